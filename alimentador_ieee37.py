@@ -0,0 +1,372 @@
+import hashlib
+import os
+import pickle
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+# ##############################################################################
+# ALIMENTADOR IEEE 37 BARRAS (TRIFÁSICO DESEQUILIBRADO, VIA OPENDSS)
+# ##############################################################################
+# Lê as planilhas de cases/ieee37/feeder37 (linhas, regulador, cargas pontuais,
+# transformadores, configurações dos cabos) e monta o alimentador no OpenDSS
+# (opendssdirect.py). As matrizes de impedância/admitância das configurações
+# 721-724 não estão nas planilhas, só no documento do caso, e foram copiadas
+# de lá para MATRIZES_CONFIG.
+#
+# O resultado da leitura das planilhas vai para um cache binário (pickle) com
+# a impressão digital dos arquivos: as execuções seguintes não abrem os .xls.
+#
+# Convenções do caso: sistema a três fios em delta, 4,8 kV; cargas em delta
+# (Ph-1 = AB, Ph-2 = BC, Ph-3 = CA); regulador em delta aberto (AB e CB) entre
+# 799 e 701; fonte ideal em 799 (1,0 pu), como no relatório de referência.
+
+DIRETORIO_IEEE37 = os.path.join('cases', 'ieee37', 'feeder37')
+DIRETORIO_CACHE_ALIMENTADOR = 'cache_alimentador'
+VERSAO_CACHE = 1
+
+KV_ALIMENTADOR = 4.8
+BARRA_FONTE = '799'
+BARRA_REGULADA = '799r'
+PASSO_TAP_PU = 0.00625
+# Posições de tap do relatório de referência (fases AB e CB)
+TAPS_REFERENCIA = (7, 4)
+
+# Z (ohm/milha) triangular superior e B (uS/milha) das configurações subterrâneas
+MATRIZES_CONFIG = {
+    721: {'r': [0.2926, 0.0673, 0.0337, 0.2646, 0.0673, 0.2926],
+          'x': [0.1973, -0.0368, -0.0417, 0.1900, -0.0368, 0.1973], 'b': 159.7919},
+    722: {'r': [0.4751, 0.1629, 0.1234, 0.4488, 0.1629, 0.4751],
+          'x': [0.2973, -0.0326, -0.0607, 0.2678, -0.0326, 0.2973], 'b': 127.8306},
+    723: {'r': [1.2936, 0.4871, 0.4585, 1.3022, 0.4871, 1.2936],
+          'x': [0.6713, 0.2111, 0.1521, 0.6326, 0.2111, 0.6713], 'b': 74.8405},
+    724: {'r': [2.0952, 0.5204, 0.4926, 2.1068, 0.5204, 2.0952],
+          'x': [0.7758, 0.2738, 0.2123, 0.7398, 0.2738, 0.7758], 'b': 60.2483},
+}
+
+# Modelo da carga no arquivo -> parâmetro 'model' do OpenDSS
+MODELOS_CARGA = {'PQ': 1, 'Z': 2, 'I': 5}
+FASES_DELTA = ('1.2', '2.3', '3.1')
+
+
+# ##############################################################################
+# LEITURA DAS PLANILHAS (COM CACHE)
+# ##############################################################################
+def _planilha(diretorio, nome):
+    return pd.read_excel(os.path.join(diretorio, nome), sheet_name=0, header=None)
+
+
+def _linhas_numericas(df, coluna=0):
+    """Linhas cuja primeira coluna é um número de barra."""
+    valores = pd.to_numeric(df[coluna], errors='coerce')
+    return df[valores.notna()]
+
+
+def _kv_conexao(texto):
+    """'4.8 D' -> (4.8, 'delta'); '.480 Y' -> (0.48, 'wye')."""
+    numero, *resto = str(texto).split()
+    return float(numero), 'wye' if resto and resto[0].upper().startswith('Y') else 'delta'
+
+
+def ler_planilhas(diretorio=DIRETORIO_IEEE37):
+    """Lê as planilhas do alimentador e devolve um dicionário com os dados já tipados."""
+    linhas = _linhas_numericas(_planilha(diretorio, 'Line Data.xls'))
+    trechos, transformadores_trecho = [], []
+    for _, r in linhas.iterrows():
+        de, para, comprimento, config = str(int(r[0])), str(int(r[1])), float(r[2]), str(r[3]).strip()
+        if config.upper().startswith('XFM'):
+            transformadores_trecho.append((de, para, config.replace(' ', '').upper()))
+        else:
+            trechos.append((de, para, comprimento, int(float(config))))
+
+    cargas = []
+    for _, r in _linhas_numericas(_planilha(diretorio, 'Spot Loads.xls')).iterrows():
+        conexao, modelo = str(r[1]).strip().split('-')
+        for fase in range(3):
+            kw, kvar = float(r[2 + 2 * fase]), float(r[3 + 2 * fase])
+            if kw or kvar:
+                cargas.append((str(int(r[0])), fase, conexao, modelo, kw, kvar))
+
+    transformadores = {}
+    for _, r in _planilha(diretorio, 'Transformer Data.xls').iterrows():
+        if pd.isna(r[1]) or pd.to_numeric(r[1], errors='coerce') != pd.to_numeric(r[1], errors='coerce'):
+            continue
+        nome = str(r[0]).replace(':', '').replace(' ', '').upper()
+        kv_alta, conexao_alta = _kv_conexao(r[2])
+        kv_baixa, conexao_baixa = _kv_conexao(r[3])
+        transformadores[nome] = {'kva': float(r[1]), 'kv_alta': kv_alta, 'kv_baixa': kv_baixa,
+                                 'conexoes': (conexao_alta, conexao_baixa), 'r_pct': float(r[4]),
+                                 'x_pct': float(r[5])}
+
+    regulador = {}
+    for _, r in _planilha(diretorio, 'Regulator Data.xls').iterrows():
+        chave = str(r[0]).strip().rstrip(':')
+        if pd.notna(r[1]) and chave and chave != 'nan':
+            regulador[chave] = [v for v in r[1:] if pd.notna(v)]
+    numero = lambda chave: float(re.findall(r'[\d.]+', str(regulador[chave][0]))[0])
+    dados_regulador = {'de': str(regulador['Line Segment'][0]).split('-')[0].strip(),
+                       'banda_v': numero('Bandwidth'), 'relacao_tp': numero('PT Ratio'),
+                       'ct_primario': numero('Primary CT Rating'), 'r_comp': numero('R - Setting'),
+                       'x_comp': numero('X - Setting'), 'v_ajuste': numero('Voltage Level')}
+
+    configuracoes = {}
+    for _, r in _linhas_numericas(_planilha(diretorio, 'UG Config.xls')).iterrows():
+        configuracoes[int(r[0])] = {'fases': str(r[1]).split(), 'cabo': str(r[2]).strip()}
+
+    return {'trechos': trechos, 'transformadores_trecho': transformadores_trecho, 'cargas': cargas,
+            'transformadores': transformadores, 'regulador': dados_regulador, 'configuracoes': configuracoes}
+
+
+def _impressao_planilhas(diretorio):
+    h = hashlib.sha1(str(VERSAO_CACHE).encode())
+    for nome in sorted(os.listdir(diretorio)):
+        if nome.lower().endswith('.xls'):
+            h.update(nome.encode())
+            with open(os.path.join(diretorio, nome), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def carregar_alimentador(diretorio=DIRETORIO_IEEE37, diretorio_cache=DIRETORIO_CACHE_ALIMENTADOR, verbose=True):
+    """
+    Dados do alimentador: do cache binário se as planilhas não mudaram,
+    senão lê os .xls e grava o cache (de forma atômica).
+    """
+    chave = _impressao_planilhas(diretorio)
+    caminho = os.path.join(diretorio_cache, f"ieee37_{chave}.pkl") if diretorio_cache else None
+    if caminho and os.path.exists(caminho):
+        try:
+            with open(caminho, 'rb') as f:
+                dados = pickle.load(f)
+            if verbose:
+                print(f"   -> Alimentador IEEE 37 lido do cache ({caminho})")
+            return dados
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    inicio = time.perf_counter()
+    dados = ler_planilhas(diretorio)
+    if caminho:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    if verbose:
+        print(f"   -> Alimentador IEEE 37 lido das planilhas em {time.perf_counter() - inicio:.2f} s")
+    return dados
+
+
+# ##############################################################################
+# MODELO OPENDSS
+# ##############################################################################
+def _matriz_dss(triangular):
+    """Triangular superior [11, 12, 13, 22, 23, 33] -> texto de matriz inferior do OpenDSS."""
+    a11, a12, a13, a22, a23, a33 = triangular
+    return f"[{a11} | {a12} {a22} | {a13} {a23} {a33}]"
+
+
+def comandos_dss(dados, taps=TAPS_REFERENCIA, controle_tap=False, penetracao_pv=0.0):
+    """
+    Lista de comandos OpenDSS do alimentador. Com 'taps' os reguladores ficam
+    fixos nessas posições; com controle_tap=True entram os RegControl das
+    planilhas. penetracao_pv > 0 cria um PVSystem em cada carga, com potência
+    nominal = penetracao_pv x kW da carga e curva diária 'pv_diario'.
+    """
+    frequencia = 60.0
+    comandos = ['clear',
+                f'new circuit.ieee37 basekv={KV_ALIMENTADOR} pu=1.0 phases=3 bus1={BARRA_FONTE} '
+                f'MVAsc3=200000 MVAsc1=210000']
+
+    for config, m in MATRIZES_CONFIG.items():
+        # B (uS/milha) -> C (nF/milha)
+        c_nf = m['b'] / (2 * np.pi * frequencia) * 1e3
+        comandos.append(f'new linecode.{config} nphases=3 units=mi rmatrix={_matriz_dss(m["r"])} '
+                        f'xmatrix={_matriz_dss(m["x"])} cmatrix=[{c_nf} | 0 {c_nf} | 0 0 {c_nf}]')
+
+    # Regulador em delta aberto (AB e CB) entre a fonte e o início do alimentador
+    reg = dados['regulador']
+    for k, (fases, tap) in enumerate(zip(('1.2', '3.2'), taps or (0, 0)), start=1):
+        comandos.append(f'new transformer.reg{k} phases=1 xhl=0.01 kvas=[1666 1666] '
+                        f'buses=[{BARRA_FONTE}.{fases} {BARRA_REGULADA}.{fases}] kvs=[{KV_ALIMENTADOR} '
+                        f'{KV_ALIMENTADOR}] %loadloss=0.01 taps=[1.0 {1.0 + tap * PASSO_TAP_PU}]')
+        if controle_tap:
+            comandos.append(f'new regcontrol.reg{k} transformer=reg{k} winding=2 vreg={reg["v_ajuste"]} '
+                            f'band={reg["banda_v"]} ptratio={reg["relacao_tp"]} ctprim={reg["ct_primario"]} '
+                            f'R={reg["r_comp"]} X={reg["x_comp"]}')
+
+    for de, para, comprimento, config in dados['trechos']:
+        # O trecho 799-701 começa depois do regulador
+        inicio = BARRA_REGULADA if de == reg['de'] else de
+        comandos.append(f'new line.{de}_{para} phases=3 bus1={inicio} bus2={para} linecode={config} '
+                        f'length={comprimento} units=ft')
+
+    barras_media = {b for de, para, _, _ in dados['trechos'] for b in (de, para)}
+    for de, para, nome in dados['transformadores_trecho']:
+        t = dados['transformadores'][nome]
+        # A planilha não garante a ordem: o lado de alta é o que está na rede de 4,8 kV
+        alta, baixa = (de, para) if de in barras_media else (para, de)
+        comandos.append(f'new transformer.{nome} phases=3 windings=2 buses=[{alta} {baixa}] '
+                        f'conns=[{t["conexoes"][0]} {t["conexoes"][1]}] kvs=[{t["kv_alta"]} {t["kv_baixa"]}] '
+                        f'kvas=[{t["kva"]} {t["kva"]}] %rs=[{t["r_pct"] / 2} {t["r_pct"] / 2}] xhl={t["x_pct"]}')
+
+    for barra, fase, conexao, modelo, kw, kvar in dados['cargas']:
+        nos = FASES_DELTA[fase] if conexao == 'D' else str(fase + 1)
+        kv = KV_ALIMENTADOR if conexao == 'D' else KV_ALIMENTADOR / np.sqrt(3)
+        comandos.append(f'new load.s{barra}_{fase + 1} bus1={barra}.{nos} phases=1 '
+                        f'conn={"delta" if conexao == "D" else "wye"} kv={kv:.4f} kw={kw} kvar={kvar} '
+                        f'model={MODELOS_CARGA[modelo]} vminpu=0.7 daily=carga_diaria')
+        if penetracao_pv > 0:
+            potencia = penetracao_pv * kw
+            comandos.append(f'new pvsystem.pv{barra}_{fase + 1} bus1={barra}.{nos} phases=1 '
+                            f'conn={"delta" if conexao == "D" else "wye"} kv={kv:.4f} pmpp={potencia} '
+                            f'kva={1.1 * potencia} irradiance=1 %cutin=0.01 %cutout=0.01 daily=pv_diario')
+
+    comandos += ['set voltagebases=[230 4.8 0.48]', 'calcv']
+    return comandos
+
+
+class AlimentadorIEEE37:
+    """
+    Alimentador IEEE 37 compilado no OpenDSS do processo. Guarda os índices dos
+    nós para ler todas as tensões de linha de uma vez a cada solução.
+    """
+
+    def __init__(self, dados=None, taps=TAPS_REFERENCIA, controle_tap=False, penetracao_pv=0.0,
+                 perfil_pv=None, perfil_carga=None):
+        import opendssdirect as dss
+
+        self.dss = dss
+        self.dados = dados if dados is not None else carregar_alimentador(verbose=False)
+        self.penetracao_pv = penetracao_pv
+        periodos = len(perfil_pv) if perfil_pv is not None else 24
+        perfil_pv = np.ones(periodos) if perfil_pv is None else np.asarray(perfil_pv, dtype=float)
+        perfil_carga = np.ones(periodos) if perfil_carga is None else np.asarray(perfil_carga, dtype=float)
+        comandos = comandos_dss(self.dados, taps=taps, controle_tap=controle_tap, penetracao_pv=penetracao_pv)
+        # As curvas diárias precisam existir antes das cargas e PVs que as usam
+        curvas = [f'new loadshape.pv_diario npts={periodos} interval=1 mult=({" ".join(map(str, perfil_pv))})',
+                  f'new loadshape.carga_diaria npts={periodos} interval=1 '
+                  f'mult=({" ".join(map(str, perfil_carga))})']
+        for comando in comandos[:2] + curvas + comandos[2:]:
+            dss.Text.Command(comando)
+        self.periodos = periodos
+        self._indexar_nos()
+
+    def _indexar_nos(self):
+        nomes = [n.lower() for n in self.dss.Circuit.AllNodeNames()]
+        posicao = {n: k for k, n in enumerate(nomes)}
+        self.barras = []
+        indices = []
+        for barra in self.dss.Circuit.AllBusNames():
+            nos = [posicao.get(f'{barra}.{f}') for f in (1, 2, 3)]
+            if None not in nos and barra.lower() != BARRA_REGULADA:
+                self.barras.append(barra)
+                indices.append(nos)
+        self._indices = np.array(indices)
+        self._kv_base = np.array([self._kv_linha(b) for b in self.barras])
+
+    def _kv_linha(self, barra):
+        self.dss.Circuit.SetActiveBus(barra)
+        return self.dss.Bus.kVBase() * np.sqrt(3)
+
+    def tensoes_linha(self):
+        """Tensões de linha (AB, BC, CA) em pu de cada barra trifásica: matriz barras x 3 complexa."""
+        v = np.array(self.dss.Circuit.AllBusVolts()).view(complex)
+        fase = v[self._indices]
+        linha = fase - np.roll(fase, -1, axis=1)
+        return linha / (self._kv_base[:, None] * 1e3)
+
+    def resolver(self, tensao_fonte_pu=1.0, mult_carga=1.0):
+        """Fluxo instantâneo; devolve (P_kw, Q_kvar) entregues pela fonte."""
+        self.dss.Vsources.PU(tensao_fonte_pu)
+        self.dss.Solution.LoadMult(mult_carga)
+        self.dss.Solution.Solve()
+        if not self.dss.Solution.Converged():
+            raise RuntimeError("Fluxo do alimentador IEEE 37 não convergiu.")
+        p, q = self.dss.Circuit.TotalPower()
+        return -p, -q
+
+    def simular_serie(self, periodos=None):
+        """
+        Série temporal (modo diário do OpenDSS, passo de 1 h) com as curvas de
+        carga e PV: as curvas são interpoladas pelo próprio OpenDSS e só as
+        grandezas agregadas e as tensões são lidas a cada passo.
+        """
+        dss = self.dss
+        periodos = periodos or self.periodos
+        dss.Text.Command('set mode=daily stepsize=1h number=1')
+        dss.Solution.Hour(0)
+        dss.Solution.Seconds(0)
+        tensoes = np.empty((periodos, len(self.barras), 3))
+        potencia = np.empty((periodos, 2))
+        perdas = np.empty(periodos)
+        pv = np.zeros(periodos)
+        taps = np.empty((periodos, 2))
+        inicio = time.perf_counter()
+        for t in range(periodos):
+            dss.Solution.Solve()
+            tensoes[t] = np.abs(self.tensoes_linha())
+            potencia[t] = -np.array(dss.Circuit.TotalPower())
+            perdas[t] = dss.Circuit.Losses()[0] / 1e3
+            if self.penetracao_pv > 0:
+                pv[t] = -sum(dss.CktElement.TotalPowers()[0] for _ in _elementos(dss, 'PVSystem'))
+            taps[t] = [_tap(dss, f'reg{k}') for k in (1, 2)]
+        return {'tensoes_pu': tensoes, 'barras': self.barras, 'potencia_fonte': potencia, 'perdas_kw': perdas,
+                'pv_kw': pv, 'taps': taps, 'tempo_s': time.perf_counter() - inicio}
+
+
+def _elementos(dss, classe):
+    """Itera ativando cada elemento de uma classe (o elemento ativo fica em dss.CktElement)."""
+    dss.Circuit.SetActiveClass(classe)
+    k = dss.ActiveClass.First()
+    while k > 0:
+        yield
+        k = dss.ActiveClass.Next()
+
+
+def _tap(dss, nome):
+    dss.Transformers.Name(nome)
+    dss.Transformers.Wdg(2)
+    return round((dss.Transformers.Tap() - 1.0) / PASSO_TAP_PU)
+
+
+def varrer_penetracao_pv(niveis, perfil_pv, perfil_carga=None, dados=None, controle_tap=True, verbose=True):
+    """
+    Série diária para cada nível de penetração de PV (fração da carga de cada
+    barra). Devolve, por nível, tensão mínima/máxima, energia da fonte, perdas
+    e manobras de tap.
+    """
+    dados = dados if dados is not None else carregar_alimentador(verbose=verbose)
+    resultados = []
+    for nivel in niveis:
+        alimentador = AlimentadorIEEE37(dados, controle_tap=controle_tap, penetracao_pv=nivel,
+                                        perfil_pv=perfil_pv, perfil_carga=perfil_carga)
+        serie = alimentador.simular_serie()
+        v = serie['tensoes_pu']
+        resumo = {'penetracao': nivel, 'v_min': float(v.min()), 'v_max': float(v.max()),
+                  'energia_fonte_kwh': float(serie['potencia_fonte'][:, 0].sum()),
+                  'energia_pv_kwh': float(serie['pv_kw'].sum()), 'perdas_kwh': float(serie['perdas_kw'].sum()),
+                  'manobras_tap': int(np.abs(np.diff(serie['taps'], axis=0)).sum()), 'tempo_s': serie['tempo_s']}
+        resultados.append(resumo)
+        if verbose:
+            print(f"      -> PV {nivel:.0%}: V em [{resumo['v_min']:.4f}, {resumo['v_max']:.4f}] pu, "
+                  f"fonte {resumo['energia_fonte_kwh']:,.0f} kWh, PV {resumo['energia_pv_kwh']:,.0f} kWh, "
+                  f"perdas {resumo['perdas_kwh']:.0f} kWh, {resumo['manobras_tap']} manobra(s) de tap "
+                  f"({resumo['tempo_s']:.2f} s)")
+    return resultados
+
+
+if __name__ == "__main__":
+    from comissionamento import PERFIL_CARGA_RTS96, perfil_der
+
+    dados = carregar_alimentador()
+    alimentador = AlimentadorIEEE37(dados)
+    p, q = alimentador.resolver()
+    v = np.abs(alimentador.tensoes_linha())
+    print(f"   -> Caso base (taps {TAPS_REFERENCIA}): fonte {p:,.1f} kW / {q:,.1f} kvar; "
+          f"V de linha em [{v.min():.4f}, {v.max():.4f}] pu")
+
+    print("   -> Série diária com PV nos telhados:")
+    varrer_penetracao_pv([0.0, 0.5, 1.0, 1.5], perfil_der('solar'), np.asarray(PERFIL_CARGA_RTS96), dados)
@@ -0,0 +1,223 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from otimizacao import resolver_lp
+
+# ##############################################################################
+# DESPACHO ÓTIMO DAS BATERIAS (LP MATRICIAL PARA TODAS AS UNIDADES)
+# ##############################################################################
+# Variáveis, para B baterias e T períodos (ordem bateria-major):
+#   carga c[b,t] >= 0, descarga d[b,t] >= 0, energia e[b,t]  (+ pico z, se houver)
+# Balanço:  e[b,t] = e[b,t-1] + eta_c*dt*c[b,t] - dt/eta_d*d[b,t]
+# A potência no pandapower segue a convenção de carga: p_mw = c - d.
+
+OBJETIVOS = ('arbitragem', 'pico')
+
+# Custo pequeno por MWh movimentado: evita carga e descarga simultâneas
+CUSTO_DEGRADACAO_PADRAO = 0.1
+
+# No objetivo 'pico' (em MW) a degradação (em $/MWh) não é comparável ao
+# pico: entra só como desempate, pequeno demais para mudar o pico ótimo.
+DESEMPATE_PICO_MW_POR_MWH = 1e-6
+
+
+class ProblemaArmazenamento:
+    """
+    Estrutura do LP de despacho para um conjunto de baterias e um horizonte.
+    As matrizes de restrição são montadas uma única vez; cada horizonte
+    (preços ou carga diferentes) só troca o vetor de custos e o lado direito.
+    """
+
+    def __init__(self, unidades, periodos, dt_h=1.0, eficiencia_ida_volta=0.9,
+                 soc_min=0.1, soc_max=0.9, soc_inicial=0.5, ciclico=True,
+                 custo_degradacao=CUSTO_DEGRADACAO_PADRAO):
+        # unidades: formato de config_storage, (barra, potencia_mw, capacidade_mwh, nome)
+        self.nomes = [u[3] for u in unidades]
+        self.potencia = np.array([u[1] for u in unidades], dtype=float)
+        self.capacidade = np.array([u[2] for u in unidades], dtype=float)
+        self.B, self.T = len(unidades), int(periodos)
+        self.dt = dt_h
+        self.eta_c = self.eta_d = np.sqrt(eficiencia_ida_volta)
+        self.soc_min, self.soc_max = soc_min, soc_max
+        self.e_inicial = soc_inicial * self.capacidade
+        self.ciclico = ciclico
+        self.custo_degradacao = custo_degradacao
+        self._montar()
+
+    def _montar(self):
+        B, T, dt = self.B, self.T, self.dt
+        n = B * T
+        eye_b = sp.identity(B, format='csr')
+        eye_t = sp.identity(T, format='csr')
+        diferenca = eye_t - sp.eye(T, k=-1, format='csr')
+
+        # Balanço de energia (igualdades)
+        self.A_eq = sp.hstack([
+            sp.kron(eye_b, -self.eta_c * dt * eye_t),
+            sp.kron(eye_b, (dt / self.eta_d) * eye_t),
+            sp.kron(eye_b, diferenca),
+        ], format='csr')
+        self.b_eq = np.zeros(n)
+        self.b_eq[np.arange(B) * T] = self.e_inicial
+
+        # Limites das variáveis
+        p = np.repeat(self.potencia, T)
+        e = np.repeat(self.capacidade, T)
+        self.lb = np.concatenate([np.zeros(n), np.zeros(n), self.soc_min * e])
+        self.ub = np.concatenate([p, p, self.soc_max * e])
+
+        # Energia final >= inicial (operação cíclica)
+        if self.ciclico:
+            linhas = np.arange(B)
+            colunas = 2 * n + np.arange(B) * T + (T - 1)
+            self.A_ciclo = sp.csr_matrix((-np.ones(B), (linhas, colunas)), shape=(B, 3 * n))
+            self.b_ciclo = -self.e_inicial
+        else:
+            self.A_ciclo = sp.csr_matrix((0, 3 * n))
+            self.b_ciclo = np.zeros(0)
+
+        # Soma sobre as baterias, por período: S @ c = sum_b c[b, t]
+        self._soma = sp.kron(np.ones((1, B)), eye_t, format='csr')
+
+    def _problema(self, precos=None, carga=None, objetivo='arbitragem'):
+        B, T, dt = self.B, self.T, self.dt
+        n = B * T
+
+        if objetivo == 'arbitragem':
+            if precos is None:
+                raise ValueError("O objetivo 'arbitragem' exige a série de preços.")
+            precos = np.asarray(precos, dtype=float)
+            c = np.concatenate([np.tile(precos * dt, B), -np.tile(precos * dt, B), np.zeros(n)])
+            c[:2 * n] += self.custo_degradacao * dt
+            return c, self.A_ciclo, self.b_ciclo, self.A_eq, self.b_eq, self.lb, self.ub
+
+        if objetivo == 'pico':
+            if carga is None:
+                raise ValueError("O objetivo 'pico' exige a série de carga.")
+            carga = np.asarray(carga, dtype=float)
+            # Variável extra z (pico): carga[t] + sum_b (c - d) <= z
+            desempate = np.full(2 * n, DESEMPATE_PICO_MW_POR_MWH * dt)
+            c = np.concatenate([desempate, np.zeros(n), [1.0]])
+            A_pico = sp.hstack([self._soma, -self._soma, sp.csr_matrix((T, n)),
+                                -np.ones((T, 1))], format='csr')
+            A_ub = sp.vstack([A_pico, sp.hstack([self.A_ciclo, sp.csr_matrix((self.A_ciclo.shape[0], 1))])],
+                             format='csr')
+            b_ub = np.concatenate([-carga, self.b_ciclo])
+            A_eq = sp.hstack([self.A_eq, sp.csr_matrix((self.A_eq.shape[0], 1))], format='csr')
+            lb = np.concatenate([self.lb, [-np.inf]])
+            ub = np.concatenate([self.ub, [np.inf]])
+            return c, A_ub, b_ub, A_eq, self.b_eq, lb, ub
+
+        raise ValueError(f"Objetivo '{objetivo}' desconhecido. Use um de {OBJETIVOS}.")
+
+    def resolver(self, precos=None, carga=None, objetivo='arbitragem', backend='auto'):
+        """Resolve um horizonte e devolve o despacho (matrizes B x T)."""
+        serie = precos if objetivo == 'arbitragem' else carga
+        if serie is None:
+            # Deixa _problema acusar a série que faltou
+            self._problema(precos, carga, objetivo)
+        return self.resolver_lote([serie], objetivo=objetivo, backend=backend)[0]
+
+    def resolver_lote(self, series, objetivo='arbitragem', backend='auto'):
+        """
+        Resolve vários horizontes em um único LP bloco-diagonal (um bloco por
+        horizonte), reduzindo o custo fixo de cada chamada ao solver.
+        """
+        series = np.atleast_2d(np.asarray(series, dtype=float))
+        K = len(series)
+        chave = 'precos' if objetivo == 'arbitragem' else 'carga'
+        partes = [self._problema(objetivo=objetivo, **{chave: serie}) for serie in series]
+        c = np.concatenate([p[0] for p in partes])
+        A_ub = sp.block_diag([p[1] for p in partes], format='csr')
+        b_ub = np.concatenate([p[2] for p in partes])
+        A_eq = sp.block_diag([p[3] for p in partes], format='csr')
+        b_eq = np.concatenate([p[4] for p in partes])
+        lb = np.concatenate([p[5] for p in partes])
+        ub = np.concatenate([p[6] for p in partes])
+        resultado = resolver_lp(c, A_ub, b_ub, A_eq, b_eq, lb, ub, backend=backend)
+        if not resultado['sucesso']:
+            raise RuntimeError(f"Despacho das baterias falhou: {resultado['status']}")
+
+        n = self.B * self.T
+        tamanho = len(partes[0][0])
+        blocos = resultado['x'].reshape(K, tamanho)
+        despachos = []
+        for k in range(K):
+            x = blocos[k]
+            carga_b = x[:n].reshape(self.B, self.T)
+            descarga_b = x[n:2 * n].reshape(self.B, self.T)
+            despachos.append({
+                'nomes': self.nomes,
+                'carga_mw': carga_b,
+                'descarga_mw': descarga_b,
+                'energia_mwh': x[2 * n:3 * n].reshape(self.B, self.T),
+                'p_mw': carga_b - descarga_b,
+                'objetivo': float(partes[k][0] @ x),
+                'backend': resultado['backend'],
+                'tempo_s': resultado['tempo_s'] / K,
+            })
+        return despachos
+
+
+def _resolver_bloco(argumentos):
+    problema, series, objetivo, backend = argumentos
+    return problema.resolver_lote(series, objetivo=objetivo, backend=backend)
+
+
+def otimizar_horizontes(problema, series, objetivo='arbitragem', backend='auto', processos=None, bloco=64):
+    """
+    Resolve muitos horizontes (ex.: milhares de dias) com a mesma estrutura.
+    'series' é uma matriz (horizontes x T) de preços ou de carga. Os
+    horizontes são agrupados em blocos (um LP bloco-diagonal por bloco) e os
+    blocos são resolvidos em paralelo.
+    """
+    series = np.asarray(series, dtype=float)
+    blocos = [(problema, series[i:i + bloco], objetivo, backend) for i in range(0, len(series), bloco)]
+    inicio = time.perf_counter()
+    if processos == 1 or len(blocos) == 1:
+        resultados = [_resolver_bloco(b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_resolver_bloco, blocos))
+    despachos = [d for bloco_resultado in resultados for d in bloco_resultado]
+    print(f"   -> {len(despachos)} horizonte(s) de despacho resolvidos em {time.perf_counter() - inicio:.2f} s.")
+    return despachos
+
+
+def aplicar_despacho(net, despacho, periodo=0):
+    """Escreve em net.storage.p_mw os setpoints de um período do despacho (por nome)."""
+    for k, nome in enumerate(despacho['nomes']):
+        linhas = net.storage.index[net.storage.name == nome]
+        if linhas.empty:
+            print(f"      -> AVISO: Bateria {nome} não encontrada na rede. Setpoint ignorado.")
+            continue
+        net.storage.loc[linhas, 'p_mw'] = despacho['p_mw'][k, periodo]
+
+
+def despachar_baterias(unidades, config_despacho, backend='auto'):
+    """
+    Atalho usado por simular_rede: monta o problema a partir de config_storage
+    e de um dicionário de despacho, por exemplo
+    {'objetivo': 'arbitragem', 'precos': [...24 valores...], 'periodo': 18}.
+    """
+    objetivo = config_despacho.get('objetivo', 'arbitragem')
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"Objetivo '{objetivo}' desconhecido. Use um de {OBJETIVOS}.")
+    chave = 'precos' if objetivo == 'arbitragem' else 'carga'
+    serie = config_despacho.get(chave)
+    if serie is None:
+        raise ValueError(f"O objetivo '{objetivo}' exige a série '{chave}' no despacho.")
+    try:
+        serie = np.asarray(serie, dtype=float)
+        valida = serie.ndim == 1 and serie.size > 0
+    except (TypeError, ValueError):
+        valida = False
+    if not valida:
+        raise ValueError(f"A série '{chave}' do despacho deve ser uma lista de números, um por período.")
+    opcoes = {k: config_despacho[k] for k in ('dt_h', 'eficiencia_ida_volta', 'soc_min', 'soc_max',
+                                               'soc_inicial', 'ciclico') if k in config_despacho}
+    problema = ProblemaArmazenamento(unidades, len(serie), **opcoes)
+    return problema.resolver(objetivo=objetivo, backend=backend, **{chave: serie})
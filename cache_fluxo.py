@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ##############################################################################
+# IMPRESSÃO DIGITAL DA REDE E CACHE DE RESULTADOS DO FLUXO DE POTÊNCIA
+# ##############################################################################
+# Entram na impressão digital todas as colunas das tabelas elétricas (tudo o
+# que o pd2ppc pode ler, inclusive limites como line.max_i_ka, que mudam o
+# loading_percent guardado nos res_*), menos uma lista explícita do que não é
+# elétrico: nomes, tags, tipos padrão, geometria e dados puramente de energia
+# das baterias. Assim uma coluna nova do pandapower entra no hash por padrão,
+# e cenários que só mudam dados econômicos (ex.: remuneração do crédito, que
+# nem está na rede) reaproveitam o resultado elétrico.
+TABELAS_FLUXO = (
+    'bus', 'line', 'trafo', 'trafo3w', 'impedance', 'switch', 'shunt', 'ward', 'xward',
+    'load', 'sgen', 'storage', 'gen', 'ext_grid', 'motor', 'asymmetric_load', 'asymmetric_sgen',
+    'dcline', 'svc', 'tcsc', 'ssc', 'vsc', 'vsc_stacked', 'vsc_bipolar', 'bus_dc', 'line_dc',
+    'load_dc', 'source_dc',
+    # Características de tap, de degraus de shunt e de capacidade de reativo
+    'trafo_characteristic_table', 'shunt_characteristic_table', 'q_capability_curve_table',
+    'q_capability_characteristic',
+)
+COLUNAS_IGNORADAS = {'name', 'std_type', 'tags', 'geo', 'zone'}
+COLUNAS_IGNORADAS_TABELA = {
+    'storage': {'max_e_mwh', 'min_e_mwh', 'soc_percent'},
+}
+
+
+def colunas_fluxo(tabela, df):
+    """Colunas de uma tabela que entram na impressão digital (ordem estável)."""
+    ignoradas = COLUNAS_IGNORADAS | COLUNAS_IGNORADAS_TABELA.get(tabela, set())
+    return sorted((coluna for coluna in df.columns if coluna not in ignoradas), key=str)
+
+TAMANHO_CACHE_MEMORIA = 256
+TAMANHO_CACHE_DISCO = 5000
+
+
+def _bytes_coluna(serie):
+    """Representação binária canônica de uma coluna (NaN e -0.0 normalizados)."""
+    if serie.dtype == object or isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype.kind in 'SU':
+        valores = serie.astype(str).values
+        return '\x1f'.join(valores).encode('utf-8')
+    valores = pd.to_numeric(serie, errors='coerce').astype(np.float64).values
+    valores = np.where(valores == 0.0, 0.0, valores)
+    valores = np.where(np.isnan(valores), np.nan, valores)
+    return np.ascontiguousarray(valores).tobytes()
+
+
+def impressao_digital(net, opcoes_fluxo=None):
+    """
+    Hash SHA-1 das tabelas e opções que influenciam o fluxo de potência.
+    A ordem das linhas não importa (as tabelas são ordenadas pelo índice).
+    """
+    h = hashlib.sha1()
+    h.update(repr(float(net.sn_mva)).encode())
+    h.update(repr(float(net.f_hz)).encode())
+    for tabela in TABELAS_FLUXO:
+        if tabela not in net or not isinstance(net[tabela], pd.DataFrame) or net[tabela].empty:
+            continue
+        df = net[tabela].sort_index()
+        h.update(f"|{tabela}:{len(df)}|".encode())
+        h.update(np.ascontiguousarray(df.index.values.astype(np.int64)).tobytes())
+        for coluna in colunas_fluxo(tabela, df):
+            h.update(str(coluna).encode())
+            h.update(_bytes_coluna(df[coluna]))
+    if opcoes_fluxo:
+        h.update(json.dumps(opcoes_fluxo, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def extrair_resultados(net):
+    """Copia as tabelas res_* da rede (o que o cache guarda)."""
+    return {nome: net[nome].copy() for nome in net.keys()
+            if nome.startswith('res_') and isinstance(net[nome], pd.DataFrame) and not net[nome].empty}
+
+
+def aplicar_resultados(net, resultados):
+    """Escreve resultados guardados de volta nas tabelas res_* da rede."""
+    for nome, tabela in resultados.items():
+        net[nome] = tabela.copy()
+    net['converged'] = True
+
+
+class CacheFluxo:
+    """
+    Cache LRU de resultados de fluxo de potência, em memória e, opcionalmente,
+    em disco (um pickle por impressão digital, gravado de forma atômica, para
+    ser compartilhado entre os processos de uma varredura).
+    """
+
+    def __init__(self, diretorio=None, capacidade_memoria=TAMANHO_CACHE_MEMORIA,
+                 capacidade_disco=TAMANHO_CACHE_DISCO):
+        self.diretorio = diretorio
+        self.capacidade_memoria = capacidade_memoria
+        self.capacidade_disco = capacidade_disco
+        self._memoria = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.pkl")
+
+    def obter(self, chave):
+        if chave in self._memoria:
+            self._memoria.move_to_end(chave)
+            self.acertos += 1
+            return self._memoria[chave]
+        if self.diretorio:
+            caminho = self._caminho(chave)
+            try:
+                with open(caminho, 'rb') as f:
+                    valor = pickle.load(f)
+                os.utime(caminho)  # marca como usado recentemente (LRU em disco)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                valor = None
+            if valor is not None:
+                self._guardar_memoria(chave, valor)
+                self.acertos += 1
+                return valor
+        self.faltas += 1
+        return None
+
+    def guardar(self, chave, valor):
+        self._guardar_memoria(chave, valor)
+        if not self.diretorio:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(chave)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        self._despejar_disco()
+
+    def _guardar_memoria(self, chave, valor):
+        self._memoria[chave] = valor
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.capacidade_memoria:
+            self._memoria.popitem(last=False)
+
+    def _despejar_disco(self):
+        """Remove os arquivos usados há mais tempo quando o disco passa da capacidade."""
+        with os.scandir(self.diretorio) as entradas:
+            arquivos = [e for e in entradas if e.name.endswith('.pkl')]
+        excesso = len(arquivos) - self.capacidade_disco
+        if excesso <= 0:
+            return
+        arquivos.sort(key=lambda e: e.stat().st_mtime)
+        for entrada in arquivos[:excesso]:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
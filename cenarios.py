@@ -0,0 +1,250 @@
+import copy
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# ##############################################################################
+# CENÁRIOS DECLARATIVOS COM EXPANSÃO SOB DEMANDA
+# ##############################################################################
+# Um arquivo de cenários (JSON, ou YAML se o PyYAML estiver instalado) tem:
+#
+#   {
+#     "nome": "varredura_der",
+#     "base": { ...mesma estrutura de configurar_cenario()... },   (opcional)
+#     "variacoes": <nó>
+#   }
+#
+# Um <nó> pode ser:
+#   {"parametro": "ders.unidades.0.1", "valores": [100, 150, 200]}
+#   {"parametro": "compensacao.remuneracao_credito_mwh", "faixa": [50, 100, 5]}
+#   {"parametro": "storage.unidades.1.2", "linspace": [200, 600, 5]}
+#   {"produto": [<nó>, <nó>, ...]}
+#   {"zip": [<nó>, <nó>, ...]}
+#   {"amostras": {"n": 1000, "semente": 42,
+#                 "parametros": {"ders.unidades.0.1": {"uniforme": [50, 300]},
+#                                "ders.unidades.0.3": {"escolha": ["solar", "eolico"]}}}}
+#
+# Os caminhos usam ponto para descer em dicionários e inteiros para índices de
+# listas/tuplas. Nenhum nó materializa sua sequência: cada um gera os valores
+# de novo a cada iteração, então a memória não cresce com o tamanho da grade.
+
+
+class _Parametro:
+    def __init__(self, caminho, valores):
+        self.caminho = caminho
+        self._valores = valores
+
+    def __len__(self):
+        return len(self._valores)
+
+    def iterar(self):
+        for valor in self._valores:
+            yield {self.caminho: valor}
+
+
+class _Faixa(_Parametro):
+    """Faixa aritmética gerada sob demanda (não guarda os valores)."""
+
+    def __init__(self, caminho, inicio, fim, passo):
+        self.caminho = caminho
+        self.inicio, self.passo = inicio, passo
+        self._n = max(0, int(np.floor((fim - inicio) / passo + 1e-9)) + 1)
+
+    def __len__(self):
+        return self._n
+
+    def iterar(self):
+        for k in range(self._n):
+            yield {self.caminho: _nativo(self.inicio + k * self.passo)}
+
+
+class _Produto:
+    def __init__(self, filhos):
+        self.filhos = filhos
+
+    def __len__(self):
+        total = 1
+        for filho in self.filhos:
+            total *= len(filho)
+        return total
+
+    def iterar(self):
+        # Recursivo em vez de itertools.product, que guardaria cada filho em memória
+        yield from self._iterar(0)
+
+    def _iterar(self, k):
+        if k == len(self.filhos):
+            yield {}
+            return
+        for atual in self.filhos[k].iterar():
+            for resto in self._iterar(k + 1):
+                yield {**atual, **resto}
+
+
+class _Zip:
+    def __init__(self, filhos):
+        self.filhos = filhos
+
+    def __len__(self):
+        return min(len(filho) for filho in self.filhos) if self.filhos else 0
+
+    def iterar(self):
+        for partes in zip(*(filho.iterar() for filho in self.filhos)):
+            combinado = {}
+            for parte in partes:
+                combinado.update(parte)
+            yield combinado
+
+
+class _Amostras:
+    """Amostras aleatórias reprodutíveis: a semente é reiniciada a cada iteração."""
+
+    def __init__(self, n, parametros, semente=0):
+        self.n = int(n)
+        self.parametros = parametros
+        self.semente = semente
+
+    def __len__(self):
+        return self.n
+
+    def iterar(self):
+        rng = np.random.default_rng(self.semente)
+        for _ in range(self.n):
+            amostra = {}
+            for caminho, distribuicao in self.parametros.items():
+                amostra[caminho] = _sortear(rng, distribuicao)
+            yield amostra
+
+
+def _sortear(rng, distribuicao):
+    if 'uniforme' in distribuicao:
+        a, b = distribuicao['uniforme']
+        return float(rng.uniform(a, b))
+    if 'inteiro' in distribuicao:
+        a, b = distribuicao['inteiro']
+        return int(rng.integers(a, b + 1))
+    if 'normal' in distribuicao:
+        media, desvio = distribuicao['normal']
+        return float(rng.normal(media, desvio))
+    if 'escolha' in distribuicao:
+        opcoes = distribuicao['escolha']
+        return opcoes[int(rng.integers(len(opcoes)))]
+    raise ValueError(f"Distribuição desconhecida: {distribuicao}")
+
+
+def _nativo(valor):
+    """Converte escalares numpy em tipos nativos (para JSON e hash estáveis)."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def compilar_no(no):
+    """Transforma a descrição de um nó (dict) no objeto gerador correspondente."""
+    if 'produto' in no:
+        return _Produto([compilar_no(filho) for filho in no['produto']])
+    if 'zip' in no:
+        return _Zip([compilar_no(filho) for filho in no['zip']])
+    if 'amostras' in no:
+        spec = no['amostras']
+        return _Amostras(spec['n'], spec['parametros'], spec.get('semente', 0))
+    if 'parametro' in no:
+        caminho = no['parametro']
+        if 'valores' in no:
+            return _Parametro(caminho, list(no['valores']))
+        if 'faixa' in no:
+            inicio, fim, passo = no['faixa']
+            return _Faixa(caminho, inicio, fim, passo)
+        if 'linspace' in no:
+            inicio, fim, n = no['linspace']
+            passo = (fim - inicio) / (n - 1) if n > 1 else 1.0
+            return _Faixa(caminho, inicio, fim if n > 1 else inicio, passo)
+    raise ValueError(f"Nó de variação inválido: {no}")
+
+
+def aplicar_valor(configs, caminho, valor):
+    """Define 'valor' no caminho pontuado (tuplas são reconstruídas)."""
+    partes = caminho.split('.')
+
+    def _definir(alvo, resto):
+        chave = resto[0]
+        if isinstance(alvo, (list, tuple)):
+            chave = int(chave)
+        if len(resto) == 1:
+            novo = valor
+        else:
+            novo = _definir(alvo[chave], resto[1:])
+        if isinstance(alvo, tuple):
+            return alvo[:chave] + (novo,) + alvo[chave + 1:]
+        alvo[chave] = novo
+        return alvo
+
+    _definir(configs, partes)
+    return configs
+
+
+def hash_cenario(configs):
+    """Hash estável do cenário expandido (independente da ordem das chaves)."""
+    conteudo = {k: v for k, v in configs.items() if k not in ('nome', 'hash')}
+    texto = json.dumps(conteudo, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def carregar_arquivo(caminho):
+    """Lê um arquivo de cenários JSON ou YAML."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        if os.path.splitext(caminho)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Arquivos YAML exigem o pacote PyYAML (pip install pyyaml).")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class EspacoCenarios:
+    """
+    Espaço de cenários descrito por um arquivo declarativo. É re-iterável e
+    expande um cenário por vez: iterar produz pares (hash, configs).
+    """
+
+    def __init__(self, especificacao, base=None):
+        self.nome = especificacao.get('nome', 'cenario')
+        self.base = especificacao.get('base', base)
+        if self.base is None:
+            raise ValueError("O arquivo de cenários não define 'base' e nenhuma base foi informada.")
+        variacoes = especificacao.get('variacoes')
+        self._raiz = compilar_no(variacoes) if variacoes else _Parametro('__nada__', [None])
+        self._sem_variacao = not variacoes
+
+    @classmethod
+    def de_arquivo(cls, caminho, base=None):
+        return cls(carregar_arquivo(caminho), base=base)
+
+    def __len__(self):
+        return len(self._raiz)
+
+    def __iter__(self):
+        return self.expandir()
+
+    def expandir(self, deduplicar=False):
+        """
+        Gera (hash, configs) para cada cenário. Com deduplicar=True, cenários
+        repetidos são pulados (guarda apenas os hashes já vistos).
+        """
+        vistos = set() if deduplicar else None
+        for valores in self._raiz.iterar():
+            configs = copy.deepcopy(self.base)
+            if not self._sem_variacao:
+                for caminho, valor in valores.items():
+                    aplicar_valor(configs, caminho, valor)
+            chave = hash_cenario(configs)
+            if vistos is not None:
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+            configs['nome'] = f"{self.nome}_{chave[:10]}"
+            configs['hash'] = chave
+            yield chave, configs
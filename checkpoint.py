@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from datetime import datetime
+
+# ##############################################################################
+# CHECKPOINT E RETOMADA DE VARREDURAS
+# ##############################################################################
+# O próprio arquivo de resultados (JSONL) é o registro do que já foi feito.
+# Os resultados ficam em memória e são gravados em lote a cada intervalo; após
+# cada lote, o manifesto '<resultados>.ckpt.json' é substituído atomicamente
+# com o tamanho confirmado do arquivo. Na retomada, tudo o que estiver além
+# desse tamanho (escrita interrompida) é descartado e refeito.
+#
+# Registros com 'erro' também vão para o arquivo (o dashboard os mostra), mas
+# não contam como concluídos: uma retomada tenta esses cenários de novo, e a
+# linha nova (mais adiante no arquivo) prevalece na leitura.
+
+INTERVALO_PADRAO_S = 30.0
+
+# Prefixo do hash guardado em memória por cenário concluído (16 bytes bastam)
+BYTES_HASH = 16
+
+
+class CheckpointVarredura:
+    """Controle de progresso de uma varredura, com gravação atômica em lotes."""
+
+    def __init__(self, arquivo_resultados, intervalo_s=INTERVALO_PADRAO_S):
+        self.arquivo_resultados = arquivo_resultados
+        self.arquivo_manifesto = arquivo_resultados + '.ckpt.json'
+        self.intervalo_s = intervalo_s
+        self._concluidos = set()
+        self._buffer = []
+        self._offset = 0
+        self.num_falhas = 0
+        self._ultimo_salvamento = time.perf_counter()
+        self.tempo_checkpoint_s = 0.0
+        self.num_checkpoints = 0
+
+    @staticmethod
+    def _chave(hash_cenario):
+        return bytes.fromhex(hash_cenario)[:BYTES_HASH]
+
+    def retomar(self):
+        """
+        Lê o manifesto e o arquivo de resultados, descarta uma cauda não
+        confirmada e carrega os hashes já concluídos (registros com 'erro'
+        ficam de fora e voltam para a fila). Retorna quantos são.
+        """
+        offset = None
+        if os.path.exists(self.arquivo_manifesto):
+            with open(self.arquivo_manifesto, 'r', encoding='utf-8') as f:
+                offset = json.load(f).get('offset', 0)
+
+        if not os.path.exists(self.arquivo_resultados):
+            self._offset = 0
+            return 0
+
+        with open(self.arquivo_resultados, 'rb') as f:
+            conteudo = f.read() if offset is None else f.read(offset)
+        if offset is None:
+            # Sem manifesto (ex.: arquivo de uma versão anterior): vale até a última linha completa
+            offset = conteudo.rfind(b'\n') + 1
+            conteudo = conteudo[:offset]
+        if os.path.getsize(self.arquivo_resultados) > offset:
+            with open(self.arquivo_resultados, 'r+b') as f:
+                f.truncate(offset)
+
+        for linha in conteudo.splitlines():
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+                chave = self._chave(registro['hash'])
+            except (ValueError, KeyError):
+                continue
+            if 'erro' not in registro:
+                self._concluidos.add(chave)
+        self._offset = offset
+        return len(self._concluidos)
+
+    def concluido(self, hash_cenario):
+        return self._chave(hash_cenario) in self._concluidos
+
+    def registrar(self, hash_cenario, registro):
+        """
+        Guarda o resultado para o próximo lote e marca o cenário como
+        concluído, a menos que o registro tenha 'erro'.
+        """
+        if 'erro' in registro:
+            self.num_falhas += 1
+        else:
+            self._concluidos.add(self._chave(hash_cenario))
+        self._buffer.append(json.dumps(registro, default=float, ensure_ascii=False) + "\n")
+        if time.perf_counter() - self._ultimo_salvamento >= self.intervalo_s:
+            self.salvar()
+
+    def salvar(self):
+        """Grava o lote pendente e atualiza o manifesto de forma atômica."""
+        inicio = time.perf_counter()
+        if self._buffer:
+            dados = ''.join(self._buffer).encode('utf-8')
+            with open(self.arquivo_resultados, 'ab') as f:
+                f.write(dados)
+                f.flush()
+                os.fsync(f.fileno())
+            self._offset += len(dados)
+            self._buffer = []
+
+        manifesto = {
+            'offset': self._offset,
+            'concluidos': len(self._concluidos),
+            'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+        }
+        temporario = self.arquivo_manifesto + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.arquivo_manifesto)
+
+        self._ultimo_salvamento = time.perf_counter()
+        self.tempo_checkpoint_s += self._ultimo_salvamento - inicio
+        self.num_checkpoints += 1
+
+    @property
+    def num_concluidos(self):
+        return len(self._concluidos)
@@ -0,0 +1,419 @@
+import numpy as np
+import scipy.sparse as sp
+
+from baterias import ProblemaArmazenamento
+from leitor_matpower import (CUSTO_N, CUSTO_PARTIDA, GEN_STATUS, PD, PG, PMAX, PMIN,
+                             ler_caso_matpower)
+from otimizacao import resolver_milp
+
+# ##############################################################################
+# COMISSIONAMENTO DE UNIDADES (UNIT COMMITMENT) EM DIAS SUCESSIVOS
+# ##############################################################################
+# Modelo barra única (sem rede) para o caso pglib_opf_case73_ieee_rts:
+#   - u[g,t] binária (ligada), v/w partida e parada (contínuas em [0, 1]);
+#   - tempos mínimos ligada/desligada, rampas de subida/descida, custo de partida;
+#   - custo quadrático do gencost linearizado por segmentos;
+#   - DERs (despachados até a disponibilidade) e baterias do cenário;
+#   - reserva girante e corte de carga com custo alto (garante viabilidade).
+# Cada dia é um MILP de 24 h; o estado final (unidades ligadas, potência,
+# horas no estado e energia das baterias) vira a condição inicial do dia seguinte.
+
+CASO_RTS = 'cases/pglib_opf_case73_ieee_rts.m'
+
+# Dados operativos do IEEE RTS-96 (Tabela 9 do artigo), por potência máxima:
+#   pmax_mw: (tempo mínimo desligada h, tempo mínimo ligada h, rampa MW/min)
+DADOS_RTS96 = {
+    12.0: (2, 4, 1.0),
+    20.0: (1, 1, 3.0),
+    50.0: (1, 1, 50.0),   # hidráulicas: sem restrição relevante
+    76.0: (4, 8, 2.0),
+    100.0: (8, 8, 7.0),
+    155.0: (8, 8, 3.0),
+    197.0: (10, 12, 3.0),
+    350.0: (48, 24, 4.0),
+    400.0: (48, 1, 20.0),
+}
+
+# Perfil horário da carga (fração do pico diário, dia útil de inverno, RTS-96)
+PERFIL_CARGA_RTS96 = np.array([67, 63, 60, 59, 59, 60, 74, 86, 95, 96, 96, 95,
+                               95, 95, 93, 94, 99, 100, 100, 96, 91, 83, 73, 63]) / 100.0
+
+# Pico de cada dia da semana (fração do pico semanal), de segunda a domingo
+PICO_DIARIO_RTS96 = np.array([93, 100, 98, 96, 94, 77, 75]) / 100.0
+
+SEGMENTOS_CUSTO = 3
+CUSTO_DEFICIT = 10000.0   # $/MWh de carga cortada
+RESERVA_GIRANTE = 0.05    # fração da carga
+
+# As três áreas do RTS-96 são réplicas: a simetria torna cara a prova de
+# otimalidade, então o gap padrão é 1% e cada dia tem um tempo limite.
+GAP_UC = 1e-2
+TEMPO_LIMITE_DIA_S = 120.0
+
+
+def perfil_der(tipo, periodos=24, dia=0, semente=0):
+    """Fator de capacidade horário de um DER ('solar' ou 'eolico')."""
+    horas = np.arange(periodos) % 24
+    if tipo == 'solar':
+        return np.clip(np.sin((horas - 6) / 12 * np.pi), 0.0, None) ** 1.5
+    rng = np.random.default_rng(semente + 1000 * dia)
+    base = 0.45 + 0.15 * np.cos((horas - 3) / 24 * 2 * np.pi)
+    return np.clip(base + rng.normal(0.0, 0.08, periodos).cumsum() * 0.3, 0.05, 1.0)
+
+
+def _banda(T, largura):
+    """Matriz T x T que soma as 'largura' últimas posições (janela deslizante)."""
+    largura = int(max(1, min(largura, T)))
+    return sp.diags([np.ones(T - k) for k in range(largura)], [-k for k in range(largura)],
+                    shape=(T, T), format='csr')
+
+
+class ComissionamentoUnidades:
+    """
+    Monta e resolve o comissionamento de unidades dia a dia. As matrizes que
+    não dependem do dia são montadas uma vez; cada dia só troca a carga, a
+    disponibilidade dos DERs e as condições iniciais.
+    """
+
+    def __init__(self, caso=CASO_RTS, ders=None, baterias=None, periodos=24,
+                 segmentos=SEGMENTOS_CUSTO, reserva=RESERVA_GIRANTE, backend='auto'):
+        mpc = ler_caso_matpower(caso) if isinstance(caso, str) else caso
+        gen, custo = mpc['gen'], mpc['gencost']
+        # Compensadores síncronos (pmax = 0) e unidades fora de serviço não entram no UC
+        ativos = (gen[:, PMAX] > 0) & (gen[:, GEN_STATUS] > 0)
+        self.indices_gen = np.flatnonzero(ativos)
+        gen, custo = gen[ativos], custo[ativos]
+
+        self.G, self.T, self.K = len(gen), int(periodos), int(segmentos)
+        self.pmax, self.pmin = gen[:, PMAX], gen[:, PMIN]
+        self.carga_pico = float(mpc['bus'][:, PD].sum())
+        self.reserva = reserva
+        self.backend = backend
+
+        dados = np.array([DADOS_RTS96.get(float(p), (1, 1, p / 60.0)) for p in self.pmax])
+        self.tempo_min_desligada = dados[:, 0].astype(int)
+        self.tempo_min_ligada = dados[:, 1].astype(int)
+        self.rampa = dados[:, 2] * 60.0            # MW/h
+        self.rampa_partida = np.maximum(self.pmin, self.rampa)
+        self.custo_partida = custo[:, CUSTO_PARTIDA]
+        self._linearizar_custos(custo)
+
+        self.ders = list((ders or {}).get('unidades', []))
+        self.R = len(self.ders)
+        self.baterias = list((baterias or {}).get('unidades', []))
+        self.B = len(self.baterias)
+
+        # Estado inicial: despacho do caso, unidades há muito tempo no estado
+        self.estado = {
+            'ligada': gen[:, PG] > 0,
+            'potencia': np.where(gen[:, PG] > 0, np.clip(gen[:, PG], self.pmin, self.pmax), 0.0),
+            'horas_no_estado': np.full(self.G, 1000),
+            'soc': np.full(self.B, 0.5),
+        }
+        self._montar()
+
+    def _linearizar_custos(self, custo):
+        """Custo quadrático c2 p² + c1 p + c0 em segmentos iguais entre pmin e pmax."""
+        n = custo[:, CUSTO_N].astype(int)
+        if np.any(custo[:, 0] != 2) or np.any(n > 3):
+            raise ValueError("Só custos polinomiais de grau até 2 são suportados.")
+        coef = np.zeros((self.G, 3))  # c2, c1, c0
+        for g in range(self.G):
+            coef[g, 3 - n[g]:] = custo[g, 4:4 + n[g]]
+
+        def custo_em(p):
+            return coef[:, 0] * p ** 2 + coef[:, 1] * p + coef[:, 2]
+
+        self.largura_segmento = (self.pmax - self.pmin) / self.K
+        pontos = self.pmin[:, None] + self.largura_segmento[:, None] * np.arange(self.K + 1)
+        valores = np.column_stack([custo_em(pontos[:, k]) for k in range(self.K + 1)])
+        self.custo_minimo = valores[:, 0]
+        largura = np.where(self.largura_segmento > 0, self.largura_segmento, 1.0)
+        self.custo_segmento = np.diff(valores, axis=1) / largura[:, None]
+
+    def _montar(self):
+        """Matrizes fixas do MILP (ordem: u, v, w, p, s, r, c, d, e, deficit)."""
+        G, T, K, R, B = self.G, self.T, self.K, self.R, self.B
+        GT = G * T
+        self.tamanhos = {'u': GT, 'v': GT, 'w': GT, 'p': GT, 's': GT * K, 'r': R * T,
+                         'c': B * T, 'd': B * T, 'e': B * T, 'deficit': T}
+        self.offsets = {}
+        total = 0
+        for nome, tamanho in self.tamanhos.items():
+            self.offsets[nome] = total
+            total += tamanho
+        self.n = total
+
+        I_T = sp.identity(T, format='csr')
+        I_GT = sp.identity(GT, format='csr')
+        atraso = sp.eye(T, k=-1, format='csr')
+        diferenca = I_T - atraso
+        kron_g = lambda m: sp.kron(sp.identity(G), m, format='csr')  # noqa: E731
+        diag_g = lambda x: sp.kron(sp.diags(x), I_T, format='csr')  # noqa: E731
+        soma_g = sp.kron(np.ones((1, G)), I_T, format='csr')
+
+        # Igualdades
+        igualdades = [
+            # p - pmin u - sum_k s = 0
+            self._linha(GT, p=I_GT, u=-diag_g(self.pmin),
+                        s=-sp.kron(I_GT, np.ones((1, K)), format='csr')),
+            # u_t - u_{t-1} - v_t + w_t = u0 (em t = 0)
+            self._linha(GT, u=kron_g(diferenca), v=-I_GT, w=I_GT),
+        ]
+        # Balanço: sum p + sum r + sum (d - c) + deficit = carga
+        balanco = {'p': soma_g, 'deficit': I_T}
+        if R:
+            balanco['r'] = sp.kron(np.ones((1, R)), I_T, format='csr')
+        if B:
+            soma_b = sp.kron(np.ones((1, B)), I_T, format='csr')
+            balanco['c'], balanco['d'] = -soma_b, soma_b
+            self.armazenamento = ProblemaArmazenamento(self.baterias, T, ciclico=False)
+            igualdades.append(self._linha(B * T, c=self.armazenamento.A_eq[:, :B * T],
+                                          d=self.armazenamento.A_eq[:, B * T:2 * B * T],
+                                          e=self.armazenamento.A_eq[:, 2 * B * T:]))
+        igualdades.append(self._linha(T, **balanco))
+        self.A_eq = sp.vstack(igualdades, format='csr')
+
+        # Desigualdades
+        ligada = sp.block_diag([_banda(T, h) for h in self.tempo_min_ligada], format='csr')
+        desligada = sp.block_diag([_banda(T, h) for h in self.tempo_min_desligada], format='csr')
+        self.A_ub = sp.vstack([
+            # sum_k s <= (pmax - pmin) u
+            self._linha(GT, s=sp.kron(I_GT, np.ones((1, K)), format='csr'),
+                        u=-diag_g(self.pmax - self.pmin)),
+            # tempo mínimo ligada: partidas na janela <= u_t
+            self._linha(GT, v=ligada, u=-I_GT),
+            # tempo mínimo desligada: paradas na janela + u_t <= 1
+            self._linha(GT, w=desligada, u=I_GT),
+            # rampa de subida: p_t - p_{t-1} - RU u_{t-1} - SU v_t <= 0
+            self._linha(GT, p=kron_g(diferenca), u=-sp.kron(sp.diags(self.rampa), atraso, format='csr'),
+                        v=-diag_g(self.rampa_partida)),
+            # rampa de descida: p_{t-1} - p_t - RD u_t - SD w_t <= 0
+            self._linha(GT, p=-kron_g(diferenca), u=-diag_g(self.rampa), w=-diag_g(self.rampa_partida)),
+            # reserva girante: sum (pmax u - p) >= reserva * carga
+            self._linha(T, p=soma_g, u=-sp.kron(self.pmax[None, :], I_T, format='csr')),
+        ], format='csr')
+
+        self.c = np.zeros(self.n)
+        self.c[self._fatia('u')] = np.repeat(self.custo_minimo, T)
+        self.c[self._fatia('v')] = np.repeat(self.custo_partida, T)
+        self.c[self._fatia('s')] = np.repeat(self.custo_segmento, T, axis=0).ravel()
+        self.c[self._fatia('deficit')] = CUSTO_DEFICIT
+        if B:
+            self.c[self._fatia('c')] = self.armazenamento.custo_degradacao
+            self.c[self._fatia('d')] = self.armazenamento.custo_degradacao
+
+        self.inteiras = np.zeros(self.n, dtype=bool)
+        self.inteiras[self._fatia('u')] = True
+
+    def _fatia(self, nome):
+        inicio = self.offsets[nome]
+        return slice(inicio, inicio + self.tamanhos[nome])
+
+    def _linha(self, linhas, **blocos):
+        """Concatena os blocos de coeficientes na ordem das variáveis (zeros nos ausentes)."""
+        partes = []
+        for nome, tamanho in self.tamanhos.items():
+            if tamanho == 0:
+                continue
+            partes.append(blocos.get(nome, sp.csr_matrix((linhas, tamanho))))
+        return sp.hstack(partes, format='csr')
+
+    def carga_do_dia(self, dia):
+        return self.carga_pico * PICO_DIARIO_RTS96[dia % 7] * np.resize(PERFIL_CARGA_RTS96, self.T)
+
+    def _problema_do_dia(self, carga, disponibilidade_der):
+        G, T, B = self.G, self.T, self.B
+        estado = self.estado
+        u0 = estado['ligada'].astype(float)
+        p0 = estado['potencia']
+
+        b_eq = np.zeros(self.A_eq.shape[0])
+        # Transição u_0 - u_{-1}
+        b_eq[G * T + np.arange(G) * T] = u0
+        if B:
+            b_eq[2 * G * T + np.arange(B) * T] = estado['soc'] * self.armazenamento.capacidade
+        b_eq[-T:] = carga
+
+        b_ub = np.zeros(self.A_ub.shape[0])
+        linha = 2 * G * T
+        b_ub[linha:linha + G * T] = 1.0                      # tempo mínimo desligada
+        linha += G * T
+        b_ub[linha + np.arange(G) * T] = p0 + self.rampa * u0  # rampa de subida em t = 0
+        linha += G * T
+        b_ub[linha + np.arange(G) * T] = -p0                  # rampa de descida em t = 0
+        b_ub[-T:] = -self.reserva * carga
+
+        lb, ub = np.zeros(self.n), np.ones(self.n)
+        ub[self._fatia('p')] = np.repeat(self.pmax, T)
+        ub[self._fatia('s')] = np.repeat(self.largura_segmento, T * self.K)
+        ub[self._fatia('r')] = disponibilidade_der.ravel()
+        ub[self._fatia('deficit')] = np.inf
+        if B:
+            ub[self._fatia('c')] = self.armazenamento.ub[:B * T]
+            ub[self._fatia('d')] = self.armazenamento.ub[B * T:2 * B * T]
+            lb[self._fatia('e')] = self.armazenamento.lb[2 * B * T:]
+            ub[self._fatia('e')] = self.armazenamento.ub[2 * B * T:]
+
+        # Herança do dia anterior: unidades que ainda não cumpriram o tempo mínimo
+        horas = estado['horas_no_estado']
+        manter_ligada = np.where(estado['ligada'], np.maximum(0, self.tempo_min_ligada - horas), 0)
+        manter_desligada = np.where(~estado['ligada'], np.maximum(0, self.tempo_min_desligada - horas), 0)
+        u = self.offsets['u']
+        for g in np.flatnonzero(manter_ligada):
+            lb[u + g * T:u + g * T + min(T, manter_ligada[g])] = 1.0
+        for g in np.flatnonzero(manter_desligada):
+            ub[u + g * T:u + g * T + min(T, manter_desligada[g])] = 0.0
+        return b_ub, b_eq, lb, ub
+
+    def _partida(self, compromisso, carga):
+        """
+        Solução inicial parcial a partir do compromisso anterior. Uma passada
+        hora a hora segue o compromisso desejado, mas respeita os tempos
+        mínimos (com os contadores herdados do dia anterior) e, quando a
+        capacidade ligada não cobre a carga mais a reserva, liga as unidades
+        liberadas mais baratas, para que a partida não dependa de corte de carga.
+        """
+        ligada = self.estado['ligada'].copy()
+        horas = self.estado['horas_no_estado'].copy()
+        ordem = np.argsort(self.custo_minimo / self.pmin.clip(1.0) + self.custo_segmento.mean(axis=1))
+        requisito = (1.0 + self.reserva) * carga
+        u = np.zeros((self.G, self.T))
+        for t in range(self.T):
+            presa_ligada = ligada & (horas < self.tempo_min_ligada)
+            presa_desligada = ~ligada & (horas < self.tempo_min_desligada)
+            atual = np.where(presa_ligada, 1.0, np.where(presa_desligada, 0.0, np.round(compromisso[:, t])))
+            for g in ordem:
+                if self.pmax @ atual >= requisito[t]:
+                    break
+                if atual[g] == 0 and not presa_desligada[g]:
+                    atual[g] = 1.0
+            nova = atual > 0
+            horas = np.where(nova == ligada, horas + 1, 1)
+            ligada = nova
+            u[:, t] = atual
+        fatia = self._fatia('u')
+        return np.arange(fatia.start, fatia.stop), u.ravel()
+
+    def resolver_dia(self, dia, compromisso_anterior=None, gap=GAP_UC, tempo_limite=TEMPO_LIMITE_DIA_S,
+                     semente=0):
+        """
+        Resolve um dia a partir do estado atual (sem alterá-lo). Com
+        compromisso_anterior (matriz G x T de 0/1), usa-o como partida quente.
+        """
+        carga = self.carga_do_dia(dia)
+        disponibilidade = np.array([u[1] * perfil_der(u[3], self.T, dia, semente) for u in self.ders])
+        disponibilidade = disponibilidade.reshape(self.R, self.T)
+        b_ub, b_eq, lb, ub = self._problema_do_dia(carga, disponibilidade)
+        partida = None if compromisso_anterior is None else self._partida(compromisso_anterior, carga)
+
+        resultado = resolver_milp(self.c, self.A_ub, b_ub, self.A_eq, b_eq, lb, ub, inteiras=self.inteiras,
+                                  backend=self.backend, partida=partida, gap=gap,
+                                  tempo_limite=tempo_limite)
+        if not resultado['sucesso']:
+            raise RuntimeError(f"Comissionamento do dia {dia} falhou: {resultado['status']}")
+
+        x = resultado['x']
+        G, T = self.G, self.T
+        solucao = {
+            'dia': dia,
+            'compromisso': np.round(x[self._fatia('u')]).reshape(G, T),
+            'potencia_mw': x[self._fatia('p')].reshape(G, T),
+            'der_mw': x[self._fatia('r')].reshape(self.R, T),
+            'bateria_mw': (x[self._fatia('c')] - x[self._fatia('d')]).reshape(self.B, T),
+            'energia_mwh': x[self._fatia('e')].reshape(self.B, T),
+            'deficit_mw': x[self._fatia('deficit')],
+            'carga_mw': carga,
+            'custo': resultado['objetivo'],
+            'partidas': int(np.round(x[self._fatia('v')]).sum()),
+            'resultado': {k: v for k, v in resultado.items() if k != 'x'},
+        }
+        return solucao
+
+    def avancar(self, solucao):
+        """Atualiza o estado inicial com o fim do dia resolvido."""
+        compromisso = solucao['compromisso'].astype(bool)
+        ultimo = compromisso[:, -1]
+        # Horas seguidas no estado final (contando o dia anterior se não houve troca)
+        trocas = compromisso != ultimo[:, None]
+        sem_troca = ~trocas.any(axis=1)
+        horas = np.where(sem_troca, self.T,
+                         self.T - 1 - np.where(trocas, np.arange(self.T), -1).max(axis=1))
+        continua = sem_troca & (ultimo == self.estado['ligada'])
+        self.estado = {
+            'ligada': ultimo,
+            'potencia': solucao['potencia_mw'][:, -1],
+            'horas_no_estado': np.where(continua, self.estado['horas_no_estado'] + self.T, horas),
+            'soc': (solucao['energia_mwh'][:, -1] / self.armazenamento.capacidade) if self.B else self.estado['soc'],
+        }
+
+
+def simular_dias(comissionamento, dias=7, partida_quente=True, comparar=False, verbose=True):
+    """
+    Resolve 'dias' dias seguidos. Com partida_quente, cada dia parte do
+    compromisso do dia anterior. Com comparar=True, cada dia também é resolvido
+    a frio a partir do mesmo estado, para medir o ganho da partida quente.
+    """
+    if verbose:
+        print(f"   -> Comissionamento: {comissionamento.G} unidades, {comissionamento.R} DER(s), "
+              f"{comissionamento.B} bateria(s), {dias} dia(s) de {comissionamento.T} h")
+    solucoes, frias = [], []
+    anterior = None
+    for dia in range(dias):
+        if comparar or not partida_quente or anterior is None:
+            fria = comissionamento.resolver_dia(dia)
+            frias.append(fria['resultado'])
+        if partida_quente and anterior is not None:
+            solucao = comissionamento.resolver_dia(dia, compromisso_anterior=anterior['compromisso'])
+        else:
+            solucao = fria
+        comissionamento.avancar(solucao)
+        solucoes.append(solucao)
+        anterior = solucao
+        if verbose:
+            r = solucao['resultado']
+            primeira = r['tempo_primeira_viavel_s']
+            texto_primeira = f"{primeira:.2f} s" if primeira is not None else "n/d"
+            print(f"      -> Dia {dia + 1}: custo ${solucao['custo']:,.0f}, {solucao['partidas']} partida(s), "
+                  f"1ª viável {texto_primeira}, total {r['tempo_s']:.2f} s"
+                  f"{' (partida quente)' if r['partida_quente'] else ''}")
+    return solucoes, frias
+
+
+def _resumo_tempos(resultados):
+    primeiras = [r for r in resultados if r['tempo_primeira_viavel_s'] is not None]
+    return {
+        'dias': len(resultados),
+        'primeira_viavel_media_s': float(np.mean([r['tempo_primeira_viavel_s'] for r in primeiras]))
+        if primeiras else None,
+        # Distância média da primeira viável até a solução final
+        'distancia_primeira_viavel': float(np.mean([r['objetivo_primeira_viavel'] / r['objetivo'] - 1.0
+                                                    for r in primeiras])) if primeiras else None,
+        'total_s': float(sum(r['tempo_s'] for r in resultados)),
+    }
+
+
+def comparar_partida_quente(comissionamento, dias=7):
+    """Relatório de tempos com e sem partida quente (dias 2 em diante, mesmo estado inicial)."""
+    solucoes, frias = simular_dias(comissionamento, dias, partida_quente=True, comparar=True)
+    quentes = [s['resultado'] for s in solucoes[1:]]
+    frias = frias[1:]
+    relatorio = {'sem_partida_quente': _resumo_tempos(frias), 'com_partida_quente': _resumo_tempos(quentes)}
+    print("\n--- Tempos do comissionamento (dias 2 em diante) ---")
+    for nome, resumo in relatorio.items():
+        if resumo['primeira_viavel_media_s'] is None:
+            texto_primeira = "n/d (backend sem callback)"
+        else:
+            texto_primeira = (f"{resumo['primeira_viavel_media_s']:.3f} s, "
+                              f"{resumo['distancia_primeira_viavel']:.1%} acima do custo final")
+        print(f"   -> {nome.replace('_', ' ').capitalize()}: 1ª viável média {texto_primeira}; "
+              f"tempo total {resumo['total_s']:.2f} s")
+    return solucoes, relatorio
+
+
+if __name__ == "__main__":
+    from main import configurar_cenario
+
+    configs = configurar_cenario()
+    uc = ComissionamentoUnidades(CASO_RTS, ders=configs['ders'], baterias=configs['storage'])
+    comparar_partida_quente(uc, dias=7)
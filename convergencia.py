@@ -0,0 +1,199 @@
+import json
+import time
+
+import numpy as np
+import pandapower as pp
+
+# ##############################################################################
+# ESCADA DE ESTRATÉGIAS DE FLUXO DE POTÊNCIA
+# ##############################################################################
+# Cada degrau: (nome, algoritmo, init). A ordem vai do caminho padrão (mais
+# barato) até os métodos mais robustos. A rampa de DER é tratada à parte,
+# pois depende de uma base convergida.
+ESCADA_PADRAO = [
+    ('nr_auto', 'nr', 'auto'),
+    ('nr_flat', 'nr', 'flat'),
+    ('nr_dc', 'nr', 'dc'),
+    ('fdxb_dc', 'fdxb', 'dc'),
+    ('iwamoto_dc', 'iwamoto_nr', 'dc'),
+]
+
+# Frações da injeção dos DERs usadas na rampa a partir da base convergida
+PASSOS_RAMPA_DER = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+NUM_PIORES_BARRAS = 5
+
+
+def _mismatch_por_iteracao(net):
+    """
+    Reconstrói o vetor de mismatch (MVA) de cada iteração a partir das tensões
+    registradas com v_debug=True. Retorna (normas, mismatch_final) ou
+    (lista vazia, None) quando o algoritmo não registra o histórico.
+    """
+    ppc = net.get('_ppc')
+    if not ppc or 'internal' not in ppc:
+        return [], None
+    interno = ppc['internal']
+    if 'Ybus' not in interno or 'Sbus' not in interno:
+        return [], None
+
+    ybus = interno['Ybus']
+    sbus = interno['Sbus']
+    pv, pq = interno['pv'], interno['pq']
+    pvpq = np.r_[pv, pq]
+    base_mva = interno['baseMVA']
+
+    vm_it, va_it = interno.get('Vm_it'), interno.get('Va_it')
+    if vm_it is not None and va_it is not None:
+        tensoes = vm_it * np.exp(1j * va_it)
+        if tensoes.ndim == 1:
+            tensoes = tensoes[:, None]
+    elif interno.get('V') is not None:
+        tensoes = np.asarray(interno['V'])[:, None]
+    else:
+        return [], None
+
+    # Todas as iterações de uma vez: S = V * conj(Ybus @ V) para cada coluna
+    mis = tensoes * np.conj(ybus @ tensoes) - sbus[:, None]
+    abs_p = np.zeros(mis.shape)
+    abs_q = np.zeros(mis.shape)
+    abs_p[pvpq] = np.abs(mis.real[pvpq])
+    abs_q[pq] = np.abs(mis.imag[pq])
+    normas = (np.maximum(abs_p, abs_q).max(axis=0) * base_mva).tolist()
+    mismatch_final = np.maximum(abs_p[:, -1], abs_q[:, -1]) * base_mva
+    return normas, mismatch_final
+
+
+def _piores_barras(net, mismatch_final, n=NUM_PIORES_BARRAS):
+    """Mapeia os maiores mismatches (índices ppci) de volta às barras do pandapower."""
+    if mismatch_final is None:
+        return []
+    lookup = net._pd2ppc_lookups['bus']
+    indices_pp = net.bus.index.values
+    indices_pp = indices_pp[indices_pp < len(lookup)]
+    indices_ppci = lookup[indices_pp]
+    validos = (indices_ppci >= 0) & (indices_ppci < len(mismatch_final))
+    indices_pp, indices_ppci = indices_pp[validos], indices_ppci[validos]
+    if len(indices_pp) == 0:
+        return []
+
+    valores = mismatch_final[indices_ppci]
+    ordem = np.argsort(valores)[::-1][:n]
+    return [
+        {'barra': int(indices_pp[k]),
+         'nome': net.bus.at[indices_pp[k], 'name'],
+         'mismatch_mva': float(valores[k])}
+        for k in ordem
+    ]
+
+
+def _tentar(net, nome, algoritmo, init, max_iteration, **kwargs):
+    """Executa uma única tentativa de runpp e devolve o registro de telemetria."""
+    registro = {
+        'estrategia': nome, 'algoritmo': algoritmo, 'init': init,
+        'convergiu': False, 'iteracoes': None, 'tempo_s': None,
+        'normas_mismatch_mva': [], 'piores_barras': [], 'erro': None,
+    }
+    inicio = time.perf_counter()
+    try:
+        pp.runpp(net, algorithm=algoritmo, init=init, max_iteration=max_iteration,
+                 v_debug=(algoritmo in ('nr', 'iwamoto_nr')), **kwargs)
+        registro['convergiu'] = True
+    except Exception as e:
+        registro['erro'] = f"{type(e).__name__}: {e}"
+    registro['tempo_s'] = time.perf_counter() - inicio
+
+    ppc = net.get('_ppc')
+    if ppc and 'iterations' in ppc:
+        registro['iteracoes'] = int(ppc['iterations'])
+    try:
+        normas, mismatch_final = _mismatch_por_iteracao(net)
+        registro['normas_mismatch_mva'] = normas
+        if not registro['convergiu']:
+            registro['piores_barras'] = _piores_barras(net, mismatch_final)
+    except Exception as e:
+        # A telemetria nunca deve derrubar a simulação
+        registro['erro_telemetria'] = f"{type(e).__name__}: {e}"
+    return registro
+
+
+def _rampa_der(net, indices_der, max_iteration, passos=PASSOS_RAMPA_DER, **kwargs):
+    """
+    Converge a rede com a injeção dos DERs reduzida e aumenta a injeção em
+    passos, usando a solução anterior como ponto inicial (init='results').
+    """
+    registros = []
+    p_alvo = net.gen.loc[indices_der, 'p_mw'].copy()
+    sucesso = False
+    try:
+        for i, fracao in enumerate(passos):
+            net.gen.loc[indices_der, 'p_mw'] = p_alvo * fracao
+            init = 'dc' if i == 0 else 'results'
+            registro = _tentar(net, f'rampa_der_{fracao:.2f}', 'nr', init, max_iteration, **kwargs)
+            registro['fracao_der'] = fracao
+            registros.append(registro)
+            if not registro['convergiu']:
+                break
+        else:
+            sucesso = True
+    finally:
+        net.gen.loc[indices_der, 'p_mw'] = p_alvo
+    return sucesso, registros
+
+
+def executar_fluxo_robusto(net, max_iteration=30, indices_der=None, escada=None, verbose=True, **kwargs):
+    """
+    Executa o fluxo de potência percorrendo uma escada de estratégias até
+    convergir: inicializações diferentes, desacoplado rápido, Newton-Raphson
+    com passo de Iwamoto e, por fim, rampa da injeção dos DERs a partir de uma
+    base convergida. Todas as tentativas ficam registradas.
+
+    Retorna (convergiu, telemetria), onde telemetria é um dicionário com a
+    estratégia vencedora e a lista de tentativas.
+    """
+    escada = ESCADA_PADRAO if escada is None else escada
+    telemetria = {'convergiu': False, 'estrategia_vencedora': None, 'tentativas': []}
+
+    for nome, algoritmo, init in escada:
+        registro = _tentar(net, nome, algoritmo, init, max_iteration, **kwargs)
+        telemetria['tentativas'].append(registro)
+        if verbose:
+            _imprimir_tentativa(registro)
+        if registro['convergiu']:
+            telemetria['convergiu'] = True
+            telemetria['estrategia_vencedora'] = nome
+            return True, telemetria
+
+    indices_der = [] if indices_der is None else [i for i in indices_der if i in net.gen.index]
+    if indices_der:
+        sucesso, registros = _rampa_der(net, indices_der, max_iteration, **kwargs)
+        telemetria['tentativas'].extend(registros)
+        if verbose:
+            for registro in registros:
+                _imprimir_tentativa(registro)
+        if sucesso:
+            telemetria['convergiu'] = True
+            telemetria['estrategia_vencedora'] = 'rampa_der'
+            return True, telemetria
+
+    return False, telemetria
+
+
+def _imprimir_tentativa(registro):
+    status = "convergiu" if registro['convergiu'] else "falhou"
+    normas = registro['normas_mismatch_mva']
+    ultima = f", mismatch final {normas[-1]:.3g} MVA" if normas else ""
+    print(f"      -> [{registro['estrategia']}] {status} em {registro['tempo_s']:.2f} s"
+          f" ({registro['iteracoes']} iterações{ultima})")
+    for barra in registro['piores_barras']:
+        print(f"         * Barra {barra['nome']} (índice {barra['barra']}): {barra['mismatch_mva']:.3g} MVA")
+
+
+def salvar_telemetria(telemetria, caminho='telemetria_fluxo.jsonl', **contexto):
+    """
+    Acrescenta a telemetria de uma simulação (uma linha JSON) ao arquivo de
+    histórico, para análise posterior do caminho padrão da escada.
+    """
+    linha = dict(contexto, **telemetria)
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(linha, default=str, ensure_ascii=False) + "\n")
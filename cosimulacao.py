@@ -0,0 +1,229 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandapower as pp
+import pandapower.networks as nw
+
+from convergencia import executar_fluxo_robusto
+
+# ##############################################################################
+# CO-SIMULAÇÃO TRANSMISSÃO-DISTRIBUIÇÃO (CASE1354PEGASE + RÉPLICAS DO IEEE 37)
+# ##############################################################################
+# Cada barra de fronteira da transmissão alimenta várias réplicas do
+# alimentador IEEE 37 (alimentador_ieee37.py), cada uma com o seu fator de
+# carga e a sua penetração de PV. A cada iteração (Gauss-Seidel na fronteira):
+#   1. os alimentadores são resolvidos com a tensão atual da barra de fronteira
+#      (em paralelo, num pool de processos; cada processo compila o alimentador
+#      uma vez no seu OpenDSS e resolve as réplicas do seu lote, voltando taps
+#      e ponto de partida do fluxo ao estado compilado antes de cada uma, para
+#      o resultado não depender da ordem das réplicas no lote);
+#   2. a soma dos P/Q das réplicas vira a carga de distribuição da barra;
+#   3. o fluxo da transmissão é refeito e devolve as novas tensões.
+# Para quando a variação das tensões e das potências na fronteira fica abaixo
+# das tolerâncias.
+
+BARRAS_FRONTEIRA = (3, 4, 10)   # mesmas barras dos DERs em main.configurar_cenario
+TOLERANCIA_V_PU = 1e-5
+TOLERANCIA_P_MW = 1e-3
+MAX_ITERACOES = 30
+IRRADIANCIA_PADRAO = 0.8
+
+# Alimentador compilado no processo de trabalho (o OpenDSS é global por processo)
+_ALIMENTADOR = None
+
+
+def _iniciar_processo():
+    """Compila o alimentador uma vez por processo (com PV de 1x a carga, reescalado por réplica)."""
+    global _ALIMENTADOR
+    from alimentador_ieee37 import AlimentadorIEEE37, carregar_alimentador
+
+    _ALIMENTADOR = AlimentadorIEEE37(carregar_alimentador(verbose=False), penetracao_pv=1.0)
+    dss = _ALIMENTADOR.dss
+    _ALIMENTADOR.pv_base = {}
+    k = dss.PVsystems.First()
+    while k > 0:
+        _ALIMENTADOR.pv_base[dss.PVsystems.Name()] = dss.PVsystems.Pmpp()
+        k = dss.PVsystems.Next()
+    _ALIMENTADOR.taps_base = {}
+    for nome in ('reg1', 'reg2'):   # Reguladores do alimentador_ieee37.comandos_dss
+        dss.Transformers.Name(nome)
+        dss.Transformers.Wdg(2)
+        _ALIMENTADOR.taps_base[nome] = dss.Transformers.Tap()
+
+
+def _resolver_lote(lote):
+    """
+    Resolve um lote de réplicas no processo atual. 'lote' é uma lista de
+    (indice, tensao_pu, mult_carga, penetracao_pv, irradiancia); devolve
+    uma lista de (indice, P_kw, Q_kvar).
+    """
+    if _ALIMENTADOR is None:
+        _iniciar_processo()
+    dss = _ALIMENTADOR.dss
+    saida = []
+    for indice, tensao, mult_carga, penetracao, irradiancia in lote:
+        # Cada réplica parte do estado compilado, não da solução da anterior
+        for nome, tap in _ALIMENTADOR.taps_base.items():
+            dss.Transformers.Name(nome)
+            dss.Transformers.Wdg(2)
+            dss.Transformers.Tap(tap)
+        dss.Text.Command('set mode=snap')   # Reinicia o ponto de partida do fluxo
+        for nome, pmpp in _ALIMENTADOR.pv_base.items():
+            dss.PVsystems.Name(nome)
+            dss.PVsystems.Pmpp(pmpp * penetracao)
+            dss.PVsystems.kVARated(max(1.1 * pmpp * penetracao, 1e-3))
+            dss.PVsystems.Irradiance(irradiancia)
+        p, q = _ALIMENTADOR.resolver(tensao_fonte_pu=tensao, mult_carga=mult_carga)
+        saida.append((indice, p, q))
+    return saida
+
+
+def criar_replicas(quantidade, barras=BARRAS_FRONTEIRA, semente=0):
+    """
+    Réplicas distribuídas em rodízio pelas barras de fronteira, cada uma com
+    fator de carga em [0,6; 1,1] e penetração de PV em [0; 1] sorteados.
+    """
+    rng = np.random.default_rng(semente)
+    return [{'barra': barras[k % len(barras)], 'mult_carga': float(rng.uniform(0.6, 1.1)),
+             'penetracao_pv': float(rng.uniform(0.0, 1.0))} for k in range(quantidade)]
+
+
+class CoSimulacaoTD:
+    """Laço de co-simulação entre a rede de transmissão e as réplicas de alimentadores."""
+
+    def __init__(self, replicas, net=None, processos=None, irradiancia=IRRADIANCIA_PADRAO, verbose=True):
+        self.replicas = replicas
+        self.irradiancia = irradiancia
+        self.verbose = verbose
+        self.processos = processos or os.cpu_count() or 1
+        self.net = net if net is not None else nw.case1354pegase()
+
+        # Uma carga de distribuição por barra de fronteira (busca pelo nome, como em main.py)
+        self.barras = sorted({r['barra'] for r in replicas})
+        self.indice_barra = {}
+        self.indice_carga = {}
+        for barra in self.barras:
+            encontradas = self.net.bus.index[self.net.bus.name == barra]
+            if not encontradas.empty:
+                indice = encontradas[0]
+            elif barra in self.net.bus.index:
+                # O case1354pegase não tem todos os nomes (ex.: 4); cai no índice da barra
+                indice = barra
+                if verbose:
+                    print(f"   -> AVISO: Barra com nome {barra} não encontrada; usando o índice {barra}.")
+            else:
+                raise ValueError(f"Barra de fronteira {barra} não encontrada na rede de transmissão.")
+            self.indice_barra[barra] = indice
+            self.indice_carga[barra] = pp.create_load(self.net, bus=indice, p_mw=0.0, q_mvar=0.0,
+                                                      name=f"distribuicao_{barra}")
+        self._barra_de = np.array([r['barra'] for r in replicas])
+
+    def _lotes(self, tensoes):
+        """Divide as réplicas em um lote por processo (menos troca de mensagens que uma tarefa por réplica)."""
+        tarefas = [(k, tensoes[r['barra']], r['mult_carga'], r['penetracao_pv'], self.irradiancia)
+                   for k, r in enumerate(self.replicas)]
+        tamanho = math.ceil(len(tarefas) / self.processos)
+        return [tarefas[k:k + tamanho] for k in range(0, len(tarefas), tamanho)]
+
+    def _resolver_alimentadores(self, executor, tensoes):
+        if executor is None:
+            resultados = _resolver_lote([t for lote in self._lotes(tensoes) for t in lote])
+        else:
+            resultados = [r for parte in executor.map(_resolver_lote, self._lotes(tensoes)) for r in parte]
+        pq = np.zeros((len(self.replicas), 2))
+        for indice, p, q in resultados:
+            pq[indice] = p, q
+        return pq
+
+    def _fluxo_transmissao(self, primeira):
+        if primeira:
+            convergiu, _ = executar_fluxo_robusto(self.net, verbose=False)
+        else:
+            try:
+                pp.runpp(self.net, init='results', max_iteration=30)
+                convergiu = True
+            except pp.LoadflowNotConverged:
+                convergiu, _ = executar_fluxo_robusto(self.net, verbose=False)
+        if not convergiu:
+            raise RuntimeError("Fluxo da transmissão não convergiu durante a co-simulação.")
+
+    def executar(self, tolerancia_v=TOLERANCIA_V_PU, tolerancia_p=TOLERANCIA_P_MW, max_iteracoes=MAX_ITERACOES):
+        """Itera até convergir na fronteira; devolve o histórico e os tempos."""
+        inicio = time.perf_counter()
+        self._fluxo_transmissao(primeira=True)
+        tensoes = {b: float(self.net.res_bus.vm_pu[self.indice_barra[b]]) for b in self.barras}
+        potencias_anteriores = None
+        historico = []
+        tempo_alimentadores = tempo_transmissao = 0.0
+        convergiu = False
+
+        # Com 1 processo os lotes rodam no próprio processo (sem custo de pool)
+        executor = ProcessPoolExecutor(max_workers=self.processos, initializer=_iniciar_processo) \
+            if self.processos > 1 else None
+        try:
+            for iteracao in range(1, max_iteracoes + 1):
+                t0 = time.perf_counter()
+                pq = self._resolver_alimentadores(executor, tensoes)
+                t1 = time.perf_counter()
+                potencias = {b: pq[self._barra_de == b].sum(axis=0) / 1e3 for b in self.barras}
+                for barra, (p, q) in potencias.items():
+                    self.net.load.loc[self.indice_carga[barra], ['p_mw', 'q_mvar']] = p, q
+                self._fluxo_transmissao(primeira=False)
+                t2 = time.perf_counter()
+                tempo_alimentadores += t1 - t0
+                tempo_transmissao += t2 - t1
+
+                novas = {b: float(self.net.res_bus.vm_pu[self.indice_barra[b]]) for b in self.barras}
+                delta_v = max(abs(novas[b] - tensoes[b]) for b in self.barras)
+                delta_p = max(abs(potencias[b][0] - potencias_anteriores[b][0]) for b in self.barras) \
+                    if potencias_anteriores else np.inf
+                historico.append({'iteracao': iteracao, 'delta_v_pu': delta_v, 'delta_p_mw': delta_p,
+                                  'tensoes_pu': novas, 'p_mw': {b: float(v[0]) for b, v in potencias.items()},
+                                  'q_mvar': {b: float(v[1]) for b, v in potencias.items()}})
+                if self.verbose:
+                    print(f"      -> Iteração {iteracao}: dV = {delta_v:.2e} pu, dP = {delta_p:.2e} MW "
+                          f"(alimentadores {t1 - t0:.2f} s, transmissão {t2 - t1:.2f} s)")
+                tensoes, potencias_anteriores = novas, potencias
+                if delta_v < tolerancia_v and delta_p < tolerancia_p:
+                    convergiu = True
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        resultado = {'convergiu': convergiu, 'iteracoes': len(historico), 'historico': historico,
+                     'num_alimentadores': len(self.replicas), 'processos': self.processos,
+                     'tempo_alimentadores_s': tempo_alimentadores, 'tempo_transmissao_s': tempo_transmissao,
+                     'tempo_total_s': time.perf_counter() - inicio}
+        if self.verbose:
+            estado = "convergiu" if convergiu else "NÃO convergiu"
+            print(f"   -> Co-simulação {estado} em {resultado['iteracoes']} iteração(ões), "
+                  f"{resultado['tempo_total_s']:.2f} s ({len(self.replicas)} alimentadores, "
+                  f"{self.processos} processo(s))")
+        return resultado
+
+
+def avaliar_escala(quantidades, processos=None, irradiancia=IRRADIANCIA_PADRAO, semente=0):
+    """Roda a co-simulação para cada número de alimentadores e imprime a tabela de escala."""
+    print("\n--- Escala da co-simulação T-D ---")
+    linhas = []
+    for quantidade in quantidades:
+        cosim = CoSimulacaoTD(criar_replicas(quantidade, semente=semente), processos=processos,
+                              irradiancia=irradiancia, verbose=False)
+        r = cosim.executar()
+        por_solucao = r['tempo_alimentadores_s'] / max(r['iteracoes'] * quantidade, 1) * 1e3
+        linhas.append(r)
+        print(f"   -> {quantidade:5d} alimentadores: {r['iteracoes']:2d} iteração(ões), total {r['tempo_total_s']:6.2f} s "
+              f"(alimentadores {r['tempo_alimentadores_s']:6.2f} s = {por_solucao:.2f} ms/solução, "
+              f"transmissão {r['tempo_transmissao_s']:5.2f} s)"
+              f"{'' if r['convergiu'] else ' [NÃO convergiu]'}")
+    return linhas
+
+
+if __name__ == "__main__":
+    print("CO-SIMULAÇÃO T-D: case1354pegase + réplicas do IEEE 37")
+    CoSimulacaoTD(criar_replicas(60)).executar()
+    avaliar_escala([3, 30, 150, 600])
@@ -0,0 +1,352 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+from pandapower.pypower.idx_brch import BR_B, BR_R, BR_X
+from pandapower.pypower.idx_bus import BASE_KV, BS, GS
+from pandapower.pypower.makeYbus import makeYbus
+
+from cache_fluxo import impressao_digital
+
+# ##############################################################################
+# CURTO-CIRCUITO EM LOTE (IEC 60909) E CONTRIBUIÇÃO DOS DERs A INVERSOR
+# ##############################################################################
+# Método da fonte de tensão equivalente (IEC 60909-0): a matriz de admitâncias
+# de sequência positiva (sem cargas, sem capacitâncias de linha e sem shunts)
+# recebe as impedâncias subtransitórias das máquinas síncronas (com a correção
+# K_G) e da rede externa, os transformadores levam a correção K_T, e a matriz é
+# fatorada uma única vez (LU esparsa) por topologia.
+#
+# Os DERs a inversor não entram na matriz: pela IEC 60909-0:2016 são fontes de
+# corrente k * I_r, e a sua contribuição na barra i em falta é
+#     (1 / |Z_ii|) * sum_j |Z_ij| * I_sk,j
+# Assim, qualquer número de configurações de DER usa a mesma fatoração:
+#   - diagonal de Z (todas as barras) em blocos de substituições triangulares;
+#   - uma coluna de Z por barra candidata a DER (em uma só chamada ao solver);
+#   - a contribuição de todos os cenários sai de um produto |Z_cols| @ I_sk.
+#
+# Parâmetros ausentes no case1354pegase (x''d, fator de potência, potência de
+# curto da rede externa) usam os valores típicos abaixo. As injeções fixas
+# (sgen) do caso são equivalentes sem dado de curto e ficam de fora.
+
+C_MAX = 1.1                  # fator de tensão c para correntes máximas (Un > 1 kV)
+XDSS_PADRAO = 0.2            # reatância subtransitória das máquinas (pu da própria base)
+RELACAO_R_X_GERADOR = 0.07   # R_G = 0,07 X''d (IEC 60909-0, Sn >= 100 MVA)
+FATOR_POTENCIA_GERADOR = 0.85
+K_CONVERSOR = 1.2            # corrente de curto do inversor em múltiplos da nominal
+TIPOS_DER = ('solar', 'eolico')
+TAMANHO_BLOCO = 256          # colunas por chamada ao solver na diagonal de Z
+TAMANHO_CACHE_TOPOLOGIAS = 4
+TAMANHO_CACHE_IMPRESSOES = 64
+_cache_topologias = OrderedDict()
+_cache_impressoes = OrderedDict()   # impressão digital da rede -> chave da matriz de curto
+
+
+def _parametros_maquinas(net):
+    """Barra, Sn (MVA) e x''d das máquinas síncronas (gens sem tag de DER) e da rede externa."""
+    g = net.gen[net.gen.in_service]
+    if 'tags' in g.columns:
+        g = g[~g.tags.astype(str).isin(TIPOS_DER)]
+    sn = g.sn_mva.values if 'sn_mva' in g.columns else np.full(len(g), np.nan)
+    sn = np.where(np.isnan(sn), g.max_p_mw.values / FATOR_POTENCIA_GERADOR, sn)
+    xdss = g.xdss_pu.fillna(XDSS_PADRAO).values if 'xdss_pu' in g.columns else np.full(len(g), XDSS_PADRAO)
+
+    eg = net.ext_grid[net.ext_grid.in_service]
+    # Rede externa: potência de curto informada ou a de uma máquina do seu porte
+    sn_eg = eg.max_p_mw.values / FATOR_POTENCIA_GERADOR
+    s_sc = eg.s_sc_max_mva.values if 's_sc_max_mva' in eg.columns else np.full(len(eg), np.nan)
+    s_sc = np.where(np.isnan(s_sc), sn_eg / XDSS_PADRAO, s_sc)
+    return pd.DataFrame({
+        'bus': np.r_[g.bus.values, eg.bus.values],
+        'sn_mva': np.r_[sn, s_sc * XDSS_PADRAO],
+        'xdss_pu': np.r_[xdss, np.full(len(eg), XDSS_PADRAO)],
+        # Rede externa: Z_Q = c * Un^2 / S''kQ, sem a correção K_G das máquinas
+        'maquina': np.r_[np.ones(len(g), dtype=bool), np.zeros(len(eg), dtype=bool)],
+    })
+
+
+def montar_ybus_curto(net, c=C_MAX):
+    """
+    Matriz de admitâncias de sequência positiva para o curto (ppci, pu): ramos
+    sem capacitância, sem shunts e sem cargas, mais as admitâncias das máquinas.
+    O ppci sai de um fluxo DC numa cópia com os taps no neutro (a IEC 60909 usa
+    a relação nominal dos transformadores); a rede original não é alterada.
+    """
+    rede = copy.deepcopy(net)
+    for tabela in ('trafo', 'trafo3w'):
+        if len(rede[tabela]):
+            rede[tabela]['tap_pos'] = rede[tabela].tap_neutral.fillna(0).values
+    pp.rundcpp(rede)
+    interno = rede._ppc['internal']
+    base_mva = interno['baseMVA']
+    barras = interno['bus'].copy()
+    ramos = interno['branch'].copy()
+    barras[:, [GS, BS]] = 0.0
+    ramos[:, BR_B] = 0.0
+    # Correção K_T dos transformadores de rede (IEC 60909-0, 6.3.3), nas linhas do ppc antes do filtro ppci
+    fator = np.ones(len(rede._ppc['branch']))
+    if 'trafo' in rede._pd2ppc_lookups['branch']:
+        inicio, fim = rede._pd2ppc_lookups['branch']['trafo']
+        vk, vkr = net.trafo.vk_percent.values / 100, net.trafo.vkr_percent.values / 100
+        fator[inicio:fim] = 0.95 * c / (1 + 0.6 * np.sqrt(np.maximum(vk ** 2 - vkr ** 2, 0.0)))
+    fator = fator[interno['branch_is']]
+    ramos[:, BR_R] *= fator
+    ramos[:, BR_X] *= fator
+    ybus, _, _ = makeYbus(base_mva, barras, ramos)
+
+    lookup = rede._pd2ppc_lookups['bus']
+    maquinas = _parametros_maquinas(net)
+    seno = np.sqrt(1 - FATOR_POTENCIA_GERADOR ** 2)
+    k_g = np.where(maquinas.maquina, c / (1 + maquinas.xdss_pu * seno), c)
+    z_maquina = k_g * (RELACAO_R_X_GERADOR + 1j) * maquinas.xdss_pu * base_mva / maquinas.sn_mva
+    y_maquinas = np.zeros(ybus.shape[0], dtype=complex)
+    np.add.at(y_maquinas, lookup[maquinas.bus.values], 1 / z_maquina.values)
+    posicao = lookup[net.bus.index.values]
+    return (ybus + sp.diags(y_maquinas)).tocsc(), base_mva, posicao, barras[posicao, BASE_KV]
+
+
+class CurtoCircuito:
+    """
+    Correntes de curto-circuito trifásico (I''k máxima, IEC 60909) em todas as
+    barras de 'net', com a rede de sequência positiva fatorada uma vez.
+    Os resultados seguem a ordem de net.bus.index.
+    """
+
+    def __init__(self, net, c=C_MAX, montada=None):
+        self.c = c
+        self.ybus, self.base_mva, self.posicao, self.vn_kv = montada or montar_ybus_curto(net, c)
+        self.barras = pd.Index(net.bus.index)
+        inicio = time.perf_counter()
+        self._lu = splu(self.ybus)
+        self.tempo_fatoracao_s = time.perf_counter() - inicio
+        self._colunas = {}
+        self._diagonal = None
+
+    def _posicao(self, barras):
+        indices = self.barras.get_indexer(np.atleast_1d(barras))
+        if (indices < 0).any():
+            raise ValueError(f"Barras inexistentes na rede: {np.atleast_1d(barras)[indices < 0].tolist()}")
+        return self.posicao[indices]
+
+    def diagonal(self):
+        """Z_ii de todas as barras (pu), em blocos de TAMANHO_BLOCO substituições."""
+        if self._diagonal is None:
+            n = self.ybus.shape[0]
+            diagonal = np.empty(n, dtype=complex)
+            for k in range(0, n, TAMANHO_BLOCO):
+                fim = min(k + TAMANHO_BLOCO, n)
+                rhs = np.zeros((n, fim - k), dtype=complex)
+                rhs[np.arange(k, fim), np.arange(fim - k)] = 1.0
+                diagonal[k:fim] = self._lu.solve(rhs)[np.arange(k, fim), np.arange(fim - k)]
+            self._diagonal = diagonal
+        return self._diagonal[self.posicao]
+
+    def colunas(self, barras):
+        """Colunas Z[:, j] (nas barras do pandapower) das barras pedidas; as novas em uma só chamada."""
+        posicoes = self._posicao(barras)
+        faltantes = [p for p in dict.fromkeys(posicoes.tolist()) if p not in self._colunas]
+        if faltantes:
+            rhs = np.zeros((self.ybus.shape[0], len(faltantes)), dtype=complex)
+            rhs[faltantes, np.arange(len(faltantes))] = 1.0
+            solucao = self._lu.solve(rhs)
+            for k, p in enumerate(faltantes):
+                self._colunas[p] = solucao[:, k]
+        return np.column_stack([self._colunas[p][self.posicao] for p in posicoes])
+
+    def correntes(self, cenarios=None):
+        """
+        I''k (kA) em todas as barras, sem DER ('base') e para cada cenário.
+        'cenarios': {nome: {barra do pandapower: potência nominal do inversor em MVA}}.
+        Devolve DataFrame (barras x ['base', *cenários]).
+        """
+        cenarios = cenarios or {}
+        z_ii = np.abs(self.diagonal())
+        base_ka = self.base_mva / (np.sqrt(3) * self.vn_kv)
+        saida = {'base': self.c / z_ii * base_ka}
+        if cenarios:
+            candidatas = sorted({b for unidades in cenarios.values() for b in unidades})
+            linha = {b: k for k, b in enumerate(candidatas)}
+            # Correntes dos inversores (pu) por barra candidata x cenário
+            fontes = np.zeros((len(candidatas), len(cenarios)))
+            for j, unidades in enumerate(cenarios.values()):
+                for barra, sn in unidades.items():
+                    fontes[linha[barra], j] += K_CONVERSOR * sn / self.base_mva
+            contribuicao = (np.abs(self.colunas(candidatas)) @ fontes) / z_ii[:, None]
+            for j, nome in enumerate(cenarios):
+                saida[nome] = (self.c / z_ii + contribuicao[:, j]) * base_ka
+        return pd.DataFrame(saida, index=self.barras)
+
+    def tabela_deltas(self, cenarios):
+        """
+        Tabela por cenário e barra (índice [cenario, barra]) com I''k sem DER e
+        com DER, a variação em kA e em % e a potência de curto S''k com DER.
+        """
+        correntes = self.correntes(cenarios)
+        base = correntes['base'].values[:, None]
+        ik = correntes[list(cenarios)].values
+        # Matrizes barras x cenários achatadas por cenário (ordem de 'cenarios')
+        indice = pd.MultiIndex.from_product([list(cenarios), self.barras], names=['cenario', 'barra'])
+        return pd.DataFrame({
+            'ikss_base_ka': np.broadcast_to(base, ik.shape).ravel(order='F'),
+            'ikss_ka': ik.ravel(order='F'),
+            'delta_ka': (ik - base).ravel(order='F'),
+            'delta_pct': (100 * (ik / base - 1)).ravel(order='F'),
+            'skss_mva': (np.sqrt(3) * self.vn_kv[:, None] * ik).ravel(order='F'),
+        }, index=indice)
+
+
+def _chave_ybus(ybus, c):
+    h = hashlib.sha1(repr(float(c)).encode())
+    ybus = ybus.tocsr()
+    h.update(ybus.indptr.tobytes())
+    h.update(ybus.indices.tobytes())
+    h.update(np.ascontiguousarray(ybus.data).tobytes())
+    return h.hexdigest()
+
+
+def _impressao_curto(net, c):
+    """Impressão digital da rede (cache_fluxo) mais o que só o curto lê: c e quais gens são DERs."""
+    ders = []
+    if 'tags' in net.gen.columns:
+        ders = net.gen.index[net.gen.tags.astype(str).isin(TIPOS_DER)].tolist()
+    return impressao_digital(net, {'curto_c': float(c), 'ders': sorted(ders)})
+
+
+def obter_curto_circuito(net, c=C_MAX):
+    """
+    CurtoCircuito reaproveitado em dois níveis (LRU): a mesma rede (impressão
+    digital) volta direto, sem remontar a matriz; uma rede que só mudou carga
+    ou despacho remonta a matriz, acha a mesma topologia e não refaz a
+    fatoração.
+    """
+    impressao = _impressao_curto(net, c)
+    chave = _cache_impressoes.get(impressao)
+    if chave in _cache_topologias:
+        _cache_impressoes.move_to_end(impressao)
+        _cache_topologias.move_to_end(chave)
+        return _cache_topologias[chave]
+
+    montada = montar_ybus_curto(net, c)
+    chave = _chave_ybus(montada[0], c)
+    _cache_impressoes[impressao] = chave
+    while len(_cache_impressoes) > TAMANHO_CACHE_IMPRESSOES:
+        _cache_impressoes.popitem(last=False)
+    if chave in _cache_topologias:
+        _cache_topologias.move_to_end(chave)
+        return _cache_topologias[chave]
+    curto = CurtoCircuito(net, c, montada)
+    _cache_topologias[chave] = curto
+    while len(_cache_topologias) > TAMANHO_CACHE_TOPOLOGIAS:
+        _cache_topologias.popitem(last=False)
+    return curto
+
+
+def ders_da_rede(net):
+    """Cenário com os DERs da rede (gens com tag 'solar'/'eolico', como em main.py): {barra: MVA}."""
+    if 'tags' not in net.gen.columns:
+        return {}
+    ders = net.gen[net.gen.in_service & net.gen.tags.astype(str).isin(TIPOS_DER)]
+    sn = ders.sn_mva.fillna(ders.p_mw) if 'sn_mva' in ders.columns else ders.p_mw
+    return {int(b): float(v) for b, v in sn.groupby(ders.bus).sum().items()}
+
+
+def gerar_cenarios_der(net, quantidade, capacidade_total_mva=450.0, unidades=3, semente=0):
+    """Cenários com a mesma capacidade total de DER em barras sorteadas (divisão aleatória)."""
+    rng = np.random.default_rng(semente)
+    cenarios = {}
+    for k in range(quantidade):
+        barras = rng.choice(net.bus.index.values, size=unidades, replace=False)
+        partes = rng.dirichlet(np.ones(unidades)) * capacidade_total_mva
+        cenarios[f"sorteio_{k}"] = {int(b): float(p) for b, p in zip(barras, partes)}
+    return cenarios
+
+
+def comparar_com_pandapower(net, cenarios, c=C_MAX, verbose=True):
+    """
+    Refaz os cenários com pandapower.shortcircuit.calc_sc (um cálculo completo
+    por cenário, com os mesmos parâmetros típicos e os DERs como sgens fonte de
+    corrente) e mede o erro e o tempo contra o cálculo em lote.
+    """
+    import pandapower.shortcircuit as sc
+
+    rede = copy.deepcopy(net)
+    maquinas = _parametros_maquinas(rede)
+    # Máquinas síncronas na mesma ordem de _parametros_maquinas; DERs saem (entram como sgens)
+    der = rede.gen.tags.astype(str).isin(TIPOS_DER) if 'tags' in rede.gen.columns else False
+    rede.gen.loc[der, 'in_service'] = False
+    g = rede.gen.index[rede.gen.in_service]
+    sincronas = maquinas[maquinas.maquina]
+    rede.gen.loc[g, 'sn_mva'] = sincronas.sn_mva.values
+    rede.gen.loc[g, 'vn_kv'] = rede.bus.vn_kv.loc[rede.gen.loc[g, 'bus']].values
+    rede.gen.loc[g, 'xdss_pu'] = sincronas.xdss_pu.values
+    rede.gen.loc[g, 'rdss_ohm'] = RELACAO_R_X_GERADOR * sincronas.xdss_pu.values * \
+        rede.gen.loc[g, 'vn_kv'].values ** 2 / sincronas.sn_mva.values
+    rede.gen.loc[g, 'cos_phi'] = FATOR_POTENCIA_GERADOR
+    rede.ext_grid['s_sc_max_mva'] = maquinas.sn_mva.values[~maquinas.maquina.values] / XDSS_PADRAO
+    rede.ext_grid['rx_max'] = RELACAO_R_X_GERADOR
+    rede.sgen['in_service'] = False
+
+    inicio = time.perf_counter()
+    lote = CurtoCircuito(net, c).correntes(cenarios)   # sem o cache: inclui montagem e fatoração
+    tempo_lote = time.perf_counter() - inicio
+
+    erros, inicio = [], time.perf_counter()
+    for nome, unidades in {'base': {}, **cenarios}.items():
+        teste = copy.deepcopy(rede)
+        for barra, sn in unidades.items():
+            pp.create_sgen(teste, barra, p_mw=sn, sn_mva=sn, k=K_CONVERSOR, generator_type='current_source')
+        sc.calc_sc(teste, case='max')
+        ik = teste.res_bus_sc.ikss_ka.reindex(lote.index)
+        erros.append(float((np.abs(lote[nome] - ik) / ik).max()))
+    tempo_completo = time.perf_counter() - inicio
+
+    relatorio = {
+        'cenarios': len(cenarios) + 1,
+        'tempo_lote_s': tempo_lote,
+        'tempo_pandapower_s': tempo_completo,
+        'aceleracao': tempo_completo / tempo_lote if tempo_lote > 0 else np.inf,
+        'erro_relativo_max': max(erros),
+    }
+    if verbose:
+        print(f"\n--- Curto em lote vs. pandapower.shortcircuit ({relatorio['cenarios']} cenários) ---")
+        print(f"  - Tempo: {tempo_completo:.2f} s -> {tempo_lote:.3f} s ({relatorio['aceleracao']:.1f}x)")
+        print(f"  - Erro relativo máximo de I''k: {relatorio['erro_relativo_max']:.2e}")
+    return relatorio
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    from main import configurar_cenario, simular_rede
+
+    print("CURTO-CIRCUITO EM LOTE: case1354pegase com os DERs de main.py")
+    with contextlib.redirect_stdout(io.StringIO()):
+        net = simular_rede(configurar_cenario(), salvar_rede_inicial=False)
+    der_main = ders_da_rede(net)
+
+    # Configuração de main.py, a mesma com 2x e 4x a potência e 1000 sorteios de 450 MVA
+    cenarios = {'main': der_main, 'main_2x': {b: 2 * p for b, p in der_main.items()},
+                'main_4x': {b: 4 * p for b, p in der_main.items()}, **gerar_cenarios_der(net, 1000)}
+    inicio = time.perf_counter()
+    curto = obter_curto_circuito(net)
+    tabela = curto.tabela_deltas(cenarios)
+    print(f"   -> {len(curto.barras)} barras x {len(cenarios)} cenários em {time.perf_counter() - inicio:.2f} s "
+          f"(fatoração {curto.tempo_fatoracao_s * 1e3:.1f} ms)")
+    obter_curto_circuito(net)   # mesma topologia: sem nova fatoração
+
+    for nome in ('main', 'main_2x', 'main_4x'):
+        maiores = tabela.loc[nome].nlargest(3, 'delta_ka')
+        print(f"   -> {nome}: maiores aumentos " + ", ".join(
+            f"barra {b} +{r.delta_ka:.3f} kA ({r.delta_pct:.1f}%)" for b, r in maiores.iterrows()))
+    pior = tabela.groupby(level='cenario').delta_pct.max()
+    print(f"   -> Sorteios: aumento máximo por cenário de {pior.min():.2f}% a {pior.max():.2f}% "
+          f"(mediana {pior.median():.2f}%)")
+
+    comparar_com_pandapower(net, {k: cenarios[k] for k in ('main', 'main_2x', 'sorteio_0')})
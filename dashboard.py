@@ -1,19 +1,195 @@
+import numpy as np
 import pandas as pd
 import pickle
-import os
+
+# ##############################################################################
+# AGREGADOS DO DASHBOARD (FUNÇÕES PURAS)
+# ##############################################################################
+# Todas as agregações leem colunas como vetores numpy (visões somente leitura,
+# sem cópias de net.gen / net.load) e nunca alteram a rede. As linhas de cada
+# tabela recebem um código (cenário x grupo) e as somas e contagens saem de
+# poucas chamadas de np.bincount sobre esse código (uma por grandeza: potência,
+# número de unidades, presença), sem laço em Python por grupo; a memória extra
+# é a de um vetor de códigos por tabela. Em classificar_cargas o limiar dos
+# grandes centros é um quantil por cenário, feito com groupby do pandas.
+#
+# Dados empilhados de vários cenários (coluna ou nível de índice 'cenario',
+# ver empilhar_cenarios) são agregados por cenário sem mudança nenhuma; uma
+# rede isolada vira um único cenário.
+
+QUANTIL_GRANDES_CENTROS = 0.95   # Top 5% das cargas como grandes centros
+TIPO_CONVENCIONAL = 'Convencional'
+TIPO_EXTERNO = 'Conexão externa'
+TIPO_ESTATICO = 'Geração estática'
+TIPO_CARGA = 'Carga'
+TIPO_ARMAZENAMENTO = 'Armazenamento'
+CLASSES_CARGA = ('Grandes Centros', 'Cidades de Interior')
+
+
+def _coluna(tabela, nome, padrao=0.0):
+    """Coluna como vetor numpy (visão, sem cópia, para colunas numéricas)."""
+    if nome in tabela.columns:
+        return tabela[nome].to_numpy()
+    return np.full(len(tabela), padrao)
+
+
+def _valores_cenario(tabela):
+    if 'cenario' in tabela.columns:
+        return tabela['cenario'].to_numpy()
+    if 'cenario' in (tabela.index.names or []):
+        return tabela.index.get_level_values('cenario')
+    return None
+
+
+def _rotulos_cenario(tabela):
+    valores = _valores_cenario(tabela)
+    return pd.Index(['base'] if valores is None else pd.unique(valores))
+
+
+def _codigos_cenario(tabela, cenarios):
+    """Posição de cada linha em 'cenarios' (todas no único cenário de uma rede isolada)."""
+    valores = _valores_cenario(tabela)
+    if valores is None:
+        return np.zeros(len(tabela), dtype=np.int64)
+    return cenarios.get_indexer(valores)
+
+
+def _somar(cenario, n_cenarios, grupo, n_grupos, pesos=None):
+    """Somas (ou contagens, sem pesos) por cenário x grupo, numa só passagem."""
+    soma = np.bincount(cenario * n_grupos + grupo, weights=pesos, minlength=n_cenarios * n_grupos)
+    return soma.reshape(n_cenarios, n_grupos)
+
+
+def agregar_geracao(gen, ext_grid, cenarios):
+    """
+    Potência instalada e número de unidades por tipo de fonte: geradores sem
+    tag são convencionais, os demais usam a tag do DER (solar, eolico, ...);
+    as conexões externas entram como tipo próprio.
+    """
+    tags = gen['tags'].to_numpy() if 'tags' in gen.columns else np.full(len(gen), None)
+    tipo, tipos = pd.factorize(pd.Series(tags).fillna(TIPO_CONVENCIONAL).to_numpy(), sort=True)
+    tipos = list(tipos) + [TIPO_EXTERNO]
+    n_cen, n_tipos = len(cenarios), len(tipos)
+    codigo = np.r_[_codigos_cenario(gen, cenarios) * n_tipos + tipo,
+                   _codigos_cenario(ext_grid, cenarios) * n_tipos + (n_tipos - 1)]
+    potencia = np.r_[_coluna(gen, 'p_mw'), _coluna(ext_grid, 'p_mw')]
+    mw = np.bincount(codigo, weights=potencia, minlength=n_cen * n_tipos).reshape(n_cen, n_tipos)
+    unidades = np.bincount(codigo, minlength=n_cen * n_tipos).reshape(n_cen, n_tipos)
+    indice = pd.MultiIndex.from_product([cenarios, tipos], names=['cenario', 'tipo'])
+    return pd.DataFrame({'potencia_mw': mw.ravel(), 'unidades': unidades.ravel()}, index=indice)
+
+
+def classificar_cargas(load, cenarios, quantil=QUANTIL_GRANDES_CENTROS):
+    """
+    Cargas acima do quantil (por cenário) são grandes centros, as demais
+    cidades de interior. Devolve limiar, número de cargas e MW por classe.
+    """
+    cen = _codigos_cenario(load, cenarios)
+    n_cen = len(cenarios)
+    p = _coluna(load, 'p_mw')
+    limiar = np.full(n_cen, np.nan)
+    if len(load):
+        # Quantil por cenário com a mesma interpolação linear do Series.quantile
+        limiar[:] = pd.Series(p).groupby(cen).quantile(quantil).reindex(range(n_cen)).to_numpy()
+    classe = (p < limiar[cen]).astype(np.int64)   # 0: grandes centros, 1: interior
+    mw = _somar(cen, n_cen, classe, 2, p)
+    quantidade = _somar(cen, n_cen, classe, 2)
+    resultado = pd.DataFrame({'limiar_mw': limiar, 'total_mw': mw.sum(axis=1), 'cargas': quantidade.sum(axis=1)},
+                             index=cenarios)
+    for k, nome in enumerate(('grandes', 'interior')):
+        resultado[f'{nome}_cargas'] = quantidade[:, k]
+        resultado[f'{nome}_mw'] = mw[:, k]
+    return resultado
+
+
+def totais_armazenamento(storage, cenarios):
+    """Número de baterias, potência e energia instaladas por cenário."""
+    cen = _codigos_cenario(storage, cenarios)
+    n_cen = len(cenarios)
+    zero = np.zeros(len(storage), dtype=np.int64)
+    return pd.DataFrame({'unidades': _somar(cen, n_cen, zero, 1)[:, 0],
+                         'potencia_mw': _somar(cen, n_cen, zero, 1, _coluna(storage, 'p_mw'))[:, 0],
+                         'energia_mwh': _somar(cen, n_cen, zero, 1, _coluna(storage, 'max_e_mwh'))[:, 0]},
+                        index=cenarios)
+
+
+def agregados_rede(tabelas, quantil=QUANTIL_GRANDES_CENTROS):
+    """
+    Todos os agregados do dashboard a partir de uma rede pandapower ou de um
+    dicionário de tabelas empilhadas (gen, ext_grid, load, storage), sem
+    alterar nada. Devolve {'geracao', 'cargas', 'armazenamento'}, por cenário.
+    """
+    vazia = pd.DataFrame()
+    gen, ext_grid = tabelas['gen'], tabelas['ext_grid']
+    load = tabelas['load']
+    storage = tabelas['storage'] if 'storage' in tabelas else vazia
+    rotulos = [_rotulos_cenario(t) for t in (gen, ext_grid, load, storage) if len(t)]
+    cenarios = rotulos[0] if rotulos else pd.Index(['base'])
+    for outros in rotulos[1:]:
+        cenarios = cenarios.union(outros, sort=False)
+    cenarios = cenarios.rename('cenario')
+    return {'geracao': agregar_geracao(gen, ext_grid, cenarios),
+            'cargas': classificar_cargas(load, cenarios, quantil),
+            'armazenamento': totais_armazenamento(storage, cenarios)}
+
+
+def injecoes_por_barra(net):
+    """
+    Potência ativa dos resultados do fluxo somada por barra x tipo: fontes com
+    os mesmos tipos de agregar_geracao, mais cargas, baterias e geração
+    estática. Devolve um DataFrame (barra, tipo, p_mw), uma linha por par
+    barra x tipo que tenha elemento na rede.
+    """
+    barras, tipos, potencias = [], [], []
+    for elemento, tipo in (('gen', None), ('ext_grid', TIPO_EXTERNO), ('sgen', TIPO_ESTATICO),
+                           ('load', TIPO_CARGA), ('storage', TIPO_ARMAZENAMENTO)):
+        resultado = 'res_' + elemento
+        if elemento not in net or resultado not in net or net[resultado].empty or net[elemento].empty:
+            continue
+        tabela = net[elemento]
+        if tipo is None:
+            tags = _coluna(tabela, 'tags', None)
+            rotulos = pd.Series(tags).fillna(TIPO_CONVENCIONAL).to_numpy()
+        else:
+            rotulos = np.full(len(tabela), tipo, dtype=object)
+        barras.append(tabela['bus'].to_numpy())
+        tipos.append(rotulos)
+        potencias.append(np.nan_to_num(net[resultado]['p_mw'].reindex(tabela.index).to_numpy(dtype=float)))
+    if not barras:
+        return pd.DataFrame({'barra': [], 'tipo': [], 'p_mw': []})
+
+    barra, barras_unicas = pd.factorize(np.concatenate(barras), sort=True)
+    tipo, tipos_unicos = pd.factorize(np.concatenate(tipos), sort=True)
+    n_tipos = len(tipos_unicos)
+    codigo = barra * n_tipos + tipo
+    soma = np.bincount(codigo, weights=np.concatenate(potencias), minlength=len(barras_unicas) * n_tipos)
+    presentes = np.flatnonzero(np.bincount(codigo, minlength=soma.size))
+    return pd.DataFrame({'barra': np.asarray(barras_unicas)[presentes // n_tipos],
+                         'tipo': np.asarray(tipos_unicos, dtype=object)[presentes % n_tipos],
+                         'p_mw': soma[presentes]})
+
+
+def empilhar_cenarios(redes, elementos=('gen', 'ext_grid', 'load', 'storage')):
+    """Empilha as tabelas de várias redes {nome do cenário: net} com a coluna 'cenario'."""
+    tabelas = {}
+    for elemento in elementos:
+        partes = [net[elemento].assign(cenario=nome) for nome, net in redes.items() if elemento in net]
+        tabelas[elemento] = pd.concat(partes) if partes else pd.DataFrame()
+    return tabelas
+
 
 # ##############################################################################
 # FASE DE ANÁLISE DA REDE
 # ##############################################################################
-def analisar_rede():
+def analisar_rede(nome_arquivo='rede_inicial.pkl'):
     """
-    Carrega o estado inicial da rede salvo pelo main.py e exibe um
-    dashboard com as principais características do sistema.
+    Carrega o estado inicial da rede salvo pelo main.py (ou outra rede em
+    'nome_arquivo') e exibe um dashboard com as principais características
+    do sistema.
     """
     print("--- Dashboard de Análise da Rede Elétrica ---")
-    
+
     # 1. Carrega o arquivo da rede salvo pelo main.py
-    nome_arquivo = 'rede_inicial.pkl'
     try:
         with open(nome_arquivo, 'rb') as f:
             net = pickle.load(f)
@@ -27,46 +203,38 @@ def analisar_rede():
         print(f"\nERRO ao carregar o arquivo da rede: {e}")
         return
 
+    agregados = agregados_rede(net)
+    geracao = agregados['geracao'].loc['base']
+    cargas = agregados['cargas'].loc['base']
+    armazenamento = agregados['armazenamento'].loc['base']
+
     # 2. Análise da Geração Existente
     print("--- GERAÇÃO CONVENCIONAL (ESTADO BASE) ---")
-    potencia_geradores_convencionais = net.gen.p_mw.sum()
-    
-    # --- CORREÇÃO AQUI: Verifica se existem conexões externas antes de somar ---
-    potencia_conexoes_externas = 0.0
-    if not net.ext_grid.empty and 'p_mw' in net.ext_grid.columns:
-        potencia_conexoes_externas = net.ext_grid.p_mw.sum()
-    # --------------------------------------------------------------------
-
-    potencia_total_convencional = potencia_geradores_convencionais + potencia_conexoes_externas
-    
-    print(f"Potência Total Instalada: {potencia_total_convencional:,.2f} MW")
-    print(f"  -> Geradores Internos: {potencia_geradores_convencionais:,.2f} MW ({len(net.gen)} unidades)")
-    print(f"  -> Conexões Externas: {potencia_conexoes_externas:,.2f} MW ({len(net.ext_grid)} unidades)")
-    
-    if not net.gen.empty:
-        net.gen['tipo_fonte'] = 'Convencional'
-        soma_por_tipo = net.gen.groupby('tipo_fonte').p_mw.sum()
+    externas = geracao.loc[TIPO_EXTERNO]
+    internas = geracao.drop(TIPO_EXTERNO)
+    print(f"Potência Total Instalada: {geracao.potencia_mw.sum():,.2f} MW")
+    print(f"  -> Geradores Internos: {internas.potencia_mw.sum():,.2f} MW ({int(internas.unidades.sum())} unidades)")
+    print(f"  -> Conexões Externas: {externas.potencia_mw:,.2f} MW ({int(externas.unidades)} unidades)")
+    if internas.unidades.sum():
         print("\nSoma de potência por tipo de fonte:")
-        print(soma_por_tipo.to_string())
+        print(internas.potencia_mw[internas.unidades > 0].to_string())
 
     # 3. Análise das Cargas (Consumidores)
     print("\n--- CARGAS (CONSUMIDORES) ---")
-    cargas = net.load
-    potencia_total_cargas = cargas.p_mw.sum()
-    
-    limiar_cidade_grande = cargas.p_mw.quantile(0.95)  # Top 5% como grandes centros
-    
-    cidades_grandes = cargas[cargas.p_mw >= limiar_cidade_grande]
-    cidades_interior = cargas[cargas.p_mw < limiar_cidade_grande]
-    
-    print(f"Potência Total Demandada: {potencia_total_cargas:,.2f} MW")
-    print(f"Número Total de Cargas: {len(cargas)}")
-    print(f"\nClassificação das Cargas (Limiar > {limiar_cidade_grande:.2f} MW):")
-    print(f"  -> Grandes Centros: {len(cidades_grandes)} cargas, somando {cidades_grandes.p_mw.sum():,.2f} MW")
-    print(f"  -> Cidades de Interior: {len(cidades_interior)} cargas, somando {cidades_interior.p_mw.sum():,.2f} MW")
+    print(f"Potência Total Demandada: {cargas.total_mw:,.2f} MW")
+    print(f"Número Total de Cargas: {cargas.cargas:.0f}")
+    print(f"\nClassificação das Cargas (Limiar > {cargas.limiar_mw:.2f} MW):")
+    print(f"  -> {CLASSES_CARGA[0]}: {cargas.grandes_cargas:.0f} cargas, somando {cargas.grandes_mw:,.2f} MW")
+    print(f"  -> {CLASSES_CARGA[1]}: {cargas.interior_cargas:.0f} cargas, somando {cargas.interior_mw:,.2f} MW")
+
+    # 4. Armazenamento
+    if armazenamento.unidades:
+        print("\n--- ARMAZENAMENTO ---")
+        print(f"  -> {armazenamento.unidades:.0f} baterias, {armazenamento.potencia_mw:,.2f} MW / "
+              f"{armazenamento.energia_mwh:,.2f} MWh")
 
 # ##############################################################################
 # ORQUESTRADOR DO DASHBOARD
 # ##############################################################################
 if __name__ == "__main__":
-    analisar_rede()
\ No newline at end of file
+    analisar_rede()
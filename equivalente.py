@@ -0,0 +1,375 @@
+import copy
+import hashlib
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandapower as pp
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+from pandapower.pypower.idx_brch import F_BUS, T_BUS
+from pandapower.pypower.idx_bus import BS, BUS_TYPE, GS, PQ
+from pandapower.pypower.makeYbus import makeYbus
+from pandapower.toolbox import select_subnet
+
+from cache_fluxo import impressao_digital
+from topologia import TopologiaRede
+
+# ##############################################################################
+# EQUIVALENTES DE REDE (WARD / REI) EM TORNO DE UMA ÁREA DE ESTUDO
+# ##############################################################################
+# A rede externa é eliminada por complemento de Schur sobre a Ybus do ponto de
+# operação convergido. A matriz externa Yee é fatorada uma única vez (splu) e
+# todas as colunas de fronteira são resolvidas com essa fatoração.
+
+TIPOS_EQUIVALENTE = ('ward', 'rei')
+
+# Acoplamentos equivalentes menores que isto (pu) viram apenas shunt
+TOL_ADMITANCIA = 1e-6
+
+TAMANHO_CACHE_MEMORIA = 16
+_cache_equivalentes = OrderedDict()
+
+
+def selecionar_area_interna(net, barras_centrais, k=3):
+    """Barras do pandapower a até k saltos das barras centrais (ex.: barras dos DERs)."""
+    return TopologiaRede(net).vizinhanca(barras_centrais, k)
+
+
+def _chave_cache(net, barras_retidas, tipo):
+    h = hashlib.sha1()
+    h.update(tipo.encode())
+    h.update(np.sort(np.asarray(barras_retidas, dtype=np.int64)).tobytes())
+    h.update(impressao_digital(net).encode())
+    return h.hexdigest()
+
+
+def _particionar(net, barras_retidas):
+    """
+    Separa os índices ppci em retidos (K), fronteira (B, subconjunto de K) e
+    externos (E). Barras auxiliares do ppci (sem barra no pandapower) ficam
+    retidas somente se todas as vizinhas forem retidas.
+    """
+    interno = net._ppc['internal']
+    ybus = interno['Ybus'].tocsr()
+    n = ybus.shape[0]
+    lookup = net._pd2ppc_lookups['bus']
+
+    retido = np.zeros(n, dtype=bool)
+    pos = lookup[np.asarray(barras_retidas, dtype=np.int64)]
+    retido[pos[(pos >= 0) & (pos < n)]] = True
+
+    mapeadas = np.zeros(n, dtype=bool)
+    todas = lookup[net.bus.index.values]
+    mapeadas[todas[(todas >= 0) & (todas < n)]] = True
+    estrutura = (ybus != 0).astype(np.int8)
+    for aux in np.flatnonzero(~mapeadas):
+        vizinhas = estrutura.indices[estrutura.indptr[aux]:estrutura.indptr[aux + 1]]
+        vizinhas = vizinhas[vizinhas != aux]
+        retido[aux] = len(vizinhas) > 0 and retido[vizinhas].all()
+
+    # Fronteira: barras retidas com pelo menos uma vizinha externa
+    externas_vizinhas = estrutura @ (~retido).astype(np.int8)
+    fronteira = retido & (externas_vizinhas > 0)
+    return np.flatnonzero(retido), np.flatnonzero(fronteira), np.flatnonzero(~retido)
+
+
+def _admitancia_ramos_cortados(interno, fronteira, externas):
+    """Parcela da Ybus de fronteira devida aos ramos fronteira-externa (sem shunts de barra)."""
+    bus = interno['bus'].copy()
+    bus[:, GS] = 0.0
+    bus[:, BS] = 0.0
+    branch = interno['branch']
+    f = branch[:, F_BUS].real.astype(np.int64)
+    t = branch[:, T_BUS].real.astype(np.int64)
+    e_fronteira = np.zeros(len(bus), dtype=bool)
+    e_fronteira[fronteira] = True
+    e_externa = np.zeros(len(bus), dtype=bool)
+    e_externa[externas] = True
+    cortados = (e_fronteira[f] & e_externa[t]) | (e_externa[f] & e_fronteira[t])
+    ycorte, _, _ = makeYbus(interno['baseMVA'], bus, branch[cortados])
+    return ycorte.tocsr()[fronteira][:, fronteira].toarray()
+
+
+def _eliminar(ybus, injecoes, mantidos, eliminados):
+    """
+    Complemento de Schur: Yeq = Ykk - Yke Yee^-1 Yek e injeção equivalente de
+    corrente Ieq = -Yke Yee^-1 Ie. Uma fatoração de Yee serve a todas as colunas.
+    """
+    yee = ybus[eliminados][:, eliminados].tocsc()
+    yek = ybus[eliminados][:, mantidos].toarray()
+    yke = ybus[mantidos][:, eliminados].tocsr()
+    lu = splu(yee)
+    rhs = np.column_stack([yek, injecoes[eliminados]])
+    solucao = lu.solve(rhs)
+    produto = yke @ solucao
+    return produto[:, :-1], -produto[:, -1]
+
+
+def _rei_aumentar(ybus, tensoes, correntes, potencias, grupos):
+    """
+    Acrescenta, para cada grupo de injeções externas, a rede de balanço nulo
+    (nó G com tensão zero) e o nó REI (R). As injeções do grupo passam para R.
+    Retorna a Ybus aumentada, correntes, tensões e a lista (G, R, S_R) por grupo.
+    """
+    n = ybus.shape[0]
+    linhas, colunas, valores = [], [], []
+    correntes = correntes.copy()
+    novos = []
+    tensoes_extra = []
+    proximo = n
+    for barras in grupos:
+        i_r = correntes[barras].sum()
+        s_r = potencias[barras].sum()
+        if abs(i_r) < 1e-9:
+            continue
+        v_r = s_r / np.conj(i_r)
+        g, r = proximo, proximo + 1
+        proximo += 2
+        y_i = -correntes[barras] / tensoes[barras]
+        y_gr = i_r / v_r
+        linhas += [*barras, *np.full(len(barras), g), *barras, *np.full(len(barras), g), g, r, g, r]
+        colunas += [*barras, *np.full(len(barras), g), *np.full(len(barras), g), *barras, g, r, r, g]
+        valores += [*y_i, *y_i, *(-y_i), *(-y_i), y_gr, y_gr, -y_gr, -y_gr]
+        correntes[barras] = 0.0
+        novos.append((g, r, s_r, v_r, i_r))
+        tensoes_extra += [0.0, v_r]
+
+    total = proximo
+    aumentada = ybus.copy()
+    aumentada.resize((total, total))
+    aumentada = aumentada + sp.csr_matrix(
+        (np.asarray(valores, dtype=complex), (np.asarray(linhas), np.asarray(colunas))),
+        shape=(total, total))
+    correntes_aum = np.concatenate([correntes, np.zeros(total - n, dtype=complex)])
+    for g, r, s_r, v_r, i_r in novos:
+        correntes_aum[r] = i_r
+    tensoes_aum = np.concatenate([tensoes, np.asarray(tensoes_extra, dtype=complex)])
+    return aumentada.tocsr(), correntes_aum, tensoes_aum, novos
+
+
+def construir_equivalente(net, barras_retidas, tipo='ward', tol_admitancia=TOL_ADMITANCIA, verbose=True):
+    """
+    Mantém as barras retidas e substitui o restante da rede por um equivalente
+    Ward (injeções de potência constante nas barras de fronteira) ou REI
+    (injeções externas agregadas em barras fictícias de geração e de carga).
+
+    Se 'net' não tiver um fluxo convergido com a Ybus interna (os casos de
+    pandapower.networks chegam com resultados, mas sem ela), o fluxo roda em
+    uma cópia: a rede de quem chamou e as suas tabelas res_* não mudam.
+    Retorna um dicionário com a rede reduzida e os metadados da redução.
+    """
+    if tipo not in TIPOS_EQUIVALENTE:
+        raise ValueError(f"Tipo de equivalente '{tipo}' desconhecido. Use um de {TIPOS_EQUIVALENTE}.")
+    if not net.get('converged', False) or not (net.get('_ppc') or {}).get('internal'):
+        net = copy.deepcopy(net)
+        pp.runpp(net)
+
+    inicio = time.perf_counter()
+    interno = net._ppc['internal']
+    base_mva = interno['baseMVA']
+    ybus = interno['Ybus'].tocsr()
+    tensoes = np.asarray(interno['V'])
+    potencias = tensoes * np.conj(ybus @ tensoes)
+    correntes = np.conj(potencias / tensoes)
+
+    retidos, fronteira, externos = _particionar(net, barras_retidas)
+    if len(externos) == 0:
+        raise ValueError("A área retida cobre a rede inteira; não há o que reduzir.")
+    y_corte = _admitancia_ramos_cortados(interno, fronteira, externos)
+
+    # Barras mantidas na eliminação: fronteira (+ nós REI)
+    mantidos = fronteira
+    nos_rei = []
+    if tipo == 'rei':
+        tipo_barra = interno['bus'][:, BUS_TYPE].real.astype(int)
+        com_injecao = np.abs(potencias[externos]) > 1e-9
+        geradoras = externos[(tipo_barra[externos] != PQ) & com_injecao]
+        cargas = externos[(tipo_barra[externos] == PQ) & com_injecao]
+        ybus, correntes, tensoes, nos_rei = _rei_aumentar(
+            ybus, tensoes, correntes, potencias, [geradoras, cargas])
+        mantidos = np.concatenate([fronteira, [r for _, r, *_ in nos_rei]]).astype(np.int64)
+        extras_g = np.asarray([g for g, *_ in nos_rei], dtype=np.int64)
+        externos = np.concatenate([externos, extras_g])
+
+    schur, i_eq = _eliminar(ybus, correntes, mantidos, externos)
+    n_b = len(fronteira)
+    y_mantida = ybus[mantidos][:, mantidos].toarray()
+    delta_y = y_mantida - schur
+    # Na fronteira, a rede retida já contém os ramos internos: tira-se o que era dos ramos cortados
+    delta_y[:n_b, :n_b] -= y_mantida[:n_b, :n_b] - y_corte
+    s_eq = tensoes[mantidos] * np.conj(i_eq)
+
+    # --- Monta a rede reduzida ---
+    lookup = net._pd2ppc_lookups['bus']
+    ppci_para_pd = {}
+    for barra_pd in net.bus.index.values:
+        pos = lookup[barra_pd]
+        if 0 <= pos < len(interno['bus']):
+            ppci_para_pd.setdefault(int(pos), int(barra_pd))
+
+    barras_mantidas_pd = [ppci_para_pd[p] for p in retidos if p in ppci_para_pd]
+    slack_externo = not net.ext_grid[net.ext_grid.in_service].bus.isin(barras_mantidas_pd).any()
+    rede = select_subnet(net, barras_mantidas_pd, include_results=False)
+
+    barras_equivalente = [ppci_para_pd[p] for p in fronteira]
+    vn_fronteira = float(np.median(rede.bus.loc[barras_equivalente, 'vn_kv'])) if barras_equivalente else 1.0
+    for g, r, s_r, v_r, i_r in nos_rei:
+        nome = 'REI_geracao' if s_r.real >= 0 else 'REI_carga'
+        barra_rei = pp.create_bus(rede, vn_kv=vn_fronteira, name=nome)
+        barras_equivalente.append(barra_rei)
+        if s_r.real >= 0:
+            if slack_externo:
+                pp.create_ext_grid(rede, barra_rei, vm_pu=abs(v_r), va_degree=np.degrees(np.angle(v_r)),
+                                   name='REI_slack')
+                slack_externo = False
+            else:
+                pp.create_gen(rede, barra_rei, p_mw=s_r.real * base_mva, vm_pu=abs(v_r), name=nome)
+        else:
+            pp.create_load(rede, barra_rei, p_mw=-s_r.real * base_mva, q_mvar=-s_r.imag * base_mva, name=nome)
+
+    n_m = len(mantidos)
+    linhas, colunas = np.nonzero(np.triu(np.abs(delta_y) + np.abs(delta_y.T) > tol_admitancia, k=1))
+    y_ft, y_tf = -delta_y[linhas, colunas], -delta_y[colunas, linhas]
+    validos = (np.abs(y_ft) > tol_admitancia) & (np.abs(y_tf) > tol_admitancia)
+    linhas, colunas = linhas[validos], colunas[validos]
+    z_ft, z_tf = 1 / y_ft[validos], 1 / y_tf[validos]
+    barras_eq = np.asarray(barras_equivalente, dtype=np.int64)
+    if len(linhas):
+        pp.create_impedances(rede, barras_eq[linhas], barras_eq[colunas],
+                             rft_pu=z_ft.real, xft_pu=z_ft.imag, rtf_pu=z_tf.real, xtf_pu=z_tf.imag,
+                             sn_mva=net.sn_mva, name=f'{tipo}_eq')
+    # O que não virou impedância fica no shunt da própria barra
+    representado = np.zeros((n_m, n_m), dtype=bool)
+    representado[linhas, colunas] = True
+    representado |= representado.T
+    y_shunt = np.diag(delta_y) + np.where(representado, delta_y, 0).sum(axis=1)
+
+    pp.create_wards(rede, barras_eq, ps_mw=-s_eq.real * base_mva, qs_mvar=-s_eq.imag * base_mva,
+                    pz_mw=y_shunt.real * base_mva, qz_mvar=-y_shunt.imag * base_mva,
+                    name=f'{tipo}_eq')
+
+    if slack_externo:
+        # Sem slack na área retida: a referência vai para a fronteira com maior injeção equivalente
+        # (de preferência uma barra sem geradores, para não conflitar com o controle de tensão)
+        prioridade = np.abs(s_eq[:n_b]) - np.isin(barras_equivalente[:n_b], rede.gen.bus.values) * 1e6
+        escolhida = int(np.argmax(prioridade))
+        candidata = barras_equivalente[escolhida]
+        v_ref = tensoes[fronteira[escolhida]]
+        pp.create_ext_grid(rede, candidata, vm_pu=abs(v_ref), va_degree=np.degrees(np.angle(v_ref)),
+                           name=f'{tipo}_slack')
+
+    tempo = time.perf_counter() - inicio
+    if verbose:
+        print(f"   -> Equivalente {tipo.upper()}: {len(net.bus)} -> {len(rede.bus)} barras "
+              f"({len(fronteira)} de fronteira) em {tempo:.2f} s.")
+    return {
+        'rede': rede,
+        'tipo': tipo,
+        'barras_retidas': np.asarray(barras_mantidas_pd),
+        'barras_fronteira': np.asarray([ppci_para_pd[p] for p in fronteira]),
+        'tempo_construcao_s': tempo,
+    }
+
+
+def obter_equivalente(net, barras_retidas, tipo='ward', diretorio_cache=None, verbose=True):
+    """
+    Devolve o equivalente da área definida por 'barras_retidas', reaproveitando
+    o cache em memória (LRU) e, se 'diretorio_cache' for dado, o cache em disco.
+    """
+    chave = _chave_cache(net, barras_retidas, tipo)
+    if chave in _cache_equivalentes:
+        _cache_equivalentes.move_to_end(chave)
+        if verbose:
+            print(f"   -> Equivalente {tipo.upper()} reaproveitado do cache em memória.")
+        return _cache_equivalentes[chave]
+
+    caminho = os.path.join(diretorio_cache, f"equivalente_{chave}.pkl") if diretorio_cache else None
+    if caminho and os.path.exists(caminho):
+        with open(caminho, 'rb') as f:
+            equivalente = pickle.load(f)
+        if verbose:
+            print(f"   -> Equivalente {tipo.upper()} carregado de '{caminho}'.")
+    else:
+        equivalente = construir_equivalente(net, barras_retidas, tipo, verbose=verbose)
+        if caminho:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            temporario = caminho + '.tmp'
+            with open(temporario, 'wb') as f:
+                pickle.dump(equivalente, f)
+            os.replace(temporario, caminho)
+
+    _cache_equivalentes[chave] = equivalente
+    while len(_cache_equivalentes) > TAMANHO_CACHE_MEMORIA:
+        _cache_equivalentes.popitem(last=False)
+    return equivalente
+
+
+def comparar_com_rede_completa(net, equivalente, modificar=None, repeticoes=3, verbose=True):
+    """
+    Mede o tempo de solução da rede completa e da reduzida e o erro de tensão
+    (módulo e ângulo) e de fluxo nas linhas da área retida. 'modificar', se
+    dado, é aplicado às duas redes antes da solução (ex.: inserir os DERs),
+    para medir a precisão fora do ponto de operação original.
+    """
+    def _cronometrar(rede):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            pp.runpp(rede)
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos)
+
+    completa = copy.deepcopy(net)
+    reduzida = copy.deepcopy(equivalente['rede'])
+    if modificar is not None:
+        modificar(completa)
+        modificar(reduzida)
+    tempo_completa = _cronometrar(completa)
+    tempo_reduzida = _cronometrar(reduzida)
+
+    barras = equivalente['barras_retidas']
+    erro_vm = np.abs(reduzida.res_bus.loc[barras, 'vm_pu'] - completa.res_bus.loc[barras, 'vm_pu'])
+    erro_va = np.abs(reduzida.res_bus.loc[barras, 'va_degree'] - completa.res_bus.loc[barras, 'va_degree'])
+    linhas = reduzida.line.index.intersection(completa.line.index)
+    erro_fluxo = np.abs(reduzida.res_line.loc[linhas, 'p_from_mw'] - completa.res_line.loc[linhas, 'p_from_mw'])
+
+    relatorio = {
+        'tipo': equivalente['tipo'],
+        'barras_completa': len(completa.bus),
+        'barras_reduzida': len(reduzida.bus),
+        'tempo_completa_s': tempo_completa,
+        'tempo_reduzida_s': tempo_reduzida,
+        'aceleracao': tempo_completa / tempo_reduzida if tempo_reduzida > 0 else np.inf,
+        'erro_max_vm_pu': float(erro_vm.max()) if len(erro_vm) else 0.0,
+        'erro_max_va_graus': float(erro_va.max()) if len(erro_va) else 0.0,
+        'erro_max_fluxo_mw': float(erro_fluxo.max()) if len(erro_fluxo) else 0.0,
+    }
+    if verbose:
+        print(f"\n--- Equivalente {relatorio['tipo'].upper()} vs. Rede Completa ---")
+        print(f"  - Barras: {relatorio['barras_completa']} -> {relatorio['barras_reduzida']}")
+        print(f"  - Tempo de solução: {tempo_completa * 1e3:.1f} ms -> {tempo_reduzida * 1e3:.1f} ms "
+              f"({relatorio['aceleracao']:.1f}x)")
+        print(f"  - Erro máximo |V|: {relatorio['erro_max_vm_pu']:.2e} pu")
+        print(f"  - Erro máximo ângulo: {relatorio['erro_max_va_graus']:.2e} graus")
+        print(f"  - Erro máximo de fluxo nas linhas retidas: {relatorio['erro_max_fluxo_mw']:.2e} MW")
+    return relatorio
+
+
+if __name__ == "__main__":
+    import pandapower.networks as nw
+
+    rede_completa = nw.case1354pegase()
+    pp.runpp(rede_completa)
+    barras_der = rede_completa.bus.index[rede_completa.bus.name.isin([3, 4, 10])]
+    area = selecionar_area_interna(rede_completa, barras_der, k=3)
+
+    def inserir_der(rede):
+        for barra in barras_der:
+            pp.create_sgen(rede, barra, p_mw=150.0, name='DER_teste')
+
+    for tipo_eq in TIPOS_EQUIVALENTE:
+        eq = obter_equivalente(rede_completa, area, tipo=tipo_eq)
+        comparar_com_rede_completa(rede_completa, eq, modificar=inserir_der)
@@ -0,0 +1,659 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+from pandapower.pypower.idx_brch import F_BUS, RATE_A
+from pandapower.pypower.idx_bus import BUS_TYPE, PD, PQ, PV, QD
+from pandapower.pypower.idx_gen import GEN_BUS, GEN_STATUS, PG, PMAX, QG, QMAX, QMIN
+
+# ##############################################################################
+# FLUXO DE POTÊNCIA CONTINUADO (CURVA P-V E MARGEM DE ESTABILIDADE DE TENSÃO)
+# ##############################################################################
+# Segue o esquema do runcpf do MATPOWER (cpf_predictor / cpf_corrector /
+# cpf_tangent): a injeção especificada é S(lam) = S0 + lam * dS, com dS dado
+# pela direção de crescimento (cargas, DER e, opcionalmente, redespacho dos
+# geradores), e a curva é traçada por preditor tangente + corretor de Newton
+# com parametrização por pseudo-comprimento de arco, que atravessa o nariz.
+#
+# Reaproveitamento: a matriz aumentada [[J, dF/dlam], [z^T]] tem padrão fixo
+# (coluna dF/dlam e linha z^T cheias), montado uma vez por estrutura de barras
+# PV/PQ junto com a ordenação de colunas, que é reutilizada nas fatorações
+# seguintes. Cada ponto aceito tem uma única LU: ela dá a tangente e serve
+# de corda ao corretor do passo seguinte (Newton completo só se a corda não
+# convergir). Os rollbacks de localização de limites (QLIM, PLIM) não fatoram
+# nada; os do nariz fatoram uma vez, porque o sinal de dlam só sai da
+# tangente no ponto novo.
+#
+# Eventos (localizados por rollback com passo interpolado, como no
+# cpf_detect_events): NARIZ (dlam da tangente troca de sinal), QLIM (gerador
+# atinge o limite de reativo e a barra passa a PQ), PLIM (gerador atinge
+# Pmax e para de crescer), VLIM (tensão sai da faixa) e FLIM (fluxo acima do
+# limite do ramo). O passo é adaptativo pelo erro entre preditor e corretor.
+
+PASSO_INICIAL = 0.05
+PASSO_MINIMO = 1e-4
+PASSO_MAXIMO = 0.2
+TOLERANCIA_PASSO = 1e-3
+AMORTECIMENTO_PASSO = 0.7
+TOLERANCIA_NEWTON = 1e-8
+MAX_ITERACOES_NEWTON = 10
+MAX_ITERACOES_CORDA = 6      # corretor com a LU do último ponto aceito antes de refatorar
+MAX_PASSOS = 2000
+MAX_TENTATIVAS_LOCALIZACAO = 8
+# Tolerâncias dos eventos (unidades das margens: dlam normalizado, MVAr, MW, pu, MVA)
+TOLERANCIAS_EVENTOS = {'NARIZ': 1e-5, 'QLIM': 0.01, 'PLIM': 0.01, 'VLIM': 1e-4, 'FLIM': 0.01, 'FIM': 1e-5}
+# Eventos que mudam o problema (ou encerram) são localizados com rollback; VLIM/FLIM só são registrados
+EVENTOS_LOCALIZADOS = ('NARIZ', 'QLIM', 'PLIM', 'FIM')
+
+
+def direcao_crescimento(net, fator_carga=1.0, der_mw=None, fator_sgen=0.0, redistribuir_geracao=True):
+    """
+    Direção de crescimento para lam = 1, nas barras do pandapower:
+      - cargas crescem 'fator_carga' x o valor atual (fator de potência mantido);
+      - 'der_mw' (Series barra -> MW) acrescenta DER com fator de potência unitário;
+      - 'fator_sgen' escala os geradores estáticos existentes (solar/eólico).
+    Com 'redistribuir_geracao', o aumento líquido de carga é repartido entre os
+    geradores (exceto a referência) na proporção do despacho atual; sem isso a
+    referência absorve tudo.
+    Devolve {'carga': Series complexa (MVA por barra), 'der': Series (MW por barra),
+    'geradores': Series (MW por índice de net.gen)}.
+    """
+    cargas = net.load[net.load.in_service]
+    escala = cargas.scaling if 'scaling' in cargas else 1.0
+    s_carga = ((cargas.p_mw + 1j * cargas.q_mvar) * escala * fator_carga).groupby(cargas.bus).sum()
+
+    der = pd.Series(dtype=float)
+    if fator_sgen and len(net.sgen):
+        sgens = net.sgen[net.sgen.in_service]
+        der = (sgens.p_mw * sgens.scaling * fator_sgen).groupby(sgens.bus).sum()
+    if der_mw is not None:
+        der = der.add(pd.Series(der_mw, dtype=float), fill_value=0.0)
+
+    geradores = pd.Series(0.0, index=net.gen.index)
+    liquido = np.real(s_carga.values).sum() - der.sum()
+    if redistribuir_geracao and len(net.gen):
+        ativos = net.gen.in_service & (net.gen.p_mw > 0)
+        pesos = net.gen.p_mw.where(ativos, 0.0)
+        if pesos.sum() > 0:
+            geradores = liquido * pesos / pesos.sum()
+    return {'carga': s_carga, 'der': der, 'geradores': geradores}
+
+
+def _linhas_gen_ppci(net, interno):
+    """Linha do gen do ppci de cada net.gen em serviço, e o nome ('ext_grid i' / 'gen i') de cada linha."""
+    gen_is = np.asarray(interno['gen_is'], dtype=bool)
+    ppci_da_ppc = np.cumsum(gen_is) - 1
+    linhas, nomes = {}, {}
+    for elemento, (primeira, _) in net._gen_order.items():
+        tabela = net[elemento]
+        em_servico = tabela.index[tabela.in_service.values]
+        for k, indice in enumerate(em_servico):
+            ppc = primeira + k
+            if ppc < len(gen_is) and gen_is[ppc]:
+                if elemento == 'gen':
+                    linhas[indice] = int(ppci_da_ppc[ppc])
+                nomes[int(ppci_da_ppc[ppc])] = f"{elemento} {indice}"
+    return linhas, nomes
+
+
+class FluxoContinuado:
+    """
+    Fluxo continuado sobre o ppci da rede 'net' convergida, na direção dada
+    por direcao_crescimento. 'tracar' devolve a curva P-V, os eventos e o nariz.
+    """
+
+    def __init__(self, net, direcao, verbose=True):
+        if not net.get('converged', False) or net._ppc is None:
+            raise ValueError("A rede precisa estar convergida (execute pp.runpp antes).")
+        interno = net._ppc['internal']
+        self.verbose = verbose
+        self.base_mva = interno['baseMVA']
+        ybus = interno['Ybus'].tocoo()
+        self.n = ybus.shape[0]
+        # Diagonal sempre presente no padrão (zeros explícitos), para montar o Jacobiano por posição
+        diagonal = np.arange(self.n)
+        self.ybus = sp.csr_matrix((np.r_[ybus.data, np.zeros(self.n)], (np.r_[ybus.row, diagonal], np.r_[ybus.col, diagonal])),
+                                  shape=ybus.shape)
+        self._y_linha = np.repeat(diagonal, np.diff(self.ybus.indptr))
+        self._y_coluna = self.ybus.indices
+        self._y_diagonal = np.flatnonzero(self._y_linha == self._y_coluna)
+        self.yf = interno['Yf'].tocsr()
+        self.ref = np.asarray(interno['ref'], dtype=np.int64)
+        self.v_inicial = np.asarray(interno['V']).copy()
+        self.lookup = net._pd2ppc_lookups['bus']
+        self.barras = net.bus.index
+        barra = interno['bus']
+        self.tipos_iniciais = barra[:, BUS_TYPE].real.astype(np.int64)
+
+        # Cargas (inclui sgens como carga negativa, como no ppci) e direção de crescimento
+        self.s_carga0 = (barra[:, PD] + 1j * barra[:, QD]) / self.base_mva
+        self.ds_carga = np.zeros(self.n, dtype=complex)
+        np.add.at(self.ds_carga, self.lookup[direcao['carga'].index.values],
+                  direcao['carga'].values / self.base_mva)
+        if len(direcao['der']):
+            np.add.at(self.ds_carga, self.lookup[direcao['der'].index.values],
+                      -direcao['der'].values / self.base_mva)
+        # Crescimentos brutos (MW em lam = 1) para o relatório; ds_carga é o líquido
+        self.dp_carga_mw = float(np.real(direcao['carga'].values).sum())
+        self.dp_der_mw = float(direcao['der'].sum())
+
+        # Geradores em serviço do ppci (ext_grid + gen); o crescimento dos gen vem pelo lookup de net.gen
+        gen = interno['gen']
+        ativos = gen[:, GEN_STATUS].real > 0
+        self.gen_ppci = np.flatnonzero(ativos)
+        gen = gen[ativos].real
+        self.gen_barra = gen[:, GEN_BUS].astype(np.int64)
+        self.pg0 = gen[:, PG] / self.base_mva
+        self.qg0 = gen[:, QG] / self.base_mva
+        self.qmax = gen[:, QMAX] / self.base_mva
+        self.qmin = gen[:, QMIN] / self.base_mva
+        self.pmax = gen[:, PMAX] / self.base_mva
+        self.dpg = np.zeros(len(self.gen_barra))
+        linha_ppci, nomes = _linhas_gen_ppci(net, interno)
+        linha = {g: k for k, g in enumerate(self.gen_ppci)}
+        for indice, dp in direcao['geradores'].items():
+            k = linha.get(linha_ppci.get(indice))
+            if k is not None:
+                self.dpg[k] = dp / self.base_mva
+        self.nome_gen = [nomes.get(g, f"gen ppci {g}") for g in self.gen_ppci]
+
+        # Limites de tensão e de fluxo
+        self.vm_min = np.full(self.n, 0.9)
+        self.vm_max = np.full(self.n, 1.1)
+        if 'min_vm_pu' in net.bus:
+            posicoes = self.lookup[net.bus.index.values]
+            self.vm_min[posicoes] = net.bus.min_vm_pu.fillna(0.9).values
+            self.vm_max[posicoes] = net.bus.max_vm_pu.fillna(1.1).values
+        ramos = interno['branch']
+        self.de = ramos[:, F_BUS].real.astype(np.int64)
+        self.limite_fluxo = ramos[:, RATE_A].real
+        self.com_limite = np.flatnonzero((self.limite_fluxo > 0) & (self.limite_fluxo < 1e5))
+        self.yf_limite = self.yf[self.com_limite]
+
+        self.fatoracoes = 0
+        self.ordenacoes = 0
+
+    # ##########################################################################
+    # EQUAÇÕES
+    # ##########################################################################
+    def _estrutura(self, tipos):
+        """Índices de variáveis (ângulos pv+pq, módulos pq) para os tipos de barra atuais."""
+        self.tipos = tipos
+        self.pv = np.flatnonzero(tipos == PV)
+        self.pq = np.flatnonzero(tipos == PQ)
+        self.pvpq = np.r_[self.pv, self.pq]
+        self._perm = None
+
+        # Padrão fixo da matriz aumentada: de onde vem cada posição de data do CSC.
+        # Valores empilhados: [Re dS/dVa, Re dS/dVm, Im dS/dVa, Im dS/dVm, dF/dlam, z]
+        npvpq, nnz = len(self.pvpq), len(self._y_linha)
+        dimensao = npvpq + len(self.pq) + 1
+        linha_p = np.full(self.n, -1)
+        linha_p[self.pvpq] = np.arange(npvpq)
+        linha_q = np.full(self.n, -1)
+        linha_q[self.pq] = npvpq + np.arange(len(self.pq))
+        i, j, k = self._y_linha, self._y_coluna, np.arange(nnz)
+        linhas, colunas, origens = [], [], []
+        for bloco, (por_linha, por_coluna) in enumerate(((linha_p, linha_p), (linha_p, linha_q),
+                                                          (linha_q, linha_p), (linha_q, linha_q))):
+            usar = (por_linha[i] >= 0) & (por_coluna[j] >= 0)
+            linhas.append(por_linha[i[usar]])
+            colunas.append(por_coluna[j[usar]])
+            origens.append(bloco * nnz + k[usar])
+        # Coluna dF/dlam e linha z^T cheias: o padrão não muda com a direção nem com z
+        linhas += [np.arange(dimensao - 1), np.full(dimensao, dimensao - 1)]
+        colunas += [np.full(dimensao - 1, dimensao - 1), np.arange(dimensao)]
+        origens += [4 * nnz + np.arange(2 * dimensao - 1)]
+        padrao = sp.csc_matrix((np.concatenate(origens) + 1.0, (np.concatenate(linhas), np.concatenate(colunas))),
+                               shape=(dimensao, dimensao))
+        self._padrao = (padrao.data.astype(np.int64) - 1, padrao.indices, padrao.indptr, dimensao)
+
+    def _s_esperada(self, lam):
+        p_ger = self.pg0 + lam * self.dpg
+        s_ger = np.bincount(self.gen_barra, weights=p_ger, minlength=self.n) + 1j * self.q_fixo
+        return s_ger - (self.s_carga0 + lam * self.ds_carga)
+
+    def _ds_esperada(self):
+        return np.bincount(self.gen_barra, weights=self.dpg, minlength=self.n) - self.ds_carga
+
+    def _residuo(self, v, lam):
+        erro = v * np.conj(self.ybus @ v) - self._s_esperada(lam)
+        return np.r_[erro[self.pvpq].real, erro[self.pq].imag]
+
+    def _vetor(self, va, vm, lam):
+        return np.r_[va[self.pvpq], vm[self.pq], lam]
+
+    def _aplicar(self, x, va, vm):
+        va, vm = va.copy(), vm.copy()
+        npvpq = len(self.pvpq)
+        va[self.pvpq] = x[:npvpq]
+        vm[self.pq] = x[npvpq:-1]
+        return va, vm, x[-1]
+
+    def _aumentada(self, v, z):
+        """[[J, dF/dlam], [z^T]] em CSC, preenchendo o padrão fixo da estrutura atual."""
+        i, j, y = self._y_linha, self._y_coluna, self.ybus.data
+        corrente = self.ybus @ v
+        unitario = v / np.abs(v)
+        ds_dva = -1j * v[i] * np.conj(y * v[j])
+        ds_dva[self._y_diagonal] += 1j * v * np.conj(corrente)
+        ds_dvm = v[i] * np.conj(y * unitario[j])
+        ds_dvm[self._y_diagonal] += np.conj(corrente) * unitario
+        ds = self._ds_esperada()
+        df_dlam = -np.r_[ds[self.pvpq].real, ds[self.pq].imag]
+        valores = np.concatenate((ds_dva.real, ds_dvm.real, ds_dva.imag, ds_dvm.imag, df_dlam, z))
+        ordem, indices, ponteiros, dimensao = self._padrao
+        return sp.csc_matrix((valores[ordem], indices, ponteiros), shape=(dimensao, dimensao))
+
+    def _fatorar(self, matriz):
+        """LU com a ordenação de colunas da primeira fatoração desta estrutura."""
+        self.fatoracoes += 1
+        if self._perm is None:
+            lu = splu(matriz, permc_spec='MMD_AT_PLUS_A')
+            # perm_c é a inversa da permutação de colunas aplicada (A[:, argsort(perm_c)])
+            self._perm = np.argsort(lu.perm_c)
+            self.ordenacoes += 1
+            return lu.solve
+        perm = self._perm
+        lu = splu(matriz[:, perm], permc_spec='NATURAL')
+
+        def resolver(b):
+            x = np.empty_like(b)
+            x[perm] = lu.solve(b)
+            return x
+        return resolver
+
+    def _tangente(self, resolver, dimensao):
+        rhs = np.zeros(dimensao)
+        rhs[-1] = 1.0
+        z = resolver(rhs)
+        return z / np.linalg.norm(z)
+
+    def _corrigir(self, va, vm, lam, x_anterior, z, passo, resolver):
+        """
+        Resolve [F(x, lam); z^T (x - x_anterior) - passo] = 0 a partir do preditor:
+        primeiro iterações de corda com 'resolver', depois Newton completo.
+        """
+        inicial = (va, vm)
+        x = self._vetor(va, vm, lam)
+        anterior = np.inf
+        for iteracao in range(MAX_ITERACOES_CORDA + 1):
+            v = vm * np.exp(1j * va)
+            residuo = np.r_[self._residuo(v, x[-1]), z @ (x - x_anterior) - passo]
+            erro = np.max(np.abs(residuo))
+            if erro < TOLERANCIA_NEWTON:
+                return True, va, vm, x[-1], iteracao
+            if not erro < 0.5 * anterior:
+                break
+            anterior = erro
+            x = x - resolver(residuo)
+            va, vm, _ = self._aplicar(x, va, vm)
+
+        va, vm = inicial
+        x = self._vetor(va, vm, lam)
+        for iteracao in range(MAX_ITERACOES_NEWTON + 1):
+            v = vm * np.exp(1j * va)
+            residuo = np.r_[self._residuo(v, x[-1]), z @ (x - x_anterior) - passo]
+            if np.max(np.abs(residuo)) < TOLERANCIA_NEWTON:
+                return True, va, vm, x[-1], iteracao
+            if not np.all(np.isfinite(residuo)):
+                break
+            x = x - self._fatorar(self._aumentada(v, z))(residuo)
+            va, vm, _ = self._aplicar(x, va, vm)
+        return False, va, vm, x[-1], MAX_ITERACOES_NEWTON
+
+    # ##########################################################################
+    # EVENTOS
+    # ##########################################################################
+    def _q_barras(self, v, lam):
+        """Reativo total pedido aos geradores de cada barra (MVAr)."""
+        s = v * np.conj(self.ybus @ v)
+        q_carga = (self.s_carga0 + lam * self.ds_carga).imag
+        return (s.imag + q_carga) * self.base_mva
+
+    def _margens(self, va, vm, lam, z):
+        """Margens por tipo de evento (>= 0 dentro do limite); inf para o que já foi tratado."""
+        v = vm * np.exp(1j * va)
+        margens = {} if z is None else {'NARIZ': np.array([z[-1]])}
+        # Limites de reativo: barras PV ainda controlando tensão
+        q = self._q_barras(v, lam)
+        qmax = np.bincount(self.gen_barra, weights=self.qmax, minlength=self.n) * self.base_mva
+        qmin = np.bincount(self.gen_barra, weights=self.qmin, minlength=self.n) * self.base_mva
+        margem_q = np.full(2 * self.n, np.inf)
+        margem_q[self.pv] = qmax[self.pv] - q[self.pv]
+        margem_q[self.n + self.pv] = q[self.pv] - qmin[self.pv]
+        margens['QLIM'] = margem_q
+        margem_p = np.full(len(self.pg0), np.inf)
+        crescendo = self.dpg > 0
+        margem_p[crescendo] = (self.pmax[crescendo] - self.pg0[crescendo] - lam * self.dpg[crescendo]) * self.base_mva
+        margens['PLIM'] = margem_p
+        margem_v = np.r_[vm - self.vm_min, self.vm_max - vm]
+        margem_v[self._v_violadas] = np.inf
+        margens['VLIM'] = margem_v
+        fluxo = np.abs(v[self.de[self.com_limite]] * np.conj(self.yf_limite @ v)) * self.base_mva
+        margem_f = self.limite_fluxo[self.com_limite] - fluxo
+        margem_f[self._f_violados] = np.inf
+        margens['FLIM'] = margem_f
+        if self._passou_nariz:
+            margens['FIM'] = np.array([lam])
+        if self._alvo is not None:
+            margens['FIM'] = np.array([self._alvo - lam])
+        return margens
+
+    def _disparos(self, anteriores, atuais):
+        """Eventos cruzados neste passo: {tipo: (índices em zero, índices ultrapassados, escala)}."""
+        disparos = {}
+        for tipo, atual in atuais.items():
+            anterior = anteriores.get(tipo)
+            if anterior is None or len(anterior) != len(atual):
+                continue
+            tol = TOLERANCIAS_EVENTOS[tipo]
+            dentro = anterior > tol
+            zerados = np.flatnonzero(dentro & (np.abs(atual) <= tol))
+            passaram = np.flatnonzero(dentro & (atual < -tol))
+            if len(zerados) or len(passaram):
+                escala = np.min(anterior[passaram] / (anterior[passaram] - atual[passaram])) if len(passaram) else 1.0
+                disparos[tipo] = (zerados, passaram, escala)
+        return disparos
+
+    # ##########################################################################
+    # TRAÇADO
+    # ##########################################################################
+    def tracar(self, parada='NARIZ', passo=PASSO_INICIAL, adaptativo=True, eventos=('QLIM', 'PLIM', 'VLIM', 'FLIM')):
+        """
+        Traça a curva a partir de lam = 0. 'parada': 'NARIZ' (para no ponto de
+        máximo carregamento), 'COMPLETO' (volta até lam = 0 no ramo inferior) ou
+        um valor de lam alvo. 'eventos' escolhe os limites monitorados.
+        """
+        inicio = time.perf_counter()
+        self.q_fixo = np.bincount(self.gen_barra, weights=self.qg0, minlength=self.n)
+        pg0_original, dpg_original = self.pg0.copy(), self.dpg.copy()
+        self._estrutura(self.tipos_iniciais.copy())
+        self._v_violadas = np.zeros(2 * self.n, dtype=bool)
+        self._f_violados = np.zeros(len(self.com_limite), dtype=bool)
+        self._passou_nariz = False
+        self._alvo = float(parada) if not isinstance(parada, str) else None
+        self.fatoracoes = self.ordenacoes = 0
+
+        va, vm, lam = np.angle(self.v_inicial), np.abs(self.v_inicial), 0.0
+        registros = []
+        if 'QLIM' in eventos:
+            va, vm = self._caso_base_com_limites(va, vm, registros)
+        # Tangente inicial: z_anterior aponta só em lam
+        dimensao = len(self.pvpq) + len(self.pq) + 1
+        z = np.zeros(dimensao)
+        z[-1] = 1.0
+        resolver = self._fatorar(self._aumentada(vm * np.exp(1j * va), z))
+        z = self._tangente(resolver, dimensao)
+        margens = self._filtrar(self._margens(va, vm, lam, z), eventos)
+
+        pontos = [(0, lam, va, vm, 0)]
+        nariz = None
+        passo_padrao = passo
+        localizando = 0
+        numero = 0
+        motivo = 'limite de passos'
+        while numero < MAX_PASSOS:
+            x_anterior = self._vetor(va, vm, lam)
+            x_previsto = x_anterior + passo * z
+            va_p, vm_p, lam_p = self._aplicar(x_previsto, va, vm)
+            ok, va_n, vm_n, lam_n, iteracoes = self._corrigir(va_p, vm_p, lam_p, x_anterior, z, passo, resolver)
+            if not ok:
+                passo /= 2
+                if passo < PASSO_MINIMO:
+                    motivo = 'corretor não convergiu'
+                    break
+                continue
+
+            # Limite ultrapassado: volta e tenta um passo menor, interpolado no zero da margem.
+            # Os limites são conferidos antes da LU do novo ponto. O nariz depende da tangente
+            # nesse ponto, então o seu rollback descarta uma LU já feita.
+            margens_novas = self._filtrar(self._margens(va_n, vm_n, lam_n, None), eventos)
+            disparos = self._disparos(margens, margens_novas)
+            if self._rollback(disparos, localizando, passo):
+                passo = self._passo_localizacao(disparos, passo)
+                localizando += 1
+                continue
+            resolver_novo = self._fatorar(self._aumentada(vm_n * np.exp(1j * va_n), z))
+            z_novo = self._tangente(resolver_novo, dimensao)
+            margens_novas['NARIZ'] = np.array([z_novo[-1]])
+            disparos.update(self._disparos({'NARIZ': margens['NARIZ']}, {'NARIZ': margens_novas['NARIZ']}))
+            if self._rollback(disparos, localizando, passo):
+                passo = self._passo_localizacao(disparos, passo)
+                localizando += 1
+                continue
+
+            # Passo aceito
+            numero += 1
+            erro = np.max(np.abs(self._vetor(va_n, vm_n, lam_n) - x_previsto))
+            va, vm, lam, z, margens, resolver = va_n, vm_n, lam_n, z_novo, margens_novas, resolver_novo
+            pontos.append((numero, lam, va, vm, iteracoes))
+            z_completo = self._completo(z)      # na estrutura de antes dos eventos
+            estrutura_mudou = False
+            terminar = False
+            for tipo, (zerados, passaram, _) in disparos.items():
+                indices = np.r_[zerados, passaram].astype(np.int64)
+                if tipo == 'NARIZ':
+                    # No ramo inferior podem surgir outras voltas (limites); o nariz é a de maior lam
+                    if nariz is None or lam > pontos[nariz][1]:
+                        nariz = len(pontos) - 1
+                    self._passou_nariz = True
+                    registros.append((numero, tipo, lam, '', 'ponto de máximo carregamento'))
+                    terminar = parada == 'NARIZ'
+                elif tipo == 'FIM':
+                    terminar = True
+                elif tipo == 'QLIM':
+                    estrutura_mudou |= self._converter_pv(indices, numero, lam, registros)
+                elif tipo == 'PLIM':
+                    self._congelar_geradores(indices, lam, numero, registros)
+                    estrutura_mudou = True
+                elif tipo == 'VLIM':
+                    self._v_violadas[indices] = True
+                    for i in indices:
+                        barra = i % self.n
+                        lado = 'mínimo' if i < self.n else 'máximo'
+                        registros.append((numero, tipo, lam, self._barra_pandapower(barra),
+                                          f"|V| = {vm[barra]:.4f} pu no limite {lado}"))
+                elif tipo == 'FLIM':
+                    self._f_violados[indices] = True
+                    for i in indices:
+                        registros.append((numero, tipo, lam, int(self.com_limite[i]),
+                                          f"fluxo no limite de {self.limite_fluxo[self.com_limite[i]]:.1f} MVA"))
+            if terminar:
+                motivo = 'nariz' if parada == 'NARIZ' else 'fim do traçado'
+                break
+
+            if estrutura_mudou:
+                # Novos tipos de barra ou nova direção: refaz a tangente no ponto atual
+                dimensao = len(self.pvpq) + len(self.pq) + 1
+                z = self._reduzir(z_completo)
+                v = vm * np.exp(1j * va)
+                resolver = self._fatorar(self._aumentada(v, z))
+                dlam_antes = z_completo[2]
+                z = self._tangente(resolver, dimensao)
+                margens = self._filtrar(self._margens(va, vm, lam, z), eventos)
+                # Bifurcação induzida por limite: com a barra PQ, lam já precisa diminuir
+                tol = TOLERANCIAS_EVENTOS['NARIZ']
+                if dlam_antes > tol and z[-1] < -tol and not self._passou_nariz:
+                    nariz = len(pontos) - 1
+                    self._passou_nariz = True
+                    margens = self._filtrar(self._margens(va, vm, lam, z), eventos)
+                    registros.append((numero, 'NARIZ', lam, '', 'ponto de máximo carregamento (induzido por limite)'))
+                    if parada == 'NARIZ':
+                        motivo = 'nariz'
+                        break
+
+            if localizando:
+                passo, localizando = passo_padrao, 0
+            elif adaptativo and erro > 0:
+                escala = min(2.0, 1 + AMORTECIMENTO_PASSO * (TOLERANCIA_PASSO / erro - 1))
+                passo = min(max(passo * escala, PASSO_MINIMO), PASSO_MAXIMO)
+                passo_padrao = passo
+
+        self.pg0, self.dpg = pg0_original, dpg_original
+        resultado = self._resultado(pontos, registros, nariz, motivo)
+        resultado['tempo_s'] = time.perf_counter() - inicio
+        if self.verbose:
+            n = resultado['nariz']
+            texto = (f"nariz em lam = {n['lam']:.4f} (+{n['carga_mw']:.0f} MW de carga, +{n['der_mw']:.0f} MW de DER)"
+                     if n else "nariz não alcançado")
+            print(f"   -> Fluxo continuado: {len(pontos) - 1} passos, {self.fatoracoes} fatorações "
+                  f"({self.ordenacoes} ordenações), {len(registros)} eventos, {texto}, "
+                  f"{resultado['tempo_s']:.2f} s ({motivo})")
+        return resultado
+
+    def _caso_base_com_limites(self, va, vm, registros):
+        """
+        Como o runcpf com limites de Q: barras PV já fora do limite no caso base
+        viram PQ e o fluxo em lam = 0 é refeito (corretor com z = e_lam e passo 0).
+        """
+        for _ in range(MAX_ITERACOES_NEWTON):
+            margem = self._margens(va, vm, 0.0, None)['QLIM']
+            violadas = np.flatnonzero(margem < -TOLERANCIAS_EVENTOS['QLIM'])
+            if not len(violadas) or not self._converter_pv(violadas, 0, 0.0, registros):
+                break
+            dimensao = len(self.pvpq) + len(self.pq) + 1
+            e_lam = np.zeros(dimensao)
+            e_lam[-1] = 1.0
+            resolver = self._fatorar(self._aumentada(vm * np.exp(1j * va), e_lam))
+            ok, va, vm, _, _ = self._corrigir(va, vm, 0.0, self._vetor(va, vm, 0.0), e_lam, 0.0, resolver)
+            if not ok:
+                raise ValueError("O caso base não converge com os limites de reativo dos geradores.")
+        return va, vm
+
+    def _rollback(self, disparos, localizando, passo):
+        ultrapassados = [t for t, d in disparos.items() if len(d[1]) and t in EVENTOS_LOCALIZADOS]
+        return bool(ultrapassados) and localizando < MAX_TENTATIVAS_LOCALIZACAO and passo > PASSO_MINIMO
+
+    def _passo_localizacao(self, disparos, passo):
+        escala = min(d[2] for t, d in disparos.items() if len(d[1]) and t in EVENTOS_LOCALIZADOS)
+        return max(passo * min(max(escala, 0.05), 0.95), PASSO_MINIMO)
+
+    def _filtrar(self, margens, eventos):
+        return {t: m for t, m in margens.items() if t in eventos or t in ('NARIZ', 'FIM')}
+
+    def _completo(self, z):
+        dva, dvm = np.zeros(self.n), np.zeros(self.n)
+        npvpq = len(self.pvpq)
+        dva[self.pvpq] = z[:npvpq]
+        dvm[self.pq] = z[npvpq:-1]
+        return dva, dvm, z[-1]
+
+    def _reduzir(self, z_completo):
+        dva, dvm, dlam = z_completo
+        return np.r_[dva[self.pvpq], dvm[self.pq], dlam]
+
+    def _converter_pv(self, indices, numero, lam, registros):
+        """Barras PV que atingiram Qmax/Qmin passam a PQ com o reativo no limite."""
+        tipos = self.tipos.copy()
+        convertidas = False
+        for i in indices:
+            barra = i % self.n
+            if tipos[barra] == PQ:
+                continue
+            no_maximo = i < self.n
+            limite = self.qmax if no_maximo else self.qmin
+            geradores = self.gen_barra == barra
+            self.q_fixo[barra] = limite[geradores].sum()
+            tipos[barra] = PQ
+            convertidas = True
+            registros.append((numero, 'QLIM', lam, self._barra_pandapower(barra),
+                              f"Q no limite {'máximo' if no_maximo else 'mínimo'} "
+                              f"({self.q_fixo[barra] * self.base_mva:.1f} MVAr): barra PV -> PQ"))
+        if convertidas:
+            self._estrutura(tipos)
+        return convertidas
+
+    def _congelar_geradores(self, indices, lam, numero, registros):
+        for k in indices:
+            self.pg0[k] = self.pmax[k]
+            self.dpg[k] = 0.0
+            registros.append((numero, 'PLIM', lam, self.nome_gen[k],
+                              f"P no limite de {self.pmax[k] * self.base_mva:.1f} MW"))
+
+    def _barra_pandapower(self, barra_ppci):
+        posicoes = np.flatnonzero(self.lookup[self.barras.values] == barra_ppci)
+        return int(self.barras[posicoes[0]]) if len(posicoes) else int(barra_ppci)
+
+    def _resultado(self, pontos, registros, nariz, motivo):
+        colunas = self.lookup[self.barras.values]
+        linhas = []
+        tensoes = np.empty((len(pontos), len(self.barras)))
+        for k, (numero, lam, va, vm, iteracoes) in enumerate(pontos):
+            tensoes[k] = vm[colunas]
+            minimo = int(np.argmin(vm[colunas]))
+            linhas.append({'passo': numero, 'lam': lam, 'carga_mw': lam * self.dp_carga_mw,
+                           'der_mw': lam * self.dp_der_mw, 'vm_min_pu': vm[colunas][minimo],
+                           'barra_vm_min': int(self.barras[minimo]), 'iteracoes': iteracoes})
+        curva = pd.DataFrame(linhas)
+        eventos = pd.DataFrame(registros, columns=['passo', 'tipo', 'lam', 'elemento', 'descricao'])
+        resumo_nariz = None
+        if nariz is not None:
+            resumo_nariz = curva.iloc[nariz][['lam', 'carga_mw', 'der_mw', 'vm_min_pu', 'barra_vm_min']].to_dict()
+            resumo_nariz['ponto'] = nariz
+        return {'curva': curva, 'tensoes': pd.DataFrame(tensoes, columns=self.barras), 'eventos': eventos,
+                'nariz': resumo_nariz, 'motivo': motivo, 'fatoracoes': self.fatoracoes}
+
+
+def aplicar_na_rede(net, direcao, lam):
+    """Cópia de 'net' com cargas, DER e geradores no ponto lam da direção (para conferir com pp.runpp)."""
+    import copy
+
+    import pandapower as pp
+
+    rede = copy.deepcopy(net)
+    fator = direcao['carga'] * lam
+    for barra, ds in fator.items():
+        cargas = rede.load.index[(rede.load.bus == barra) & rede.load.in_service]
+        p0 = rede.load.loc[cargas, 'p_mw'] * rede.load.loc[cargas, 'scaling']
+        q0 = rede.load.loc[cargas, 'q_mvar'] * rede.load.loc[cargas, 'scaling']
+        if p0.abs().sum() > 0:
+            rede.load.loc[cargas, 'p_mw'] += ds.real * p0.abs() / p0.abs().sum() / rede.load.loc[cargas, 'scaling']
+        if q0.abs().sum() > 0:
+            rede.load.loc[cargas, 'q_mvar'] += ds.imag * q0.abs() / q0.abs().sum() / rede.load.loc[cargas, 'scaling']
+    for barra, p in direcao['der'].items():
+        pp.create_sgen(rede, barra, p_mw=p * lam, name="DER continuado")
+    p_gen = rede.gen.p_mw + direcao['geradores'] * lam
+    if 'max_p_mw' in rede.gen:
+        p_gen = p_gen.clip(upper=rede.gen.max_p_mw)
+    rede.gen['p_mw'] = p_gen
+    return rede
+
+
+if __name__ == "__main__":
+    import pandapower as pp
+    import pandapower.networks as nw
+
+    print("FLUXO CONTINUADO: case1354pegase")
+    net = nw.case1354pegase()
+    pp.runpp(net)
+    print(f"   -> Carga base: {net.load.p_mw.sum():.0f} MW")
+
+    # Crescimento uniforme de carga, curva completa (ramo superior, nariz e volta a lam = 0)
+    direcao = direcao_crescimento(net)
+    continuado = FluxoContinuado(net, direcao)
+    resultado = continuado.tracar(parada='COMPLETO')
+    print(resultado['eventos'].tipo.value_counts().to_string())
+    print(resultado['curva'].iloc[::max(1, len(resultado['curva']) // 12)].to_string(index=False))
+
+    # Conferência com o Newton-Raphson do pandapower num ponto do ramo superior (limites de Q ativos)
+    superior = resultado['curva'].loc[:resultado['nariz']['ponto']]
+    superior = superior[superior.lam <= 0.8 * resultado['nariz']['lam']]
+    ponto = superior.index[-1]
+    rede = aplicar_na_rede(net, direcao, superior.lam.iloc[-1])
+    pp.runpp(rede, enforce_q_lims=True)
+    erro = np.max(np.abs(rede.res_bus.vm_pu.values - resultado['tensoes'].loc[ponto].values))
+    print(f"   -> lam = {superior.lam.iloc[-1]:.4f}: maior diferença de |V| para o pp.runpp {erro:.2e} pu")
+
+    # Margem até o nariz com DER crescendo junto com a carga nas 200 maiores barras de carga
+    maiores = net.load.groupby('bus').p_mw.sum().nlargest(200)
+    for penetracao in (0.0, 0.3, 0.6):
+        direcao = direcao_crescimento(net, der_mw=penetracao * maiores)
+        r = FluxoContinuado(net, direcao, verbose=False).tracar()
+        n = r['nariz']
+        print(f"   -> DER cobrindo {penetracao:.0%} do crescimento nas 200 maiores barras: "
+              f"nariz em +{n['carga_mw']:.0f} MW de carga e +{n['der_mw']:.0f} MW de DER (lam = {n['lam']:.4f}, "
+              f"|V| mín {n['vm_min_pu']:.3f} pu na barra {n['barra_vm_min']:.0f}), "
+              f"{len(r['curva']) - 1} passos em {r['tempo_s']:.2f} s")
@@ -0,0 +1,81 @@
+import re
+
+import numpy as np
+
+# ##############################################################################
+# LEITURA DE CASOS MATPOWER (.m)
+# ##############################################################################
+# Lê as matrizes 'mpc.<campo> = [ ... ];' de um arquivo de caso do MATPOWER
+# (ex.: cases/pglib_opf_case73_ieee_rts.m) sem precisar do MATLAB/Octave.
+# Campos numéricos viram arrays NumPy; escalares (baseMVA) viram float.
+
+# Índices (base 0) das colunas usadas, na convenção do MATPOWER (idx_bus/idx_gen)
+BUS_I, BUS_TIPO, PD, QD = 0, 1, 2, 3
+GEN_BUS, PG, QG, QMAX, QMIN, VG, MBASE, GEN_STATUS, PMAX, PMIN = range(10)
+CUSTO_MODELO, CUSTO_PARTIDA, CUSTO_PARADA, CUSTO_N = 0, 1, 2, 3
+
+_ATRIBUICAO = re.compile(r"^\s*mpc\.(\w+)\s*=\s*(.*)$")
+
+
+def _numeros(linha):
+    """Converte uma linha de matriz (separada por espaços, tab ou vírgula) em floats."""
+    linha = linha.split('%', 1)[0].replace(',', ' ').replace(';', ' ')
+    return [float(v) for v in linha.split()]
+
+
+def ler_caso_matpower(caminho):
+    """
+    Lê um caso MATPOWER. Retorna um dicionário com 'baseMVA', 'version' e uma
+    matriz NumPy por campo encontrado ('bus', 'gen', 'branch', 'gencost', ...).
+    """
+    caso = {}
+    campo, linhas = None, None
+    with open(caminho, 'r', encoding='utf-8', errors='replace') as f:
+        for linha in f:
+            if campo is not None:
+                fim = ']' in linha.split('%', 1)[0]
+                valores = _numeros(linha.split(']', 1)[0])
+                if valores:
+                    linhas.append(valores)
+                if fim:
+                    largura = max((len(l) for l in linhas), default=0)
+                    matriz = np.full((len(linhas), largura), np.nan)
+                    for k, l in enumerate(linhas):
+                        matriz[k, :len(l)] = l
+                    caso[campo] = matriz
+                    campo = None
+                continue
+
+            encontrado = _ATRIBUICAO.match(linha.split('%', 1)[0])
+            if not encontrado:
+                continue
+            nome, valor = encontrado.groups()
+            valor = valor.strip().rstrip(';').strip()
+            if valor.startswith('['):
+                campo, linhas = nome, []
+                resto = valor[1:]
+                if ']' in resto:
+                    # Matriz em uma linha só: mpc.x = [1 2 3];
+                    caso[nome] = np.atleast_2d(np.array(_numeros(resto.split(']', 1)[0])))
+                    campo = None
+                elif resto.strip():
+                    linhas.append(_numeros(resto))
+            elif valor.startswith("'"):
+                caso[nome] = valor.strip("'")
+            else:
+                try:
+                    caso[nome] = float(valor)
+                except ValueError:
+                    caso[nome] = valor
+    return caso
+
+
+def caso_para_pandapower(caso):
+    """Converte o dicionário de ler_caso_matpower numa rede pandapower (via from_ppc)."""
+    from pandapower.converter.pypower import from_ppc
+
+    ppc = {'version': str(caso.get('version', '2')), 'baseMVA': caso['baseMVA'],
+           'bus': caso['bus'], 'gen': caso['gen'], 'branch': caso['branch']}
+    if 'gencost' in caso:
+        ppc['gencost'] = caso['gencost']
+    return from_ppc(ppc, f_hz=60)
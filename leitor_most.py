@@ -0,0 +1,970 @@
+import hashlib
+import os
+import pickle
+import re
+import time
+
+import numpy as np
+
+from leitor_matpower import GEN_BUS, GEN_STATUS, PD, PG, PMAX, PMIN, QD, QMAX, QMIN, VG, ler_caso_matpower
+
+# ##############################################################################
+# LEITURA DE DADOS DO MOST (PERFIS, XGD E ARMAZENAMENTO)
+# ##############################################################################
+# Os dados do MOST (matpower8.1/most) são funções MATLAB que devolvem structs:
+# perfis (idx_profile/apply_profile), tabelas xgd (loadxgendata), unidades
+# eólicas e de armazenamento (addwind/addstorage/loadstoragedata). Este módulo
+# avalia o subconjunto de MATLAB usado nesses arquivos (atribuições, structs,
+# matrizes, cell arrays, atribuição indexada em 3-D e chamadas a outras
+# funções .m, como idx_ct e idx_gen) sem precisar do MATLAB/Octave, e monta
+# as séries densas (período x cenário x elemento) já nos índices das tabelas
+# do pandapower (net.load, net.gen, net.sgen, net.ext_grid).
+#
+# A montagem compilada vai para um cache em disco (pickle gravado de forma
+# atômica). A chave é o conteúdo dos arquivos de entrada; cada entrada guarda
+# também o hash de todos os .m lidos indiretamente (idx_*, perfis chamados por
+# outros perfis), conferido na leitura.
+
+DIRETORIO_MATPOWER = 'matpower8.1'
+CAMINHOS_FUNCOES = (os.path.join(DIRETORIO_MATPOWER, 'most', 'lib'),
+                    os.path.join(DIRETORIO_MATPOWER, 'most', 'examples'),
+                    os.path.join(DIRETORIO_MATPOWER, 'lib'))
+DIRETORIO_CACHE_MOST = 'cache_most'
+VERSAO_CACHE = 1
+
+# Constantes de idx_ct / idx_profile (as mesmas dos arquivos; usadas aqui para legibilidade)
+CT_TBUS, CT_TGEN, CT_TBRCH, CT_TAREABUS, CT_TAREAGEN, CT_TAREABRCH, CT_TLOAD, CT_TAREALOAD = range(1, 9)
+CT_REP, CT_REL, CT_ADD = 1, 2, 3
+CT_LOAD_ALL_PQ, CT_LOAD_FIX_PQ, CT_LOAD_DIS_PQ, CT_LOAD_ALL_P, CT_LOAD_FIX_P, CT_LOAD_DIS_P = range(1, 7)
+BUS_AREA, VMAX, VMIN = 6, 11, 12
+BR_STATUS = 10
+
+# Coluna do MATPOWER -> coluna do pandapower (gen/sgen/ext_grid)
+COLUNAS_GEN_PANDAPOWER = {PG: 'p_mw', PMAX: 'max_p_mw', PMIN: 'min_p_mw', QMAX: 'max_q_mvar',
+                          QMIN: 'min_q_mvar', GEN_STATUS: 'in_service', VG: 'vm_pu'}
+COLUNAS_BUS_PANDAPOWER = {PD: ('load', 'p_mw'), QD: ('load', 'q_mvar'),
+                          VMAX: ('bus', 'max_vm_pu'), VMIN: ('bus', 'min_vm_pu')}
+
+CAMPOS_ARMAZENAMENTO = ('MinStorageLevel', 'MaxStorageLevel', 'OutEff', 'InEff', 'LossFactor', 'rho')
+
+
+# ##############################################################################
+# AVALIADOR DO SUBCONJUNTO DE MATLAB
+# ##############################################################################
+_TOKEN = re.compile(r"""
+    (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<nome>[A-Za-z_]\w*)
+  | (?P<op>\.\*|\./|\.\^|==|~=|<=|>=|[-+*/^()\[\]{},;:=.<>~])
+  | (?P<esp>[ \t]+)
+""", re.VERBOSE)
+_PALAVRAS_NAO_SUPORTADAS = {'if', 'for', 'while', 'switch', 'try', 'parfor', 'global', 'persistent'}
+_DOIS_PONTOS = slice(None)
+
+
+def _inicio_de_texto(anterior):
+    """Um apóstrofo abre texto se não vier logo após um valor (senão seria transposição)."""
+    return not anterior or not (anterior.isalnum() or anterior in "_)]}.'")
+
+
+def _limpar_linha(linha):
+    """Remove o comentário; devolve (linha, continua) — 'continua' se termina em '...'."""
+    em_texto, anterior = False, ''
+    k = 0
+    while k < len(linha):
+        c = linha[k]
+        if em_texto:
+            if c == "'":
+                if linha[k + 1:k + 2] == "'":
+                    k += 1
+                else:
+                    em_texto = False
+        elif c == "'" and _inicio_de_texto(anterior):
+            em_texto = True
+        elif c == '%':
+            return linha[:k], False
+        elif linha.startswith('...', k):
+            return linha[:k], True
+        if not c.isspace():
+            anterior = c
+        k += 1
+    return linha, False
+
+
+def _instrucoes(texto):
+    """Texto do arquivo -> lista de instruções (quebras de linha dentro de [] e {} viram ';')."""
+    logico = []
+    for linha in texto.splitlines():
+        limpa, continua = _limpar_linha(linha)
+        logico.append(limpa + (' ' if continua else '\n'))
+    logico = ''.join(logico)
+
+    instrucoes, atual, pilha = [], [], []
+    em_texto, anterior = False, ''
+    for c in logico:
+        if em_texto:
+            atual.append(c)
+            if c == "'":
+                em_texto = False   # '' (apóstrofo escapado) reabre logo em seguida
+            continue
+        if c == "'" and _inicio_de_texto(anterior):
+            em_texto = True
+        elif c in '([{':
+            pilha.append(c)
+        elif c in ')]}' and pilha:
+            pilha.pop()
+        elif c in ';,\n' and not pilha:
+            if ''.join(atual).strip():
+                instrucoes.append(''.join(atual).strip())
+            atual, anterior = [], ''
+            continue
+        elif c == '\n':
+            c = ';' if pilha[-1] in '[{' else ' '
+        atual.append(c)
+        if not c.isspace():
+            anterior = c
+    if ''.join(atual).strip():
+        instrucoes.append(''.join(atual).strip())
+    return instrucoes
+
+
+def _tokens(instrucao):
+    """Tokens (tipo, valor); espaços só contam dentro de [] e {} (separam elementos)."""
+    saida, pilha, k = [], [], 0
+    while k < len(instrucao):
+        c = instrucao[k]
+        anterior = saida[-1][1][-1:] if saida and saida[-1][0] != 'esp' else ''
+        if c == "'" and (_inicio_de_texto(anterior) or (saida and saida[-1][0] == 'esp')):
+            fim, partes = k + 1, []
+            while True:
+                j = instrucao.index("'", fim)
+                partes.append(instrucao[fim:j])
+                if instrucao[j + 1:j + 2] == "'":
+                    partes.append("'")
+                    fim = j + 2
+                else:
+                    break
+            saida.append(('texto', ''.join(partes)))
+            k = j + 1
+            continue
+        encontrado = _TOKEN.match(instrucao, k)
+        if not encontrado:
+            raise ValueError(f"Caractere inesperado '{c}' em: {instrucao}")
+        tipo, valor = encontrado.lastgroup, encontrado.group()
+        k = encontrado.end()
+        if tipo == 'esp':
+            if pilha and pilha[-1] in '[{':
+                saida.append(('esp', ' '))
+            continue
+        if valor in ('(', '[', '{'):
+            pilha.append(valor)
+        elif valor in (')', ']', '}') and pilha:
+            pilha.pop()
+        saida.append((tipo, valor))
+    saida.append(('fim', ''))
+    return saida
+
+
+def _como_array(valor):
+    return np.asarray(valor, dtype=float)
+
+
+def _matlab_mean(x, dim=1):
+    return np.mean(_como_array(x), axis=int(dim) - 1, keepdims=True)
+
+
+def _matlab_sum(x, dim=1):
+    return np.sum(_como_array(x), axis=int(dim) - 1, keepdims=True)
+
+
+def _matlab_dimensoes(*args):
+    return (int(args[0]), int(args[0])) if len(args) == 1 else tuple(int(a) for a in args)
+
+
+FUNCOES_EMBUTIDAS = {
+    'struct': lambda *pares: {pares[k]: pares[k + 1] for k in range(0, len(pares), 2)},
+    'mean': _matlab_mean,
+    'sum': _matlab_sum,
+    'ones': lambda *d: np.ones(_matlab_dimensoes(*d)),
+    'zeros': lambda *d: np.zeros(_matlab_dimensoes(*d)),
+    'repmat': lambda x, *d: np.tile(np.atleast_2d(_como_array(x)), _matlab_dimensoes(*d)),
+    'abs': lambda x: np.abs(_como_array(x)),
+    'sqrt': lambda x: np.sqrt(_como_array(x)),
+    'round': lambda x: np.round(_como_array(x)),
+    'floor': lambda x: np.floor(_como_array(x)),
+    'ceil': lambda x: np.ceil(_como_array(x)),
+    'min': lambda a, b=None: np.minimum(a, b) if b is not None else np.min(a),
+    'max': lambda a, b=None: np.maximum(a, b) if b is not None else np.max(a),
+    'size': lambda x, dim=None: (np.shape(x)[int(dim) - 1] if int(dim) <= np.ndim(x) else 1) if dim is not None
+    else np.array([np.shape(np.atleast_2d(x))], dtype=float),
+    'length': lambda x: float(max(np.shape(x)) if np.size(x) else 0),
+    'numel': lambda x: float(np.size(x)),
+    'isempty': lambda x: float(np.size(x) == 0),
+    'Inf': lambda: np.inf, 'inf': lambda: np.inf, 'NaN': lambda: np.nan, 'nan': lambda: np.nan,
+    'pi': lambda: np.pi, 'true': lambda: 1.0, 'false': lambda: 0.0,
+}
+
+
+class _Interpretador:
+    """Avalia arquivos .m de dados (funções sem controle de fluxo) e registra os arquivos lidos."""
+
+    def __init__(self, caminhos=CAMINHOS_FUNCOES):
+        self.caminhos = tuple(caminhos)
+        self.dependencias = {}
+        self._sem_argumentos = {}
+
+    # ---------------------------------------------------------------- arquivos
+    def localizar(self, nome, diretorio=None):
+        for pasta in ((diretorio,) if diretorio else ()) + self.caminhos:
+            caminho = os.path.join(pasta, f"{nome}.m")
+            if os.path.exists(caminho):
+                return caminho
+        return None
+
+    def avaliar_arquivo(self, caminho, argumentos=(), nargout=1):
+        """Executa o arquivo; para funções devolve as saídas (tupla se nargout > 1)."""
+        if not argumentos and caminho in self._sem_argumentos:
+            saidas = self._sem_argumentos[caminho]
+            return saidas[:nargout] if nargout > 1 else saidas[0]
+        with open(caminho, 'rb') as f:
+            conteudo = f.read()
+        self.dependencias[caminho] = hashlib.sha1(conteudo).hexdigest()
+        instrucoes = _instrucoes(conteudo.decode('utf-8', errors='replace'))
+
+        ambiente = {}
+        nomes_saida = None
+        if instrucoes and instrucoes[0].startswith('function'):
+            nomes_saida, parametros = self._cabecalho(instrucoes[0])
+            ambiente.update(zip(parametros, argumentos))
+            instrucoes = instrucoes[1:]
+        diretorio = os.path.dirname(caminho)
+        for instrucao in instrucoes:
+            self._executar(instrucao, ambiente, diretorio, caminho)
+
+        if nomes_saida is None:
+            return ambiente
+        faltando = [n for n in nomes_saida if n not in ambiente]
+        if faltando:
+            raise ValueError(f"{caminho}: saída(s) {faltando} não definida(s).")
+        saidas = tuple(ambiente[n] for n in nomes_saida)
+        if not argumentos:
+            self._sem_argumentos[caminho] = saidas
+        return saidas[:nargout] if nargout > 1 else saidas[0]
+
+    @staticmethod
+    def _cabecalho(instrucao):
+        encontrado = re.match(r"function\s*(?:(\[[^\]]*\]|\w+)\s*=\s*)?(\w+)\s*(?:\(([^)]*)\))?", instrucao)
+        if not encontrado:
+            raise ValueError(f"Cabeçalho de função não reconhecido: {instrucao}")
+        saidas, _, parametros = encontrado.groups()
+        saidas = re.findall(r"\w+", saidas or '')
+        parametros = re.findall(r"\w+", parametros or '')
+        return saidas, parametros
+
+    # -------------------------------------------------------------- instruções
+    def _executar(self, instrucao, ambiente, diretorio, caminho):
+        primeira = re.match(r"\w+", instrucao)
+        if primeira and primeira.group() in _PALAVRAS_NAO_SUPORTADAS:
+            raise ValueError(f"{caminho}: construção MATLAB não suportada ('{primeira.group()}').")
+        if instrucao in ('end', 'return'):
+            return
+        tokens = _tokens(instrucao)
+        igual = self._posicao_atribuicao(tokens)
+        leitor = _Expressao(self, ambiente, diretorio)
+        if igual is None:
+            leitor.avaliar(tokens)
+            return
+        esquerda, direita = tokens[:igual] + [('fim', '')], tokens[igual + 1:]
+        if esquerda[0] == ('op', '['):
+            # [A, B, ...] = funcao(...)
+            nomes = [v for t, v in esquerda if t == 'nome']
+            valores = leitor.avaliar(direita, nargout=len(nomes))
+            ambiente.update(zip(nomes, valores if len(nomes) > 1 else (valores,)))
+            return
+        self._atribuir(esquerda, leitor.avaliar(direita), ambiente, leitor)
+
+    @staticmethod
+    def _posicao_atribuicao(tokens):
+        profundidade = 0
+        for k, (tipo, valor) in enumerate(tokens):
+            if valor in ('(', '[', '{'):
+                profundidade += 1
+            elif valor in (')', ']', '}'):
+                profundidade -= 1
+            elif tipo == 'op' and valor == '=' and profundidade == 0:
+                return k
+        return None
+
+    @staticmethod
+    def _atribuir(tokens, valor, ambiente, leitor):
+        """nome(.campo)*[(índices)] = valor"""
+        caminho = [tokens[0][1]]
+        k = 1
+        while tokens[k] == ('op', '.'):
+            caminho.append(tokens[k + 1][1])
+            k += 2
+        indices = None
+        if tokens[k] == ('op', '('):
+            leitor.tokens, leitor.k = tokens, k + 1
+            indices = leitor.argumentos(')')
+        alvo = ambiente
+        for chave in caminho[:-1]:
+            if not isinstance(alvo.get(chave), dict):
+                alvo[chave] = {}
+            alvo = alvo[chave]
+        chave = caminho[-1]
+        alvo[chave] = valor if indices is None else _atribuir_indices(alvo.get(chave), indices, valor)
+
+
+class _Expressao:
+    """Analisador descendente recursivo que já avalia a expressão."""
+
+    def __init__(self, interpretador, ambiente, diretorio):
+        self.interpretador = interpretador
+        self.ambiente = ambiente
+        self.diretorio = diretorio
+        self.tokens, self.k = None, 0
+        self.contexto = []
+
+    def avaliar(self, tokens, nargout=1):
+        self.tokens, self.k, self.contexto = tokens, 0, []
+        valor = self.aditiva(nargout)
+        self.pular_espacos()
+        if self.atual[0] != 'fim':
+            raise ValueError(f"Sobra na expressão: {self.atual[1]!r}")
+        return valor
+
+    @property
+    def atual(self):
+        return self.tokens[self.k]
+
+    def pular_espacos(self):
+        while self.atual[0] == 'esp':
+            self.k += 1
+
+    def _seguinte(self, deslocamento=0):
+        """Próximo token não-espaço (e o token logo depois dele)."""
+        j = self.k
+        while self.tokens[j][0] == 'esp':
+            j += 1
+        return self.tokens[j + deslocamento], j
+
+    def _continua_binaria(self, operadores):
+        """Num [ ] ou { }, 'a -b' são dois elementos e 'a - b' é uma conta."""
+        if self.atual[0] != 'esp':
+            return self.atual[1] in operadores
+        proximo, j = self._seguinte()
+        if proximo[1] not in operadores:
+            return False
+        if proximo[1] in '+-' and self.tokens[j + 1][0] != 'esp':
+            return False
+        self.k = j
+        return True
+
+    def aditiva(self, nargout=1):
+        valor = self.multiplicativa(nargout)
+        while self._continua_binaria(('+', '-')):
+            op = self.atual[1]
+            self.k += 1
+            self.pular_espacos()
+            direita = self.multiplicativa()
+            valor = _como_array(valor) + _como_array(direita) if op == '+' else \
+                _como_array(valor) - _como_array(direita)
+        return valor
+
+    def multiplicativa(self, nargout=1):
+        valor = self.unaria(nargout)
+        while self._continua_binaria(('*', '/', '.*', './')):
+            op = self.atual[1]
+            self.k += 1
+            self.pular_espacos()
+            direita = _como_array(self.unaria())
+            esquerda = _como_array(valor)
+            if op == '*' and esquerda.ndim and direita.ndim and esquerda.size > 1 and direita.size > 1:
+                valor = esquerda @ direita
+            elif op in ('*', '.*'):
+                valor = esquerda * direita
+            else:
+                valor = esquerda / direita
+        return valor
+
+    def unaria(self, nargout=1):
+        if self.atual[1] in ('-', '+'):
+            op = self.atual[1]
+            self.k += 1
+            valor = self.unaria()
+            return -_como_array(valor) if op == '-' else valor
+        return self.potencia(nargout)
+
+    def potencia(self, nargout=1):
+        valor = self.posfixa(nargout)
+        if self.atual[1] in ('^', '.^'):
+            self.k += 1
+            valor = _como_array(valor) ** _como_array(self.unaria())
+        return valor
+
+    def posfixa(self, nargout=1):
+        tipo, valor = self.atual
+        if tipo == 'nome':
+            self.k += 1
+            if valor in self.ambiente:
+                resultado = self.ambiente[valor]
+            else:
+                argumentos = ()
+                if self.atual == ('op', '('):
+                    self.k += 1
+                    argumentos = self.argumentos(')')
+                resultado = self.chamar(valor, argumentos, nargout)
+        else:
+            resultado = self.primaria()
+        while True:
+            if self.atual == ('op', '.') and self.tokens[self.k + 1][0] == 'nome':
+                campo = self.tokens[self.k + 1][1]
+                if not isinstance(resultado, dict) or campo not in resultado:
+                    raise ValueError(f"Campo '{campo}' inexistente.")
+                resultado = resultado[campo]
+                self.k += 2
+            elif self.atual == ('op', '('):
+                self.k += 1
+                resultado = _indexar(resultado, self.argumentos(')'))
+            else:
+                return resultado
+
+    def primaria(self):
+        tipo, valor = self.atual
+        self.k += 1
+        if tipo == 'num':
+            return float(valor)
+        if tipo == 'texto':
+            return valor
+        if valor == '(':
+            self.contexto.append('(')
+            resultado = self.aditiva()
+            self.contexto.pop()
+            self._esperar(')')
+            return resultado
+        if valor in ('[', '{'):
+            return self.concatenacao(']' if valor == '[' else '}')
+        raise ValueError(f"Token inesperado: {valor!r}")
+
+    def _esperar(self, valor):
+        self.pular_espacos()
+        if self.atual[1] != valor:
+            raise ValueError(f"Esperado '{valor}', encontrado {self.atual[1]!r}")
+        self.k += 1
+
+    def argumentos(self, fechamento):
+        """Lista de argumentos até 'fechamento'; ':' sozinho vira 'todos'."""
+        saida = []
+        self.contexto.append('(')
+        while True:
+            self.pular_espacos()
+            if self.atual[1] == fechamento:
+                self.k += 1
+                break
+            if self.atual == ('op', ':') and self.tokens[self.k + 1][1] in (',', fechamento):
+                saida.append(_DOIS_PONTOS)
+                self.k += 1
+            else:
+                saida.append(self.aditiva())
+            self.pular_espacos()
+            if self.atual[1] == ',':
+                self.k += 1
+        self.contexto.pop()
+        return saida
+
+    def concatenacao(self, fechamento):
+        """[ ... ] (matriz numérica) ou { ... } (cell array, devolvido como lista plana)."""
+        linhas, linha = [], []
+        self.contexto.append(fechamento)
+        while True:
+            self.pular_espacos()
+            tipo, valor = self.atual
+            if valor == fechamento:
+                self.k += 1
+                break
+            if valor == ';':
+                linhas.append(linha)
+                linha = []
+                self.k += 1
+            elif valor == ',':
+                self.k += 1
+            elif tipo == 'fim':
+                raise ValueError(f"'{fechamento}' não fechado.")
+            else:
+                linha.append(self.aditiva())
+        linhas.append(linha)
+        self.contexto.pop()
+        linhas = [l for l in linhas if l]
+        if fechamento == '}':
+            return [v for l in linhas for v in l]
+        if not linhas:
+            return np.zeros((0, 0))
+        blocos = [np.hstack([np.atleast_2d(_como_array(v)) for v in l]) for l in linhas]
+        return np.vstack(blocos)
+
+    def chamar(self, nome, argumentos, nargout=1):
+        if nome in FUNCOES_EMBUTIDAS:
+            return FUNCOES_EMBUTIDAS[nome](*argumentos)
+        caminho = self.interpretador.localizar(nome, self.diretorio)
+        if caminho is None:
+            raise ValueError(f"Função ou variável '{nome}' desconhecida.")
+        return self.interpretador.avaliar_arquivo(caminho, tuple(argumentos), nargout)
+
+
+def _indice_python(indice, tamanho):
+    if indice is _DOIS_PONTOS:
+        return slice(0, tamanho)
+    indice = np.asarray(indice, dtype=float).ravel().astype(int) - 1
+    return int(indice[0]) if indice.size == 1 else indice
+
+
+def _indexar(valor, indices):
+    if callable(valor) or isinstance(valor, (dict, str)):
+        raise ValueError("Indexação só é suportada em matrizes.")
+    if isinstance(valor, list):
+        return valor[int(indices[0]) - 1]
+    valor = np.asarray(valor)
+    if len(indices) == 1:
+        plano = valor.ravel(order='F')
+        return plano[_indice_python(indices[0], plano.size)]
+    forma = valor.shape + (1,) * (len(indices) - valor.ndim)
+    return valor.reshape(forma)[tuple(_indice_python(i, n) for i, n in zip(indices, forma))]
+
+
+def _atribuir_indices(atual, indices, valor):
+    """x(i, j, k) = valor, crescendo x com zeros (como o MATLAB) quando preciso."""
+    valor = _como_array(valor)
+    atual = np.zeros((0,) * len(indices)) if atual is None or np.size(atual) == 0 else _como_array(atual)
+    # Dimensões do valor na ordem dos ':' (descarta singulares até casar)
+    dims_valor = list(valor.shape)
+    livres = sum(1 for i in indices if i is _DOIS_PONTOS)
+    while len(dims_valor) > livres and 1 in dims_valor:
+        dims_valor.remove(1)
+    dims_valor += [1] * (livres - len(dims_valor))
+    necessario, it = [], iter(dims_valor)
+    for i in indices:
+        necessario.append(next(it) if i is _DOIS_PONTOS else int(np.max(i)))
+    forma_atual = atual.shape + (1,) * (len(indices) - atual.ndim) if atual.ndim <= len(indices) else atual.shape
+    nova = tuple(max(a, n) for a, n in zip(forma_atual, necessario))
+    if nova != forma_atual:
+        maior = np.zeros(nova)
+        maior[tuple(slice(0, n) for n in forma_atual)] = atual.reshape(forma_atual)
+        atual = maior
+    else:
+        atual = atual.reshape(forma_atual).copy()
+    alvo = tuple(slice(0, n) if i is _DOIS_PONTOS else _indice_python(i, n) for i, n in zip(indices, necessario))
+    atual[alvo] = valor.reshape(atual[alvo].shape)
+    return atual
+
+
+def avaliar_arquivo_m(caminho, *argumentos, interpretador=None):
+    """Avalia um arquivo de dados .m do MATPOWER/MOST e devolve o valor da função."""
+    return (interpretador or _Interpretador()).avaliar_arquivo(caminho, argumentos)
+
+
+# ##############################################################################
+# ESTRUTURAS DO MOST (getprofiles, loadxgendata, loadstoragedata, addgen2mpc)
+# ##############################################################################
+def _origem(origem, interpretador, *argumentos):
+    """Aceita o caminho de um .m ou o dicionário já avaliado (como loadgenericdata)."""
+    if isinstance(origem, str):
+        return interpretador.avaliar_arquivo(origem, argumentos)
+    return origem
+
+
+def ler_perfis(origem, linhas=None, interpretador=None):
+    """
+    Lista de perfis {'type', 'table', 'rows', 'col', 'chgtype', 'values'}, com
+    'values' em 3-D (períodos x cenários x linhas). 'linhas' remapeia 'rows'
+    como getprofiles(perfil, idx): rows=k vira linhas[k-1] (rows=0 continua 'todas').
+    """
+    interpretador = interpretador or _Interpretador()
+    dados = _origem(origem, interpretador)
+    perfis = dados if isinstance(dados, list) else [dados]
+    saida = []
+    for perfil in perfis:
+        valores = np.asarray(perfil['values'], dtype=float)
+        valores = valores.reshape(valores.shape + (1,) * (3 - valores.ndim))
+        linhas_perfil = np.atleast_1d(np.asarray(perfil['rows'], dtype=float)).astype(int).ravel()
+        if linhas is not None:
+            mapa = np.asarray(linhas, dtype=int)
+            if linhas_perfil.max() > len(mapa):
+                raise ValueError(f"ROWS do perfil passa do número de unidades mapeadas ({len(mapa)}).")
+            linhas_perfil = np.where(linhas_perfil > 0, mapa[np.maximum(linhas_perfil, 1) - 1], 0)
+        if len(linhas_perfil) > 1 and np.any(linhas_perfil == 0):
+            raise ValueError("ROWS de um perfil só pode conter 0 se for a única entrada.")
+        tabela = perfil['table']
+        saida.append({'type': perfil['type'], 'table': tabela if isinstance(tabela, str) else int(tabela),
+                      'rows': linhas_perfil, 'col': int(np.ravel(perfil.get('col', 0))[0]) if np.size(perfil.get('col', 0)) else 0,
+                      'chgtype': int(perfil['chgtype']), 'values': valores})
+    return saida
+
+
+def _tabela_colunas(tabela, nome):
+    colunas, dados = tabela['colnames'], np.atleast_2d(np.asarray(tabela['data'], dtype=float))
+    if dados.size and dados.shape[1] != len(colunas):
+        raise ValueError(f"{nome}: {dados.shape[1]} coluna(s) em 'data' e {len(colunas)} em 'colnames'.")
+    return colunas, dados
+
+
+def ler_dados_xgd(origem, gen, interpretador=None):
+    """Equivalente ao loadxgendata: padrões calculados de 'gen' + colunas da tabela (um vetor por campo)."""
+    interpretador = interpretador or _Interpretador()
+    tabela = _origem(origem, interpretador, gen)
+    colunas, dados = _tabela_colunas(tabela, 'xgd_table')
+    gen = np.atleast_2d(gen)
+    ng = len(gen)
+    if dados.size and len(dados) != ng:
+        raise ValueError(f"xgd_table: {len(dados)} linha(s) em 'data' e {ng} em GEN.")
+    C, Pg = gen[:, GEN_STATUS].copy(), gen[:, PG].copy()
+    R = 2 * (gen[:, PMAX] - np.minimum(0.0, gen[:, PMIN]))
+    Z = np.zeros(ng)
+    xgd = {'CommitSched': C, 'InitialPg': Pg, 'RampWearCostCoeff': Z}
+    for sinal in ('Positive', 'Negative'):
+        xgd[f'{sinal}ActiveReservePrice'] = Z
+        xgd[f'{sinal}ActiveReserveQuantity'] = R
+        xgd[f'{sinal}ActiveDeltaPrice'] = Z
+        xgd[f'{sinal}LoadFollowReservePrice'] = Z
+        xgd[f'{sinal}LoadFollowReserveQuantity'] = R
+    if 'CommitKey' in colunas:
+        xgd.update({'CommitKey': C, 'InitialState': np.where(C > 0, np.inf, -np.inf),
+                    'MinUp': np.ones(ng), 'MinDown': np.ones(ng)})
+    validos = set(xgd) | {'TerminalPg', 'CommitKey', 'InitialState', 'MinUp', 'MinDown'}
+    for j, nome in enumerate(colunas):
+        if nome not in validos:
+            raise ValueError(f"'{nome}' não é um campo válido de xGenData.")
+        xgd[nome] = dados[:, j].copy()
+    return {nome: np.array(v, dtype=float) for nome, v in xgd.items()}
+
+
+def ler_dados_armazenamento(origem, gen, interpretador=None):
+    """Equivalente ao loadstoragedata: escalares padrão da sd_table + colunas de 'data' (vetores por unidade)."""
+    interpretador = interpretador or _Interpretador()
+    tabela = _origem(origem, interpretador, gen)
+    colunas, dados = _tabela_colunas(tabela, 'sd_table')
+    ns = len(np.atleast_2d(gen))
+    if dados.size and len(dados) != ns:
+        raise ValueError(f"sd_table: {len(dados)} linha(s) em 'data' e {ns} em GEN.")
+    sd = {campo: np.full(ns, float(tabela[campo])) for campo in CAMPOS_ARMAZENAMENTO if campo in tabela}
+    for j, nome in enumerate(colunas):
+        sd[nome] = dados[:, j].copy()
+    return sd
+
+
+def adicionar_unidades(caso, unidades, combustivel):
+    """
+    Acrescenta as linhas de unidades['gen'] (e o gencost, zero por padrão) ao
+    caso, como addgen2mpc. Devolve (números das linhas novas, base 1; caso novo).
+    """
+    caso = dict(caso)
+    gen_novo = np.atleast_2d(np.asarray(unidades['gen'], dtype=float))
+    ng, largura = caso['gen'].shape
+    if gen_novo.shape[1] < largura:
+        gen_novo = np.hstack([gen_novo, np.zeros((len(gen_novo), largura - gen_novo.shape[1]))])
+    caso['gen'] = np.vstack([caso['gen'], gen_novo[:, :largura]])
+    if 'gencost' in caso:
+        custo = np.atleast_2d(np.asarray(unidades['gencost'], dtype=float)) if 'gencost' in unidades \
+            else np.tile([2, 0, 0, 2, 0, 0], (len(gen_novo), 1)).astype(float)
+        largura_custo = max(caso['gencost'].shape[1], custo.shape[1])
+        preencher = lambda m: np.hstack([m, np.zeros((len(m), largura_custo - m.shape[1]))])
+        caso['gencost'] = np.vstack([preencher(caso['gencost']), preencher(custo)])
+    caso['genfuel'] = list(caso.get('genfuel', ['unknown'] * ng)) + [combustivel] * len(gen_novo)
+    return np.arange(ng + 1, ng + len(gen_novo) + 1), caso
+
+
+# ##############################################################################
+# SÉRIES DENSAS NOS ÍNDICES DO PANDAPOWER
+# ##############################################################################
+def _expandir(valores, nt, nj, nlinhas):
+    """values (nt|1, nj|1, n|1) -> (nt, nj, nlinhas), como apply_profile (singulares valem para todos)."""
+    if valores.shape[0] not in (1, nt) or valores.shape[1] not in (1, nj) or valores.shape[2] not in (1, nlinhas):
+        raise ValueError(f"Perfil com values {valores.shape} incompatível com ({nt}, {nj}, {nlinhas}).")
+    return np.broadcast_to(valores, (nt, nj, nlinhas))
+
+
+def _aplicar(atual, valores, tipo):
+    if tipo == CT_REP:
+        return np.broadcast_to(valores, atual.shape).copy()
+    if tipo == CT_REL:
+        return atual * valores
+    if tipo == CT_ADD:
+        return atual + valores
+    raise ValueError(f"Tipo de mudança {tipo} não suportado.")
+
+
+class _Estado:
+    """Cópias densas (nt x nj x linhas) das colunas do caso que algum perfil altera."""
+
+    def __init__(self, caso, nt, nj):
+        self.caso, self.nt, self.nj = caso, nt, nj
+        self.colunas = {}
+
+    def coluna(self, tabela, col):
+        chave = (tabela, col)
+        if chave not in self.colunas:
+            base = self.caso[tabela][:, col]
+            self.colunas[chave] = np.broadcast_to(base, (self.nt, self.nj, len(base))).copy()
+        return self.colunas[chave]
+
+
+def _aplicar_carga(estado, caso, perfil, valores):
+    """CT_TLOAD / CT_TAREALOAD: escala cargas fixas (Pd/Qd) e despacháveis (geradores com Pmin < 0 = Pmax)."""
+    bus, gen = caso['bus'], caso['gen']
+    linha_da_barra = {int(b): k for k, b in enumerate(bus[:, 0])}
+    barra_gen = np.array([linha_da_barra[int(b)] for b in gen[:, GEN_BUS]], dtype=int)
+    despachavel = (gen[:, PMIN] < 0) & (gen[:, PMAX] == 0)
+    col = abs(perfil['col'])
+    so_p = col in (CT_LOAD_ALL_P, CT_LOAD_FIX_P, CT_LOAD_DIS_P)
+    fixas = col in (CT_LOAD_ALL_PQ, CT_LOAD_FIX_PQ, CT_LOAD_ALL_P, CT_LOAD_FIX_P)
+    despachaveis = col in (CT_LOAD_ALL_PQ, CT_LOAD_DIS_PQ, CT_LOAD_ALL_P, CT_LOAD_DIS_P)
+
+    pd = estado.coluna('bus', PD)
+    qd = estado.coluna('bus', QD)
+    pmin = estado.coluna('gen', PMIN)
+    for i, linha in enumerate(perfil['rows']):
+        if perfil['table'] == CT_TLOAD:
+            zona = np.ones(len(bus), dtype=bool) if linha == 0 else np.arange(len(bus)) == linha - 1
+        else:
+            zona = bus[:, BUS_AREA] == linha
+        gens = despachavel & zona[barra_gen] & (gen[:, GEN_STATUS] > 0)
+        total = np.zeros((estado.nt, estado.nj))
+        if fixas:
+            total += pd[:, :, zona].sum(axis=2)
+        if despachaveis:
+            total -= pmin[:, :, gens].sum(axis=2)
+        v = valores[:, :, i]
+        if perfil['chgtype'] == CT_REL:
+            fator = v
+        elif perfil['chgtype'] == CT_REP:
+            fator = np.divide(v, total, out=np.ones_like(total), where=total != 0)
+        else:
+            fator = np.divide(total + v, total, out=np.ones_like(total), where=total != 0)
+        fator = fator[:, :, None]
+        if fixas:
+            pd[:, :, zona] *= fator
+            if not so_p:
+                qd[:, :, zona] *= fator
+        if despachaveis and gens.any():
+            for c in (PG, PMIN) + (() if so_p else (QMIN, QMAX)):
+                estado.coluna('gen', c)[:, :, gens] *= fator
+
+
+def _aplicar_perfil_mpc(estado, caso, perfil, nt, nj):
+    tabela = perfil['table']
+    if tabela in (CT_TLOAD, CT_TAREALOAD):
+        valores = _expandir(perfil['values'], nt, nj, len(perfil['rows']))
+        _aplicar_carga(estado, caso, perfil, valores)
+        return True
+    if tabela not in (CT_TBUS, CT_TGEN, CT_TBRCH, CT_TAREAGEN):
+        return False
+    nome = {CT_TBUS: 'bus', CT_TGEN: 'gen', CT_TBRCH: 'branch', CT_TAREAGEN: 'gen'}[tabela]
+    coluna = estado.coluna(nome, perfil['col'] - 1)
+    valores = _expandir(perfil['values'], nt, nj, len(perfil['rows']))
+    for i, linha in enumerate(perfil['rows']):
+        if tabela == CT_TAREAGEN:
+            area_da_barra = {int(b): a for b, a in zip(caso['bus'][:, 0], caso['bus'][:, BUS_AREA])}
+            alvo = np.array([area_da_barra[int(b)] == linha for b in caso['gen'][:, GEN_BUS]])
+        else:
+            alvo = slice(None) if linha == 0 else [linha - 1]
+        coluna[:, :, alvo] = _aplicar(coluna[:, :, alvo], valores[:, :, i:i + 1], perfil['chgtype'])
+    return True
+
+
+def _aplicar_perfil_campos(campos, perfil, nt, nj, tipo):
+    """xGenData / StorageData: perfil sobre um campo (vetor por unidade) -> (nt, nj, unidades)."""
+    nome = perfil['table']
+    if nome not in campos:
+        raise ValueError(f"Campo '{nome}' inexistente em {tipo}.")
+    atual = np.asarray(campos[nome], dtype=float)
+    if atual.ndim == 1:
+        atual = np.broadcast_to(atual, (nt, nj, atual.size)).copy()
+    valores = _expandir(perfil['values'], nt, nj, len(perfil['rows']))
+    for i, linha in enumerate(perfil['rows']):
+        alvo = slice(None) if linha == 0 else [linha - 1]
+        atual[:, :, alvo] = _aplicar(atual[:, :, alvo], valores[:, :, i:i + 1], perfil['chgtype'])
+    campos[nome] = atual
+
+
+def montar_series(caso, perfis, net, nt=None, nj=None, xgd=None, armazenamento=None, verbose=True):
+    """
+    Aplica os perfis (na ordem) ao caso e devolve as séries densas:
+      'series':  {'tabela.coluna': (nt, nj, len(net[tabela]))} nas tabelas do pandapower;
+      'xgd' e 'armazenamento': campos (nt, nj, unidades) quando algum perfil os altera;
+      'gen_elementos': (tipo, índice no pandapower) de cada linha de mpc.gen.
+    """
+    nt = nt or max((p['values'].shape[0] for p in perfis), default=1)
+    nj = nj or max((p['values'].shape[1] for p in perfis), default=1)
+    estado = _Estado(caso, nt, nj)
+    xgd = dict(xgd or {})
+    armazenamento = dict(armazenamento or {})
+    for perfil in perfis:
+        if perfil['type'] == 'mpcData':
+            aplicado = _aplicar_perfil_mpc(estado, caso, perfil, nt, nj)
+        elif perfil['type'] == 'xGenData':
+            _aplicar_perfil_campos(xgd, perfil, nt, nj, 'xGenData')
+            aplicado = True
+        elif perfil['type'] == 'StorageData':
+            _aplicar_perfil_campos(armazenamento, perfil, nt, nj, 'StorageData')
+            aplicado = True
+        else:
+            aplicado = False
+        if not aplicado and verbose:
+            print(f"      -> AVISO: Perfil {perfil['type']}/{perfil['table']} não suportado. Ignorado.")
+
+    lookup = net._from_ppc_lookups['gen']
+    gen_elementos = [(str(t), int(e)) for t, e in zip(lookup.element_type.values, lookup.element.values)]
+    posicao_barra = {b: k for k, b in enumerate(net.bus.index)}
+    series = {}
+    for (tabela, col), valores in estado.colunas.items():
+        if tabela == 'bus' and col in COLUNAS_BUS_PANDAPOWER:
+            destino, coluna = COLUNAS_BUS_PANDAPOWER[col]
+            if destino == 'load':
+                if len(net.load):
+                    posicoes = np.array([posicao_barra[b] for b in net.load.bus], dtype=int)
+                    series[f'load.{coluna}'] = valores[:, :, posicoes]
+            else:
+                series[f'bus.{coluna}'] = valores
+        elif tabela == 'gen' and col in COLUNAS_GEN_PANDAPOWER:
+            coluna = COLUNAS_GEN_PANDAPOWER[col]
+            for tipo in sorted(set(lookup.element_type)):
+                if coluna not in net[tipo].columns or (tipo == 'ext_grid' and coluna == 'p_mw'):
+                    continue
+                linhas = np.flatnonzero(lookup.element_type.values == tipo)
+                posicoes = net[tipo].index.get_indexer(lookup.element.values[linhas].astype(int))
+                denso = np.broadcast_to(net[tipo][coluna].values.astype(float),
+                                        (nt, nj, len(net[tipo]))).copy()
+                denso[:, :, posicoes] = valores[:, :, linhas]
+                series[f'{tipo}.{coluna}'] = denso > 0 if coluna == 'in_service' else denso
+        elif tabela == 'branch' and col == BR_STATUS:
+            ramos = net._from_ppc_lookups['branch']
+            for tipo in sorted(set(ramos.element_type)):
+                linhas = np.flatnonzero(ramos.element_type.values == tipo)
+                posicoes = net[tipo].index.get_indexer(ramos.element.values[linhas].astype(int))
+                denso = np.broadcast_to(net[tipo]['in_service'].values, (nt, nj, len(net[tipo]))).copy()
+                denso[:, :, posicoes] = valores[:, :, linhas] > 0
+                series[f'{tipo}.in_service'] = denso
+        elif verbose:
+            print(f"      -> AVISO: Coluna {col + 1} da tabela {tabela} sem equivalente no pandapower. Ignorada.")
+    return {'nt': nt, 'nj': nj, 'series': series, 'xgd': xgd, 'armazenamento': armazenamento,
+            'gen_elementos': gen_elementos}
+
+
+def aplicar_periodo(net, series, periodo, cenario=0):
+    """Escreve no net os valores de um período/cenário das séries densas."""
+    for chave, valores in series.items():
+        tabela, coluna = chave.split('.')
+        net[tabela][coluna] = valores[periodo, cenario]
+
+
+# ##############################################################################
+# LEITURA COMPILADA (COM CACHE)
+# ##############################################################################
+def _hash_arquivo(caminho):
+    with open(caminho, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _chave(caso, perfis, eolicas, armazenamento, xgd, nt, nj):
+    h = hashlib.sha1(f"v{VERSAO_CACHE}|{nt}|{nj}".encode())
+    arquivos = [caso] + [p[0] if isinstance(p, tuple) else p for p in perfis] + \
+               [a for a in (eolicas, armazenamento, xgd) if a]
+    for caminho in arquivos:
+        h.update(f"|{os.path.basename(caminho)}|{_hash_arquivo(caminho)}".encode())
+    for p in perfis:
+        mapa = p[1] if isinstance(p, tuple) else None
+        h.update(f"|{mapa if isinstance(mapa, str) or mapa is None else list(mapa)}".encode())
+    return h.hexdigest()
+
+
+def compilar_most(caso, perfis=(), eolicas=None, armazenamento=None, xgd=None, nt=None, nj=None, verbose=True):
+    """
+    Lê o caso (.m do MATPOWER), acrescenta as unidades eólicas e de
+    armazenamento (arquivos no formato de ex_wind/ex_storage), lê os perfis e
+    monta as séries densas. Cada item de 'perfis' é um caminho ou (caminho,
+    mapa), com mapa 'eolicas', 'armazenamento' ou uma lista de linhas de
+    mpc.gen (base 1), como em getprofiles(perfil, idx).
+    """
+    from leitor_matpower import caso_para_pandapower
+
+    interpretador = _Interpretador()
+    dados_caso = ler_caso_matpower(caso)
+    dados_caso['gen'] = np.atleast_2d(dados_caso['gen'])
+    interpretador.dependencias[caso] = _hash_arquivo(caso)
+    dados_xgd = ler_dados_xgd(xgd, dados_caso['gen'], interpretador) if xgd else None
+    indices = {}
+    dados_sd = None
+    for chave, arquivo, combustivel in (('eolicas', eolicas, 'wind'), ('armazenamento', armazenamento, 'ess')):
+        if not arquivo:
+            continue
+        unidades = interpretador.avaliar_arquivo(arquivo, (dados_caso,))
+        indices[chave], dados_caso = adicionar_unidades(dados_caso, unidades, combustivel)
+        xgd_novo = ler_dados_xgd(unidades['xgd_table'], unidades['gen'], interpretador)
+        if dados_xgd is None:
+            dados_xgd = xgd_novo
+        else:
+            dados_xgd = {c: np.concatenate([dados_xgd[c], xgd_novo[c]]) for c in dados_xgd if c in xgd_novo}
+        if chave == 'armazenamento':
+            dados_sd = ler_dados_armazenamento(unidades['sd_table'], unidades['gen'], interpretador)
+            dados_sd['UnitIdx'] = indices[chave].astype(float)
+
+    lista = []
+    for item in perfis:
+        arquivo, mapa = item if isinstance(item, tuple) else (item, None)
+        linhas = indices[mapa] if isinstance(mapa, str) else mapa
+        lista.extend(ler_perfis(arquivo, linhas, interpretador))
+
+    net = caso_para_pandapower(dados_caso)
+    montagem = montar_series(dados_caso, lista, net, nt, nj, dados_xgd, dados_sd, verbose)
+    montagem.update({'caso': dados_caso, 'perfis': lista, 'indices_unidades': indices,
+                     'indices': {t: net[t].index.values for t in ('bus', 'load', 'gen', 'sgen', 'ext_grid')},
+                     'dependencias': dict(interpretador.dependencias)})
+    return montagem
+
+
+def carregar_most(caso, perfis=(), eolicas=None, armazenamento=None, xgd=None, nt=None, nj=None,
+                  diretorio_cache=DIRETORIO_CACHE_MOST, verbose=True):
+    """compilar_most com cache: a leitura repetida do mesmo conjunto só desserializa as séries."""
+    inicio = time.perf_counter()
+    chave = _chave(caso, perfis, eolicas, armazenamento, xgd, nt, nj)
+    caminho = os.path.join(diretorio_cache, f"most_{chave}.pkl") if diretorio_cache else None
+    if caminho and os.path.exists(caminho):
+        try:
+            with open(caminho, 'rb') as f:
+                montagem = pickle.load(f)
+            # Os .m lidos indiretamente (idx_*, funções chamadas) também precisam estar iguais
+            if all(os.path.exists(a) and _hash_arquivo(a) == h for a, h in montagem['dependencias'].items()):
+                if verbose:
+                    print(f"   -> Dados MOST lidos do cache em {1e3 * (time.perf_counter() - inicio):.1f} ms ({caminho})")
+                return montagem
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            pass
+
+    montagem = compilar_most(caso, perfis, eolicas, armazenamento, xgd, nt, nj, verbose)
+    if caminho:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump(montagem, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    if verbose:
+        print(f"   -> Dados MOST compilados em {1e3 * (time.perf_counter() - inicio):.1f} ms "
+              f"({len(montagem['perfis'])} perfil(is), {montagem['nt']} período(s) x {montagem['nj']} cenário(s), "
+              f"{len(montagem['dependencias'])} arquivo(s) .m)")
+    return montagem
+
+
+if __name__ == "__main__":
+    exemplos = os.path.join(DIRETORIO_MATPOWER, 'most', 'examples')
+    print("LEITURA DE DADOS MOST: ex_case3b + eólica + armazenamento + perfis")
+    argumentos = dict(caso=os.path.join(exemplos, 'ex_case3b.m'),
+                      perfis=[(os.path.join(exemplos, 'ex_wind_profile.m'), 'eolicas'),
+                              os.path.join(exemplos, 'ex_load_profile.m')],
+                      eolicas=os.path.join(exemplos, 'ex_wind.m'),
+                      armazenamento=os.path.join(exemplos, 'ex_storage.m'),
+                      xgd=os.path.join(exemplos, 'ex_xgd_uc.m'))
+    dados = carregar_most(**argumentos)
+    carregar_most(**argumentos)
+    for nome, valores in dados['series'].items():
+        print(f"      -> {nome}: {valores.shape}, período 1 cenário 1 = {np.round(valores[0, 0], 3)}")
+    print(f"      -> Linhas de mpc.gen no pandapower: {dados['gen_elementos']}")
+    print(f"      -> Armazenamento: {sorted(dados['armazenamento'])}")
@@ -1,10 +1,30 @@
-import pandapower as pp
-import pandapower.networks as nw
+import contextlib
+import io
 import os
-import numpy as np
-import pickle # Importa a biblioteca para salvar/carregar objetos python
-import subprocess
 import sys
+import time
+
+# Só biblioteca padrão e módulos leves no carregamento: pandapower, numpy e os
+# módulos do projeto que dependem deles são importados dentro das funções que
+# os usam, então a linha de comando sobe sem a pilha científica e cada
+# subcomando paga só o que usa (ver 'python main.py benchmark').
+from checkpoint import INTERVALO_PADRAO_S
+
+# Opções do fluxo de potência (também fazem parte da chave do cache)
+OPCOES_FLUXO = {'max_iteration': 30}
+
+# Resultados elétricos memoizados pela impressão digital da rede; o diretório
+# em disco é compartilhado pelos processos de uma varredura. Criado no
+# primeiro uso (obter_cache_fluxo).
+cache_fluxo = None
+
+
+def obter_cache_fluxo():
+    global cache_fluxo
+    if cache_fluxo is None:
+        from cache_fluxo import CacheFluxo
+        cache_fluxo = CacheFluxo(diretorio='cache_fluxo')
+    return cache_fluxo
 
 # ##############################################################################
 # FASE 1: CONFIGURAÇÃO DO CENÁRIO
@@ -54,11 +74,22 @@ def configurar_cenario():
 # ##############################################################################
 # FASE 2: SIMULAÇÃO DA REDE ELÉTRICA (EM PYTHON)
 # ##############################################################################
-def simular_rede(configs):
+def simular_rede(configs, salvar_rede_inicial=True, usar_cache=True):
     """
     Carrega um caso de estudo nativo da biblioteca pandapower, adiciona os ativos
-    e executa a simulação de fluxo de potência.
+    e executa a simulação de fluxo de potência. Se uma rede eletricamente
+    idêntica já foi resolvida, o resultado vem do cache e o runpp é pulado.
     """
+    import pickle
+
+    import pandapower as pp
+    import pandapower.networks as nw
+
+    from baterias import aplicar_despacho, despachar_baterias
+    from cache_fluxo import aplicar_resultados, extrair_resultados, impressao_digital
+    from convergencia import executar_fluxo_robusto, salvar_telemetria
+    from topologia import TopologiaRede
+
     print("\nFASE 2: Iniciando a simulação da rede elétrica...")
 
     try:
@@ -66,15 +97,17 @@ def simular_rede(configs):
         net = nw.case1354pegase()
         print(f"   -> Sucesso! Rede '{net.name}' com {len(net.bus)} barras foi carregada.")
         
-        with open('rede_inicial.pkl', 'wb') as f:
-            pickle.dump(net, f)
-        print("   -> Rede inicial salva em 'rede_inicial.pkl'.")
+        if salvar_rede_inicial:
+            with open('rede_inicial.pkl', 'wb') as f:
+                pickle.dump(net, f)
+            print("   -> Rede inicial salva em 'rede_inicial.pkl'.")
 
     except Exception as e:
         print(f"   -> ERRO ao carregar o caso de estudo nativo: {e}")
         return None
 
     print("   -> Adicionando DERs à rede...")
+    indices_der = []
     for der_info in configs['ders']['unidades']:
         barra, capacidade_mw, nome, tipo = der_info
         
@@ -91,7 +124,7 @@ def simular_rede(configs):
             print(f"      -> Removendo {len(gens_na_barra)} gerador(es) existente(s) na barra {barra}.")
             net.gen.drop(gens_na_barra, inplace=True)
             
-        pp.create_gen(net, bus=bus_index, p_mw=capacidade_mw, name=nome, tags=tipo)
+        indices_der.append(pp.create_gen(net, bus=bus_index, p_mw=capacidade_mw, name=nome, tags=tipo))
 
     print("   -> Adicionando Baterias à rede...")
     for bat_info in configs['storage']['unidades']:
@@ -106,14 +139,40 @@ def simular_rede(configs):
         # ----------------------------------------------------------------------
 
         pp.create_storage(net, bus=bus_index, p_mw=potencia_mw, max_e_mwh=capacidade_mwh, name=nome)
+
+    # Despacho ótimo opcional, ex.: configs['storage']['despacho'] =
+    # {'objetivo': 'arbitragem', 'precos': [...], 'periodo': 18}
+    config_despacho = configs['storage'].get('despacho')
+    if config_despacho:
+        print("   -> Otimizando o despacho das baterias...")
+        despacho = despachar_baterias(configs['storage']['unidades'], config_despacho)
+        aplicar_despacho(net, despacho, config_despacho.get('periodo', 0))
         
+    # Verifica ilhamento / perda de referência após a troca de geradores por DERs
+    TopologiaRede(net).verificar()
+
+    chave_fluxo = impressao_digital(net, OPCOES_FLUXO)
+    em_cache = obter_cache_fluxo().obter(chave_fluxo) if usar_cache else None
+    if em_cache is not None:
+        aplicar_resultados(net, em_cache['resultados'])
+        net['telemetria_fluxo'] = em_cache['telemetria']
+        print("   -> Resultado do fluxo de potência reaproveitado do cache (rede eletricamente idêntica).")
+        return net
+
     print("   -> Executando a simulação de fluxo de potência (runpp)...")
+    convergiu, telemetria = executar_fluxo_robusto(net, indices_der=indices_der, **OPCOES_FLUXO)
     try:
-        pp.runpp(net, max_iteration=30)
-        print("   -> Simulação concluída com sucesso.")
-    except Exception as e:
-        print(f"   -> ERRO durante a simulação do fluxo de potência: {e}")
+        salvar_telemetria(telemetria, cenario=configs.get('nome', 'padrao'))
+    except OSError as e:
+        print(f"   -> AVISO: Não foi possível salvar a telemetria do fluxo: {e}")
+
+    if not convergiu:
+        print(f"   -> ERRO: O fluxo de potência não convergiu após {len(telemetria['tentativas'])} tentativas.")
         return None
+    print(f"   -> Simulação concluída com sucesso (estratégia '{telemetria['estrategia_vencedora']}').")
+    net['telemetria_fluxo'] = telemetria
+    if usar_cache:
+        obter_cache_fluxo().guardar(chave_fluxo, {'resultados': extrair_resultados(net), 'telemetria': telemetria})
         
     return net
 
@@ -124,6 +183,8 @@ def calcular_indicadores(net, configs):
     """
     Calcula os indicadores de desempenho a partir da rede simulada.
     """
+    import numpy as np
+
     print("\nFASE 3: Calculando indicadores...")
     indicadores = {}
 
@@ -137,8 +198,18 @@ def calcular_indicadores(net, configs):
     perdas_totais_mw = geracao_total_mw - carga_total_mw
     
     indicadores['perdas_totais_mw'] = perdas_totais_mw
-    
+
+    # Pior tensão e maior carregamento de ramo (linhas e transformadores)
+    vm = net.res_bus.vm_pu.dropna()
+    indicadores['tensao_min_pu'] = float(vm.min())
+    indicadores['tensao_max_pu'] = float(vm.max())
+    carregamentos = [net[t].loading_percent.max() for t in ('res_line', 'res_trafo', 'res_trafo3w')
+                     if t in net and not net[t].empty]
+    indicadores['carregamento_max_pct'] = float(np.nanmax(carregamentos)) if carregamentos else float('nan')
+
     print(f"   -> Indicador calculado: Perdas Totais = {perdas_totais_mw:.2f} MW")
+    print(f"   -> Indicador calculado: Tensão em [{indicadores['tensao_min_pu']:.4f}, "
+          f"{indicadores['tensao_max_pu']:.4f}] pu, carregamento máximo {indicadores['carregamento_max_pct']:.1f}%")
     
     return indicadores
 
@@ -159,23 +230,186 @@ def apresentar_resultados(indicadores):
         print(f"  - Perdas Totais na Rede: {perdas:.2f} MW")
     else:
         print("  - Perdas Totais na Rede: N/A")
+    if 'tensao_min_pu' in indicadores:
+        print(f"  - Pior Tensão: {indicadores['tensao_min_pu']:.4f} pu")
+        print(f"  - Carregamento Máximo de Ramo: {indicadores['carregamento_max_pct']:.1f}%")
+
+# ##############################################################################
+# FASE 5: VARREDURA DE CENÁRIOS EM PARALELO
+# ##############################################################################
+def _hora_cenario(configs):
+    """Hora do dia do cenário: 'hora' explícita ou o período do despacho das baterias."""
+    despacho = configs['storage'].get('despacho') or {}
+    return int(configs.get('hora', despacho.get('periodo', 0)))
+
+
+def _executar_cenario(configs, pasta_detalhes=None):
+    """
+    Executa um cenário completo em um processo de trabalho (sem saída no
+    terminal). Com 'pasta_detalhes', grava também a potência por barra x tipo
+    para o servidor do dashboard (servidor_dashboard.py).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        net = simular_rede(configs, salvar_rede_inicial=False)
+        indicadores = calcular_indicadores(net, configs)
+    if pasta_detalhes and indicadores:
+        from dashboard import injecoes_por_barra
+        from servidor_dashboard import gravar_detalhes_cenario
+        gravar_detalhes_cenario(pasta_detalhes, configs['hash'], injecoes_por_barra(net), _hora_cenario(configs))
+    return configs['hash'], configs['nome'], indicadores
+
+
+def executar_varredura(arquivo_cenarios, arquivo_resultados='resultados_varredura.jsonl', processos=None,
+                       intervalo_checkpoint_s=INTERVALO_PADRAO_S, max_tentativas=3, gravar_detalhes=True):
+    """
+    Expande o arquivo de cenários sob demanda e executa os cenários em um pool
+    de processos. Só há no máximo 2x 'processos' cenários em andamento, e os
+    resultados são gravados em lotes com checkpoint, então a memória não
+    cresce com o tamanho da varredura.
+
+    Ao ser executada de novo com o mesmo arquivo de resultados, a varredura
+    retoma de onde parou: cenários concluídos são pulados, e os que estavam em
+    andamento ou terminaram com erro são refeitos. Se um processo de trabalho
+    morrer, o pool é recriado e os cenários que estavam em andamento são
+    refeitos um de cada vez, em um pool de um processo; só o cenário que
+    derrubar esse processo gasta uma tentativa, até 'max_tentativas'.
+
+    Com 'gravar_detalhes', cada cenário grava a potência por barra x tipo em
+    '<resultados>.cenarios/<hash>.npz', ingerida pelo servidor do dashboard.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    from cenarios import EspacoCenarios
+    from checkpoint import CheckpointVarredura
+    from servidor_dashboard import diretorio_detalhes
+
+    print("\nVARREDURA: Carregando cenários...")
+    espaco = EspacoCenarios.de_arquivo(arquivo_cenarios, base=configurar_cenario())
+    total = len(espaco)
+    processos = processos or os.cpu_count() or 1
+    print(f"   -> {total} cenário(s) em '{arquivo_cenarios}', {processos} processo(s).")
+
+    checkpoint = CheckpointVarredura(arquivo_resultados, intervalo_s=intervalo_checkpoint_s)
+    ja_concluidos = checkpoint.retomar()
+    if ja_concluidos:
+        print(f"   -> Retomando: {ja_concluidos} cenário(s) já concluídos em '{arquivo_resultados}'.")
+
+    pasta_detalhes = diretorio_detalhes(arquivo_resultados) if gravar_detalhes else None
+    if pasta_detalhes:
+        os.makedirs(pasta_detalhes, exist_ok=True)
+
+    inicio = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=processos)
+    isolado = None     # Pool de um processo para os suspeitos de uma quebra
+    em_andamento = {}  # futuro -> (configs, tentativa)
+    suspeitos = []     # (configs, tentativa) em andamento quando o pool quebrou
+    cenarios = (configs for chave, configs in espaco.expandir() if not checkpoint.concluido(chave))
+    try:
+        while True:
+            if suspeitos and not em_andamento:
+                # Um de cada vez: só quem derruba o processo sozinho gasta uma tentativa
+                configs, tentativa = suspeitos.pop()
+                isolado = isolado or ProcessPoolExecutor(max_workers=1)
+                try:
+                    checkpoint.registrar(configs['hash'],
+                                         _registro_cenario(isolado.submit(_executar_cenario, configs, pasta_detalhes),
+                                                           configs))
+                except BrokenProcessPool:
+                    isolado.shutdown(wait=False, cancel_futures=True)
+                    isolado = None
+                    _reenfileirar(suspeitos, configs, tentativa, max_tentativas, checkpoint)
+                continue
+
+            # Mantém a janela de trabalho cheia (fora do isolamento)
+            while not suspeitos and len(em_andamento) < 2 * processos:
+                configs = next(cenarios, None)
+                if configs is None:
+                    break
+                em_andamento[executor.submit(_executar_cenario, configs, pasta_detalhes)] = (configs, 1)
+            if not em_andamento:
+                break
+
+            prontos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            pool_quebrado = False
+            for futuro in prontos:
+                configs, tentativa = em_andamento.pop(futuro)
+                try:
+                    checkpoint.registrar(configs['hash'], _registro_cenario(futuro, configs))
+                except BrokenProcessPool:
+                    pool_quebrado = True
+                    suspeitos.append((configs, tentativa))
+
+            if pool_quebrado:
+                # Não se sabe qual cenário derrubou o processo: todos os que estavam em
+                # andamento são refeitos isolados, sem gastar tentativa
+                print(f"   -> AVISO: Um processo de trabalho morreu; refazendo {len(suspeitos) + len(em_andamento)} "
+                      "cenário(s) em andamento um de cada vez.")
+                suspeitos.extend(em_andamento.values())
+                em_andamento.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=processos)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if isolado is not None:
+            isolado.shutdown(wait=True, cancel_futures=True)
+        checkpoint.salvar()
+
+    duracao = time.perf_counter() - inicio
+    fracao = 100.0 * checkpoint.tempo_checkpoint_s / duracao if duracao > 0 else 0.0
+    print(f"   -> Varredura concluída: {checkpoint.num_concluidos}/{total} cenário(s) em '{arquivo_resultados}'.")
+    if checkpoint.num_falhas:
+        print(f"   -> AVISO: {checkpoint.num_falhas} cenário(s) falharam; serão refeitos na próxima execução.")
+    print(f"   -> Checkpoints: {checkpoint.num_checkpoints}, {checkpoint.tempo_checkpoint_s:.3f} s "
+          f"({fracao:.2f}% do tempo da varredura).")
+    return checkpoint.num_concluidos
+
+
+def _registro_cenario(futuro, configs):
+    """
+    Registro de resultados de um cenário terminado. Exceções do cenário viram
+    um registro com 'erro'; BrokenProcessPool é propagada a quem chamou.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        chave, nome, indicadores = futuro.result()
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        print(f"   -> ERRO no cenário {configs['nome']}: {e}")
+        return {'hash': configs['hash'], 'nome': configs['nome'], 'indicadores': {},
+                'erro': f"{type(e).__name__}: {e}"}
+    return {'hash': chave, 'nome': nome, 'indicadores': indicadores}
+
+
+def _reenfileirar(fila, configs, tentativa, max_tentativas, checkpoint):
+    """Devolve à fila um cenário que derrubou o processo, ou registra a falha após muitas tentativas."""
+    if tentativa < max_tentativas:
+        fila.append((configs, tentativa + 1))
+        return
+    print(f"   -> ERRO: Cenário {configs['nome']} derrubou o processo {tentativa} vezes; desistindo.")
+    checkpoint.registrar(configs['hash'], {'hash': configs['hash'], 'nome': configs['nome'], 'indicadores': {},
+                                           'erro': 'processo de trabalho morreu'})
 
 # ##############################################################################
-# FASE 5: ORQUESTRADOR PRINCIPAL
+# FASE 6: ORQUESTRADOR PRINCIPAL
 # ##############################################################################
-def main():
+def main(usar_cache=True, executar_dashboard=True):
     """Função principal para executar a simulação completa."""
     
     # FASE 1
     configs = configurar_cenario()
 
     # FASE 2
-    net_simulada = simular_rede(configs)
+    net_simulada = simular_rede(configs, usar_cache=usar_cache)
 
-    print("\n" + "="*50)
-    print("Executando o Dashboard de Análise da Rede Base...")
-    subprocess.run([sys.executable, "dashboard.py"])
-    print("="*50 + "\n")
+    if executar_dashboard:
+        # No mesmo processo: a pilha científica já está carregada
+        from dashboard import analisar_rede
+        print("\n" + "="*50)
+        print("Executando o Dashboard de Análise da Rede Base...")
+        analisar_rede()
+        print("="*50 + "\n")
 
     # FASE 3
     indicadores = calcular_indicadores(net_simulada, configs)
@@ -183,5 +417,138 @@ def main():
     # FASE 4
     apresentar_resultados(indicadores)
 
+# ##############################################################################
+# FASE 7: LINHA DE COMANDO
+# ##############################################################################
+# Módulos pesados que cada subcomando carrega antes de trabalhar. Os handlers
+# os importam por importar_dependencias, e o benchmark mede a subida de cada
+# subcomando pelo mesmo caminho.
+DEPENDENCIAS_SUBCOMANDO = {
+    'simular': ('pandapower', 'pandapower.networks', 'baterias', 'cache_fluxo', 'convergencia', 'topologia'),
+    'dashboard': ('dashboard',),
+    'servidor': ('servidor_dashboard',),
+    'varredura': ('concurrent.futures.process', 'cenarios', 'servidor_dashboard'),
+    'benchmark': ('tempo_importacao',),
+}
+
+# Teto para 'import main' (ms, -X importtime): a CLI não pode voltar a
+# carregar a pilha científica no topo do módulo.
+ORCAMENTO_IMPORTACAO_CLI_MS = 50.0
+
+
+def importar_dependencias(subcomando):
+    """Carrega os módulos pesados de um subcomando (o que a CLI adia até ele rodar)."""
+    import importlib
+    for modulo in DEPENDENCIAS_SUBCOMANDO[subcomando]:
+        importlib.import_module(modulo)
+
+
+def executar_benchmark(repeticoes=3, historico='benchmarks.jsonl', simulacao=False):
+    """
+    Relatório de tempo de importação da CLI e de cada subcomando, comparado
+    com a execução anterior do histórico (e, com 'simulacao', o tempo de uma
+    simulação completa sem cache). Retorna 1 se a CLI passou do orçamento.
+    """
+    importar_dependencias('benchmark')
+    from tempo_importacao import gravar_historico, relatorio_importacao, ultimo_registro
+
+    print("BENCHMARK: Subida da linha de comando...")
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    alvos = {'cli': 'import main'}
+    alvos.update({nome: f"import main; main.importar_dependencias({nome!r})" for nome in DEPENDENCIAS_SUBCOMANDO})
+    anterior = ultimo_registro(historico)
+    medicoes, estourados = relatorio_importacao(alvos, diretorio, repeticoes,
+                                                {'cli': ORCAMENTO_IMPORTACAO_CLI_MS}, anterior)
+    registro = {'importacao': medicoes}
+
+    if simulacao:
+        importar_dependencias('simular')
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            net = simular_rede(configurar_cenario(), salvar_rede_inicial=False, usar_cache=False)
+        registro['simulacao_s'] = time.perf_counter() - inicio
+        antes = (anterior or {}).get('simulacao_s')
+        print(f"\n   -> Simulação completa sem cache: {registro['simulacao_s']:.2f} s"
+              + (f" (anterior: {antes:.2f} s)" if antes is not None else "")
+              + ("" if net is not None else " - ERRO: não convergiu"))
+
+    if historico:
+        gravar_historico(registro, historico)
+        print(f"   -> Registro acrescentado a '{historico}'.")
+    return 1 if estourados else 0
+
+
+def criar_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='main.py', description="Inserção de DERs e baterias no case1354pegase: simulação, dashboard, "
+                                    "varredura de cenários e benchmark de subida.")
+    subcomandos = parser.add_subparsers(dest='comando', metavar='comando')
+
+    simular = subcomandos.add_parser('simular', aliases=['simulate'],
+                                     help="Simulação completa do cenário padrão (o padrão sem argumentos).")
+    simular.add_argument('--sem-cache', action='store_true', help="Ignora o cache de fluxos de potência.")
+    simular.add_argument('--sem-dashboard', action='store_true', help="Não exibe o dashboard da rede base.")
+
+    dashboard = subcomandos.add_parser('dashboard', help="Dashboard da rede base no terminal ou no navegador.")
+    dashboard.add_argument('resultados', nargs='*',
+                           help="Resultados de varreduras ingeridos pelo servidor (com --servidor; padrão: "
+                                "resultados_varredura.jsonl).")
+    dashboard.add_argument('--servidor', action='store_true',
+                           help="Serve o dashboard interativo (servidor_dashboard.py) em vez de imprimir.")
+    dashboard.add_argument('--rede', default='rede_inicial.pkl', help="Rede base salva pela simulação.")
+    dashboard.add_argument('--porta', type=int, help="Porta do servidor local (com --servidor).")
+
+    varredura = subcomandos.add_parser('varredura', aliases=['sweep'], help="Varredura de cenários em paralelo.")
+    varredura.add_argument('arquivo_cenarios', help="Arquivo JSON de cenários (ex.: arquivos_cenarios/...).")
+    varredura.add_argument('--resultados', default='resultados_varredura.jsonl', help="Arquivo JSONL de saída.")
+    varredura.add_argument('--processos', type=int, help="Processos de trabalho (padrão: núcleos da máquina).")
+    varredura.add_argument('--intervalo-checkpoint', type=float, default=INTERVALO_PADRAO_S,
+                           help="Segundos entre gravações em lote dos resultados.")
+    varredura.add_argument('--sem-detalhes', action='store_true',
+                           help="Não grava a potência por barra x tipo de cada cenário.")
+
+    benchmark = subcomandos.add_parser('benchmark', help="Tempo de importação da CLI e dos subcomandos.")
+    benchmark.add_argument('--repeticoes', type=int, default=3, help="Processos medidos por alvo (mediana).")
+    benchmark.add_argument('--historico', default='benchmarks.jsonl',
+                           help="Histórico JSONL dos benchmarks ('' para não gravar).")
+    benchmark.add_argument('--simulacao', action='store_true', help="Mede também uma simulação completa.")
+    return parser
+
+
+def executar_cli(argv=None):
+    """Ponto de entrada da linha de comando. Retorna o código de saída."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv:
+        argv = ['simular']
+    elif argv[0].endswith('.json'):
+        # Compatibilidade: python main.py arquivos_cenarios/exemplo_varredura.json
+        argv = ['varredura'] + argv
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.comando == 'dashboard' and not args.servidor and (args.resultados or args.porta is not None):
+        parser.error("'resultados' e --porta só valem com --servidor.")
+
+    if args.comando in ('simular', 'simulate'):
+        importar_dependencias('simular')
+        main(usar_cache=not args.sem_cache, executar_dashboard=not args.sem_dashboard)
+    elif args.comando == 'dashboard' and args.servidor:
+        importar_dependencias('servidor')
+        from servidor_dashboard import PORTA_PADRAO, servir
+        servir(args.resultados or ['resultados_varredura.jsonl'], args.rede, porta=args.porta or PORTA_PADRAO)
+    elif args.comando == 'dashboard':
+        importar_dependencias('dashboard')
+        from dashboard import analisar_rede
+        analisar_rede(args.rede)
+    elif args.comando in ('varredura', 'sweep'):
+        importar_dependencias('varredura')
+        executar_varredura(args.arquivo_cenarios, args.resultados, processos=args.processos,
+                           intervalo_checkpoint_s=args.intervalo_checkpoint, gravar_detalhes=not args.sem_detalhes)
+    elif args.comando == 'benchmark':
+        return executar_benchmark(args.repeticoes, args.historico, args.simulacao)
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Ex.: python main.py simular | dashboard [--servidor] | varredura arquivo.json | benchmark
+    sys.exit(executar_cli())
@@ -0,0 +1,254 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+# ##############################################################################
+# BACKENDS DE OTIMIZAÇÃO (HiGHS VIA SCIPY / CPLEX)
+# ##############################################################################
+# Os modelos são montados em forma matricial esparsa:
+#   min c'x   s.a.  A_ub x <= b_ub,  A_eq x = b_eq,  lb <= x <= ub
+# e resolvidos pelo HiGHS do SciPy ou, se o pacote 'cplex' estiver instalado,
+# pela API Python do CPLEX (a mesma distribuída em x64_win64/cplex).
+# Nos MILPs, o HiGHS é usado pelo pacote highspy quando disponível, o que
+# permite partida quente e medir o tempo até a primeira solução viável; sem
+# ele, cai no milp do SciPy (mesmo solver, sem essas duas funções).
+
+BACKENDS = ('auto', 'highs', 'cplex')
+
+GAP_MIP_PADRAO = 1e-3
+
+
+def cplex_disponivel():
+    try:
+        import cplex  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def highspy_disponivel():
+    try:
+        import highspy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def escolher_backend(backend='auto'):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend '{backend}' desconhecido. Use um de {BACKENDS}.")
+    if backend == 'auto':
+        return 'cplex' if cplex_disponivel() else 'highs'
+    if backend == 'cplex' and not cplex_disponivel():
+        raise ImportError("O backend 'cplex' exige o pacote cplex (veja x64_win64/setup.py).")
+    return backend
+
+
+def _vazia(n):
+    return sp.csr_matrix((0, n))
+
+
+def _forma_padrao(c, A_ub, b_ub, A_eq, b_eq, lb, ub):
+    """Completa os argumentos opcionais da forma matricial."""
+    n = len(c)
+    A_ub = _vazia(n) if A_ub is None else sp.csr_matrix(A_ub)
+    A_eq = _vazia(n) if A_eq is None else sp.csr_matrix(A_eq)
+    b_ub = np.zeros(0) if b_ub is None else np.asarray(b_ub, dtype=float)
+    b_eq = np.zeros(0) if b_eq is None else np.asarray(b_eq, dtype=float)
+    lb = np.zeros(n) if lb is None else np.asarray(lb, dtype=float)
+    ub = np.full(n, np.inf) if ub is None else np.asarray(ub, dtype=float)
+    return np.asarray(c, dtype=float), A_ub, b_ub, A_eq, b_eq, lb, ub
+
+
+def modelo_cplex(c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, lb=None, ub=None, inteiras=None):
+    """Monta um objeto cplex.Cplex a partir da forma matricial (sem resolver)."""
+    import cplex
+
+    c, A_ub, b_ub, A_eq, b_eq, lb, ub = _forma_padrao(c, A_ub, b_ub, A_eq, b_eq, lb, ub)
+
+    cpx = cplex.Cplex()
+    for fluxo in (cpx.set_log_stream, cpx.set_results_stream, cpx.set_warning_stream):
+        fluxo(None)
+    cpx.objective.set_sense(cpx.objective.sense.minimize)
+    tipos = ''
+    if inteiras is not None:
+        tipos = ''.join('B' if (i and lb[k] == 0 and ub[k] == 1) else ('I' if i else 'C')
+                        for k, i in enumerate(inteiras))
+    cpx.variables.add(obj=c.tolist(),
+                      lb=np.maximum(lb, -cplex.infinity).tolist(),
+                      ub=np.minimum(ub, cplex.infinity).tolist(),
+                      types=tipos)
+    cpx.linear_constraints.add(senses='L' * A_ub.shape[0] + 'E' * A_eq.shape[0],
+                               rhs=np.concatenate([b_ub, b_eq]).tolist())
+    matriz = sp.vstack([A_ub, A_eq]).tocoo()
+    if matriz.nnz:
+        cpx.linear_constraints.set_coefficients(
+            zip(matriz.row.tolist(), matriz.col.tolist(), matriz.data.tolist()))
+    return cpx
+
+
+def resolver_lp(c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, lb=None, ub=None, backend='auto'):
+    """
+    Resolve um LP em forma matricial. Retorna um dicionário com 'x',
+    'objetivo', 'sucesso', 'status', 'backend' e 'tempo_s'.
+    """
+    backend = escolher_backend(backend)
+    n = len(c)
+    inicio = time.perf_counter()
+
+    if backend == 'cplex':
+        cpx = modelo_cplex(c, A_ub, b_ub, A_eq, b_eq, lb, ub)
+        cpx.solve()
+        status = cpx.solution.get_status_string()
+        sucesso = cpx.solution.is_primal_feasible()
+        x = np.asarray(cpx.solution.get_values()) if sucesso else None
+        objetivo = cpx.solution.get_objective_value() if sucesso else None
+    else:
+        lb = np.zeros(n) if lb is None else lb
+        ub = np.full(n, np.inf) if ub is None else ub
+        limites = np.column_stack([lb, ub])
+        res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=limites, method='highs')
+        status, sucesso = res.message, res.status == 0
+        x = res.x if sucesso else None
+        objetivo = res.fun if sucesso else None
+
+    return {'x': x, 'objetivo': objetivo, 'sucesso': bool(sucesso), 'status': status,
+            'backend': backend, 'tempo_s': time.perf_counter() - inicio}
+
+
+def _milp_cplex(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, partida, gap, tempo_limite, inicio):
+    import cplex
+
+    cpx = modelo_cplex(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras=inteiras)
+    cpx.parameters.mip.tolerances.mipgap.set(gap)
+    if tempo_limite:
+        cpx.parameters.timelimit.set(tempo_limite)
+    if partida is not None:
+        indices, valores = partida
+        # Todas as inteiras fixadas: o CPLEX só precisa resolver o LP restante
+        cpx.MIP_starts.add(cplex.SparsePair(ind=[int(i) for i in indices], val=[float(v) for v in valores]),
+                           cpx.MIP_starts.effort_level.solve_fixed, 'partida_quente')
+
+    primeira = []
+
+    class _Candidata:
+        def invoke(self, contexto):
+            if not primeira and contexto.in_candidate() and contexto.is_candidate_point():
+                primeira.append((time.perf_counter() - inicio, contexto.get_candidate_objective()))
+
+    cpx.set_callback(_Candidata(), cplex.callbacks.Context.id.candidate)
+    cpx.solve()
+    sucesso = cpx.solution.is_primal_feasible()
+    if sucesso and not primeira:
+        # A partida quente já era a incumbente: a primeira viável veio antes da busca
+        primeira.append((time.perf_counter() - inicio, cpx.solution.get_objective_value()))
+    return {
+        'x': np.asarray(cpx.solution.get_values()) if sucesso else None,
+        'objetivo': cpx.solution.get_objective_value() if sucesso else None,
+        'sucesso': bool(sucesso),
+        'status': cpx.solution.get_status_string(),
+        'gap': cpx.solution.MIP.get_mip_relative_gap() if sucesso else None,
+        'tempo_primeira_viavel_s': primeira[0][0] if primeira else None,
+        'objetivo_primeira_viavel': primeira[0][1] if primeira else None,
+    }
+
+
+def _milp_highspy(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, partida, gap, tempo_limite, inicio):
+    import highspy
+
+    n = len(c)
+    matriz = sp.vstack([A_ub, A_eq], format='csc')
+    lp = highspy.HighsLp()
+    lp.num_col_, lp.num_row_ = n, matriz.shape[0]
+    lp.col_cost_, lp.col_lower_, lp.col_upper_ = c, lb, ub
+    lp.row_lower_ = np.concatenate([np.full(len(b_ub), -np.inf), b_eq])
+    lp.row_upper_ = np.concatenate([b_ub, b_eq])
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = matriz.indptr
+    lp.a_matrix_.index_ = matriz.indices
+    lp.a_matrix_.value_ = matriz.data
+    if inteiras is not None:
+        lp.integrality_ = [highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+                           for i in inteiras]
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    h.setOptionValue('mip_rel_gap', gap)
+    if tempo_limite:
+        h.setOptionValue('time_limit', float(tempo_limite))
+    h.passModel(lp)
+
+    primeira = []
+    h.cbMipImprovingSolution.subscribe(
+        lambda evento: primeira.append((time.perf_counter() - inicio, evento.data_out.objective_function_value))
+        if not primeira else None)
+    if partida is not None:
+        # Solução parcial (só as inteiras): o HiGHS completa o restante antes da busca
+        indices, valores = partida
+        h.setSolution(len(indices), np.asarray(indices, dtype=np.int32), np.asarray(valores, dtype=float))
+    h.run()
+
+    info = h.getInfo()
+    estado = h.getModelStatus()
+    sucesso = info.primal_solution_status == 2  # kSolutionStatusFeasible
+    return {
+        'x': np.asarray(h.getSolution().col_value) if sucesso else None,
+        'objetivo': info.objective_function_value if sucesso else None,
+        'sucesso': bool(sucesso),
+        'status': h.modelStatusToString(estado),
+        'gap': info.mip_gap if sucesso else None,
+        'tempo_primeira_viavel_s': primeira[0][0] if primeira else None,
+        'objetivo_primeira_viavel': primeira[0][1] if primeira else None,
+    }
+
+
+def _milp_scipy(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, gap, tempo_limite):
+    restricoes = []
+    if A_ub.shape[0]:
+        restricoes.append(LinearConstraint(A_ub, -np.inf, b_ub))
+    if A_eq.shape[0]:
+        restricoes.append(LinearConstraint(A_eq, b_eq, b_eq))
+    opcoes = {'mip_rel_gap': gap}
+    if tempo_limite:
+        opcoes['time_limit'] = tempo_limite
+    res = milp(c, constraints=restricoes, bounds=Bounds(lb, ub),
+               integrality=None if inteiras is None else np.asarray(inteiras, dtype=int), options=opcoes)
+    sucesso = res.x is not None
+    return {
+        'x': res.x if sucesso else None,
+        'objetivo': res.fun if sucesso else None,
+        'sucesso': bool(sucesso),
+        'status': res.message,
+        'gap': getattr(res, 'mip_gap', None),
+        'tempo_primeira_viavel_s': None,
+        'objetivo_primeira_viavel': None,
+    }
+
+
+def resolver_milp(c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, lb=None, ub=None, inteiras=None,
+                  backend='auto', partida=None, gap=GAP_MIP_PADRAO, tempo_limite=None):
+    """
+    Resolve um MILP em forma matricial. 'inteiras' marca as variáveis inteiras
+    e 'partida' é uma solução inicial parcial (indices, valores), passada ao
+    CPLEX por MIP_starts e ao HiGHS por setSolution. Além dos campos de
+    resolver_lp, retorna 'gap', 'tempo_primeira_viavel_s',
+    'objetivo_primeira_viavel' e 'partida_quente'.
+    """
+    backend = escolher_backend(backend)
+    c, A_ub, b_ub, A_eq, b_eq, lb, ub = _forma_padrao(c, A_ub, b_ub, A_eq, b_eq, lb, ub)
+    inicio = time.perf_counter()
+
+    if backend == 'cplex':
+        resultado = _milp_cplex(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, partida, gap, tempo_limite, inicio)
+    elif highspy_disponivel():
+        resultado = _milp_highspy(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, partida, gap, tempo_limite, inicio)
+    else:
+        # milp do SciPy: sem partida quente nem medição da primeira viável
+        resultado = _milp_scipy(c, A_ub, b_ub, A_eq, b_eq, lb, ub, inteiras, gap, tempo_limite)
+        partida = None
+
+    resultado.update({'backend': backend, 'partida_quente': partida is not None,
+                      'tempo_s': time.perf_counter() - inicio})
+    return resultado
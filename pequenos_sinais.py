@@ -0,0 +1,338 @@
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator, eigs, splu
+
+from dinamica import CASO_WECC, ESTADOS, RedePSSE, SimulacaoDinamica, ler_dyr
+from leitor_psse import ler_raw
+
+# ##############################################################################
+# ESTABILIDADE A PEQUENOS SINAIS (AUTOVALORES CRÍTICOS COM ARPACK)
+# ##############################################################################
+# O modelo de dinamica.py é linearizado no ponto inicial (fluxo de potência) na
+# forma descritora esparsa, com as tensões da rede como variáveis algébricas:
+#     d(dx)/dt = f_x dx + f_v dv
+#            0 = g_x dx + g_v dv        (g = Y_aum v - I(x, v), partes real e imaginária)
+# A matriz de estados A = f_x - f_v g_v^-1 g_x (densa, pois a rede acopla todas
+# as máquinas) nunca é montada: o shift-invert (A - sigma I)^-1 b sai de uma LU
+# esparsa da matriz aumentada [[f_x - sigma I, f_v], [g_x, g_v]].
+#
+# As derivadas são diferenças centrais agrupadas: f_x é bloco-diagonal por
+# gerador (máquina + excitador + regulador / conversor) e g_x só liga cada
+# gerador à sua barra, então estados de geradores diferentes são perturbados
+# juntos (um grupo por posição local do estado, separando geradores da mesma
+# barra). f_v, g_v também só têm termos da própria barra: 4 avaliações.
+#
+# Os autovalores perto de vários deslocamentos no eixo imaginário (faixa
+# eletromecânica) vêm do ARPACK (eigs); os menos amortecidos recebem fatores de
+# participação (autovetores à esquerda por iteração inversa na transposta).
+
+PASSO_DIFERENCA = 1e-6
+FREQUENCIAS_DESLOCAMENTO_HZ = (0.1, 0.3, 0.6, 1.0, 1.5, 2.2)
+AUTOVALORES_POR_DESLOCAMENTO = 12
+FREQUENCIA_MINIMA_HZ = 0.02    # abaixo disto o modo não é oscilatório (referência angular, integradores)
+NOMES_ESTADOS = {
+    'GENROU': ('delta', 'omega', "E'q", "E'd", 'psi1d', 'psi2q'),
+    'GENCLS': ('delta', 'omega'),
+    'SEXS': ('x_leadlag', 'Efd'),
+    'TGOV1': ('x1', 'x2'),
+    'GAST': ('x1', 'x2', 'x3'),
+    'HYGOV': ('filtro', 'integral', 'abertura', 'vazao'),
+    'CONVERSOR': ('Ip', 'Iq', 'V_filtro'),
+}
+GRUPOS = (('GENROU', 'genrou'), ('GENCLS', 'gencls'), ('SEXS', 'sexs'), ('TGOV1', 'tgov1'),
+          ('GAST', 'gast'), ('HYGOV', 'hygov'), ('CONVERSOR', 'conversor'))
+
+
+# ##############################################################################
+# SUBSTITUIÇÃO DE GERAÇÃO SÍNCRONA POR DER
+# ##############################################################################
+MODELOS_SINCRONOS = ('GENROU', 'GENCLS', 'SEXS', 'TGOV1', 'GAST', 'HYGOV', 'IEEEST')
+
+
+def substituir_por_der(caso, registros_dyr, fracao, ordem='maiores'):
+    """
+    Troca máquinas síncronas (GENROU/GENCLS e os seus controles) por conversores
+    REGCA1 + REECB1 até 'fracao' da potência síncrona despachada. Os parâmetros
+    dos conversores copiam o primeiro REGCA1/REECB1 do próprio .dyr. 'ordem':
+    'maiores' (maior despacho primeiro) ou 'menores'.
+    Devolve (registros novos, lista de geradores (barra, id) trocados).
+    """
+    molde = {m: next((r[3] for r in registros_dyr if r[1] == m), None) for m in ('REGCA1', 'REECB1')}
+    if molde['REGCA1'] is None:
+        raise ValueError("O .dyr não tem REGCA1 para servir de molde aos conversores.")
+    despacho = {(r[0], str(r[1])): r[2] for r in caso.get('generator', []) if r[14] > 0}
+    maquinas = [(b, i) for b, m, i, _ in registros_dyr if m in ('GENROU', 'GENCLS') and (b, i) in despacho]
+    maquinas.sort(key=lambda k: despacho[k], reverse=(ordem == 'maiores'))
+    alvo = fracao * sum(max(despacho[k], 0.0) for k in maquinas)
+    trocados, acumulado = [], 0.0
+    for chave in maquinas:
+        if acumulado >= alvo - 1e-9:
+            break
+        trocados.append(chave)
+        acumulado += max(despacho[chave], 0.0)
+    trocados_set = set(trocados)
+    novos = [r for r in registros_dyr if not ((r[0], r[2]) in trocados_set and r[1] in MODELOS_SINCRONOS)]
+    for barra, ident in trocados:
+        novos.append((barra, 'REGCA1', ident, list(molde['REGCA1'])))
+        if molde['REECB1'] is not None:
+            novos.append((barra, 'REECB1', ident, list(molde['REECB1'])))
+    return novos, trocados
+
+
+# ##############################################################################
+# LINEARIZAÇÃO ESPARSA
+# ##############################################################################
+def _mapa_estados(sim):
+    """Gerador, modelo e nome de cada estado (na ordem do vetor de estados)."""
+    n = sim.n_estados
+    gerador = np.full(n, -1, dtype=np.int64)
+    local = np.zeros(n, dtype=np.int64)
+    nomes = [''] * n
+    for modelo, atributo in GRUPOS:
+        grupo = getattr(sim, atributo, None)
+        if not grupo:
+            continue
+        quantidade = len(grupo['idx'])
+        inicio = grupo['bloco'].start
+        for s in range(ESTADOS[modelo]):
+            posicoes = inicio + s * quantidade + np.arange(quantidade)
+            gerador[posicoes] = grupo['idx']
+            for pos, k in zip(posicoes, grupo['idx']):
+                barra, ident = sim.rede.gen_chave[k]
+                nomes[pos] = f"{modelo} {NOMES_ESTADOS[modelo][s]} ({barra}/{ident})"
+    # Posição local de cada estado dentro do seu gerador
+    contagem = {}
+    for pos in range(n):
+        k = gerador[pos]
+        local[pos] = contagem.get(k, 0)
+        contagem[k] = local[pos] + 1
+    return gerador, local, nomes
+
+
+def _grupos_colunas(sim, gerador, local):
+    """Cor de cada estado: posição local + deslocamento que separa geradores da mesma barra."""
+    barra = sim.rede.gen_barra[gerador]
+    ordem_na_barra = {}
+    vaga = np.zeros(len(gerador), dtype=np.int64)
+    for k in np.unique(gerador):
+        b = sim.rede.gen_barra[k]
+        ordem_na_barra.setdefault(b, []).append(k)
+    vaga_gerador = {k: lista.index(k) for lista in ordem_na_barra.values() for k in lista}
+    for pos, k in enumerate(gerador):
+        vaga[pos] = vaga_gerador[k]
+    largura = int(local.max()) + 1 if len(local) else 1
+    return vaga * largura + local, barra
+
+
+class ModeloLinearizado:
+    """
+    Jacobianas esparsas do modelo dinâmico no ponto inicial (forma descritora).
+    Variáveis algébricas: [Re(V); Im(V)] das barras da rede.
+    """
+
+    def __init__(self, sim, passo=PASSO_DIFERENCA, verbose=True):
+        inicio = time.perf_counter()
+        self.sim = sim
+        sim._preparar_rede()
+        x0, v0 = sim.x0.copy(), sim.v_inicial.copy()
+        # Ponto de equilíbrio da rede: tensões coerentes com x0 (ponto fixo dos conversores)
+        v0 = sim._tensoes(x0)[0]
+        self.x0, self.v0 = x0, v0
+        nb, nx = sim.n_barras, sim.n_estados
+        self.n_estados, self.n_algebricas = nx, 2 * nb
+        self.gerador, local, self.nomes = _mapa_estados(sim)
+        cores, barra_estado = _grupos_colunas(sim, self.gerador, local)
+        self.avaliacoes = 0
+
+        # f_x e g_x por grupos de colunas
+        linhas_f, colunas_f, valores_f = [], [], []
+        linhas_g, colunas_g, valores_g = [], [], []
+        estados_do_gerador = pd.Series(np.arange(nx)).groupby(self.gerador).apply(np.asarray).to_dict()
+        for cor in np.unique(cores):
+            colunas = np.flatnonzero(cores == cor)
+            delta = np.zeros(nx)
+            delta[colunas] = passo
+            df = (self._f(x0 + delta, v0) - self._f(x0 - delta, v0)) / (2 * passo)
+            dg = (self._g(x0 + delta, v0) - self._g(x0 - delta, v0)) / (2 * passo)
+            for c in colunas:
+                linhas = estados_do_gerador[self.gerador[c]]
+                linhas_f.append(linhas)
+                colunas_f.append(np.full(len(linhas), c))
+                valores_f.append(df[linhas])
+                b = barra_estado[c]
+                linhas_g.append(np.array([b, nb + b]))
+                colunas_g.append(np.array([c, c]))
+                valores_g.append(dg[[b, nb + b]])
+        self.f_x = _coo(linhas_f, colunas_f, valores_f, (nx, nx))
+        self.g_x = _coo(linhas_g, colunas_g, valores_g, (2 * nb, nx))
+
+        # f_v e a derivada das correntes dos conversores: só a própria barra, 4 avaliações
+        barras_gen = sim.rede.gen_barra[self.gerador]
+        linhas_f, colunas_f, valores_f = [], [], []
+        conversores = []
+        for parte, unidade in ((0, 1.0), (1, 1j)):
+            dv = np.full(nb, passo * unidade)
+            df = (self._f(x0, v0 + dv) - self._f(x0, v0 - dv)) / (2 * passo)
+            linhas_f.append(np.arange(nx))
+            colunas_f.append(parte * nb + barras_gen)
+            valores_f.append(df)
+            conversores.append((self._i_conversores(x0, v0 + dv) - self._i_conversores(x0, v0 - dv)) / (2 * passo))
+        self.f_v = _coo(linhas_f, colunas_f, valores_f, (nx, 2 * nb))
+
+        # g_v: Y_aum exata em forma real menos os blocos 2x2 dos conversores
+        y = sim.y_aumentada
+        barras = np.arange(nb)
+        d_re, d_im = conversores
+        blocos = sp.csr_matrix((np.r_[d_re.real, d_re.imag, d_im.real, d_im.imag],
+                                (np.r_[barras, nb + barras, barras, nb + barras],
+                                 np.r_[barras, barras, nb + barras, nb + barras])), shape=(2 * nb, 2 * nb))
+        self.g_v = (sp.bmat([[y.real, -y.imag], [y.imag, y.real]], format='csr') - blocos).tocsc()
+        self._lu_gv = splu(self.g_v)
+        self.tempo_linearizacao_s = time.perf_counter() - inicio
+        if verbose:
+            print(f"   -> Linearização: {nx} estados, {2 * nb} variáveis algébricas, "
+                  f"{self.avaliacoes} avaliações do modelo em {self.tempo_linearizacao_s:.2f} s")
+
+    def _f(self, x, v):
+        self.avaliacoes += 1
+        fontes, internas = self.sim._fontes(x)
+        return self.sim._derivadas_estados(x, v, fontes, internas)
+
+    def _i_conversores(self, x, v):
+        """Corrente dos conversores somada por barra (base do sistema)."""
+        total = np.zeros(self.sim.n_barras, dtype=complex)
+        if self.sim.conversor:
+            np.add.at(total, self.sim.rede.gen_barra[self.sim.conversor['idx']],
+                      self.sim._corrente_conversores(x, v))
+        return total
+
+    def _g(self, x, v):
+        """Resíduo da rede Y_aum v - I(x, v) em partes real e imaginária."""
+        injecao = self.sim._injecoes(x)[0] + self._i_conversores(x, v)
+        residuo = self.sim.y_aumentada @ v - injecao
+        return np.r_[residuo.real, residuo.imag]
+
+    def residuo_equilibrio(self):
+        """max |f(x0, v0)| e max |g(x0, v0)| (quão perto do equilíbrio está a linearização)."""
+        return float(np.max(np.abs(self._f(self.x0, self.v0)))), float(np.max(np.abs(self._g(self.x0, self.v0))))
+
+    def aplicar_a(self, b):
+        """A b = f_x b - f_v g_v^-1 g_x b (sem montar A)."""
+        return self.f_x @ b - self.f_v @ self._lu_gv.solve(np.asarray(self.g_x @ b))
+
+    def matriz_densa(self):
+        """A densa (só para conferência em casos pequenos)."""
+        return self.f_x.toarray() - self.f_v @ self._lu_gv.solve(self.g_x.toarray())
+
+    def _aumentada(self, sigma):
+        nx = self.n_estados
+        return sp.bmat([[self.f_x - sigma * sp.identity(nx), self.f_v], [self.g_x, self.g_v]], format='csc')
+
+    def autovalores(self, deslocamentos=None, k=AUTOVALORES_POR_DESLOCAMENTO, tol=1e-8):
+        """
+        Autovalores (e autovetores à direita) perto de cada deslocamento com
+        shift-invert do ARPACK; uma LU esparsa da matriz aumentada por deslocamento.
+        """
+        if deslocamentos is None:
+            deslocamentos = [2j * np.pi * f for f in FREQUENCIAS_DESLOCAMENTO_HZ]
+        nx = self.n_estados
+        operador = LinearOperator((nx, nx), matvec=lambda b: self.aplicar_a(b.astype(complex)), dtype=complex)
+        valores, vetores = [], []
+        for sigma in deslocamentos:
+            lu = splu(self._aumentada(sigma))
+            zeros = np.zeros(self.n_algebricas, dtype=complex)
+            inversa = LinearOperator((nx, nx), dtype=complex,
+                                     matvec=lambda b, lu=lu: lu.solve(np.r_[b.astype(complex), zeros])[:nx])
+            lam, vet = eigs(operador, k=min(k, nx - 2), sigma=sigma, OPinv=inversa, tol=tol)
+            valores.append(lam)
+            vetores.append(vet)
+        valores, vetores = np.concatenate(valores), np.concatenate(vetores, axis=1)
+        # Mesmo autovalor achado por deslocamentos vizinhos: fica um só
+        unicos = []
+        for i in np.argsort(-valores.imag):
+            if all(abs(valores[i] - valores[j]) > 1e-6 * max(1.0, abs(valores[i])) for j in unicos):
+                unicos.append(i)
+        return valores[unicos], vetores[:, unicos]
+
+    def autovetor_esquerdo(self, lam, iteracoes=3):
+        """w com w^T A = lam w^T, por iteração inversa na aumentada transposta."""
+        nx = self.n_estados
+        lu = splu(self._aumentada(lam * (1 + 1e-9) + 1e-12))
+        w = np.ones(nx, dtype=complex)
+        zeros = np.zeros(self.n_algebricas, dtype=complex)
+        for _ in range(iteracoes):
+            w = lu.solve(np.r_[w, zeros], trans='T')[:nx]
+            w /= np.linalg.norm(w)
+        return w
+
+    def modos(self, quantidade=10, deslocamentos=None, participantes=5):
+        """
+        Modos oscilatórios menos amortecidos: frequência, amortecimento e os
+        estados de maior participação (fator normalizado pelo maior).
+        """
+        inicio = time.perf_counter()
+        valores, vetores = self.autovalores(deslocamentos)
+        oscilatorios = np.flatnonzero(valores.imag / (2 * np.pi) > FREQUENCIA_MINIMA_HZ)
+        amortecimento = -valores.real / np.abs(valores)
+        escolhidos = oscilatorios[np.argsort(amortecimento[oscilatorios])][:quantidade]
+        linhas = []
+        for i in escolhidos:
+            lam, v = valores[i], vetores[:, i]
+            w = self.autovetor_esquerdo(lam)
+            participacao = np.abs(v * w) / np.abs(np.dot(w, v))
+            participacao /= participacao.max()
+            maiores = np.argsort(participacao)[::-1][:participantes]
+            linhas.append({'real': lam.real, 'imag': lam.imag, 'frequencia_hz': lam.imag / (2 * np.pi),
+                           'amortecimento_pct': 100 * amortecimento[i],
+                           'participantes': [(self.nomes[j], round(float(participacao[j]), 3)) for j in maiores]})
+        self.tempo_autovalores_s = time.perf_counter() - inicio
+        return pd.DataFrame(linhas)
+
+
+def _coo(linhas, colunas, valores, forma):
+    linhas, colunas, valores = np.concatenate(linhas), np.concatenate(colunas), np.concatenate(valores)
+    manter = valores != 0
+    return sp.csr_matrix((valores[manter], (linhas[manter], colunas[manter])), shape=forma)
+
+
+def analisar_caso(caminho_base=CASO_WECC, fracao_der=0.0, quantidade=10, verbose=True):
+    """Lê o caso, troca 'fracao_der' da geração síncrona por DER e devolve (modelo linearizado, modos)."""
+    caso = ler_raw(caminho_base + '.raw')
+    registros = ler_dyr(caminho_base + '.dyr')
+    trocados = []
+    if fracao_der > 0:
+        registros, trocados = substituir_por_der(caso, registros, fracao_der)
+    sim = SimulacaoDinamica(RedePSSE(caso), registros, verbose=False)
+    modelo = ModeloLinearizado(sim, verbose=verbose)
+    modos = modelo.modos(quantidade)
+    if verbose:
+        print(f"   -> {fracao_der:.0%} da geração síncrona como DER ({len(trocados)} máquinas): "
+              f"{len(modos)} modos em {modelo.tempo_autovalores_s:.2f} s")
+    return modelo, modos
+
+
+if __name__ == "__main__":
+    print("PEQUENOS SINAIS: WECC 240 barras")
+    modelo, modos = analisar_caso()
+    f_max, g_max = modelo.residuo_equilibrio()
+    print(f"   -> Resíduo no equilíbrio: |f| {f_max:.2e}, |g| {g_max:.2e}")
+
+    # Conferência com a decomposição densa completa (viável neste porte, não em milhares de barras)
+    inicio = time.perf_counter()
+    densos = np.linalg.eigvals(modelo.matriz_densa())
+    tempo_denso = time.perf_counter() - inicio
+    oscilatorios = densos[densos.imag / (2 * np.pi) > FREQUENCIA_MINIMA_HZ]
+    erro = max(np.min(np.abs(oscilatorios - complex(m.real, m.imag))) for m in modos.itertuples())
+    print(f"   -> Denso (np.linalg.eigvals): {tempo_denso:.2f} s; ARPACK: {modelo.tempo_autovalores_s:.2f} s; "
+          f"maior distância ao espectro denso {erro:.2e}")
+
+    for fracao in (0.0, 0.2, 0.4):
+        _, modos = analisar_caso(fracao_der=fracao, verbose=False)
+        print(f"\n--- {fracao:.0%} da geração síncrona substituída por DER ---")
+        for m in modos.head(5).itertuples():
+            nome, fator = m.participantes[0]
+            print(f"   -> {m.frequencia_hz:5.2f} Hz, amortecimento {m.amortecimento_pct:6.2f}%  "
+                  f"(maior participação: {nome})")
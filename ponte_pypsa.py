@@ -0,0 +1,440 @@
+import hashlib
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache_fluxo import impressao_digital
+from comissionamento import CUSTO_DEFICIT, perfil_der
+
+# ##############################################################################
+# PONTE PANDAPOWER -> PyPSA (FLUXO ÓTIMO LINEAR EM HORIZONTES LONGOS)
+# ##############################################################################
+# Converte a rede simulada (barras, linhas, transformadores, geradores, DERs,
+# injeções fixas, shunts e baterias) numa rede PyPSA com n.add vetorizado (uma
+# chamada por tipo de componente). A conversão vai para um cache em disco pela
+# impressão digital elétrica da rede (cache_fluxo.impressao_digital) somada
+# às colunas que só importam para o despacho (custos, limites, tags dos DERs).
+#
+# As séries temporais (carga por carga, disponibilidade dos DERs) entram como
+# matrizes (tempo x elemento); o fluxo ótimo linear do PyPSA roda no horizonte
+# inteiro ou em janelas (rolling horizon). O despacho volta para as tabelas
+# res_* do pandapower período a período, e os indicadores saem por período.
+#
+# Convenções da conversão:
+#   - DERs são os geradores com tag 'solar' ou 'eolico' (como em main.py);
+#     custo marginal zero e p_max_pu pelo perfil do tipo;
+#   - sgens não controláveis viram cargas negativas (injeção fixa);
+#   - sem comissionamento: p_min_pu = 0 (o Pmin do caso vale com a unidade ligada);
+#   - cada barra com carga ganha um gerador de corte de carga a CUSTO_DEFICIT.
+
+DIRETORIO_CACHE_PYPSA = 'cache_pypsa'
+VERSAO_CACHE = 1
+TIPOS_DER = ('solar', 'eolico')
+# Ramos com max_i_ka "infinito" (99999 no caso) ganham este limite, para não
+# estragar o condicionamento do LP
+LIMITE_RAMO_SEM_RESTRICAO_MVA = 1e5
+# Mesma eficiência de ida e volta padrão do baterias.ProblemaArmazenamento
+EFICIENCIA_IDA_VOLTA = 0.9
+SOC_INICIAL_PADRAO = 0.5
+
+# Colunas que entram na chave da conversão além das do fluxo de potência
+COLUNAS_DESPACHO = {
+    'gen': ['max_p_mw', 'min_p_mw', 'tags'],
+    'ext_grid': ['max_p_mw', 'min_p_mw'],
+    'line': ['max_i_ka'],
+    'storage': ['max_e_mwh', 'soc_percent'],
+    'poly_cost': ['element', 'et', 'cp0_eur', 'cp1_eur_per_mw', 'cp2_eur_per_mw2'],
+}
+
+PREFIXOS = {'bus': 'b', 'line': 'l', 'trafo': 't', 'gen': 'g', 'ext_grid': 'e', 'sgen': 's', 'load': 'c',
+            'storage': 'a', 'shunt': 'h', 'trafo3w': 'w'}
+
+
+def _nomes(tabela, indices):
+    return [f"{PREFIXOS[tabela]}{i}" for i in indices]
+
+
+def chave_conversao(net):
+    """Impressão digital elétrica + colunas de despacho (custos, limites, tags)."""
+    h = hashlib.sha1(f"v{VERSAO_CACHE}".encode())
+    for tabela, colunas in COLUNAS_DESPACHO.items():
+        if tabela in net and not net[tabela].empty:
+            df = net[tabela][[c for c in colunas if c in net[tabela].columns]].sort_index()
+            h.update(f"|{tabela}|".encode())
+            h.update(pd.util.hash_pandas_object(df.astype(str), index=True).values.tobytes())
+    return impressao_digital(net, {'despacho': h.hexdigest()})
+
+
+# ##############################################################################
+# CONVERSÃO (TABELAS DE COMPONENTES)
+# ##############################################################################
+def _custos_lineares(net, tabela):
+    """cp1 (custo marginal) de cada elemento da tabela a partir do poly_cost (0 se ausente)."""
+    custo = pd.Series(0.0, index=net[tabela].index)
+    if 'poly_cost' in net and not net.poly_cost.empty:
+        pc = net.poly_cost[net.poly_cost.et == tabela]
+        custo.loc[pc.element.values] = pc.cp1_eur_per_mw.values
+    return custo.values
+
+
+def _trafos_estrela(net, vn_barra):
+    """Trafos de três enrolamentos -> barra estrela + três trafos (impedâncias em estrela)."""
+    t3 = net.trafo3w[net.trafo3w.in_service]
+    if t3.empty:
+        return None, None
+    barras, trafos = [], []
+    for i, t in t3.iterrows():
+        estrela = f"{PREFIXOS['trafo3w']}{i}_estrela"
+        barras.append({'name': estrela, 'v_nom': t.vn_hv_kv})
+        s_base = min(t.sn_hv_mva, t.sn_mv_mva, t.sn_lv_mva)
+        # Impedâncias entre pares (em pu de s_base) -> impedâncias em estrela
+        par = {}
+        for nome, sn in (('hv', t.sn_mv_mva), ('mv', t.sn_lv_mva), ('lv', t.sn_lv_mva)):
+            vk, vkr = t[f'vk_{nome}_percent'] / 100, t[f'vkr_{nome}_percent'] / 100
+            par[nome] = (vkr * s_base / sn, np.sqrt(max(vk ** 2 - vkr ** 2, 0.0)) * s_base / sn)
+        hm, ml, lh = par['hv'], par['mv'], par['lv']
+        for enrolamento, barra, vn, (r, x), s in (
+                ('hv', t.hv_bus, t.vn_hv_kv, ((hm[0] + lh[0] - ml[0]) / 2, (hm[1] + lh[1] - ml[1]) / 2), t.sn_hv_mva),
+                ('mv', t.mv_bus, t.vn_mv_kv, ((hm[0] + ml[0] - lh[0]) / 2, (hm[1] + ml[1] - lh[1]) / 2), t.sn_mv_mva),
+                ('lv', t.lv_bus, t.vn_lv_kv, ((lh[0] + ml[0] - hm[0]) / 2, (lh[1] + ml[1] - hm[1]) / 2), t.sn_lv_mva)):
+            # Reatância em estrela negativa (comum no enrolamento do meio) é mantida pequena e positiva
+            trafos.append({'name': f"{PREFIXOS['trafo3w']}{i}_{enrolamento}", 'bus0': f"b{barra}", 'bus1': estrela,
+                           'r': r * s / s_base, 'x': max(x, 1e-4) * s / s_base, 's_nom': s,
+                           'tap_ratio': vn / vn_barra[barra] if enrolamento != 'hv' else 1.0,
+                           'phase_shift': 0.0})
+    return pd.DataFrame(barras).set_index('name'), pd.DataFrame(trafos).set_index('name')
+
+
+def tabelas_pypsa(net):
+    """Tabelas (DataFrames indexados pelo nome) de cada classe de componente do PyPSA."""
+    vn_barra = net.bus.vn_kv
+    tabelas = {}
+    barras = net.bus[net.bus.in_service]
+    tabelas['Bus'] = pd.DataFrame({'v_nom': barras.vn_kv.values}, index=_nomes('bus', barras.index))
+
+    # Linhas: parâmetros físicos (ohm e siemens), como o PyPSA espera
+    ln = net.line[net.line.in_service]
+    paralelo = ln.parallel.values
+    s_nom = np.sqrt(3) * vn_barra.loc[ln.from_bus].values * ln.max_i_ka.values * ln.df.values * paralelo
+    tabelas['Line'] = pd.DataFrame({
+        'bus0': _nomes('bus', ln.from_bus), 'bus1': _nomes('bus', ln.to_bus),
+        'r': ln.r_ohm_per_km.values * ln.length_km.values / paralelo,
+        'x': ln.x_ohm_per_km.values * ln.length_km.values / paralelo,
+        'b': 2 * np.pi * net.f_hz * ln.c_nf_per_km.values * 1e-9 * ln.length_km.values * paralelo,
+        's_nom': np.minimum(s_nom, LIMITE_RAMO_SEM_RESTRICAO_MVA),
+    }, index=_nomes('line', ln.index))
+
+    # Transformadores: pu na base s_nom, relação fora da nominal vira tap_ratio
+    tr = net.trafo[net.trafo.in_service]
+    s_nom = tr.sn_mva.values * tr.parallel.values
+    vk, vkr = tr.vk_percent.values / 100, tr.vkr_percent.values / 100
+    fator_base = (tr.vn_hv_kv.values / vn_barra.loc[tr.hv_bus].values) ** 2
+    passo = (tr.tap_pos.fillna(0).values - tr.tap_neutral.fillna(0).values) * tr.tap_step_percent.fillna(0).values / 100
+    tap_hv = np.where(tr.tap_side.values == 'lv', 1.0, 1.0 + passo)
+    tap_lv = np.where(tr.tap_side.values == 'lv', 1.0 + passo, 1.0)
+    relacao = (tr.vn_hv_kv.values * tap_hv / vn_barra.loc[tr.hv_bus].values) / \
+              (tr.vn_lv_kv.values * tap_lv / vn_barra.loc[tr.lv_bus].values)
+    tabelas['Transformer'] = pd.DataFrame({
+        'bus0': _nomes('bus', tr.hv_bus), 'bus1': _nomes('bus', tr.lv_bus),
+        'r': vkr * fator_base, 'x': np.sqrt(np.maximum(vk ** 2 - vkr ** 2, 0.0)) * fator_base,
+        's_nom': s_nom, 'tap_ratio': relacao, 'phase_shift': tr.shift_degree.fillna(0).values,
+    }, index=_nomes('trafo', tr.index))
+    if 'trafo3w' in net and not net.trafo3w.empty:
+        estrelas, trafos3w = _trafos_estrela(net, vn_barra)
+        if estrelas is not None:
+            tabelas['Bus'] = pd.concat([tabelas['Bus'], estrelas])
+            tabelas['Transformer'] = pd.concat([tabelas['Transformer'], trafos3w])
+
+    # Geradores convencionais, DERs e referência
+    g = net.gen[net.gen.in_service]
+    tags = g.tags.astype(str).values if 'tags' in g.columns else np.full(len(g), '')
+    der = np.isin(tags, TIPOS_DER)
+    p_nom = np.where(der, g.p_mw.values, np.fmax(g.max_p_mw.values, g.p_mw.values)) \
+        if 'max_p_mw' in g.columns else g.p_mw.values
+    custo = _custos_lineares(net, 'gen')[net.gen.in_service.values]
+    geradores = pd.DataFrame({
+        'bus': _nomes('bus', g.bus), 'p_nom': np.maximum(p_nom, 0.0), 'p_min_pu': 0.0,
+        'marginal_cost': np.where(der, 0.0, custo), 'carrier': np.where(der, tags, 'convencional'),
+    }, index=_nomes('gen', g.index))
+    eg = net.ext_grid[net.ext_grid.in_service]
+    p_nom_ref = eg.max_p_mw.values if 'max_p_mw' in eg.columns else np.full(len(eg), np.nan)
+    p_nom_ref = np.where(np.isfinite(p_nom_ref), p_nom_ref, net.load.p_mw.sum())
+    referencia = pd.DataFrame({
+        'bus': _nomes('bus', eg.bus), 'p_nom': p_nom_ref, 'p_min_pu': 0.0,
+        'marginal_cost': _custos_lineares(net, 'ext_grid')[net.ext_grid.in_service.values],
+        'carrier': 'referencia',
+    }, index=_nomes('ext_grid', eg.index))
+    cargas = net.load[net.load.in_service]
+    barras_com_carga = np.unique(cargas.bus.values)
+    corte = pd.DataFrame({
+        'bus': _nomes('bus', barras_com_carga), 'p_nom': cargas.groupby('bus').p_mw.sum().clip(lower=0).values,
+        'p_min_pu': 0.0, 'marginal_cost': CUSTO_DEFICIT, 'carrier': 'corte_carga',
+    }, index=[f"corte_{b}" for b in barras_com_carga])
+    tabelas['Generator'] = pd.concat([geradores, referencia, corte])
+
+    # Cargas e injeções fixas (sgen não controlável = carga negativa)
+    fixas = net.sgen[net.sgen.in_service]
+    tabelas['Load'] = pd.concat([
+        pd.DataFrame({'bus': _nomes('bus', cargas.bus), 'p_set': cargas.p_mw.values * cargas.scaling.values,
+                      'q_set': cargas.q_mvar.values * cargas.scaling.values}, index=_nomes('load', cargas.index)),
+        pd.DataFrame({'bus': _nomes('bus', fixas.bus), 'p_set': -fixas.p_mw.values * fixas.scaling.values,
+                      'q_set': -fixas.q_mvar.values * fixas.scaling.values}, index=_nomes('sgen', fixas.index)),
+    ])
+
+    sh = net.shunt[net.shunt.in_service]
+    tabelas['ShuntImpedance'] = pd.DataFrame({
+        'bus': _nomes('bus', sh.bus),
+        'g': sh.p_mw.values * sh.step.values / sh.vn_kv.values ** 2,
+        'b': -sh.q_mvar.values * sh.step.values / sh.vn_kv.values ** 2,
+    }, index=_nomes('shunt', sh.index))
+
+    # Baterias: p_nom pela potência configurada, energia pela max_e_mwh
+    st = net.storage[net.storage.in_service]
+    p_nom = np.abs(st.p_mw.values)
+    if 'sn_mva' in st.columns:
+        p_nom = np.where(p_nom > 0, p_nom, st.sn_mva.fillna(0).values)
+    soc = st.soc_percent.values / 100 if 'soc_percent' in st.columns else np.full(len(st), np.nan)
+    eta = np.sqrt(EFICIENCIA_IDA_VOLTA)
+    tabelas['StorageUnit'] = pd.DataFrame({
+        'bus': _nomes('bus', st.bus), 'p_nom': p_nom,
+        'max_hours': np.divide(st.max_e_mwh.values, p_nom, out=np.zeros(len(st)), where=p_nom > 0),
+        'efficiency_store': eta, 'efficiency_dispatch': eta, 'cyclic_state_of_charge': True,
+        'state_of_charge_initial': np.where(np.isfinite(soc), soc, SOC_INICIAL_PADRAO) * st.max_e_mwh.values,
+    }, index=_nomes('storage', st.index))
+    return tabelas
+
+
+def converter_para_pypsa(net, diretorio_cache=DIRETORIO_CACHE_PYPSA, verbose=True):
+    """
+    Rede PyPSA equivalente ao net (sem séries). As tabelas da conversão vêm do
+    cache quando a rede (elétrica e de despacho) não mudou.
+    """
+    import pypsa
+
+    inicio = time.perf_counter()
+    chave = chave_conversao(net)
+    caminho = os.path.join(diretorio_cache, f"pypsa_{chave}.pkl") if diretorio_cache else None
+    tabelas = None
+    if caminho and os.path.exists(caminho):
+        try:
+            with open(caminho, 'rb') as f:
+                tabelas = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            tabelas = None
+    do_cache = tabelas is not None
+    if tabelas is None:
+        tabelas = tabelas_pypsa(net)
+        if caminho:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'wb') as f:
+                pickle.dump(tabelas, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, caminho)
+
+    n = pypsa.Network()
+    n.add('Carrier', ['AC', 'convencional', 'referencia', 'corte_carga', *TIPOS_DER])
+    for classe in ('Bus', 'Line', 'Transformer', 'Generator', 'Load', 'ShuntImpedance', 'StorageUnit'):
+        df = tabelas[classe]
+        if not df.empty:
+            n.add(classe, df.index, **{c: df[c].values for c in df.columns})
+    n.meta = {'chave_conversao': chave}
+    if verbose:
+        origem = "do cache" if do_cache else "convertida"
+        print(f"   -> Rede PyPSA {origem} em {time.perf_counter() - inicio:.2f} s: {len(n.buses)} barras, "
+              f"{len(n.lines)} linhas, {len(n.transformers)} trafos, {len(n.generators)} geradores, "
+              f"{len(n.storage_units)} baterias")
+    return n
+
+
+# ##############################################################################
+# SÉRIES TEMPORAIS E OTIMIZAÇÃO
+# ##############################################################################
+def anexar_series(n, net, periodos, carga_p=None, disponibilidade_der=None, inicio='2024-01-01'):
+    """
+    Define os snapshots (horários) e anexa as séries como matrizes:
+      carga_p: (periodos x len(net.load)) em MW, na ordem de net.load (ex.: previsao_carga);
+      disponibilidade_der: {nome do gerador no pandapower: vetor em pu}; os DERs
+      sem série usam comissionamento.perfil_der do seu tipo.
+    """
+    n.set_snapshots(pd.date_range(inicio, periods=periodos, freq='h'))
+    cargas = net.load[net.load.in_service]
+    if carga_p is not None:
+        carga_p = np.asarray(carga_p, dtype=float)[:, net.load.in_service.values]
+        n.loads_t.p_set = pd.DataFrame(carga_p, index=n.snapshots, columns=_nomes('load', cargas.index))
+        # O corte de carga acompanha o pico da série
+        pico = pd.Series(carga_p.max(axis=0), index=cargas.bus.values).groupby(level=0).sum().clip(lower=0)
+        n.generators.loc[[f"corte_{b}" for b in pico.index], 'p_nom'] = pico.values
+
+    ders = n.generators.index[n.generators.carrier.isin(TIPOS_DER)]
+    disponibilidade_der = disponibilidade_der or {}
+    por_nome = dict(zip(_nomes('gen', net.gen.index), net.gen.name))
+    colunas = {}
+    for nome in ders:
+        serie = disponibilidade_der.get(por_nome.get(nome))
+        colunas[nome] = np.asarray(serie, dtype=float)[:periodos] if serie is not None else \
+            perfil_der(n.generators.carrier[nome], periodos)
+    if colunas:
+        n.generators_t.p_max_pu = pd.DataFrame(colunas, index=n.snapshots)
+    return n
+
+
+def _otimizar_janelas(n, janela, sobreposicao, opcoes):
+    """
+    Horizonte rolante janela a janela, como o optimize_with_rolling_horizon
+    do PyPSA, mas conferindo o status de cada janela (o PyPSA só registra um
+    aviso quando uma falha). O SOC ao fim da parte mantida de uma janela é o
+    inicial da seguinte; por isso o SOC cíclico fica desligado durante as
+    janelas, senão cada uma teria de terminar com o SOC com que começou.
+    Retorna o número de janelas.
+    """
+    if janela <= sobreposicao:
+        raise ValueError("A sobreposição precisa ser menor que a janela.")
+    snapshots = n.snapshots
+    baterias = n.storage_units
+    ciclico = baterias['cyclic_state_of_charge'].copy()
+    soc_inicial = baterias['state_of_charge_initial'].copy()
+    baterias.loc[:, 'cyclic_state_of_charge'] = False
+    k = 0
+    try:
+        for k, inicio in enumerate(range(0, len(snapshots), janela - sobreposicao), start=1):
+            fim = min(len(snapshots), inicio + janela)
+            if inicio and not baterias.empty:
+                baterias.loc[:, 'state_of_charge_initial'] = \
+                    n.storage_units_t.state_of_charge.loc[snapshots[inicio - 1], baterias.index].values
+            status, condicao = n.optimize(snapshots[inicio:fim], **opcoes)
+            if status != 'ok':
+                raise RuntimeError(f"Janela {k} ({snapshots[inicio]} a {snapshots[fim - 1]}) do fluxo ótimo "
+                                   f"linear terminou com status '{status}' ({condicao}).")
+            if fim == len(snapshots):
+                break
+    finally:
+        baterias.loc[:, 'cyclic_state_of_charge'] = ciclico
+        baterias.loc[:, 'state_of_charge_initial'] = soc_inicial
+    return k
+
+
+def otimizar(n, janela=None, sobreposicao=0, solver='highs', verbose=True):
+    """Fluxo ótimo linear no horizonte inteiro ou em janelas de 'janela' períodos."""
+    inicio = time.perf_counter()
+    # Com o HiGHS o modelo vai direto para o highspy (sem arquivo LP intermediário)
+    opcoes = {'solver_name': solver, 'include_objective_constant': False}
+    if solver == 'highs':
+        opcoes.update(io_api='direct', log_to_console=False)
+    em_janelas = bool(janela and janela < len(n.snapshots))
+    if em_janelas:
+        n_janelas = _otimizar_janelas(n, janela, sobreposicao, opcoes)
+    else:
+        status, condicao = n.optimize(**opcoes)
+        if status != 'ok':
+            raise RuntimeError(f"Fluxo ótimo linear do PyPSA terminou com status '{status}' ({condicao}).")
+    if verbose:
+        # Em janelas, n.objective guarda só a última; o custo total sai de indicadores_serie
+        modo = f"em {n_janelas} janelas de {janela}" if em_janelas else \
+            f"em um só LP (custo {float(n.objective):.1f})"
+        print(f"   -> Fluxo ótimo linear de {len(n.snapshots)} período(s) {modo} em "
+              f"{time.perf_counter() - inicio:.2f} s")
+    return n
+
+
+# ##############################################################################
+# VOLTA PARA O PANDAPOWER
+# ##############################################################################
+def resultados_para_pandapower(n, net, periodo=0):
+    """
+    Escreve o despacho de um período nas tabelas res_* do net (convenção do
+    pandapower: carga positiva). Fluxo linear: tensões em 1 pu, ângulos e
+    fluxos ativos do PyPSA, sem perdas nem reativos.
+    """
+    t = n.snapshots[periodo]
+    angulo = np.degrees(n.buses_t.v_ang.loc[t]) if not n.buses_t.v_ang.empty else pd.Series(0.0, index=n.buses.index)
+    injecao = n.buses_t.p.loc[t] if not n.buses_t.p.empty else pd.Series(0.0, index=n.buses.index)
+    nomes_barras = _nomes('bus', net.bus.index)
+    net.res_bus = pd.DataFrame({'vm_pu': 1.0, 'va_degree': angulo.reindex(nomes_barras).values,
+                                'p_mw': -injecao.reindex(nomes_barras).values, 'q_mvar': 0.0}, index=net.bus.index)
+
+    for tabela, res, de, para in (('line', 'res_line', 'p_from_mw', 'p_to_mw'),
+                                  ('trafo', 'res_trafo', 'p_hv_mw', 'p_lv_mw')):
+        classe = 'lines' if tabela == 'line' else 'transformers'
+        nomes = _nomes(tabela, net[tabela].index)
+        p0 = getattr(n, f"{classe}_t").p0.loc[t].reindex(nomes).values
+        p1 = getattr(n, f"{classe}_t").p1.loc[t].reindex(nomes).values
+        s_nom = getattr(n, classe).s_nom.reindex(nomes).values
+        net[res] = pd.DataFrame({de: p0, para: p1, 'pl_mw': 0.0,
+                                 'loading_percent': 100 * np.abs(p0) / s_nom}, index=net[tabela].index)
+
+    despacho = n.generators_t.p.loc[t]
+    net.res_gen = pd.DataFrame({'p_mw': despacho.reindex(_nomes('gen', net.gen.index)).values,
+                                'vm_pu': 1.0}, index=net.gen.index)
+    net.res_ext_grid = pd.DataFrame({'p_mw': despacho.reindex(_nomes('ext_grid', net.ext_grid.index)).values},
+                                    index=net.ext_grid.index)
+    carga = n.loads_t.p.loc[t] if not n.loads_t.p.empty else n.loads.p_set
+    net.res_load = pd.DataFrame({'p_mw': carga.reindex(_nomes('load', net.load.index)).values},
+                                index=net.load.index)
+    net.res_sgen = pd.DataFrame({'p_mw': -carga.reindex(_nomes('sgen', net.sgen.index)).values},
+                                index=net.sgen.index)
+    if len(net.storage):
+        bateria = n.storage_units_t.p.loc[t].reindex(_nomes('storage', net.storage.index))
+        soc = n.storage_units_t.state_of_charge.loc[t].reindex(_nomes('storage', net.storage.index))
+        net.res_storage = pd.DataFrame({'p_mw': -bateria.values,
+                                        'soc_percent': 100 * soc.values / net.storage.max_e_mwh.values},
+                                       index=net.storage.index)
+    net['converged'] = True
+
+
+def indicadores_serie(n):
+    """Indicadores por período do despacho ótimo (custo, carregamento, corte de DER e de carga, preço)."""
+    g = n.generators
+    despacho = n.generators_t.p
+    custo = (despacho * g.marginal_cost).sum(axis=1)
+    ders = g.index[g.carrier.isin(TIPOS_DER)]
+    disponivel = n.get_switchable_as_dense('Generator', 'p_max_pu')[ders] * g.p_nom[ders]
+    carregamentos = [(getattr(n, f"{c}_t").p0.abs() / getattr(n, c).s_nom).max(axis=1)
+                     for c in ('lines', 'transformers') if len(getattr(n, c))]
+    return pd.DataFrame({
+        'custo': custo,
+        'carregamento_max_pct': 100 * pd.concat(carregamentos, axis=1).max(axis=1),
+        'corte_der_mw': (disponivel - despacho[ders]).clip(lower=0).sum(axis=1),
+        'corte_carga_mw': despacho[g.index[g.carrier == 'corte_carga']].sum(axis=1),
+        'preco_marginal_medio': n.buses_t.marginal_price.mean(axis=1),
+    })
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    import logging
+
+    from main import configurar_cenario, simular_rede
+    from previsao_carga import PERIODO_SAZONAL, PrevisorCarga, gerar_historico
+
+    # Os avisos de consistência e o log do linopy/HiGHS poluem a saída do demo
+    logging.disable(logging.WARNING)
+    print("PONTE PANDAPOWER -> PyPSA: case1354pegase com DERs e baterias")
+    with contextlib.redirect_stdout(io.StringIO()):
+        net = simular_rede(configurar_cenario(), salvar_rede_inicial=False)
+    n = converter_para_pypsa(net)
+    converter_para_pypsa(net)   # mesma rede: tabelas do cache
+
+    # Carga prevista (previsao_carga) como série de p_set: um dia em um só LP
+    previsor = PrevisorCarga(verbose=False).ajustar(gerar_historico(net, semanas=4), net.load.index)
+    anexar_series(n, net, 24, carga_p=previsor.prever(24))
+    otimizar(n)
+    indicadores = indicadores_serie(n)
+    pico = int(indicadores.custo.values.argmax())
+    resultados_para_pandapower(n, net, pico)
+    print(f"   -> Período de maior custo ({pico}): geração {net.res_gen.p_mw.sum() + net.res_ext_grid.p_mw.sum():.0f} MW, "
+          f"carga {net.res_load.p_mw.sum() - net.res_sgen.p_mw.sum():.0f} MW, "
+          f"carregamento máximo {net.res_line.loading_percent.max():.1f}%")
+    print(f"   -> Corte de DER médio {indicadores.corte_der_mw.mean():.1f} MW, corte de carga total "
+          f"{indicadores.corte_carga_mw.sum():.1f} MWh, preço marginal médio {indicadores.preco_marginal_medio.mean():.2f}")
+
+    # A semana inteira em janelas de 24 h (um LP de 168 períodos não cabe na memória de uma máquina comum)
+    semana = converter_para_pypsa(net, verbose=False)
+    anexar_series(semana, net, PERIODO_SAZONAL, carga_p=previsor.prever(PERIODO_SAZONAL))
+    otimizar(semana, janela=24)
+    indicadores = indicadores_serie(semana)
+    print(f"   -> Semana: custo {indicadores.custo.sum():.1f}, carregamento máximo "
+          f"{indicadores.carregamento_max_pct.max():.1f}%, corte de carga total {indicadores.corte_carga_mw.sum():.1f} MWh")
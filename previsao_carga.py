@@ -0,0 +1,319 @@
+import hashlib
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from comissionamento import PICO_DIARIO_RTS96
+
+# ##############################################################################
+# PREVISÃO DE CARGA POR BARRA (SÉRIES TEMPORAIS)
+# ##############################################################################
+# Ajusta modelos sazonais (Holt-Winters aditivo do statsmodels, sazonalidade
+# semanal em base horária) ao histórico de cada carga de net.load e produz a
+# previsão como uma matriz (tempo x carga), pronta para net.load.p_mw.
+#
+# Dois métodos:
+#   - 'compartilhado': as séries são normalizadas pela média e agrupadas
+#     (k-means no perfil semanal médio); cada grupo ajusta UM Holt-Winters na
+#     série média do grupo e cada carga vira a + b * (perfil ajustado do grupo),
+#     com a e b por mínimos quadrados, vetorizado para todas as cargas;
+#   - 'individual': um Holt-Winters por carga, em blocos num pool de processos.
+# Os dois reduzem ao mesmo estado compacto por carga: nível (N) e componente
+# sazonal (N x período); a previsão é nível + sazonal[h mod período].
+#
+# O estado ajustado vai para um cache em disco (pickle gravado de forma
+# atômica), com a impressão digital do histórico e dos parâmetros do ajuste:
+# só reajusta quando o histórico muda.
+
+METODOS = ('compartilhado', 'individual')
+PERIODO_SAZONAL = 168          # uma semana em passos de 1 h
+NUM_GRUPOS = 8
+DIRETORIO_CACHE_PREVISAO = 'cache_previsao'
+VERSAO_CACHE = 1
+
+# Perfil horário (fração do pico diário) das classes de consumidores do histórico sintético
+PERFIS_CLASSE = {
+    'residencial': np.array([55, 50, 47, 46, 46, 50, 60, 68, 66, 62, 60, 60,
+                             61, 60, 59, 62, 70, 84, 98, 100, 96, 87, 74, 62]) / 100.0,
+    'comercial': np.array([40, 38, 37, 37, 38, 42, 55, 75, 90, 97, 100, 100,
+                           96, 98, 99, 97, 92, 82, 70, 62, 56, 50, 45, 42]) / 100.0,
+    'industrial': np.array([78, 77, 76, 76, 77, 80, 88, 96, 100, 100, 99, 98,
+                            95, 98, 99, 98, 96, 92, 88, 85, 83, 81, 80, 79]) / 100.0,
+}
+
+
+# ##############################################################################
+# HISTÓRICO
+# ##############################################################################
+def gerar_historico(net, semanas=6, semente=0):
+    """
+    Histórico horário sintético (semanas*168 x cargas) de net.load.p_mw: cada
+    carga recebe uma classe de consumidor, o pico semanal do RTS-96 e um ruído
+    AR(1) próprio. O p_mw atual da carga é tratado como o pico.
+    """
+    rng = np.random.default_rng(semente)
+    T, N = semanas * PERIODO_SAZONAL, len(net.load)
+    horas = np.arange(T)
+    classes = list(PERFIS_CLASSE)
+    classe = rng.integers(len(classes), size=N)
+    perfis = np.stack([np.resize(PERFIS_CLASSE[c], T) for c in classes])     # classes x T
+    semana = PICO_DIARIO_RTS96[(horas // 24) % 7]
+    ruido = np.empty((T, N))
+    ruido[0] = rng.normal(0.0, 0.03, N)
+    choques = rng.normal(0.0, 0.03 * np.sqrt(1 - 0.9 ** 2), (T, N))
+    for t in range(1, T):
+        ruido[t] = 0.9 * ruido[t - 1] + choques[t]
+    fator = perfis[classe].T * semana[:, None] * (1.0 + ruido)
+    return np.clip(fator, 0.0, 1.0) * net.load.p_mw.values[None, :]
+
+
+def impressao_historico(historico, metodo, periodo, num_grupos):
+    """SHA-1 do histórico (valores e forma) e dos parâmetros do ajuste."""
+    h = hashlib.sha1()
+    h.update(f"v{VERSAO_CACHE}|{metodo}|{periodo}|{num_grupos}|{historico.shape}".encode())
+    h.update(np.ascontiguousarray(historico, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+# ##############################################################################
+# AJUSTE
+# ##############################################################################
+def _holt_winters(serie, periodo):
+    """Holt-Winters aditivo; devolve (nível final, últimas 'periodo' sazonais, valores ajustados)."""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        r = ExponentialSmoothing(serie, seasonal='add', seasonal_periods=periodo,
+                                 initialization_method='heuristic').fit()
+    return float(r.level[-1]), np.asarray(r.season[-periodo:]), np.asarray(r.fittedvalues)
+
+
+def _ajustar_bloco(argumentos):
+    """Ajusta um Holt-Winters por coluna do bloco (executado nos processos do pool)."""
+    bloco, periodo = argumentos
+    nivel = np.empty(bloco.shape[1])
+    sazonal = np.empty((bloco.shape[1], periodo))
+    erro = np.empty(bloco.shape[1])
+    for j in range(bloco.shape[1]):
+        nivel[j], sazonal[j], ajustado = _holt_winters(bloco[:, j], periodo)
+        erro[j] = np.sqrt(np.mean((ajustado - bloco[:, j]) ** 2))
+    return nivel, sazonal, erro
+
+
+def ajustar_individual(historico, periodo=PERIODO_SAZONAL, processos=None, bloco=64):
+    """Um modelo por carga; os blocos de colunas são ajustados em paralelo."""
+    blocos = [(historico[:, i:i + bloco], periodo) for i in range(0, historico.shape[1], bloco)]
+    if processos == 1 or len(blocos) == 1:
+        partes = [_ajustar_bloco(b) for b in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            partes = list(executor.map(_ajustar_bloco, blocos))
+    nivel, sazonal, erro = (np.concatenate(p) for p in zip(*partes))
+    return {'nivel': nivel, 'sazonal': sazonal, 'erro_ajuste': erro}
+
+
+def ajustar_compartilhado(historico, periodo=PERIODO_SAZONAL, num_grupos=NUM_GRUPOS, semente=0):
+    """
+    Um modelo por grupo de cargas com o mesmo formato de perfil; o ajuste de
+    cada carga ao perfil do seu grupo é vetorizado.
+    """
+    from sklearn.cluster import KMeans
+
+    T, N = historico.shape
+    media = historico.mean(axis=0)
+    escala = np.where(np.abs(media) > 1e-9, media, 1.0)
+    Z = historico / escala                                            # T x N, média ~1
+
+    # Perfil semanal médio de cada carga (só ciclos completos) para agrupar
+    ciclos = T // periodo
+    perfil = Z[T - ciclos * periodo:].reshape(ciclos, periodo, N).mean(axis=0).T
+    k = int(min(num_grupos, N))
+    grupo = KMeans(n_clusters=k, n_init=4, random_state=semente).fit_predict(perfil) if k > 1 \
+        else np.zeros(N, dtype=int)
+
+    nivel = np.empty(N)
+    sazonal = np.empty((N, periodo))
+    erro = np.empty(N)
+    for g in range(k):
+        membros = np.flatnonzero(grupo == g)
+        if membros.size == 0:
+            continue
+        nivel_g, sazonal_g, ajustado = _holt_winters(Z[:, membros].mean(axis=1), periodo)
+        # Z_i(t) ~ a_i + b_i * ajustado(t), mínimos quadrados para todas as cargas do grupo de uma vez
+        f = ajustado - ajustado.mean()
+        Zg = Z[:, membros]
+        b = f @ (Zg - Zg.mean(axis=0)) / max(f @ f, 1e-12)
+        a = Zg.mean(axis=0) - b * ajustado.mean()
+        residuo = Zg - (a[None, :] + b[None, :] * ajustado[:, None])
+        nivel[membros] = escala[membros] * (a + b * nivel_g)
+        sazonal[membros] = (escala[membros] * b)[:, None] * sazonal_g[None, :]
+        erro[membros] = np.abs(escala[membros]) * np.sqrt(np.mean(residuo ** 2, axis=0))
+    return {'nivel': nivel, 'sazonal': sazonal, 'erro_ajuste': erro, 'grupo': grupo}
+
+
+class PrevisorCarga:
+    """Ajusta (ou recupera do cache) os modelos das cargas e gera as previsões."""
+
+    def __init__(self, metodo='compartilhado', periodo=PERIODO_SAZONAL, num_grupos=NUM_GRUPOS,
+                 processos=None, diretorio_cache=DIRETORIO_CACHE_PREVISAO, verbose=True):
+        if metodo not in METODOS:
+            raise ValueError(f"Método de previsão '{metodo}' desconhecido. Use um de {METODOS}.")
+        self.metodo = metodo
+        self.periodo = periodo
+        self.num_grupos = num_grupos
+        self.processos = processos
+        self.diretorio_cache = diretorio_cache
+        self.verbose = verbose
+        self.estado = None
+        self.indices = None
+        self.do_cache = False
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio_cache, f"previsao_{chave}.pkl")
+
+    def ajustar(self, historico, indices=None):
+        """
+        'historico' é (tempo x carga), colunas na ordem de 'indices' (índices
+        de net.load). Reaproveita o ajuste salvo se o histórico não mudou.
+        """
+        historico = np.asarray(historico, dtype=float)
+        if historico.shape[0] < 2 * self.periodo:
+            raise ValueError(f"O histórico precisa de pelo menos dois ciclos sazonais "
+                             f"({2 * self.periodo} passos); tem {historico.shape[0]}.")
+        self.indices = np.arange(historico.shape[1]) if indices is None else np.asarray(indices)
+        chave = impressao_historico(historico, self.metodo, self.periodo, self.num_grupos)
+        caminho = self._caminho(chave) if self.diretorio_cache else None
+        inicio = time.perf_counter()
+
+        if caminho and os.path.exists(caminho):
+            try:
+                with open(caminho, 'rb') as f:
+                    self.estado = pickle.load(f)
+                self.do_cache = True
+                if self.verbose:
+                    print(f"   -> Modelos de {historico.shape[1]} carga(s) lidos do cache ({caminho})")
+                return self
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+
+        if self.metodo == 'compartilhado':
+            self.estado = ajustar_compartilhado(historico, self.periodo, self.num_grupos)
+        else:
+            self.estado = ajustar_individual(historico, self.periodo, self.processos)
+        self.do_cache = False
+        if caminho:
+            os.makedirs(self.diretorio_cache, exist_ok=True)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, 'wb') as f:
+                pickle.dump(self.estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, caminho)
+        if self.verbose:
+            print(f"   -> {historico.shape[1]} carga(s) ajustada(s) pelo método '{self.metodo}' em "
+                  f"{time.perf_counter() - inicio:.2f} s")
+        return self
+
+    def prever(self, horizonte, deslocamento=0):
+        """Matriz (horizonte x carga) dos passos deslocamento+1 ... deslocamento+horizonte após o histórico."""
+        if self.estado is None:
+            raise RuntimeError("Ajuste os modelos (PrevisorCarga.ajustar) antes de prever.")
+        passos = (deslocamento + np.arange(horizonte)) % self.periodo
+        return self.estado['nivel'][None, :] + self.estado['sazonal'][:, passos].T
+
+
+# ##############################################################################
+# APLICAÇÃO NA REDE E SIMULAÇÃO NO TEMPO
+# ##############################################################################
+def aplicar_previsao(net, previsao, periodo=0, indices=None):
+    """
+    Escreve a linha 'periodo' da previsão em net.load.p_mw; q_mvar acompanha
+    mantendo o fator de potência de cada carga (cargas com p = 0 mantêm o q).
+    """
+    indices = net.load.index if indices is None else indices
+    p_atual = net.load.loc[indices, 'p_mw'].values
+    q_atual = net.load.loc[indices, 'q_mvar'].values
+    p_novo = np.asarray(previsao[periodo], dtype=float)
+    razao = np.divide(q_atual, p_atual, out=np.full_like(q_atual, np.nan), where=p_atual != 0)
+    net.load.loc[indices, 'p_mw'] = p_novo
+    net.load.loc[indices, 'q_mvar'] = np.where(np.isnan(razao), q_atual, p_novo * razao)
+
+
+def simular_serie_temporal(net, previsao, indices=None, verbose=True):
+    """
+    Roda um fluxo de potência por linha da previsão (partida quente a partir
+    do período anterior) e devolve perdas, tensões extremas e convergência.
+    O despacho dos geradores acompanha a carga total (fator de participação
+    proporcional ao despacho original); sem isso a barra de referência
+    absorveria toda a variação da carga.
+    """
+    import pandapower as pp
+
+    from convergencia import executar_fluxo_robusto
+
+    T = len(previsao)
+    saida = {'perdas_mw': np.full(T, np.nan), 'tensao_min_pu': np.full(T, np.nan),
+             'tensao_max_pu': np.full(T, np.nan), 'convergiu': np.zeros(T, dtype=bool)}
+    p_gen_base = net.gen.p_mw.values.copy()
+    carga_base = net.load.p_mw.sum()
+    inicio = time.perf_counter()
+    for t in range(T):
+        aplicar_previsao(net, previsao, t, indices)
+        net.gen['p_mw'] = p_gen_base * (net.load.p_mw.sum() / carga_base)
+        if t > 0 and saida['convergiu'][t - 1]:
+            try:
+                pp.runpp(net, init='results', max_iteration=30)
+                convergiu = True
+            except pp.LoadflowNotConverged:
+                convergiu, _ = executar_fluxo_robusto(net, verbose=False)
+        else:
+            convergiu, _ = executar_fluxo_robusto(net, verbose=False)
+        saida['convergiu'][t] = convergiu
+        if not convergiu:
+            continue
+        saida['perdas_mw'][t] = sum(net[r].pl_mw.sum() for r in ('res_line', 'res_trafo', 'res_trafo3w')
+                                    if r in net and not net[r].empty)
+        saida['tensao_min_pu'][t] = net.res_bus.vm_pu.min()
+        saida['tensao_max_pu'][t] = net.res_bus.vm_pu.max()
+    if verbose:
+        print(f"   -> Série de {T} período(s) em {time.perf_counter() - inicio:.2f} s "
+              f"({saida['convergiu'].sum()} convergido(s)); perdas de {np.nanmin(saida['perdas_mw']):.1f} "
+              f"a {np.nanmax(saida['perdas_mw']):.1f} MW, tensão mínima {np.nanmin(saida['tensao_min_pu']):.4f} pu")
+    return saida
+
+
+def erro_percentual(previsao, real):
+    """Erro absoluto médio relativo à carga média de cada coluna (%), por carga."""
+    escala = np.maximum(np.abs(real).mean(axis=0), 1e-9)
+    return 100.0 * np.abs(previsao - real).mean(axis=0) / escala
+
+
+if __name__ == "__main__":
+    import pandapower.networks as nw
+
+    print("PREVISÃO DE CARGA POR BARRA: case1354pegase")
+    net = nw.case1354pegase()
+    semanas_ajuste = 6
+    completo = gerar_historico(net, semanas=semanas_ajuste + 1)
+    historico, real = completo[:-PERIODO_SAZONAL], completo[-PERIODO_SAZONAL:]
+
+    previsor = PrevisorCarga('compartilhado').ajustar(historico, net.load.index)
+    PrevisorCarga('compartilhado').ajustar(historico, net.load.index)   # mesma entrada: vem do cache
+    previsao = previsor.prever(PERIODO_SAZONAL)
+    print(f"   -> Compartilhado: erro médio na semana seguinte {erro_percentual(previsao, real).mean():.2f}%")
+
+    # Comparação com um modelo por carga numa amostra de 100 cargas
+    amostra = np.arange(100)
+    individual = PrevisorCarga('individual', diretorio_cache=None).ajustar(historico[:, amostra])
+    print(f"   -> Individual (100 cargas): erro médio "
+          f"{erro_percentual(individual.prever(PERIODO_SAZONAL), real[:, amostra]).mean():.2f}% "
+          f"(compartilhado nas mesmas: {erro_percentual(previsao[:, amostra], real[:, amostra]).mean():.2f}%)")
+
+    # Escala do método compartilhado (cargas replicadas)
+    for replicas in (2, 4):
+        PrevisorCarga('compartilhado', diretorio_cache=None).ajustar(np.tile(historico, replicas))
+
+    simular_serie_temporal(net, previsor.prever(24), net.load.index)
@@ -0,0 +1,335 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from leitor_matpower import (BUS_I, BUS_TIPO, CUSTO_N, GEN_BUS, GEN_STATUS, PD, PMAX, PMIN,
+                             ler_caso_matpower)
+from otimizacao import escolher_backend, modelo_cplex, resolver_lp
+
+# ##############################################################################
+# FLUXO ÓTIMO COM RESTRIÇÕES DE SEGURANÇA (SCOPF N-1) COM GERAÇÃO SOB DEMANDA
+# ##############################################################################
+# Modelo DC: fluxos f = PTDF (Pg - Pd) e, após a saída do ramo k,
+#   f_l^k = f_l + LODF[l, k] f_k.
+# Em vez de escrever as ~2 L^2 restrições pós-contingência de uma vez, o
+# problema começa sem limites de fluxo (despacho econômico) e, a cada
+# iteração, todos os pares (ramo monitorado, contingência) são verificados em
+# bloco pela LODF; só as restrições violadas entram no LP. No CPLEX, o modo
+# 'lazy' entrega um conjunto triado pela LODF como restrições lazy.
+# As restrições pós-contingência têm folga penalizada: alguns pares do PEGASE
+# não são controláveis por redespacho (o fluxo é fixado pela carga) e ficam
+# reportados como sobrecarga residual em vez de tornar o LP inviável.
+
+CASO_PEGASE = 'case1354pegase.m'
+
+# Colunas de ramo do MATPOWER (idx_brch)
+F_BUS, T_BUS, BR_R, BR_X, BR_B, RATE_A, RATE_B, RATE_C, TAP, SHIFT, BR_STATUS = range(11)
+GS = 4
+
+TOLERANCIA_MW = 1e-3
+# Limite de emergência quando rateC não é informado (fração de rateA)
+FATOR_EMERGENCIA = 1.2
+MAX_POR_ITERACAO = 200
+# Penalidade ($/MW) da sobrecarga pós-contingência que o redespacho não elimina
+CUSTO_SOBRECARGA = 1e4
+# Triagem do modo lazy: pares com fluxo pós-contingência acima desta fração do limite
+LIMIAR_TRIAGEM = 0.8
+
+
+class ModeloDC:
+    """Matrizes do fluxo DC (PTDF e LODF densas) de um caso MATPOWER."""
+
+    def __init__(self, caso=CASO_PEGASE, fator_emergencia=FATOR_EMERGENCIA):
+        inicio = time.perf_counter()
+        mpc = ler_caso_matpower(caso) if isinstance(caso, str) else caso
+        base = mpc['baseMVA']
+        barras, ramos, gen = mpc['bus'], mpc['branch'], mpc['gen']
+        ramos = ramos[ramos[:, BR_STATUS] > 0]
+        gen_ativos = gen[:, GEN_STATUS] > 0
+        gen = gen[gen_ativos]
+
+        posicao = {int(b): k for k, b in enumerate(barras[:, BUS_I])}
+        N, L = len(barras), len(ramos)
+        de = np.array([posicao[int(b)] for b in ramos[:, F_BUS]])
+        para = np.array([posicao[int(b)] for b in ramos[:, T_BUS]])
+        tap = np.where(ramos[:, TAP] == 0, 1.0, ramos[:, TAP])
+        b_serie = 1.0 / (ramos[:, BR_X] * tap)
+
+        A = sp.csr_matrix((np.r_[np.ones(L), -np.ones(L)], (np.r_[np.arange(L), np.arange(L)], np.r_[de, para])),
+                          shape=(L, N))
+        Bf = sp.diags(b_serie) @ A
+        Bbus = (A.T @ Bf).tocsc()
+        # Defasadores entram como injeções equivalentes constantes (em MW)
+        pf_inj = b_serie * -np.deg2rad(ramos[:, SHIFT]) * base
+        pbus_inj = A.T @ pf_inj
+
+        referencia = int(np.flatnonzero(barras[:, BUS_TIPO] == 3)[0])
+        demais = np.delete(np.arange(N), referencia)
+        lu = splu(Bbus[demais][:, demais].tocsc())
+        self.ptdf = np.zeros((L, N))
+        self.ptdf[:, demais] = lu.solve(Bf[:, demais].T.toarray()).T
+
+        # LODF: H[l, k] = fluxo em l por 1 MW transferido entre os terminais de k
+        H = self.ptdf @ A.T.toarray()
+        denominador = 1.0 - np.diag(H)
+        # Ramos cuja saída ilha a rede (pontes) não são contingências válidas no modelo DC
+        self.contingencias = np.flatnonzero(np.abs(denominador) > 1e-6)
+        self.lodf = H[:, self.contingencias] / denominador[self.contingencias]
+        self.lodf[self.contingencias, np.arange(len(self.contingencias))] = -1.0
+
+        self.L, self.N, self.G = L, N, len(gen)
+        self.limite = ramos[:, RATE_A]
+        emergencia = np.where(ramos[:, RATE_C] > 0, ramos[:, RATE_C], fator_emergencia * ramos[:, RATE_A])
+        self.limite_emergencia = emergencia
+        # Só ramos com limite (rateA = 0 significa ilimitado no MATPOWER)
+        self.monitorados = np.flatnonzero(self.limite > 0)
+
+        barra_gen = np.array([posicao[int(b)] for b in gen[:, GEN_BUS]])
+        self.ptdf_gen = self.ptdf[:, barra_gen]
+        carga = barras[:, PD] + barras[:, GS]
+        self.carga_total = float(carga.sum())
+        self.fluxo_carga = self.ptdf @ (-carga - pbus_inj) + pf_inj
+        self.pmin, self.pmax = gen[:, PMIN], gen[:, PMAX]
+        self.custo = self._custo_linear(mpc['gencost'][gen_ativos] if 'gencost' in mpc else None)
+        self.tempo_montagem_s = time.perf_counter() - inicio
+
+    def _custo_linear(self, custo):
+        """Custo marginal linear por gerador (termo c1; o quadrático vira a média na faixa)."""
+        if custo is None:
+            return np.ones(self.G)
+        n = custo[:, CUSTO_N].astype(int)
+        c1 = np.where(n >= 2, custo[np.arange(self.G), 4 + n - 2], 0.0)
+        c2 = np.where(n >= 3, custo[:, 4], 0.0)
+        return c1 + c2 * (self.pmin + self.pmax)
+
+    def fluxos(self, pg):
+        return self.ptdf_gen @ pg + self.fluxo_carga
+
+    def tamanho_conjunto_completo(self):
+        """Restrições de fluxo do SCOPF completo: caso base + todos os pares (l, k), nos dois sentidos."""
+        M, C = len(self.monitorados), len(self.contingencias)
+        pares = M * C - len(np.intersect1d(self.monitorados, self.contingencias))
+        return 2 * (M + pares)
+
+    def fluxos_contingencia(self, f):
+        """Fluxos pós-contingência (ramos monitorados x contingências) a partir do caso base."""
+        mon = self.monitorados
+        return f[mon][:, None] + self.lodf[mon] * f[self.contingencias][None, :]
+
+    def violacoes(self, pg, tolerancia=TOLERANCIA_MW):
+        """
+        Verifica em bloco o caso base e todas as contingências. Retorna a lista
+        (violação MW, ramo, índice da contingência ou -1, sentido) de todos os
+        pares violados, da maior para a menor violação.
+        """
+        f = self.fluxos(pg)
+        mon = self.monitorados
+        pos = self.fluxos_contingencia(f)
+        excesso_pos = np.abs(pos) - self.limite_emergencia[mon][:, None]
+        # A contingência do próprio ramo não limita o ramo (ele está fora)
+        proprio = np.isin(mon, self.contingencias)
+        excesso_pos[proprio, np.searchsorted(self.contingencias, mon[proprio])] = -np.inf
+        excesso_base = np.abs(f[mon]) - self.limite[mon]
+
+        lista = [(excesso_base[i], mon[i], -1, np.sign(f[mon[i]]))
+                 for i in np.flatnonzero(excesso_base > tolerancia)]
+        linhas, colunas = np.nonzero(excesso_pos > tolerancia)
+        lista += [(excesso_pos[i, k], mon[i], k, np.sign(pos[i, k])) for i, k in zip(linhas, colunas)]
+        lista.sort(key=lambda v: -v[0])
+        return lista
+
+    def restricao(self, ramo, contingencia, sentido):
+        """Linha (coeficientes em Pg) e lado direito de sentido * f_ramo^k <= limite."""
+        if contingencia < 0:
+            coef = self.ptdf_gen[ramo]
+            constante = self.fluxo_carga[ramo]
+            limite = self.limite[ramo]
+        else:
+            k = self.contingencias[contingencia]
+            fator = self.lodf[ramo, contingencia]
+            coef = self.ptdf_gen[ramo] + fator * self.ptdf_gen[k]
+            constante = self.fluxo_carga[ramo] + fator * self.fluxo_carga[k]
+            limite = self.limite_emergencia[ramo]
+        return sentido * coef, limite - sentido * constante
+
+
+def _novas_restricoes(violadas, chaves, maximo):
+    """Pares violados ainda fora do LP: o pior de cada ramo, até 'maximo' por rodada."""
+    novas, ramos = [], set()
+    for _, ramo, contingencia, sentido in violadas:
+        chave = (ramo, contingencia, sentido)
+        if chave in chaves or ramo in ramos:
+            continue
+        ramos.add(ramo)
+        novas.append(chave)
+        if len(novas) >= maximo:
+            break
+    return novas
+
+
+def _resolver_iterativo(modelo, backend, max_iteracoes, max_por_iteracao, verbose):
+    G = modelo.G
+    linhas, lados, folgas, chaves = [], [], [], set()
+    iteracoes = 0
+    while True:
+        iteracoes += 1
+        # Variáveis: Pg e uma folga (sobrecarga penalizada) por restrição pós-contingência
+        n_folgas = sum(folgas)
+        c = np.concatenate([modelo.custo, np.full(n_folgas, CUSTO_SOBRECARGA)])
+        A_eq = np.concatenate([np.ones(G), np.zeros(n_folgas)])[None, :]
+        lb = np.concatenate([modelo.pmin, np.zeros(n_folgas)])
+        ub = np.concatenate([modelo.pmax, np.full(n_folgas, np.inf)])
+        A_ub = None
+        if linhas:
+            coluna_folga = np.cumsum(folgas) - 1
+            linhas_folga = np.flatnonzero(folgas)
+            A_ub = sp.hstack([sp.csr_matrix(np.array(linhas)),
+                              sp.csr_matrix((-np.ones(n_folgas), (linhas_folga, coluna_folga[linhas_folga])),
+                                            shape=(len(linhas), n_folgas))], format='csr')
+        resultado = resolver_lp(c, A_ub, np.array(lados) if lados else None, A_eq, [modelo.carga_total],
+                                lb, ub, backend=backend)
+        if not resultado['sucesso']:
+            raise RuntimeError(f"SCOPF inviável na iteração {iteracoes}: {resultado['status']}")
+        pg = resultado['x'][:G]
+        violadas = modelo.violacoes(pg)
+        novas = _novas_restricoes(violadas, chaves, max_por_iteracao)
+        if verbose:
+            print(f"      -> Iteração {iteracoes}: custo {resultado['objetivo']:,.2f}, "
+                  f"{len(linhas)} restrição(ões) no LP, {len(violadas)} par(es) violado(s), "
+                  f"{len(novas)} nova(s)")
+        if not novas or iteracoes >= max_iteracoes:
+            break
+        for chave in novas:
+            chaves.add(chave)
+            linha, lado = modelo.restricao(*chave)
+            linhas.append(linha)
+            lados.append(lado)
+            folgas.append(chave[1] >= 0)
+    sobrecarga = float(resultado['x'][G:].sum())
+    return resultado, pg, len(linhas), iteracoes, violadas, sobrecarga
+
+
+def _resolver_lazy_cplex(modelo, max_iteracoes, verbose):
+    """
+    Modo lazy do CPLEX: o conjunto de pares triados pela LODF a partir do
+    despacho econômico vai para o pool de restrições lazy
+    (linear_constraints.advanced.add_lazy_constraints); o CPLEX só as ativa
+    quando violadas. Se a verificação completa ainda achar violação fora do
+    pool, os pares faltantes são acrescentados e o modelo é resolvido de novo.
+    """
+    import cplex
+
+    G = modelo.G
+    A_eq, b_eq = np.ones((1, G)), np.array([modelo.carga_total])
+    despacho = resolver_lp(modelo.custo, None, None, A_eq, b_eq, modelo.pmin, modelo.pmax, backend='cplex')
+    if not despacho['sucesso']:
+        raise RuntimeError(f"Despacho econômico inviável: {despacho['status']}")
+    f = modelo.fluxos(despacho['x'])
+    mon = modelo.monitorados
+    pos = modelo.fluxos_contingencia(f)
+    triados = np.argwhere(np.abs(pos) >= LIMIAR_TRIAGEM * modelo.limite_emergencia[mon][:, None])
+    base = np.flatnonzero(np.abs(f[mon]) >= LIMIAR_TRIAGEM * modelo.limite[mon])
+    pendentes = [(mon[i], -1, s) for i in base for s in (1.0, -1.0)]
+    pendentes += [(mon[i], j, s) for i, j in triados if modelo.contingencias[j] != mon[i] for s in (1.0, -1.0)]
+
+    cpx = modelo_cplex(modelo.custo, None, None, A_eq, b_eq, modelo.pmin, modelo.pmax)
+    no_pool = set()
+    iteracoes = 0
+    while True:
+        iteracoes += 1
+        expressoes, lados = [], []
+        for chave in pendentes:
+            if chave in no_pool:
+                continue
+            no_pool.add(chave)
+            linha, lado = modelo.restricao(*chave)
+            indices = np.flatnonzero(linha).tolist()
+            valores = linha[indices].tolist()
+            if chave[1] >= 0:
+                # Folga penalizada: pós-contingência que o redespacho não resolve vira sobrecarga
+                folga = cpx.variables.get_num()
+                cpx.variables.add(obj=[CUSTO_SOBRECARGA], lb=[0.0])
+                indices.append(folga)
+                valores.append(-1.0)
+            expressoes.append(cplex.SparsePair(ind=indices, val=valores))
+            lados.append(float(lado))
+        if expressoes:
+            # Com restrições lazy o CPLEX trata o modelo como MIP, mesmo sem inteiras
+            cpx.linear_constraints.advanced.add_lazy_constraints(
+                lin_expr=expressoes, senses='L' * len(expressoes), rhs=lados)
+        inicio = time.perf_counter()
+        cpx.solve()
+        # Mesmo critério de otimizacao.resolver_lp para o CPLEX
+        sucesso = cpx.solution.is_primal_feasible()
+        if not sucesso:
+            raise RuntimeError(f"SCOPF inviável na iteração {iteracoes}: {cpx.solution.get_status_string()}")
+        x = np.asarray(cpx.solution.get_values())
+        resultado = {'x': x, 'objetivo': cpx.solution.get_objective_value(), 'sucesso': bool(sucesso),
+                     'status': cpx.solution.get_status_string(), 'backend': 'cplex',
+                     'tempo_s': time.perf_counter() - inicio}
+        pg = x[:G]
+        violadas = [v for v in modelo.violacoes(pg) if (v[1], v[2], v[3]) not in no_pool]
+        if verbose:
+            print(f"      -> Iteração {iteracoes}: custo {resultado['objetivo']:,.2f}, "
+                  f"{len(no_pool)} restrição(ões) no pool lazy, {len(violadas)} par(es) violado(s) fora do pool")
+        if not violadas or iteracoes >= max_iteracoes:
+            break
+        pendentes = [(ramo, contingencia, sentido) for _, ramo, contingencia, sentido in violadas]
+    return resultado, pg, len(no_pool), iteracoes, modelo.violacoes(pg), float(x[G:].sum())
+
+
+def resolver_scopf(modelo, modo='iterativo', backend='auto', max_iteracoes=50,
+                   max_por_iteracao=MAX_POR_ITERACAO, verbose=True):
+    """
+    SCOPF N-1 DC com geração de restrições. modo='iterativo' (qualquer
+    backend) acrescenta a cada rodada as restrições mais violadas; modo='lazy'
+    usa o pool de restrições lazy do CPLEX. Retorna um dicionário com o
+    despacho, o custo e o relatório de restrições materializadas.
+    """
+    if modo not in ('iterativo', 'lazy'):
+        raise ValueError("modo deve ser 'iterativo' ou 'lazy'.")
+    if modo == 'lazy' and escolher_backend(backend) != 'cplex':
+        raise ImportError("O modo 'lazy' exige o backend CPLEX; use modo='iterativo' com o HiGHS.")
+
+    inicio = time.perf_counter()
+    if verbose:
+        print(f"   -> SCOPF ({modo}): {len(modelo.monitorados)} ramos monitorados, "
+              f"{len(modelo.contingencias)} contingências")
+    if modo == 'lazy':
+        resultado, pg, materializadas, iteracoes, violadas, sobrecarga = _resolver_lazy_cplex(
+            modelo, max_iteracoes, verbose)
+    else:
+        resultado, pg, materializadas, iteracoes, violadas, sobrecarga = _resolver_iterativo(
+            modelo, backend, max_iteracoes, max_por_iteracao, verbose)
+
+    completo = modelo.tamanho_conjunto_completo()
+    relatorio = {
+        'custo': float(modelo.custo @ pg),
+        'pg_mw': pg,
+        'iteracoes': iteracoes,
+        'restricoes_materializadas': materializadas,
+        'restricoes_conjunto_completo': completo,
+        'fracao_materializada': materializadas / completo,
+        'seguro': not violadas,
+        # Pares que nenhum redespacho preventivo resolve (fluxo fixado pela carga)
+        'pares_nao_resolvidos': len(violadas),
+        'sobrecarga_residual_mw': sobrecarga,
+        'backend': resultado['backend'],
+        'tempo_s': time.perf_counter() - inicio,
+    }
+    if verbose:
+        print(f"   -> {materializadas} de {completo:,} restrições materializadas "
+              f"({relatorio['fracao_materializada']:.4%}) em {iteracoes} iteração(ões), "
+              f"{relatorio['tempo_s']:.2f} s")
+        if not relatorio['seguro']:
+            print(f"   -> AVISO: {len(violadas)} par(es) sem solução por redespacho, "
+                  f"sobrecarga residual de {sobrecarga:.1f} MW")
+    return relatorio
+
+
+if __name__ == "__main__":
+    modelo = ModeloDC(CASO_PEGASE)
+    print(f"   -> PTDF/LODF de {modelo.L} ramos montadas em {modelo.tempo_montagem_s:.2f} s")
+    resolver_scopf(modelo)
@@ -0,0 +1,181 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+from pandapower.pypower.dSbus_dV import dSbus_dV
+
+# ##############################################################################
+# SENSIBILIDADES DE TENSÃO (dV/dP, dV/dQ) A PARTIR DO JACOBIANO CONVERGIDO
+# ##############################################################################
+# O Jacobiano do ponto convergido é fatorado uma única vez (LU esparsa). Cada
+# barra de injeção pedida custa apenas um par de substituições triangulares
+# (uma coluna de J^-1 para P e outra para Q); as colunas ficam em cache.
+
+TAMANHO_CACHE_PONTOS = 8
+TAMANHO_CACHE_MATRIZES = 128
+_cache_pontos = OrderedDict()
+
+
+class SensibilidadeTensao:
+    """
+    Sensibilidades de módulo de tensão em relação a injeções de potência ativa
+    e reativa, no ponto de operação convergido de 'net'.
+
+    As matrizes devolvidas estão em pu/MW e pu/Mvar e seguem a ordem das
+    listas de barras (índices do pandapower) passadas na consulta.
+    """
+
+    def __init__(self, net):
+        if not net.get('converged', False):
+            raise ValueError("A rede precisa estar convergida (execute pp.runpp antes).")
+        interno = net._ppc['internal']
+        self.base_mva = interno['baseMVA']
+        ybus = interno['Ybus']
+        tensoes = np.asarray(interno['V'])
+        pv, pq = interno['pv'], interno['pq']
+        pvpq = np.r_[pv, pq]
+        n = ybus.shape[0]
+
+        ds_dvm, ds_dva = dSbus_dV(ybus, tensoes)
+        ds_dvm, ds_dva = sp.csr_matrix(ds_dvm), sp.csr_matrix(ds_dva)
+        j11 = ds_dva[pvpq][:, pvpq].real
+        j12 = ds_dvm[pvpq][:, pq].real
+        j21 = ds_dva[pq][:, pvpq].imag
+        j22 = ds_dvm[pq][:, pq].imag
+        jacobiano = sp.bmat([[j11, j12], [j21, j22]], format='csc')
+        self._lu = splu(jacobiano)
+        self._n_pvpq = len(pvpq)
+
+        # Posição de cada barra ppci nas equações de P, de Q e nas variáveis |V|
+        self._linha_p = np.full(n, -1, dtype=np.int64)
+        self._linha_p[pvpq] = np.arange(len(pvpq))
+        self._linha_q = np.full(n, -1, dtype=np.int64)
+        self._linha_q[pq] = len(pvpq) + np.arange(len(pq))
+        # As variáveis |V| das barras PQ ocupam as mesmas posições das equações de Q
+        self._var_vm = self._linha_q.copy()
+
+        lookup = net._pd2ppc_lookups['bus']
+        self._lookup = lookup
+        self.vm_pu = np.abs(tensoes)
+        self._colunas_p = {}
+        self._colunas_q = {}
+        self._matrizes = OrderedDict()
+
+    def _posicao(self, barras):
+        barras = np.atleast_1d(np.asarray(barras, dtype=np.int64))
+        return self._lookup[barras]
+
+    def _resolver(self, barras_ppci):
+        """Calcula (e guarda) as colunas de J^-1 das barras ainda não vistas."""
+        faltantes = [b for b in dict.fromkeys(barras_ppci.tolist()) if b not in self._colunas_p]
+        if not faltantes:
+            return
+        n = self._lu.shape[0]
+        # Todas as colunas faltantes de P e Q em uma única chamada ao solver
+        rhs = np.zeros((n, 2 * len(faltantes)))
+        for k, b in enumerate(faltantes):
+            if self._linha_p[b] >= 0:
+                rhs[self._linha_p[b], 2 * k] = 1.0
+            if self._linha_q[b] >= 0:
+                rhs[self._linha_q[b], 2 * k + 1] = 1.0
+        solucao = self._lu.solve(rhs)
+        for k, b in enumerate(faltantes):
+            self._colunas_p[b] = solucao[:, 2 * k]
+            self._colunas_q[b] = solucao[:, 2 * k + 1]
+
+    def matrizes(self, barras_injecao, barras_monitoradas):
+        """
+        Retorna (dV/dP, dV/dQ), cada uma com forma (monitoradas x injeção).
+        Barras PV/slack monitoradas têm sensibilidade nula (tensão controlada).
+        """
+        chave = (tuple(np.atleast_1d(barras_injecao).tolist()), tuple(np.atleast_1d(barras_monitoradas).tolist()))
+        if chave in self._matrizes:
+            self._matrizes.move_to_end(chave)
+            return self._matrizes[chave]
+
+        injecao = self._posicao(barras_injecao)
+        self._resolver(injecao)
+        monitoradas = self._var_vm[self._posicao(barras_monitoradas)]
+        controladas = monitoradas < 0
+        monitoradas = np.where(controladas, 0, monitoradas)
+
+        dv_dp = np.column_stack([self._colunas_p[b] for b in injecao.tolist()])[monitoradas] / self.base_mva
+        dv_dq = np.column_stack([self._colunas_q[b] for b in injecao.tolist()])[monitoradas] / self.base_mva
+        dv_dp[controladas] = 0.0
+        dv_dq[controladas] = 0.0
+
+        resultado = (dv_dp, dv_dq)
+        self._matrizes[chave] = resultado
+        while len(self._matrizes) > TAMANHO_CACHE_MATRIZES:
+            self._matrizes.popitem(last=False)
+        return resultado
+
+    def dv_dp(self, barras_injecao, barras_monitoradas):
+        return self.matrizes(barras_injecao, barras_monitoradas)[0]
+
+    def dv_dq(self, barras_injecao, barras_monitoradas):
+        return self.matrizes(barras_injecao, barras_monitoradas)[1]
+
+    def estimar_tensoes(self, barras_injecao, barras_monitoradas, delta_p_mw, delta_q_mvar=None):
+        """
+        Estimativa linear de |V| nas barras monitoradas para variações de
+        injeção. 'delta_p_mw' pode ser um vetor (injeção) ou uma matriz
+        (casos x injeção), para avaliar muitos tamanhos de DER de uma vez.
+        """
+        dv_dp, dv_dq = self.matrizes(barras_injecao, barras_monitoradas)
+        v0 = self.vm_pu[self._posicao(barras_monitoradas)]
+        delta_p = np.asarray(delta_p_mw, dtype=float)
+        variacao = delta_p @ dv_dp.T
+        if delta_q_mvar is not None:
+            variacao = variacao + np.asarray(delta_q_mvar, dtype=float) @ dv_dq.T
+        return v0 + variacao
+
+
+def _chave_ponto_operacao(net):
+    interno = net._ppc['internal']
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(interno['V']).tobytes())
+    ybus = interno['Ybus'].tocsr()
+    h.update(ybus.indptr.tobytes())
+    h.update(ybus.indices.tobytes())
+    h.update(np.ascontiguousarray(ybus.data).tobytes())
+    return h.hexdigest()
+
+
+def obter_sensibilidade(net):
+    """Instância de SensibilidadeTensao reaproveitada por ponto de operação (cache LRU)."""
+    chave = _chave_ponto_operacao(net)
+    if chave in _cache_pontos:
+        _cache_pontos.move_to_end(chave)
+        return _cache_pontos[chave]
+    sensibilidade = SensibilidadeTensao(net)
+    _cache_pontos[chave] = sensibilidade
+    while len(_cache_pontos) > TAMANHO_CACHE_PONTOS:
+        _cache_pontos.popitem(last=False)
+    return sensibilidade
+
+
+if __name__ == "__main__":
+    import time
+
+    import pandapower as pp
+    import pandapower.networks as nw
+
+    from topologia import TopologiaRede
+
+    net = nw.case1354pegase()
+    pp.runpp(net)
+    barras_der = net.bus.index[net.bus.name.isin([3, 4, 10])]
+    vizinhas = TopologiaRede(net).vizinhanca(barras_der, 2)
+
+    inicio = time.perf_counter()
+    sens = obter_sensibilidade(net)
+    dv_dp, dv_dq = sens.matrizes(vizinhas, vizinhas)
+    print(f"Sensibilidades de {len(vizinhas)} barras calculadas em {time.perf_counter() - inicio:.3f} s.")
+
+    tamanhos = np.random.default_rng(0).uniform(0, 50, size=(10000, len(vizinhas)))
+    inicio = time.perf_counter()
+    sens.estimar_tensoes(vizinhas, vizinhas, tamanhos)
+    print(f"10.000 tamanhos de DER avaliados em {time.perf_counter() - inicio:.4f} s.")
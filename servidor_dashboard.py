@@ -0,0 +1,726 @@
+import asyncio
+import json
+import os
+import pickle
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from dashboard import agregados_rede
+
+# ##############################################################################
+# SERVIDOR LOCAL DO DASHBOARD COM CUBOS PRÉ-AGREGADOS
+# ##############################################################################
+# O dashboard interativo é servido por um servidor HTTP assíncrono mínimo
+# (asyncio puro, sem dependências novas) que lê a rede base e os resultados
+# das varreduras à medida que eles chegam:
+#
+#   - '<resultados>.jsonl': indicadores por cenário, lidos só até o offset
+#     confirmado no manifesto '<resultados>.jsonl.ckpt.json' (checkpoint.py);
+#   - '<resultados>.jsonl.cenarios/<hash>.npz': potência por barra x tipo na
+#     hora do cenário, gravada de forma atômica pelo processo de trabalho.
+#
+# Na ingestão, cada (cenário, hora) vira uma fatia do cubo: uma linha float32
+# com uma coluna por par barra x tipo já visto, mais a linha já somada por
+# tipo. Uma consulta (filtros por indicador, nome, tipo, hora e barra,
+# agrupada por cenário, barra, tipo ou hora) é uma máscara sobre as fatias e
+# um produto matriz-vetor sobre o cubo, sem tocar em arquivos nem no pandas.
+# A ingestão é incremental: só bytes novos do JSONL e arquivos novos da pasta.
+# No servidor, a leitura dos arquivos roda em uma thread (run_in_executor), em
+# lotes de até LOTE_INGESTAO detalhes; só a cópia para o cubo fica no laço de
+# eventos, um cenário por vez, então as consultas seguem sendo atendidas
+# enquanto uma varredura grande é ingerida.
+
+HORAS = 24
+GRUPOS = ('cenario', 'barra', 'tipo', 'hora')
+PORTA_PADRAO = 8050
+INTERVALO_INGESTAO_S = 2.0
+TEMPO_LIMITE_REQUISICAO_S = 10.0
+LIMITE_PADRAO = 50
+CAPACIDADE_INICIAL = 256
+LOTE_INGESTAO = 200
+
+
+def diretorio_detalhes(arquivo_resultados):
+    """Pasta com os detalhes por cenário de uma varredura (ao lado do JSONL)."""
+    return arquivo_resultados + '.cenarios'
+
+
+def gravar_detalhes_cenario(diretorio, hash_cenario, injecoes, hora=0):
+    """
+    Grava a potência por barra x tipo de um cenário (saída de
+    dashboard.injecoes_por_barra) em '<diretorio>/<hash>.npz', de forma
+    atômica: o servidor nunca vê um arquivo pela metade. O temporário leva o
+    pid, então dois processos gravando o mesmo cenário não se atropelam.
+    """
+    caminho = os.path.join(diretorio, f"{hash_cenario}.npz")
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        np.savez(f, barra=injecoes['barra'].to_numpy(dtype=np.int64),
+                 tipo=injecoes['tipo'].to_numpy(dtype=str),
+                 hora=np.full(len(injecoes), int(hora), dtype=np.int64),
+                 p_mw=injecoes['p_mw'].to_numpy(dtype=float))
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def ler_detalhes_cenario(caminho):
+    """Lê um arquivo de detalhes por cenário: dicionário barra, tipo, hora, p_mw."""
+    with np.load(caminho, allow_pickle=False) as dados:
+        return {chave: dados[chave] for chave in ('barra', 'tipo', 'hora', 'p_mw')}
+
+
+def _garantir(matriz, n, eixo=0, preenchimento=0):
+    """Capacidade de pelo menos 'n' no eixo, dobrando (crescimento amortizado)."""
+    if matriz.shape[eixo] >= n:
+        return matriz
+    forma = list(matriz.shape)
+    forma[eixo] = max(n, 2 * forma[eixo])
+    nova = np.full(forma, preenchimento, dtype=matriz.dtype)
+    nova[tuple(slice(0, s) for s in matriz.shape)] = matriz
+    return nova
+
+
+def _rotulo(valor):
+    """Rótulo de grupo serializável em JSON: textos e inteiros como estão, o resto como texto."""
+    if isinstance(valor, str):
+        return valor
+    if isinstance(valor, (int, np.integer)) and not isinstance(valor, (bool, np.bool_)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return int(valor)
+    return str(valor)
+
+
+def _lista(valores):
+    """Vetor numpy como lista JSON (NaN/inf viram null)."""
+    valores = np.asarray(valores, dtype=float)
+    return [float(v) if np.isfinite(v) else None for v in valores]
+
+
+# ##############################################################################
+# CUBO DE CENÁRIOS
+# ##############################################################################
+class CuboCenarios:
+    """
+    Agregados por cenário x hora x barra x tipo, montados na ingestão e
+    consultados por máscaras e produtos matriz-vetor.
+    """
+
+    def __init__(self, barras, nomes_barras=None):
+        self.barras = pd.Index(barras)
+        # Barras sem nome (o padrão do pandapower é name=None) usam o índice
+        nomes = pd.Series(self.barras if nomes_barras is None else list(nomes_barras), dtype=object)
+        sem_nome = nomes.isna().to_numpy()
+        nomes[sem_nome] = self.barras[sem_nome]
+        self.nomes_barras = nomes.to_numpy()
+        self.tipos = []
+        self._codigo_tipo = {}
+        # Cenários
+        self.hashes, self.nomes = [], []
+        self._linha_cenario = {}
+        self.indicadores = {}
+        self.erro = np.zeros(CAPACIDADE_INICIAL, dtype=bool)
+        # Colunas do cubo: pares barra x tipo, na ordem em que aparecem
+        self._mapa_coluna = np.full((len(self.barras), 4), -1, dtype=np.int64)
+        self.coluna_barra = np.zeros(CAPACIDADE_INICIAL, dtype=np.int64)
+        self.coluna_tipo = np.zeros(CAPACIDADE_INICIAL, dtype=np.int64)
+        self.n_colunas = 0
+        # Fatias: uma por (cenário, hora)
+        self._linha_fatia = {}
+        self.fatia_cenario = np.zeros(CAPACIDADE_INICIAL, dtype=np.int64)
+        self.fatia_hora = np.zeros(CAPACIDADE_INICIAL, dtype=np.int64)
+        self.n_fatias = 0
+        self.cubo = np.zeros((CAPACIDADE_INICIAL, CAPACIDADE_INICIAL), dtype=np.float32)
+        self.por_tipo = np.zeros((CAPACIDADE_INICIAL, 4))
+        self.barras_ignoradas = 0
+
+    @property
+    def n_cenarios(self):
+        return len(self.hashes)
+
+    # --------------------------------------------------------------------------
+    # Ingestão
+    # --------------------------------------------------------------------------
+    def _cenario(self, hash_cenario, nome=None):
+        linha = self._linha_cenario.get(hash_cenario)
+        if linha is None:
+            linha = len(self.hashes)
+            self._linha_cenario[hash_cenario] = linha
+            self.hashes.append(hash_cenario)
+            self.nomes.append(nome or hash_cenario[:12])
+            self.erro = _garantir(self.erro, linha + 1)
+            for nome_indicador in self.indicadores:
+                self.indicadores[nome_indicador] = _garantir(self.indicadores[nome_indicador], linha + 1,
+                                                             preenchimento=np.nan)
+        elif nome:
+            self.nomes[linha] = nome
+        return linha
+
+    def _tipo(self, nome):
+        codigo = self._codigo_tipo.get(nome)
+        if codigo is None:
+            codigo = len(self.tipos)
+            self._codigo_tipo[nome] = codigo
+            self.tipos.append(nome)
+            self._mapa_coluna = _garantir(self._mapa_coluna, codigo + 1, eixo=1, preenchimento=-1)
+            self.por_tipo = _garantir(self.por_tipo, codigo + 1, eixo=1)
+        return codigo
+
+    def _colunas(self, barra, tipo):
+        """Coluna de cada par barra x tipo, criando as que faltam."""
+        colunas = self._mapa_coluna[barra, tipo]
+        novas = colunas < 0
+        if novas.any():
+            pares = np.unique(np.c_[barra[novas], tipo[novas]], axis=0)
+            inicio = self.n_colunas
+            self.n_colunas += len(pares)
+            self._mapa_coluna[pares[:, 0], pares[:, 1]] = np.arange(inicio, self.n_colunas)
+            self.coluna_barra = _garantir(self.coluna_barra, self.n_colunas)
+            self.coluna_tipo = _garantir(self.coluna_tipo, self.n_colunas)
+            self.coluna_barra[inicio:self.n_colunas] = pares[:, 0]
+            self.coluna_tipo[inicio:self.n_colunas] = pares[:, 1]
+            self.cubo = _garantir(self.cubo, self.n_colunas, eixo=1)
+            colunas = self._mapa_coluna[barra, tipo]
+        return colunas
+
+    def _fatia(self, cenario, hora):
+        linha = self._linha_fatia.get((cenario, hora))
+        if linha is None:
+            linha = self.n_fatias
+            self.n_fatias += 1
+            self._linha_fatia[(cenario, hora)] = linha
+            self.fatia_cenario = _garantir(self.fatia_cenario, self.n_fatias)
+            self.fatia_hora = _garantir(self.fatia_hora, self.n_fatias)
+            self.cubo = _garantir(self.cubo, self.n_fatias)
+            self.por_tipo = _garantir(self.por_tipo, self.n_fatias)
+            self.fatia_cenario[linha], self.fatia_hora[linha] = cenario, hora
+        return linha
+
+    def ingerir_registro(self, registro):
+        """Indicadores de uma linha do JSONL da varredura (repetições sobrescrevem)."""
+        linha = self._cenario(registro['hash'], registro.get('nome'))
+        self.erro[linha] = 'erro' in registro
+        for nome, valor in (registro.get('indicadores') or {}).items():
+            if nome not in self.indicadores:
+                self.indicadores[nome] = np.full(len(self.erro), np.nan)
+            self.indicadores[nome][linha] = np.nan if valor is None else float(valor)
+
+    def ingerir_detalhes(self, hash_cenario, detalhes):
+        """Potência por barra x tipo x hora de um cenário (repetições sobrescrevem a hora)."""
+        cenario = self._cenario(hash_cenario)
+        barra = self.barras.get_indexer(detalhes['barra'])
+        validas = barra >= 0
+        self.barras_ignoradas += int((~validas).sum())
+        if not validas.any():
+            return
+        nomes_tipos, tipo = np.unique(np.asarray(detalhes['tipo'])[validas], return_inverse=True)
+        tipo = np.array([self._tipo(str(nome)) for nome in nomes_tipos], dtype=np.int64)[tipo]
+        hora = np.asarray(detalhes['hora'], dtype=np.int64)[validas] % HORAS
+        p_mw = np.asarray(detalhes['p_mw'], dtype=float)[validas]
+        colunas = self._colunas(barra[validas], tipo)
+        for h in np.unique(hora):
+            nesta_hora = hora == h
+            fatia = self._fatia(cenario, int(h))
+            linha = np.bincount(colunas[nesta_hora], weights=p_mw[nesta_hora], minlength=self.n_colunas)
+            self.cubo[fatia, :self.n_colunas] = linha
+            self.por_tipo[fatia, :] = 0.0
+            self.por_tipo[fatia, :len(self.tipos)] = np.bincount(self.coluna_tipo[:self.n_colunas], weights=linha,
+                                                                 minlength=len(self.tipos))
+
+    # --------------------------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------------------------
+    def filtrar_cenarios(self, nome=None, faixas=None, incluir_erros=False):
+        """Máscara dos cenários com nome contendo 'nome' e indicadores em {indicador: (min, max)}."""
+        n = self.n_cenarios
+        mascara = np.ones(n, dtype=bool) if incluir_erros else ~self.erro[:n]
+        for indicador, (minimo, maximo) in (faixas or {}).items():
+            if indicador not in self.indicadores:
+                raise ValueError(f"Indicador desconhecido: '{indicador}'.")
+            valores = self.indicadores[indicador][:n]
+            if minimo is not None:
+                mascara &= valores >= minimo
+            if maximo is not None:
+                mascara &= valores <= maximo
+        if nome:
+            mascara &= np.array([nome in rotulo for rotulo in self.nomes], dtype=bool)
+        return mascara
+
+    def _codigos_tipos(self, tipos):
+        selecionados = np.zeros(len(self.tipos), dtype=bool)
+        if tipos is None:
+            selecionados[:] = True
+        else:
+            for nome in tipos:
+                if nome in self._codigo_tipo:
+                    selecionados[self._codigo_tipo[nome]] = True
+        return selecionados
+
+    def consultar(self, agrupar='tipo', tipos=None, horas=None, barras=None, nome=None, faixas=None,
+                  incluir_erros=False, limite=LIMITE_PADRAO):
+        """
+        Soma da potência (MW) das fatias filtradas, agrupada por 'cenario',
+        'barra', 'tipo' ou 'hora'. Grupos de cenário e barra vêm ordenados
+        pelo módulo da soma e cortados em 'limite'.
+        """
+        if agrupar not in GRUPOS:
+            raise ValueError(f"Agrupamento inválido: '{agrupar}' (use {', '.join(GRUPOS)}).")
+        inicio = time.perf_counter()
+        n_fatias, n_colunas, n_tipos = self.n_fatias, self.n_colunas, len(self.tipos)
+        cenarios = self.filtrar_cenarios(nome, faixas, incluir_erros)
+        fatia_cenario = self.fatia_cenario[:n_fatias]
+        fatia_hora = self.fatia_hora[:n_fatias]
+        fatias = cenarios[fatia_cenario]
+        if horas is not None:
+            fatias &= np.isin(fatia_hora, np.asarray(list(horas)) % HORAS)
+        tipos_sel = self._codigos_tipos(tipos)
+
+        if barras is None and agrupar != 'barra':
+            # Só o cubo já somado por tipo: fatias x tipos
+            por_tipo = self.por_tipo[:n_fatias, :n_tipos]
+            if agrupar == 'tipo':
+                soma = por_tipo[fatias].sum(axis=0) * tipos_sel
+            else:
+                valor = por_tipo @ tipos_sel.astype(float)
+                soma = self._por_fatia(valor, fatias, agrupar)
+        else:
+            colunas = tipos_sel[self.coluna_tipo[:n_colunas]]
+            if barras is not None:
+                posicoes = self.barras.get_indexer(list(barras))
+                barras_sel = np.zeros(len(self.barras), dtype=bool)
+                barras_sel[posicoes[posicoes >= 0]] = True
+                colunas &= barras_sel[self.coluna_barra[:n_colunas]]
+            cubo = self.cubo[:n_fatias, :n_colunas]
+            if agrupar in ('barra', 'tipo'):
+                por_coluna = fatias.astype(np.float32) @ cubo * colunas
+                codigo, n_grupos = ((self.coluna_barra, len(self.barras)) if agrupar == 'barra'
+                                    else (self.coluna_tipo, n_tipos))
+                soma = np.bincount(codigo[:n_colunas], weights=por_coluna, minlength=n_grupos)
+            else:
+                valor = cubo @ colunas.astype(np.float32)
+                soma = self._por_fatia(valor, fatias, agrupar)
+
+        n_filtrados = int(cenarios.sum())
+        if agrupar == 'cenario':
+            indices = np.flatnonzero(cenarios)
+            rotulos = np.asarray(self.nomes, dtype=object)
+        elif agrupar == 'barra':
+            indices = np.flatnonzero(soma)
+            rotulos = self.nomes_barras
+        elif agrupar == 'tipo':
+            indices = np.flatnonzero(tipos_sel)
+            rotulos = np.asarray(self.tipos, dtype=object)
+        else:
+            indices = np.arange(HORAS) if horas is None else np.unique(np.asarray(list(horas)) % HORAS)
+            rotulos = np.arange(HORAS)
+        if agrupar in ('cenario', 'barra'):
+            indices = indices[np.argsort(-np.abs(soma[indices]), kind='stable')][:limite]
+        media = soma[indices] / (1 if agrupar == 'cenario' else max(n_filtrados, 1))
+        return {'agrupar': agrupar,
+                'grupos': [_rotulo(r) for r in rotulos[indices]],
+                'soma_mw': _lista(soma[indices]),
+                'media_mw': _lista(media),
+                'cenarios': n_filtrados,
+                'fatias': int(fatias.sum()),
+                'tempo_ms': 1000.0 * (time.perf_counter() - inicio)}
+
+    def _por_fatia(self, valor, fatias, agrupar):
+        if agrupar == 'cenario':
+            return np.bincount(self.fatia_cenario[:self.n_fatias][fatias], weights=valor[fatias],
+                               minlength=self.n_cenarios)
+        return np.bincount(self.fatia_hora[:self.n_fatias][fatias], weights=valor[fatias], minlength=HORAS)
+
+    def tabela_cenarios(self, nome=None, faixas=None, ordenar=None, crescente=True, incluir_erros=False,
+                        limite=LIMITE_PADRAO):
+        """Indicadores dos cenários filtrados, ordenados por um indicador."""
+        mascara = self.filtrar_cenarios(nome, faixas, incluir_erros)
+        indices = np.flatnonzero(mascara)
+        if ordenar is not None:
+            if ordenar not in self.indicadores:
+                raise ValueError(f"Indicador desconhecido: '{ordenar}'.")
+            chave = self.indicadores[ordenar][indices]
+            indices = indices[np.argsort(chave if crescente else -chave, kind='stable')]
+        indices = indices[:limite]
+        return {'cenarios': int(mascara.sum()),
+                'linhas': [{'hash': self.hashes[i], 'nome': self.nomes[i], 'erro': bool(self.erro[i]),
+                            **{k: _lista(v[i:i + 1])[0] for k, v in self.indicadores.items()}}
+                           for i in indices]}
+
+    def resumo(self):
+        return {'cenarios': self.n_cenarios, 'fatias': self.n_fatias, 'colunas': self.n_colunas,
+                'tipos': list(self.tipos), 'indicadores': sorted(self.indicadores),
+                'memoria_mb': (self.cubo.nbytes + self.por_tipo.nbytes) / 2 ** 20}
+
+
+# ##############################################################################
+# INGESTÃO INCREMENTAL DOS RESULTADOS DE UMA VARREDURA
+# ##############################################################################
+class FonteVarredura:
+    """Lê só o que é novo no JSONL (até o offset confirmado) e na pasta de detalhes."""
+
+    def __init__(self, arquivo_resultados):
+        self.arquivo_resultados = arquivo_resultados
+        self.arquivo_manifesto = arquivo_resultados + '.ckpt.json'
+        self.diretorio = diretorio_detalhes(arquivo_resultados)
+        self.offset = 0
+        self._detalhes_vistos = set()
+
+    def _offset_confirmado(self):
+        try:
+            with open(self.arquivo_manifesto, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get('offset', 0))
+        except (OSError, ValueError):
+            return None
+
+    def novos_registros(self):
+        if not os.path.exists(self.arquivo_resultados):
+            return []
+        tamanho = os.path.getsize(self.arquivo_resultados)
+        confirmado = self._offset_confirmado()
+        limite = tamanho if confirmado is None else min(confirmado, tamanho)
+        if limite < self.offset:
+            print(f"   -> AVISO: '{self.arquivo_resultados}' foi reescrito; relendo do início.")
+            self.offset = 0
+        if limite == self.offset:
+            return []
+        with open(self.arquivo_resultados, 'rb') as f:
+            f.seek(self.offset)
+            dados = f.read(limite - self.offset)
+        if confirmado is None:
+            # Sem manifesto: só até a última linha completa
+            dados = dados[:dados.rfind(b'\n') + 1]
+        self.offset += len(dados)
+        registros = []
+        for linha in dados.splitlines():
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if 'hash' in registro:
+                registros.append(registro)
+        return registros
+
+    def novos_detalhes(self, limite=None):
+        """Detalhes ainda não lidos (no máximo 'limite' arquivos), como pares (hash, tabela)."""
+        if not os.path.isdir(self.diretorio):
+            return []
+        novos = sorted(entrada.name for entrada in os.scandir(self.diretorio)
+                       if entrada.name.endswith('.npz') and entrada.name not in self._detalhes_vistos)[:limite]
+        detalhes = []
+        for nome in novos:
+            try:
+                detalhes.append((nome[:-len('.npz')], ler_detalhes_cenario(os.path.join(self.diretorio, nome))))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"   -> AVISO: Detalhes '{nome}' ilegíveis: {e}")
+            self._detalhes_vistos.add(nome)
+        return detalhes
+
+    def ler_novos(self, limite_detalhes=None):
+        """Só a leitura (sem tocar no cubo): (registros, detalhes) novos."""
+        return self.novos_registros(), self.novos_detalhes(limite_detalhes)
+
+    def atualizar(self, cubo):
+        """Ingere no cubo o que chegou desde a última chamada. Retorna (registros, detalhes)."""
+        registros, detalhes = self.ler_novos()
+        for registro in registros:
+            cubo.ingerir_registro(registro)
+        for hash_cenario, tabela in detalhes:
+            cubo.ingerir_detalhes(hash_cenario, tabela)
+        return len(registros), len(detalhes)
+
+
+# ##############################################################################
+# SERVIDOR HTTP ASSÍNCRONO
+# ##############################################################################
+PAGINA = """<!doctype html>
+<html lang="pt-br"><head><meta charset="utf-8"><title>Dashboard da Rede</title>
+<style>body{font-family:sans-serif;margin:2em}td,th{padding:2px 8px;text-align:right}
+input{width:8em}.barra{background:#4a90d9;height:10px}</style></head>
+<body><h1>Dashboard de Cenários</h1><p id="resumo"></p>
+<form id="filtros">Agrupar <select name="agrupar"><option>tipo<option>cenario<option>barra<option>hora</select>
+Tipos <input name="tipo" placeholder="solar,eolico"> Horas <input name="hora" placeholder="0-23">
+Barras <input name="barra" placeholder="índices"> Nome <input name="nome">
+Tensão mín. &ge; <input name="tensao_min_pu_min"> Carregamento &le; <input name="carregamento_max_pct_max">
+<button>Consultar</button></form><p id="info"></p><table id="tabela"></table>
+<script>
+const filtros = document.getElementById('filtros');
+async function consultar(evento) {
+  if (evento) evento.preventDefault();
+  const q = new URLSearchParams([...new FormData(filtros)].filter(([k, v]) => v));
+  const r = await (await fetch('/api/consulta?' + q)).json();
+  const s = await (await fetch('/api/resumo')).json();
+  resumo.textContent = `${s.rede.nome}: ${s.rede.barras} barras | ${s.cubo.cenarios} cenário(s), ` +
+                       `${s.cubo.fatias} fatia(s), ${s.cubo.memoria_mb.toFixed(1)} MB`;
+  if (r.erro) { info.textContent = r.erro; return; }
+  info.textContent = `${r.cenarios} cenário(s) filtrado(s), consulta em ${r.tempo_ms.toFixed(2)} ms`;
+  const m = Math.max(1e-9, ...r.soma_mw.map(Math.abs));
+  tabela.innerHTML = `<tr><th>${r.agrupar}<th>soma (MW)<th>média (MW)<th>` + r.grupos.map((g, i) =>
+    `<tr><td>${g}<td>${r.soma_mw[i].toFixed(2)}<td>${r.media_mw[i].toFixed(2)}` +
+    `<td style="text-align:left"><div class="barra" style="width:${300 * Math.abs(r.soma_mw[i]) / m}px"></div>`).join('');
+}
+filtros.onsubmit = consultar; consultar(); setInterval(consultar, 5000);
+</script></body></html>
+"""
+
+
+def _inteiros(texto):
+    """'0-5,18' -> [0, 1, 2, 3, 4, 5, 18]."""
+    valores = []
+    for parte in texto.split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if '-' in parte:
+            inicio, fim = parte.split('-', 1)
+            valores.extend(range(int(inicio), int(fim) + 1))
+        else:
+            valores.append(int(parte))
+    return valores
+
+
+def parametros_consulta(query, indicadores):
+    """Converte a query string nos argumentos de CuboCenarios.consultar/tabela_cenarios."""
+    params = {chave: valores[-1] for chave, valores in parse_qs(query).items()}
+    argumentos = {'faixas': {}}
+    for chave, valor in params.items():
+        if chave == 'agrupar':
+            argumentos['agrupar'] = valor
+        elif chave == 'tipo':
+            argumentos['tipos'] = [t.strip() for t in valor.split(',') if t.strip()]
+        elif chave == 'hora':
+            argumentos['horas'] = _inteiros(valor)
+        elif chave == 'barra':
+            argumentos['barras'] = _inteiros(valor)
+        elif chave == 'nome':
+            argumentos['nome'] = valor
+        elif chave == 'limite':
+            argumentos['limite'] = int(valor)
+        elif chave == 'erros':
+            argumentos['incluir_erros'] = valor not in ('0', 'false', '')
+        elif chave in ('ordenar', 'crescente'):
+            argumentos[chave] = valor if chave == 'ordenar' else valor not in ('0', 'false', '')
+        elif chave[-4:] in ('_min', '_max') and chave[:-4] in indicadores:
+            faixa = list(argumentos['faixas'].get(chave[:-4], (None, None)))
+            faixa[chave.endswith('_max')] = float(valor)
+            argumentos['faixas'][chave[:-4]] = tuple(faixa)
+        else:
+            raise ValueError(f"Parâmetro desconhecido: '{chave}'.")
+    return argumentos
+
+
+def resumo_rede(net):
+    """Agregados da rede base (dashboard.agregados_rede) em formato JSON."""
+    agregados = agregados_rede(net)
+    geracao = agregados['geracao'].loc['base']
+    cargas = agregados['cargas'].loc['base']
+    armazenamento = agregados['armazenamento'].loc['base']
+    return {'nome': str(net.name), 'barras': len(net.bus),
+            'geracao': [{'tipo': tipo, 'potencia_mw': float(linha.potencia_mw), 'unidades': int(linha.unidades)}
+                        for tipo, linha in geracao.iterrows()],
+            'cargas': dict(zip(cargas.index, _lista(cargas.to_numpy(dtype=float)))),
+            'armazenamento': dict(zip(armazenamento.index, _lista(armazenamento.to_numpy(dtype=float))))}
+
+
+class ServidorDashboard:
+    """Serve a página e a API JSON; a ingestão periódica lê os arquivos em uma thread e alimenta o cubo no laço."""
+
+    def __init__(self, net, arquivos_resultados, intervalo_s=INTERVALO_INGESTAO_S):
+        self.cubo = CuboCenarios(net.bus.index, net.bus['name'].to_numpy())
+        self.fontes = [FonteVarredura(arquivo) for arquivo in arquivos_resultados]
+        self.rede = resumo_rede(net)
+        self.intervalo_s = intervalo_s
+
+    def atualizar(self):
+        total_registros = total_detalhes = 0
+        for fonte in self.fontes:
+            registros, detalhes = fonte.atualizar(self.cubo)
+            total_registros += registros
+            total_detalhes += detalhes
+        return total_registros, total_detalhes
+
+    def _ler_novos(self):
+        return [fonte.ler_novos(LOTE_INGESTAO) for fonte in self.fontes]
+
+    async def _ingerir_periodicamente(self):
+        laco = asyncio.get_running_loop()
+        while True:
+            inicio = time.perf_counter()
+            # Arquivos lidos fora do laço de eventos; o cubo só é alterado nele
+            lidos = await laco.run_in_executor(None, self._ler_novos)
+            registros = detalhes = 0
+            lote_cheio = False
+            for novos_registros, novos_detalhes in lidos:
+                for registro in novos_registros:
+                    self.cubo.ingerir_registro(registro)
+                for hash_cenario, tabela in novos_detalhes:
+                    self.cubo.ingerir_detalhes(hash_cenario, tabela)
+                    await asyncio.sleep(0)   # Deixa as consultas pendentes passarem
+                registros += len(novos_registros)
+                detalhes += len(novos_detalhes)
+                lote_cheio |= len(novos_detalhes) == LOTE_INGESTAO
+            if registros or detalhes:
+                print(f"   -> Ingeridos {registros} resultado(s) e {detalhes} detalhe(s) em "
+                      f"{1000 * (time.perf_counter() - inicio):.1f} ms ({self.cubo.n_cenarios} cenário(s)).")
+            # Com lote cheio ainda há arquivos na pasta: segue sem esperar o intervalo
+            await asyncio.sleep(0 if lote_cheio else self.intervalo_s)
+
+    def _rotear(self, caminho, query):
+        if caminho == '/':
+            return 200, 'text/html; charset=utf-8', PAGINA.encode('utf-8')
+        if caminho == '/api/resumo':
+            corpo = {'rede': self.rede, 'cubo': self.cubo.resumo()}
+        elif caminho == '/api/consulta':
+            argumentos = parametros_consulta(query, self.cubo.indicadores)
+            argumentos.pop('ordenar', None)
+            argumentos.pop('crescente', None)
+            corpo = self.cubo.consultar(**argumentos)
+        elif caminho == '/api/cenarios':
+            argumentos = parametros_consulta(query, self.cubo.indicadores)
+            for chave in ('agrupar', 'tipos', 'horas', 'barras'):
+                argumentos.pop(chave, None)
+            corpo = self.cubo.tabela_cenarios(**argumentos)
+        else:
+            return 404, 'application/json', json.dumps({'erro': f"Caminho desconhecido: '{caminho}'."}).encode()
+        return 200, 'application/json', json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+
+    async def _atender(self, leitor, escritor):
+        try:
+            linha = await asyncio.wait_for(leitor.readline(), TEMPO_LIMITE_REQUISICAO_S)
+            while (await asyncio.wait_for(leitor.readline(), TEMPO_LIMITE_REQUISICAO_S)) not in (b'\r\n', b'\n', b''):
+                pass
+            partes = linha.decode('latin-1').split()
+            if len(partes) < 2 or partes[0] != 'GET':
+                status, tipo, corpo = 405, 'application/json', b'{"erro": "Apenas GET."}'
+            else:
+                url = urlsplit(partes[1])
+                try:
+                    status, tipo, corpo = self._rotear(url.path, url.query)
+                except ValueError as e:
+                    status, tipo = 400, 'application/json'
+                    corpo = json.dumps({'erro': str(e)}, ensure_ascii=False).encode('utf-8')
+                except Exception as e:
+                    print(f"   -> ERRO ao atender '{partes[1]}': {type(e).__name__}: {e}")
+                    status, tipo = 500, 'application/json'
+                    corpo = json.dumps({'erro': f"Erro interno: {type(e).__name__}: {e}"},
+                                       ensure_ascii=False).encode('utf-8')
+            motivo = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                      500: 'Internal Server Error'}[status]
+            cabecalho = (f"HTTP/1.1 {status} {motivo}\r\nContent-Type: {tipo}\r\n"
+                         f"Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n")
+            escritor.write(cabecalho.encode('latin-1') + corpo)
+            await escritor.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self, host='127.0.0.1', porta=PORTA_PADRAO):
+        servidor = await asyncio.start_server(self._atender, host, porta)
+        ingestao = asyncio.create_task(self._ingerir_periodicamente())
+        print(f"   -> Dashboard em http://{host}:{porta}/ (Ctrl+C para encerrar).")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            ingestao.cancel()
+
+
+def servir(arquivos_resultados=('resultados_varredura.jsonl',), arquivo_rede='rede_inicial.pkl',
+           host='127.0.0.1', porta=PORTA_PADRAO, intervalo_s=INTERVALO_INGESTAO_S):
+    """Carrega a rede base e serve o dashboard interativo até Ctrl+C."""
+    print("--- Servidor do Dashboard da Rede Elétrica ---")
+    try:
+        with open(arquivo_rede, 'rb') as f:
+            net = pickle.load(f)
+    except FileNotFoundError:
+        print(f"\nERRO: Arquivo '{arquivo_rede}' não encontrado.")
+        print("   -> Por favor, execute o script 'main.py' para gerar o arquivo.")
+        return
+    servidor = ServidorDashboard(net, list(arquivos_resultados), intervalo_s=intervalo_s)
+    inicio = time.perf_counter()
+    registros, detalhes = servidor.atualizar()
+    print(f"   -> Carga inicial: {registros} resultado(s), {detalhes} detalhe(s) em "
+          f"{time.perf_counter() - inicio:.2f} s.")
+    try:
+        asyncio.run(servidor.servir(host, porta))
+    except KeyboardInterrupt:
+        print("\n   -> Servidor encerrado.")
+
+
+# ##############################################################################
+# DEMONSTRAÇÃO
+# ##############################################################################
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        servir(sys.argv[1:])
+        sys.exit(0)
+
+    import tempfile
+
+    import pandapower as pp
+    import pandapower.networks as nw
+
+    from checkpoint import CheckpointVarredura
+    from dashboard import injecoes_por_barra
+
+    print("--- Demonstração: cubo de cenários sintéticos (case1354pegase) ---")
+    net = nw.case1354pegase()
+    pp.runpp(net)
+    base = injecoes_por_barra(net)
+    geracao_externa = base.tipo == 'Conexão externa'
+    cargas = base.tipo == 'Carga'
+    barras_gen = net.bus.index.to_numpy()
+    rng = np.random.default_rng(7)
+    n_cenarios = 2000
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, 'resultados_varredura.jsonl')
+        os.makedirs(diretorio_detalhes(arquivo))
+        fonte = FonteVarredura(arquivo)
+        cubo = CuboCenarios(net.bus.index, net.bus['name'].to_numpy())
+        checkpoint = CheckpointVarredura(arquivo, intervalo_s=float('inf'))
+
+        def gerar(inicio, fim):
+            for k in range(inicio, fim):
+                fator = rng.uniform(0.8, 1.2)
+                der = pd.DataFrame({'barra': rng.choice(barras_gen, 5, replace=False),
+                                    'tipo': rng.choice(['solar', 'eolico'], 5),
+                                    'p_mw': rng.uniform(10, 200, 5)})
+                tabela = base.copy()
+                tabela.loc[cargas, 'p_mw'] *= fator
+                tabela.loc[geracao_externa, 'p_mw'] -= der.p_mw.sum() / geracao_externa.sum()
+                tabela = pd.concat([tabela, der], ignore_index=True)
+                chave = f"{k:064x}"
+                gravar_detalhes_cenario(fonte.diretorio, chave, tabela, hora=rng.integers(HORAS))
+                checkpoint.registrar(chave, {'hash': chave, 'nome': f"cenario_{k:05d}", 'indicadores': {
+                    'perdas_totais_mw': float(rng.uniform(60, 120)), 'tensao_min_pu': float(rng.uniform(0.9, 1.0)),
+                    'tensao_max_pu': float(rng.uniform(1.0, 1.1)),
+                    'carregamento_max_pct': float(rng.uniform(50, 130))}})
+            checkpoint.salvar()
+
+        for inicio, fim in ((0, n_cenarios // 2), (n_cenarios // 2, n_cenarios)):
+            gerar(inicio, fim)
+            t0 = time.perf_counter()
+            registros, detalhes = fonte.atualizar(cubo)
+            print(f"   -> Ingestão incremental: +{registros} resultado(s), +{detalhes} detalhe(s) em "
+                  f"{time.perf_counter() - t0:.2f} s -> {cubo.n_cenarios} cenário(s), {cubo.n_colunas} colunas.")
+
+        consultas = [{'agrupar': 'tipo'},
+                     {'agrupar': 'hora', 'tipos': ['solar'], 'faixas': {'tensao_min_pu': (0.95, None)}},
+                     {'agrupar': 'cenario', 'tipos': ['solar', 'eolico'], 'limite': 5},
+                     {'agrupar': 'barra', 'tipos': ['Carga'], 'horas': range(18, 22),
+                      'faixas': {'carregamento_max_pct': (None, 100.0)}, 'limite': 5},
+                     {'agrupar': 'tipo', 'barras': barras_gen[:100], 'nome': '1'}]
+        for argumentos in consultas:
+            resultado = cubo.consultar(**argumentos)
+            print(f"\n   -> consultar({', '.join(f'{k}={v!r}' for k, v in argumentos.items() if k != 'barras')}"
+                  f"): {resultado['cenarios']} cenário(s), {resultado['tempo_ms']:.2f} ms")
+            for grupo, soma in list(zip(resultado['grupos'], resultado['soma_mw']))[:6]:
+                print(f"      {grupo!s:>20}: {soma:14,.1f} MW")
+        print(f"\n   -> Cubo em memória: {cubo.resumo()['memoria_mb']:.1f} MB. "
+              "Para servir: python servidor_dashboard.py resultados_varredura.jsonl")
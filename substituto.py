@@ -0,0 +1,326 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cache_fluxo import impressao_digital
+from cenarios import EspacoCenarios
+
+# ##############################################################################
+# MODELO SUBSTITUTO (SURROGATE) PARA TRIAGEM RÁPIDA DE CENÁRIOS
+# ##############################################################################
+# Amostra configurações de DERs/baterias, resolve cada uma com o pipeline real
+# (main.simular_rede + calcular_indicadores) e treina, por indicador, três
+# regressões de gradient boosting por histogramas (quantis 10%, 50% e 90%).
+# O intervalo é calibrado num conjunto separado (regressão quantílica
+# conformalizada): o alargamento Q garante a cobertura pedida nos dados de
+# calibração.
+#
+# Na triagem, a previsão só é aceita se a meia-largura do intervalo estiver
+# abaixo do limite do indicador e os atributos estiverem dentro da faixa vista
+# no treino; senão o cenário vai para o simulador exato.
+#
+# O modelo é salvo em disco pela impressão digital da rede base (a mesma do
+# cache do fluxo), pelo formato dos atributos (número de DERs e baterias) e
+# pelo hash da especificação do treino (amostras, barras candidatas, semente
+# e configuração base inteira): pedir outro treino nunca reaproveita um
+# modelo treinado com outra especificação.
+
+INDICADORES = ('perdas_totais_mw', 'tensao_min_pu', 'carregamento_max_pct')
+# Meia-largura máxima do intervalo para aceitar a previsão (perdas do caso ficam
+# entre ~600 e ~960 MW com os DERs/baterias amostrados)
+LIMITES_INCERTEZA = {'perdas_totais_mw': 80.0, 'tensao_min_pu': 0.01, 'carregamento_max_pct': 5.0}
+QUANTIS = (0.1, 0.5, 0.9)
+COBERTURA_ALVO = 0.9
+FRACAO_CALIBRACAO = 0.25
+DIRETORIO_MODELOS = 'modelos_substitutos'
+PARAMETROS_GBR = {'max_iter': 300, 'max_depth': 4, 'learning_rate': 0.05, 'min_samples_leaf': 5}
+
+
+# ##############################################################################
+# ATRIBUTOS
+# ##############################################################################
+def descritores_barras(net):
+    """
+    Descritores elétricos de cada barra (pelo nome), do caso base resolvido:
+    tensão nominal, |V| e ângulo base e número de ramos conectados.
+    """
+    ramos = np.concatenate([net.line.from_bus.values, net.line.to_bus.values,
+                            net.trafo.hv_bus.values, net.trafo.lv_bus.values])
+    grau = np.bincount(ramos, minlength=int(net.bus.index.max()) + 1)
+    descritores = {}
+    for indice, nome in net.bus.name.items():
+        descritores[nome] = (float(net.bus.vn_kv[indice]), float(net.res_bus.vm_pu[indice]),
+                             float(net.res_bus.va_degree[indice]), float(grau[indice]))
+    return descritores
+
+
+def atributos(configs, descritores):
+    """Vetor de atributos do cenário: por DER e por bateria, capacidades, tipo e descritores da barra."""
+    # Unidades em barras inexistentes são puladas por main.simular_rede: entram zeradas
+    vetor = []
+    for barra, capacidade, _, tipo in configs['ders']['unidades']:
+        if barra in descritores:
+            vetor += [capacidade, 1.0 if tipo == 'solar' else 0.0, *descritores[barra]]
+        else:
+            vetor += [0.0] * 6
+    for barra, potencia, energia, _ in configs['storage']['unidades']:
+        vetor += [potencia, energia, *descritores[barra]] if barra in descritores else [0.0] * 6
+    return np.array(vetor, dtype=float)
+
+
+def formato_atributos(configs):
+    return f"ders{len(configs['ders']['unidades'])}_baterias{len(configs['storage']['unidades'])}"
+
+
+def especificacao_treino(base, n_amostras, barras_candidatas, semente):
+    """
+    O que define um treino além da rede e do formato: amostragem e a
+    configuração base (inclusive o que não vira atributo, como o despacho das
+    baterias, que muda os indicadores). Devolve (especificação, hash).
+    """
+    especificacao = {'n_amostras': int(n_amostras), 'barras_candidatas': list(barras_candidatas),
+                     'semente': semente, 'base': base}
+    # Ida e volta pelo JSON: tuplas viram listas, como no modelo salvo
+    especificacao = json.loads(json.dumps(especificacao, sort_keys=True, default=str))
+    texto = json.dumps(especificacao, sort_keys=True, separators=(',', ':'))
+    return especificacao, hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def espaco_amostras(base, n, barras_candidatas, semente=0):
+    """
+    Espaço de cenários (cenarios.EspacoCenarios) com 'n' amostras aleatórias:
+    barra, capacidade e tipo de cada DER; barra, potência e energia de cada bateria.
+    """
+    parametros = {}
+    for k, (_, capacidade, _, _) in enumerate(base['ders']['unidades']):
+        parametros[f'ders.unidades.{k}.0'] = {'escolha': list(barras_candidatas)}
+        parametros[f'ders.unidades.{k}.1'] = {'uniforme': [0.0, 2.0 * capacidade]}
+        parametros[f'ders.unidades.{k}.3'] = {'escolha': ['solar', 'eolico']}
+    for k, (_, potencia, energia, _) in enumerate(base['storage']['unidades']):
+        parametros[f'storage.unidades.{k}.0'] = {'escolha': list(barras_candidatas)}
+        parametros[f'storage.unidades.{k}.1'] = {'uniforme': [0.0, 2.0 * potencia]}
+        parametros[f'storage.unidades.{k}.2'] = {'uniforme': [0.0, 2.0 * energia]}
+    especificacao = {'nome': 'substituto', 'variacoes': {'amostras': {'n': n, 'semente': semente,
+                                                                       'parametros': parametros}}}
+    return EspacoCenarios(especificacao, base=copy.deepcopy(base))
+
+
+def simular_cenarios(lista_configs, processos=1):
+    """Indicadores exatos de cada cenário (pipeline real, com o cache do fluxo)."""
+    from main import _executar_cenario
+
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            saidas = list(executor.map(_executar_cenario, lista_configs))
+    else:
+        saidas = [_executar_cenario(c) for c in lista_configs]
+    return [indicadores for _, _, indicadores in saidas]
+
+
+# ##############################################################################
+# MODELO
+# ##############################################################################
+class ModeloSubstituto:
+    """Regressões quantílicas calibradas, uma trinca por indicador."""
+
+    def __init__(self, impressao, formato, descritores, indicadores=INDICADORES, especificacao=None,
+                 hash_especificacao=''):
+        self.impressao = impressao
+        self.formato = formato
+        self.especificacao = especificacao
+        self.hash_especificacao = hash_especificacao
+        self.descritores = descritores
+        self.indicadores = tuple(indicadores)
+        self.modelos = {}
+        self.alargamento = {}
+        self.faixa = None
+        self.num_amostras = 0
+
+    def treinar(self, X, Y, semente=0):
+        """X: amostras x atributos; Y: amostras x indicadores. Separa uma parte para calibrar."""
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        rng = np.random.default_rng(semente)
+        ordem = rng.permutation(len(X))
+        n_cal = max(1, int(FRACAO_CALIBRACAO * len(X)))
+        calibracao, treino = ordem[:n_cal], ordem[n_cal:]
+        self.faixa = (np.nanmin(X[treino], axis=0), np.nanmax(X[treino], axis=0))
+        self.num_amostras = len(X)
+
+        for j, nome in enumerate(self.indicadores):
+            validos = ~np.isnan(Y[:, j])
+            tr, cal = treino[validos[treino]], calibracao[validos[calibracao]]
+            self.modelos[nome] = [HistGradientBoostingRegressor(loss='quantile', quantile=q, random_state=semente,
+                                                                **PARAMETROS_GBR).fit(X[tr], Y[tr, j])
+                                  for q in QUANTIS]
+            # Calibração conformal: quanto alargar [q10, q90] para cobrir COBERTURA_ALVO
+            baixo, _, alto = (m.predict(X[cal]) for m in self.modelos[nome])
+            escores = np.maximum(baixo - Y[cal, j], Y[cal, j] - alto)
+            nivel = min(1.0, np.ceil((len(cal) + 1) * COBERTURA_ALVO) / max(len(cal), 1))
+            self.alargamento[nome] = float(np.quantile(escores, nivel)) if len(cal) else 0.0
+        return self
+
+    def prever(self, X):
+        """Por indicador: (previsão, meia-largura do intervalo) e a máscara 'dentro da faixa de treino'."""
+        X = np.atleast_2d(X)
+        saida = {}
+        for nome in self.indicadores:
+            baixo, mediana, alto = (m.predict(X) for m in self.modelos[nome])
+            q = self.alargamento[nome]
+            saida[nome] = (mediana, np.maximum((alto - baixo) / 2 + q, 0.0))
+        minimo, maximo = self.faixa
+        dentro = np.all((X >= minimo - 1e-9) & (X <= maximo + 1e-9) | np.isnan(X), axis=1)
+        return saida, dentro
+
+    @staticmethod
+    def caminho(diretorio, impressao, formato, hash_especificacao):
+        return os.path.join(diretorio, f"{impressao}_{formato}_{hash_especificacao[:16]}.pkl")
+
+    def salvar(self, diretorio=DIRETORIO_MODELOS):
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = self.caminho(diretorio, self.impressao, self.formato, self.hash_especificacao)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as f:
+            # Salva só o estado (a classe pode ter sido definida em __main__)
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        return caminho
+
+    @classmethod
+    def carregar(cls, impressao, formato, especificacao, hash_especificacao, diretorio=DIRETORIO_MODELOS):
+        """Modelo salvo para esta rede, formato de atributos e especificação de treino, ou None."""
+        try:
+            with open(cls.caminho(diretorio, impressao, formato, hash_especificacao), 'rb') as f:
+                estado = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if estado.get('especificacao') != especificacao:
+            # Colisão do prefixo do hash no nome do arquivo: treino diferente
+            return None
+        modelo = cls.__new__(cls)
+        modelo.__dict__.update(estado)
+        return modelo
+
+
+def rede_base():
+    """Caso base do main.py resolvido (sem DERs), com a impressão digital usada no cache do fluxo."""
+    import pandapower.networks as nw
+
+    from convergencia import executar_fluxo_robusto
+    from main import OPCOES_FLUXO
+
+    net = nw.case1354pegase()
+    impressao = impressao_digital(net, OPCOES_FLUXO)
+    executar_fluxo_robusto(net, verbose=False, **OPCOES_FLUXO)
+    return net, impressao
+
+
+def treinar_substituto(base, n_amostras=200, barras_candidatas=None, processos=1, semente=0,
+                       diretorio=DIRETORIO_MODELOS, retreinar=False, verbose=True):
+    """
+    Carrega o modelo salvo desta rede com a mesma especificação de treino, ou
+    amostra 'n_amostras' cenários, resolve-os com o simulador exato, treina e
+    salva. Com 'retreinar', ignora o modelo salvo.
+    """
+    net, impressao = rede_base()
+    formato = formato_atributos(base)
+    if barras_candidatas is None:
+        barras_candidatas = [b for b, _, _, _ in base['ders']['unidades']]
+    especificacao, hash_especificacao = especificacao_treino(base, n_amostras, barras_candidatas, semente)
+    modelo = None if retreinar else ModeloSubstituto.carregar(impressao, formato, especificacao,
+                                                               hash_especificacao, diretorio)
+    if modelo is not None:
+        if verbose:
+            print(f"   -> Modelo substituto carregado ({modelo.num_amostras} amostras, rede {impressao[:10]}, "
+                  f"treino {hash_especificacao[:10]})")
+        return modelo
+
+    descritores = descritores_barras(net)
+    espaco = espaco_amostras(base, n_amostras, barras_candidatas, semente=semente)
+    lista = [configs for _, configs in espaco.expandir()]
+
+    inicio = time.perf_counter()
+    resultados = simular_cenarios(lista, processos=processos)
+    tempo_exato = time.perf_counter() - inicio
+    X = np.array([atributos(c, descritores) for c in lista])
+    Y = np.array([[r.get(nome, np.nan) for nome in INDICADORES] for r in resultados], dtype=float)
+
+    inicio = time.perf_counter()
+    modelo = ModeloSubstituto(impressao, formato, descritores, especificacao=especificacao,
+                              hash_especificacao=hash_especificacao).treinar(X, Y, semente=semente)
+    caminho = modelo.salvar(diretorio)
+    if verbose:
+        print(f"   -> {n_amostras} cenários exatos em {tempo_exato:.1f} s; treino em "
+              f"{time.perf_counter() - inicio:.1f} s; modelo salvo em '{caminho}'")
+    return modelo
+
+
+class TriagemSubstituta:
+    """
+    Avalia cenários com o modelo substituto e recorre ao simulador exato
+    quando a previsão é incerta ou está fora da faixa de treino.
+    """
+
+    def __init__(self, modelo, limites=None):
+        self.modelo = modelo
+        self.limites = dict(LIMITES_INCERTEZA, **(limites or {}))
+        self.previstos = 0
+        self.exatos = 0
+
+    def avaliar(self, lista_configs, processos=1):
+        """Lista de (indicadores, origem) com origem 'substituto' ou 'exato'."""
+        X = np.array([atributos(c, self.modelo.descritores) for c in lista_configs])
+        previsoes, dentro = self.modelo.prever(X)
+        confiavel = dentro.copy()
+        for nome, (_, meia_largura) in previsoes.items():
+            confiavel &= meia_largura <= self.limites[nome]
+
+        saida = [None] * len(lista_configs)
+        incertos = np.flatnonzero(~confiavel)
+        for k in np.flatnonzero(confiavel):
+            indicadores = {nome: float(previsoes[nome][0][k]) for nome in previsoes}
+            indicadores.update({f'{nome}_incerteza': float(previsoes[nome][1][k]) for nome in previsoes})
+            saida[k] = (indicadores, 'substituto')
+        if len(incertos):
+            exatos = simular_cenarios([lista_configs[k] for k in incertos], processos=processos)
+            for k, indicadores in zip(incertos, exatos):
+                saida[k] = (indicadores, 'exato')
+        self.previstos += int(confiavel.sum())
+        self.exatos += len(incertos)
+        return saida
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    from main import configurar_cenario
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = configurar_cenario()
+    candidatas = [3, 20, 21, 25, 28, 43, 52, 58]
+    modelo = treinar_substituto(base, n_amostras=160, barras_candidatas=candidatas)
+
+    # Validação em cenários novos: previsão x simulador exato
+    teste = [c for _, c in espaco_amostras(base, 30, candidatas, semente=123).expandir()]
+    inicio = time.perf_counter()
+    triagem = TriagemSubstituta(modelo)
+    avaliados = triagem.avaliar(teste)
+    tempo_triagem = time.perf_counter() - inicio
+    exatos = simular_cenarios(teste)
+    X = np.array([atributos(c, modelo.descritores) for c in teste])
+    previsoes, _ = modelo.prever(X)
+    print(f"   -> Triagem de {len(teste)} cenários em {tempo_triagem:.1f} s: {triagem.previstos} pelo substituto, "
+          f"{triagem.exatos} pelo simulador exato")
+    for nome in INDICADORES:
+        real = np.array([r[nome] for r in exatos])
+        erro = np.abs(previsoes[nome][0] - real)
+        cobertura = np.mean(erro <= previsoes[nome][1])
+        print(f"      -> {nome}: erro médio {erro.mean():.4f}, meia-largura média {previsoes[nome][1].mean():.4f}, "
+              f"cobertura do intervalo {cobertura:.0%}, faixa real [{real.min():.4f}; {real.max():.4f}]")
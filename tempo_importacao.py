@@ -0,0 +1,137 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# ##############################################################################
+# TEMPO DE IMPORTAÇÃO (python -X importtime)
+# ##############################################################################
+# Cada medição roda um interpretador novo com '-X importtime' e lê do stderr o
+# tempo acumulado de cada import de primeiro nível. Os módulos que o
+# interpretador carrega sozinho (medidos no mesmo instante com '-c pass') são
+# descontados: o número é o custo do código medido, não o da subida do Python.
+# Cada relatório vai para um histórico JSONL, comparado com a execução
+# anterior; quem passar do orçamento é acusado. Só biblioteca padrão aqui,
+# para o próprio benchmark não pesar na subida que ele mede.
+
+HISTORICO_PADRAO = 'benchmarks.jsonl'
+REPETICOES_PADRAO = 3
+N_MODULOS_RELATORIO = 3
+
+
+def _ler_importtime(saida):
+    """Linhas do -X importtime -> lista de (módulo, profundidade, próprio_us, acumulado_us)."""
+    entradas = []
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        campos = linha[len('import time:'):].split('|')
+        if len(campos) != 3 or not campos[0].strip().isdigit():
+            continue   # Cabeçalho
+        nome = campos[2].rstrip()
+        modulo = nome.lstrip()
+        entradas.append((modulo, (len(nome) - len(modulo) - 1) // 2, int(campos[0]), int(campos[1])))
+    return entradas
+
+
+def _executar(codigo, diretorio):
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=diretorio,
+                              capture_output=True, text=True)
+    parede_ms = 1000.0 * (time.perf_counter() - inicio)
+    if processo.returncode != 0:
+        ultima = (processo.stderr.strip().splitlines() or ['sem saída'])[-1]
+        raise RuntimeError(f"Falha ao medir '{codigo}': {ultima}")
+    return _ler_importtime(processo.stderr), parede_ms
+
+
+def medir_importacao(codigo, diretorio='.', repeticoes=REPETICOES_PADRAO):
+    """
+    Mediana, em 'repeticoes' processos novos, do tempo de importação de
+    'codigo' (ms, pelo -X importtime), do tempo de parede do processo e do
+    interpretador vazio, mais os imports de primeiro nível mais caros.
+    """
+    importacao, processo, interpretador = [], [], []
+    por_modulo = {}
+    for _ in range(repeticoes):
+        base, parede_base = _executar('pass', diretorio)
+        ja_carregados = {modulo for modulo, *_ in base}
+        entradas, parede = _executar(codigo, diretorio)
+        primeiro_nivel = [(modulo, acumulado / 1000.0) for modulo, profundidade, _, acumulado in entradas
+                          if profundidade == 0 and modulo not in ja_carregados]
+        importacao.append(sum(ms for _, ms in primeiro_nivel))
+        processo.append(parede)
+        interpretador.append(parede_base)
+        for modulo, ms in primeiro_nivel:
+            por_modulo.setdefault(modulo, []).append(ms)
+    modulos = sorted(((modulo, statistics.median(v)) for modulo, v in por_modulo.items()), key=lambda x: -x[1])
+    return {'importacao_ms': statistics.median(importacao),
+            'processo_ms': statistics.median(processo),
+            'interpretador_ms': statistics.median(interpretador),
+            'modulos': [{'modulo': modulo, 'ms': ms} for modulo, ms in modulos]}
+
+
+def ultimo_registro(historico=HISTORICO_PADRAO):
+    """Último registro do histórico de benchmarks (None se não houver)."""
+    if not historico or not os.path.exists(historico):
+        return None
+    ultimo = None
+    with open(historico, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                ultimo = json.loads(linha)
+            except ValueError:
+                continue
+    return ultimo
+
+
+def gravar_historico(registro, historico=HISTORICO_PADRAO):
+    """Acrescenta um registro (com data e versão do Python) ao histórico JSONL."""
+    registro = {'data': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0], **registro}
+    with open(historico, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    return registro
+
+
+def relatorio_importacao(alvos, diretorio='.', repeticoes=REPETICOES_PADRAO, orcamentos_ms=None, anterior=None):
+    """
+    Mede cada alvo {nome: código} e imprime a tabela, comparada ao registro
+    'anterior' do histórico. Devolve (medições por alvo, alvos acima do
+    orçamento {nome: ms}).
+    """
+    orcamentos_ms = orcamentos_ms or {}
+    anteriores = (anterior or {}).get('importacao', {})
+    print(f"\n--- Tempo de importação (python -X importtime, mediana de {repeticoes}) ---")
+    print(f"  {'alvo':<12}{'import (ms)':>13}{'processo (ms)':>15}{'anterior (ms)':>15}{'orçamento':>11}")
+    medicoes, estourados = {}, {}
+    for nome, codigo in alvos.items():
+        medicao = medir_importacao(codigo, diretorio, repeticoes)
+        medicao['modulos'] = medicao['modulos'][:N_MODULOS_RELATORIO]
+        medicoes[nome] = medicao
+        ms = medicao['importacao_ms']
+        antes = anteriores.get(nome, {}).get('importacao_ms')
+        orcamento = orcamentos_ms.get(nome)
+        if orcamento is not None and ms > orcamento:
+            estourados[nome] = ms
+        print(f"  {nome:<12}{ms:>13.1f}{medicao['processo_ms']:>15.1f}"
+              f"{'-' if antes is None else f'{antes:.1f}':>15}{'-' if orcamento is None else f'{orcamento:.0f}':>11}")
+        if medicao['modulos']:
+            print("      " + ", ".join(f"{m['modulo']} {m['ms']:.1f}" for m in medicao['modulos']))
+    interpretador = statistics.median(m['interpretador_ms'] for m in medicoes.values()) if medicoes else 0.0
+    print(f"  (interpretador vazio: {interpretador:.1f} ms por processo)")
+    for nome, ms in estourados.items():
+        print(f"   -> AVISO: '{nome}' importa em {ms:.1f} ms, acima do orçamento de {orcamentos_ms[nome]:.0f} ms.")
+    return medicoes, estourados
+
+
+# ##############################################################################
+# DEMONSTRAÇÃO
+# ##############################################################################
+if __name__ == "__main__":
+    # Ex.: python tempo_importacao.py numpy pandas pandapower
+    modulos = sys.argv[1:] or ['json', 'numpy', 'pandas']
+    relatorio_importacao({modulo: f"import {modulo}" for modulo in modulos})
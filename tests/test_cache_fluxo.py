@@ -0,0 +1,89 @@
+import copy
+import os
+
+import pandapower as pp
+import pandapower.networks as nw
+import pytest
+
+from cache_fluxo import CacheFluxo, aplicar_resultados, extrair_resultados, impressao_digital
+
+OPCOES = {'max_iteration': 30}
+
+
+@pytest.fixture(scope='module')
+def rede():
+    net = nw.case9()
+    pp.create_storage(net, 4, p_mw=5.0, max_e_mwh=20.0, soc_percent=50.0)
+    return net
+
+
+@pytest.fixture
+def copia(rede):
+    return copy.deepcopy(rede)
+
+
+def test_impressao_estavel_e_independente_da_ordem_das_linhas(rede, copia):
+    assert impressao_digital(copia, OPCOES) == impressao_digital(rede, OPCOES)
+    copia.line = copia.line.iloc[::-1]
+    copia.load = copia.load.sample(frac=1.0, random_state=0)
+    assert impressao_digital(copia, OPCOES) == impressao_digital(rede, OPCOES)
+
+
+@pytest.mark.parametrize('tabela, coluna, valor', [
+    ('load', 'p_mw', 123.0),
+    ('line', 'max_i_ka', 0.01),            # Muda o loading_percent guardado
+    ('line', 'in_service', False),
+    ('gen', 'vm_pu', 1.03),
+    ('storage', 'p_mw', -5.0),
+    ('ext_grid', 'va_degree', 10.0),
+])
+def test_colunas_eletricas_invalidam(rede, copia, tabela, coluna, valor):
+    copia[tabela].loc[copia[tabela].index[0], coluna] = valor
+    assert impressao_digital(copia, OPCOES) != impressao_digital(rede, OPCOES)
+
+
+@pytest.mark.parametrize('tabela, coluna, valor', [
+    ('bus', 'name', 'renomeada'),
+    ('line', 'std_type', 'outro'),
+    ('storage', 'max_e_mwh', 80.0),        # Dado de energia, não entra no fluxo
+    ('storage', 'soc_percent', 10.0),
+])
+def test_colunas_nao_eletricas_nao_invalidam(rede, copia, tabela, coluna, valor):
+    copia[tabela].loc[copia[tabela].index[0], coluna] = valor
+    assert impressao_digital(copia, OPCOES) == impressao_digital(rede, OPCOES)
+
+
+def test_opcoes_do_fluxo_entram_na_chave(rede):
+    assert impressao_digital(rede, {'max_iteration': 10}) != impressao_digital(rede, OPCOES)
+
+
+def test_cache_em_memoria_e_em_disco(tmp_path, copia):
+    pp.runpp(copia)
+    chave = impressao_digital(copia, OPCOES)
+    resultados = extrair_resultados(copia)
+
+    cache = CacheFluxo(diretorio=str(tmp_path), capacidade_memoria=1)
+    assert cache.obter(chave) is None
+    cache.guardar(chave, resultados)
+    assert cache.obter(chave) is resultados
+    cache.guardar('outra', {})
+    assert cache.obter(chave) is not None             # Saiu da memória, volta do disco
+    assert (cache.acertos, cache.faltas) == (2, 1)
+
+    nova = CacheFluxo(diretorio=str(tmp_path))        # Outro processo da varredura
+    rede_nova = copy.deepcopy(copia)
+    for nome in resultados:
+        rede_nova[nome] = rede_nova[nome].iloc[0:0]
+    aplicar_resultados(rede_nova, nova.obter(chave))
+    assert rede_nova.converged
+    assert rede_nova.res_bus.equals(copia.res_bus)
+    assert not [nome for nome in os.listdir(tmp_path) if nome.endswith('.tmp')]
+
+
+def test_disco_despeja_os_mais_antigos(tmp_path):
+    cache = CacheFluxo(diretorio=str(tmp_path), capacidade_disco=2)
+    for k, chave in enumerate(('a', 'b', 'c')):
+        cache.guardar(chave, {'k': k})
+        os.utime(os.path.join(tmp_path, f"{chave}.pkl"), (k, k))
+    cache.guardar('d', {})
+    assert sorted(os.listdir(tmp_path)) == ['c.pkl', 'd.pkl']
@@ -0,0 +1,70 @@
+import pytest
+
+import dashboard
+import main
+import servidor_dashboard
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    """Substitui os handlers da CLI e registra com que argumentos foram chamados."""
+    registro = []
+    monkeypatch.setattr(main, 'importar_dependencias', lambda subcomando: registro.append(('importar', subcomando)))
+    monkeypatch.setattr(main, 'main', lambda **kw: registro.append(('simular', kw)))
+    monkeypatch.setattr(main, 'executar_varredura', lambda *a, **kw: registro.append(('varredura', a, kw)))
+    monkeypatch.setattr(main, 'executar_benchmark', lambda *a: registro.append(('benchmark', a)) or 0)
+    monkeypatch.setattr(dashboard, 'analisar_rede', lambda *a: registro.append(('dashboard', a)))
+    monkeypatch.setattr(servidor_dashboard, 'servir', lambda *a, **kw: registro.append(('servidor', a, kw)))
+    return registro
+
+
+def test_sem_argumentos_simula(chamadas):
+    assert main.executar_cli([]) == 0
+    assert chamadas == [('importar', 'simular'), ('simular', {'usar_cache': True, 'executar_dashboard': True})]
+
+
+def test_simular_com_opcoes(chamadas):
+    main.executar_cli(['simulate', '--sem-cache', '--sem-dashboard'])
+    assert chamadas[-1] == ('simular', {'usar_cache': False, 'executar_dashboard': False})
+
+
+def test_forma_antiga_com_arquivo_json_vira_varredura(chamadas):
+    main.executar_cli(['arquivos_cenarios/exemplo_varredura.json'])
+    assert chamadas[0] == ('importar', 'varredura')
+    _, posicionais, nomeados = chamadas[1]
+    assert posicionais == ('arquivos_cenarios/exemplo_varredura.json', 'resultados_varredura.jsonl')
+    assert nomeados == {'processos': None, 'intervalo_checkpoint_s': main.INTERVALO_PADRAO_S,
+                        'gravar_detalhes': True}
+
+
+def test_varredura_com_opcoes(chamadas):
+    main.executar_cli(['sweep', 'c.json', '--resultados', 'r.jsonl', '--processos', '3',
+                       '--intervalo-checkpoint', '5', '--sem-detalhes'])
+    assert chamadas[1] == ('varredura', ('c.json', 'r.jsonl'),
+                           {'processos': 3, 'intervalo_checkpoint_s': 5.0, 'gravar_detalhes': False})
+
+
+def test_dashboard_repassa_a_rede(chamadas):
+    main.executar_cli(['dashboard', '--rede', 'outra.pkl'])
+    assert chamadas == [('importar', 'dashboard'), ('dashboard', ('outra.pkl',))]
+
+
+def test_dashboard_servidor(chamadas):
+    main.executar_cli(['dashboard', '--servidor', 'a.jsonl', 'b.jsonl', '--porta', '9000'])
+    assert chamadas[-1] == ('servidor', (['a.jsonl', 'b.jsonl'], 'rede_inicial.pkl'), {'porta': 9000})
+    main.executar_cli(['dashboard', '--servidor'])
+    assert chamadas[-1] == ('servidor', (['resultados_varredura.jsonl'], 'rede_inicial.pkl'),
+                            {'porta': servidor_dashboard.PORTA_PADRAO})
+
+
+@pytest.mark.parametrize('argv', [['dashboard', 'r.jsonl'], ['dashboard', '--porta', '9000']])
+def test_dashboard_rejeita_opcoes_do_servidor(chamadas, argv):
+    with pytest.raises(SystemExit):
+        main.executar_cli(argv)
+    assert chamadas == []
+
+
+def test_benchmark(chamadas):
+    assert main.executar_cli(['benchmark', '--repeticoes', '1', '--historico', '']) == 0
+    assert chamadas == [('benchmark', (1, '', False))]
+
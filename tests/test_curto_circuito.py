@@ -0,0 +1,55 @@
+import pandapower as pp
+import pandapower.networks as nw
+import pytest
+
+import curto_circuito
+
+
+@pytest.fixture
+def montagens(monkeypatch):
+    """Cache vazio e contagem das montagens da matriz de curto."""
+    monkeypatch.setattr(curto_circuito, '_cache_topologias', curto_circuito.OrderedDict())
+    monkeypatch.setattr(curto_circuito, '_cache_impressoes', curto_circuito.OrderedDict())
+    chamadas = []
+    montar = curto_circuito.montar_ybus_curto
+
+    def contar(net, c=curto_circuito.C_MAX):
+        chamadas.append(c)
+        return montar(net, c)
+    monkeypatch.setattr(curto_circuito, 'montar_ybus_curto', contar)
+    return chamadas
+
+
+def test_mesma_rede_nao_remonta_a_matriz(montagens):
+    net = nw.case9()
+    curto = curto_circuito.obter_curto_circuito(net)
+    assert curto_circuito.obter_curto_circuito(net) is curto
+    assert len(montagens) == 1
+
+
+def test_carga_nova_remonta_mas_reaproveita_a_fatoracao(montagens):
+    net = nw.case9()
+    curto = curto_circuito.obter_curto_circuito(net)
+    net.load['p_mw'] *= 1.2
+    assert curto_circuito.obter_curto_circuito(net) is curto
+    assert len(montagens) == 2
+
+
+def test_topologia_der_e_fator_c_invalidam(montagens):
+    net = nw.case9()
+    curto = curto_circuito.obter_curto_circuito(net)
+    assert curto_circuito.obter_curto_circuito(net, c=1.0) is not curto
+
+    net.line.loc[1, 'in_service'] = False   # Trecho 3-4 do anel
+    sem_linha = curto_circuito.obter_curto_circuito(net)
+    assert sem_linha is not curto
+    assert (sem_linha.correntes()['base'] != curto.correntes()['base']).any()
+
+    net.line.loc[1, 'in_service'] = True
+    assert curto_circuito.obter_curto_circuito(net) is curto
+    # Um gerador marcado como DER sai das máquinas síncronas da matriz
+    pp.create_gen(net, 4, p_mw=10.0, vm_pu=1.0, max_p_mw=20.0)
+    com_gerador = curto_circuito.obter_curto_circuito(net)
+    net.gen['tags'] = None
+    net.gen.loc[net.gen.index[-1], 'tags'] = 'solar'
+    assert curto_circuito.obter_curto_circuito(net) is not com_gerador
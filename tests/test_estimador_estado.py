@@ -0,0 +1,41 @@
+import numpy as np
+import pandapower as pp
+import pandapower.networks as nw
+import pytest
+
+from estimador_estado import EstimadorEstado, gerar_snapshots
+
+
+@pytest.fixture(scope='module')
+def caso():
+    net = nw.case14()
+    pp.runpp(net)
+    return net, EstimadorEstado(net, verbose=False)
+
+
+def test_snapshot_sem_erro_nao_remove_medicao(caso):
+    _, estimador = caso
+    resultado = estimador.estimar(estimador.medir(estimador.v_base))
+    assert resultado['removidas'] == [] and resultado['convergiu']
+    assert resultado['j'] < resultado['limite_qui_quadrado']
+
+
+@pytest.mark.parametrize('medicao', [0, 20, 40, 60, 81])
+def test_erro_grosseiro_e_removido_e_o_estado_recuperado(caso, medicao):
+    _, estimador = caso
+    z = estimador.medir(estimador.v_base)
+    z[medicao] += 20 * estimador.plano.sigma.values[medicao]
+    resultado = estimador.estimar(z)
+    assert resultado['removidas'] == [medicao]
+    assert np.abs(resultado['v'] - estimador.v_base).max() < 1e-8
+    assert estimador.estimar(z, detectar=False)['removidas'] == []
+
+
+def test_snapshots_ruidosos_com_medicoes_faltando(caso):
+    net, estimador = caso
+    snapshots = gerar_snapshots(net, estimador, 20, taxa_erro_grosseiro=0.5, perda_medicao=0.02, semente=3)
+    assert any(corrompida is not None for _, _, corrompida in snapshots)
+    for (z, v, corrompida), resultado in zip(snapshots, estimador.processar(z for z, _, _ in snapshots)):
+        esperadas = [] if corrompida is None or np.isnan(z[corrompida]) else [corrompida]
+        assert resultado['removidas'] == esperadas
+        assert np.abs(np.abs(resultado['v']) - np.abs(v)).max() < 0.01
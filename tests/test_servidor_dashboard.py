@@ -0,0 +1,98 @@
+import asyncio
+import os
+
+import numpy as np
+import pandapower as pp
+import pandas as pd
+import pytest
+
+from checkpoint import CheckpointVarredura
+from servidor_dashboard import (CuboCenarios, FonteVarredura, ServidorDashboard, diretorio_detalhes,
+                                gravar_detalhes_cenario)
+
+BARRAS = [10, 20, 30]
+
+
+def _detalhes(linhas, hora):
+    barra, tipo, p_mw = zip(*linhas)
+    return {'barra': np.array(barra), 'tipo': np.array(tipo), 'hora': np.full(len(linhas), hora),
+            'p_mw': np.array(p_mw, dtype=float)}
+
+
+@pytest.fixture
+def cubo():
+    cubo = CuboCenarios(BARRAS, ['A', None, 'C'])
+    cubo.ingerir_registro({'hash': 'h1', 'nome': 'cen_1', 'indicadores': {'tensao_min_pu': 0.97}})
+    cubo.ingerir_registro({'hash': 'h2', 'nome': 'cen_2', 'indicadores': {'tensao_min_pu': 0.92}})
+    cubo.ingerir_registro({'hash': 'h3', 'nome': 'cen_3', 'indicadores': {}, 'erro': 'falhou'})
+    cubo.ingerir_detalhes('h1', _detalhes([(10, 'solar', 5.0), (20, 'Carga', -8.0), (30, 'solar', 1.0)], 12))
+    cubo.ingerir_detalhes('h1', _detalhes([(10, 'solar', 2.0)], 18))
+    cubo.ingerir_detalhes('h2', _detalhes([(20, 'eolico', 4.0), (20, 'Carga', -6.0), (99, 'solar', 50.0)], 12))
+    cubo.ingerir_detalhes('h3', _detalhes([(30, 'solar', 100.0)], 12))
+    return cubo
+
+
+def _por_grupo(resultado):
+    return dict(zip(resultado['grupos'], resultado['soma_mw']))
+
+
+def test_consulta_por_tipo_ignora_cenarios_com_erro(cubo):
+    resultado = cubo.consultar(agrupar='tipo')
+    assert _por_grupo(resultado) == {'solar': 8.0, 'Carga': -14.0, 'eolico': 4.0}
+    assert resultado['cenarios'] == 2 and resultado['fatias'] == 3
+    assert _por_grupo(cubo.consultar(agrupar='tipo', incluir_erros=True))['solar'] == 108.0
+    assert cubo.barras_ignoradas == 1
+
+
+def test_consulta_por_barra_usa_o_indice_de_barras_sem_nome(cubo):
+    assert _por_grupo(cubo.consultar(agrupar='barra')) == {20: -10.0, 'A': 7.0, 'C': 1.0}
+
+
+def test_consulta_por_cenario_e_hora_com_filtros(cubo):
+    assert _por_grupo(cubo.consultar(agrupar='cenario')) == {'cen_1': 0.0, 'cen_2': -2.0}
+    assert _por_grupo(cubo.consultar(agrupar='cenario', tipos=['solar'], limite=1)) == {'cen_1': 8.0}
+    por_hora = _por_grupo(cubo.consultar(agrupar='hora', tipos=['solar'], horas=[12, 18]))
+    assert por_hora == {12: 6.0, 18: 2.0}
+    filtrado = cubo.consultar(agrupar='tipo', faixas={'tensao_min_pu': (0.95, None)})
+    assert filtrado['cenarios'] == 1 and _por_grupo(filtrado)['Carga'] == -8.0
+    assert _por_grupo(cubo.consultar(agrupar='tipo', barras=[20], nome='cen_2')) == {
+        'solar': 0.0, 'Carga': -6.0, 'eolico': 4.0}
+
+
+def test_consulta_invalida(cubo):
+    with pytest.raises(ValueError):
+        cubo.consultar(agrupar='estado')
+    with pytest.raises(ValueError):
+        cubo.consultar(faixas={'inexistente': (0, 1)})
+
+
+def test_ingestao_incremental_e_servidor(tmp_path):
+    arquivo = str(tmp_path / 'resultados.jsonl')
+    os.makedirs(diretorio_detalhes(arquivo))
+    checkpoint = CheckpointVarredura(arquivo, intervalo_s=float('inf'))
+    tabela = pd.DataFrame({'barra': [10, 30], 'tipo': ['solar', 'Carga'], 'p_mw': [3.0, -2.0]})
+    for k in range(3):
+        chave = f"{k:040x}"
+        gravar_detalhes_cenario(diretorio_detalhes(arquivo), chave, tabela, hora=k)
+        checkpoint.registrar(chave, {'hash': chave, 'nome': f"c{k}", 'indicadores': {'x': float(k)}})
+    checkpoint.salvar()
+    assert not [nome for nome in os.listdir(diretorio_detalhes(arquivo)) if nome.endswith('.tmp')]
+
+    fonte = FonteVarredura(arquivo)
+    assert [len(parte) for parte in fonte.ler_novos(limite_detalhes=2)] == [3, 2]
+    assert [len(parte) for parte in fonte.ler_novos()] == [0, 1]
+
+    net = pp.create_empty_network()
+    for barra in BARRAS:
+        pp.create_bus(net, 110.0, index=barra)
+    servidor = ServidorDashboard(net, [arquivo], intervalo_s=60.0)
+
+    async def ingerir():
+        tarefa = asyncio.create_task(servidor._ingerir_periodicamente())
+        while servidor.cubo.n_fatias < 3:
+            await asyncio.sleep(0.01)
+        tarefa.cancel()
+
+    asyncio.run(asyncio.wait_for(ingerir(), 10))
+    assert _por_grupo(servidor.cubo.consultar(agrupar='hora', tipos=['solar'], horas=range(3))) == {
+        0: 3.0, 1: 3.0, 2: 3.0}
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+import main
+from checkpoint import CheckpointVarredura
+
+# Horas com comportamento especial no cenário falso
+HORA_QUE_DERRUBA = 3
+HORA_COM_ERRO = 4
+
+# Lido pelos processos de trabalho (herdado no fork do pool)
+falhar_com_erro = True
+
+
+def _cenario_falso(configs, pasta_detalhes=None):
+    if configs['hora'] == HORA_QUE_DERRUBA:
+        os._exit(1)
+    if configs['hora'] == HORA_COM_ERRO and falhar_com_erro:
+        raise ValueError("falha simulada")
+    return configs['hash'], configs['nome'], {'hora': configs['hora']}
+
+
+def _ler(arquivo):
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+@pytest.fixture
+def varredura(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, '_executar_cenario', _cenario_falso)
+    arquivo_cenarios = tmp_path / 'cenarios.json'
+    arquivo_cenarios.write_text(json.dumps({'nome': 'teste',
+                                            'variacoes': {'parametro': 'hora', 'valores': list(range(8))}}))
+    arquivo_resultados = str(tmp_path / 'resultados.jsonl')
+
+    def executar():
+        return main.executar_varredura(str(arquivo_cenarios), arquivo_resultados, processos=2,
+                                       max_tentativas=2, gravar_detalhes=False)
+    return executar, arquivo_resultados
+
+
+def test_quebra_do_pool_so_cobra_o_cenario_culpado(varredura, capsys):
+    executar, arquivo = varredura
+    assert executar() == 6
+    registros = {r['indicadores'].get('hora', r['nome']): r for r in _ler(arquivo)}
+    horas_ok = [h for h in range(8) if h not in (HORA_QUE_DERRUBA, HORA_COM_ERRO)]
+    assert all('erro' not in registros[h] for h in horas_ok)
+    erros = [r for r in _ler(arquivo) if 'erro' in r]
+    assert sorted(r['erro'] for r in erros) == ['ValueError: falha simulada', 'processo de trabalho morreu']
+    saida = capsys.readouterr().out
+    assert saida.count("desistindo") == 1
+
+
+def test_retomada_refaz_so_os_cenarios_com_erro(varredura):
+    global falhar_com_erro
+    executar, arquivo = varredura
+    executar()
+    checkpoint = CheckpointVarredura(arquivo)
+    assert checkpoint.retomar() == 6
+
+    falhar_com_erro = False
+    try:
+        assert executar() == 7
+    finally:
+        falhar_com_erro = True
+    novos = _ler(arquivo)[8:]
+    # Só os dois cenários com erro rodaram de novo; o que derruba o processo falha outra vez
+    assert sorted(r.get('erro', '') for r in novos) == ['', 'processo de trabalho morreu']
+    assert [r['indicadores'] for r in novos if 'erro' not in r] == [{'hora': HORA_COM_ERRO}]
+
+
+def test_retomada_descarta_cauda_nao_confirmada(tmp_path):
+    arquivo = str(tmp_path / 'resultados.jsonl')
+    checkpoint = CheckpointVarredura(arquivo, intervalo_s=float('inf'))
+    checkpoint.retomar()
+    checkpoint.registrar('aa' * 20, {'hash': 'aa' * 20, 'indicadores': {}})
+    checkpoint.salvar()
+    with open(arquivo, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'hash': 'bb' * 20, 'indicadores': {}}) + "\n{\"hash\": ")
+
+    retomado = CheckpointVarredura(arquivo)
+    assert retomado.retomar() == 1
+    assert retomado.concluido('aa' * 20) and not retomado.concluido('bb' * 20)
+    assert len(_ler(arquivo)) == 1
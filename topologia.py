@@ -0,0 +1,313 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import breadth_first_order, connected_components, depth_first_order
+
+# ##############################################################################
+# SERVIÇO DE TOPOLOGIA (GRAFO ESPARSO BARRA-RAMO)
+# ##############################################################################
+# Elementos que ligam barras, com as colunas de barra de cada um.
+# O trafo de 3 enrolamentos entra como duas arestas (AT-MT e AT-BT).
+ELEMENTOS_RAMO = [
+    ('line', 'from_bus', 'to_bus'),
+    ('trafo', 'hv_bus', 'lv_bus'),
+    ('trafo3w', 'hv_bus', 'mv_bus'),
+    ('trafo3w', 'hv_bus', 'lv_bus'),
+    ('impedance', 'from_bus', 'to_bus'),
+]
+
+# Tipo de elemento associado a cada letra da coluna 'et' de net.switch
+SWITCH_ET = {'l': 'line', 't': 'trafo', 't3': 'trafo3w'}
+
+
+class TopologiaRede:
+    """
+    Grafo barra-ramo da rede em formato esparso (CSR), construído uma única vez.
+
+    Cada aresta do grafo guarda o número de elementos em serviço entre as duas
+    barras; ligar ou desligar um elemento altera apenas esse contador, sem
+    reconstruir a matriz. Componentes conexas e pontes são calculadas com as
+    rotinas de scipy.sparse.csgraph e reaproveitadas enquanto a topologia não
+    muda.
+    """
+
+    def __init__(self, net):
+        self.barras = net.bus.index.values
+        self._pos_barra = np.full(self.barras.max() + 1, -1, dtype=np.int64)
+        self._pos_barra[self.barras] = np.arange(len(self.barras))
+        n = len(self.barras)
+
+        origem, destino, tipos, indices = [], [], [], []
+        for elemento, col_de, col_para in ELEMENTOS_RAMO:
+            tabela = net[elemento] if elemento in net else None
+            if tabela is None or tabela.empty:
+                continue
+            origem.append(tabela[col_de].values)
+            destino.append(tabela[col_para].values)
+            tipos.append(np.full(len(tabela), elemento, dtype=object))
+            indices.append(tabela.index.values)
+
+        # Chaves barra-barra fechadas unem duas barras diretamente
+        if 'switch' in net and not net.switch.empty:
+            chaves_bb = net.switch[net.switch.et == 'b']
+            origem.append(chaves_bb.bus.values)
+            destino.append(chaves_bb.element.values)
+            tipos.append(np.full(len(chaves_bb), 'switch', dtype=object))
+            indices.append(chaves_bb.index.values)
+
+        if origem:
+            self._de = self._pos_barra[np.concatenate(origem).astype(np.int64)]
+            self._para = self._pos_barra[np.concatenate(destino).astype(np.int64)]
+            self._tipo = np.concatenate(tipos)
+            self._indice = np.concatenate(indices)
+        else:
+            self._de = self._para = self._indice = np.zeros(0, dtype=np.int64)
+            self._tipo = np.zeros(0, dtype=object)
+
+        # Pares (min, max) de barras -> posição da aresta na matriz CSR
+        menor = np.minimum(self._de, self._para)
+        maior = np.maximum(self._de, self._para)
+        estrutura = sp.csr_matrix(
+            (np.ones(len(menor)), (menor, maior)), shape=(n, n))
+        estrutura = estrutura + estrutura.T
+        estrutura.sum_duplicates()
+        estrutura.sort_indices()
+        self._adj = sp.csr_matrix(
+            (np.zeros(estrutura.nnz), estrutura.indices, estrutura.indptr), shape=(n, n))
+
+        # Para cada aresta, as duas posições correspondentes em adj.data
+        self._pos_dados = np.column_stack([
+            self._posicao_csr(menor, maior),
+            self._posicao_csr(maior, menor),
+        ])
+        self._chave_elemento = {
+            (t, int(i)): k for k, (t, i) in enumerate(zip(self._tipo, self._indice))
+        }
+        self._em_servico = np.zeros(len(self._de), dtype=bool)
+
+        self._cache_componentes = None
+        self._cache_pontes = None
+        self.sincronizar(net)
+
+    # ------------------------------------------------------------------
+    # Construção e atualização
+    # ------------------------------------------------------------------
+    def _posicao_csr(self, linhas, colunas):
+        """Posição em adj.data de cada par (linha, coluna), via busca binária por linha."""
+        indptr, indices = self._adj.indptr, self._adj.indices
+        posicoes = np.empty(len(linhas), dtype=np.int64)
+        for k, (i, j) in enumerate(zip(linhas, colunas)):
+            inicio, fim = indptr[i], indptr[i + 1]
+            posicoes[k] = inicio + np.searchsorted(indices[inicio:fim], j)
+        return posicoes
+
+    def _estado_elementos(self, net):
+        """Estado em serviço de cada aresta, considerando chaves abertas."""
+        estado = np.zeros(len(self._de), dtype=bool)
+        for elemento in set(self._tipo):
+            mascara = self._tipo == elemento
+            tabela = net[elemento]
+            if elemento == 'switch':
+                estado[mascara] = tabela.loc[self._indice[mascara], 'closed'].values.astype(bool)
+                continue
+            indices = self._indice[mascara]
+            # Elementos removidos da tabela (ex.: net.gen.drop) contam como fora de serviço
+            existe = np.isin(indices, tabela.index.values)
+            valores = np.zeros(len(indices), dtype=bool)
+            valores[existe] = tabela.loc[indices[existe], 'in_service'].values.astype(bool)
+            estado[mascara] = valores
+
+        if 'switch' in net and not net.switch.empty:
+            abertas = net.switch[(net.switch.et != 'b') & ~net.switch.closed.astype(bool)]
+            for et, elemento in SWITCH_ET.items():
+                abertos = abertas.element.values[abertas.et.values == et]
+                if len(abertos):
+                    estado[(self._tipo == elemento) & np.isin(self._indice, abertos)] = False
+        return estado
+
+    def _aplicar(self, arestas, ligar):
+        """Atualiza os contadores das arestas e invalida apenas o que mudou."""
+        if len(arestas) == 0:
+            return
+        delta = 1.0 if ligar else -1.0
+        np.add.at(self._adj.data, self._pos_dados[arestas].ravel(), delta)
+        self._em_servico[arestas] = ligar
+
+        comp = self._cache_componentes
+        if comp is not None:
+            rotulos = comp[1]
+            if ligar:
+                # Ligar dentro da mesma ilha não altera as componentes
+                if np.any(rotulos[self._de[arestas]] != rotulos[self._para[arestas]]):
+                    self._cache_componentes = None
+            else:
+                # Desligar um único ramo que não é ponte não altera as componentes
+                pontes = self._cache_pontes
+                if pontes is None or len(arestas) > 1 or np.any(pontes[arestas]):
+                    self._cache_componentes = None
+        self._cache_pontes = None
+
+    def alternar(self, elemento, indice, em_servico):
+        """Liga ou desliga um único elemento (ex.: ('line', 12, False))."""
+        k = self._chave_elemento.get((elemento, int(indice)))
+        if k is None:
+            raise KeyError(f"Elemento {elemento} {indice} não faz parte da topologia.")
+        if self._em_servico[k] != bool(em_servico):
+            self._aplicar(np.array([k]), bool(em_servico))
+
+    def sincronizar(self, net):
+        """
+        Compara o estado atual da rede com o estado guardado e aplica só as
+        diferenças. Também atualiza as barras de referência (ext_grid e
+        geradores slack em serviço).
+        """
+        estado = self._estado_elementos(net)
+        mudou = estado != self._em_servico
+        self._aplicar(np.flatnonzero(mudou & estado), True)
+        self._aplicar(np.flatnonzero(mudou & ~estado), False)
+
+        referencias = []
+        if not net.ext_grid.empty:
+            referencias.append(net.ext_grid.bus.values[net.ext_grid.in_service.values.astype(bool)])
+        if not net.gen.empty and 'slack' in net.gen.columns:
+            slack = net.gen.slack.fillna(False).values.astype(bool) & net.gen.in_service.values.astype(bool)
+            referencias.append(net.gen.bus.values[slack])
+        referencias = np.concatenate(referencias) if referencias else np.zeros(0, dtype=np.int64)
+        self._referencias = np.unique(self._pos_barra[referencias.astype(np.int64)])
+
+        self._barra_ativa = net.bus.loc[self.barras, 'in_service'].values.astype(bool)
+        return int(mudou.sum())
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _grafo(self):
+        grafo = self._adj.copy()
+        grafo.eliminate_zeros()
+        return grafo
+
+    def componentes(self):
+        """Retorna (número de componentes, rótulo da componente de cada barra)."""
+        if self._cache_componentes is None:
+            self._cache_componentes = connected_components(self._grafo(), directed=False)
+        return self._cache_componentes
+
+    def ilhas(self):
+        """Dicionário {rótulo: array de índices de barra do pandapower}."""
+        _, rotulos = self.componentes()
+        ordem = np.argsort(rotulos, kind='stable')
+        cortes = np.flatnonzero(np.diff(rotulos[ordem])) + 1
+        return {int(rotulos[grupo[0]]): self.barras[grupo] for grupo in np.split(ordem, cortes)}
+
+    def barras_sem_referencia(self):
+        """Barras em serviço que estão em ilhas sem ext_grid nem gerador slack."""
+        _, rotulos = self.componentes()
+        com_referencia = np.zeros(rotulos.max() + 1, dtype=bool)
+        com_referencia[rotulos[self._referencias]] = True
+        orfas = ~com_referencia[rotulos] & self._barra_ativa
+        return self.barras[orfas]
+
+    def pontes(self):
+        """
+        Marca as arestas cujo desligamento separa a rede (pontes). Usa a ordem
+        de busca em profundidade do csgraph e propaga o 'low-link' das folhas
+        para a raiz. Ramos paralelos nunca são pontes.
+        """
+        if self._cache_pontes is not None:
+            return self._cache_pontes
+
+        grafo = self._grafo()
+        n = grafo.shape[0]
+        n_comp, rotulos = self.componentes()
+        pre = np.full(n, -1, dtype=np.int64)
+        pai = np.full(n, -9999, dtype=np.int64)
+        ordem_total = []
+        contador = 0
+        for c in range(n_comp):
+            raiz = int(np.argmax(rotulos == c))
+            ordem, predecessores = depth_first_order(grafo, raiz, directed=False)
+            pre[ordem] = np.arange(contador, contador + len(ordem))
+            pai[ordem] = predecessores[ordem]
+            contador += len(ordem)
+            ordem_total.append(ordem)
+        ordem_total = np.concatenate(ordem_total)
+
+        # low[v]: menor pré-ordem alcançável por uma aresta de retorno a partir de v
+        linhas = np.repeat(np.arange(n), np.diff(grafo.indptr))
+        colunas = grafo.indices
+        multiplicidade = grafo.data
+        aresta_arvore = (pai[linhas] == colunas) | (pai[colunas] == linhas)
+        retorno = ~aresta_arvore | (multiplicidade > 1)
+        low = pre.copy()
+        np.minimum.at(low, linhas[retorno], pre[colunas[retorno]])
+
+        for v in ordem_total[::-1]:
+            p = pai[v]
+            if p >= 0 and low[v] < low[p]:
+                low[p] = low[v]
+
+        # Aresta de árvore (pai, filho) é ponte quando o filho não alcança acima do pai
+        filho_ponte = np.zeros(n, dtype=bool)
+        tem_pai = pai >= 0
+        filho_ponte[tem_pai] = low[tem_pai] > pre[pai[tem_pai]]
+
+        de, para = self._de, self._para
+        candidata = self._em_servico & (
+            (filho_ponte[para] & (pai[para] == de)) | (filho_ponte[de] & (pai[de] == para)))
+        # Uma aresta paralela a outra em serviço não é ponte
+        candidata &= self._adj.data[self._pos_dados[:, 0]] == 1
+        self._cache_pontes = candidata
+        return candidata
+
+    def elementos_ponte(self):
+        """Lista de (elemento, índice) cujo desligamento cria uma ilha."""
+        mascara = self.pontes()
+        return list(zip(self._tipo[mascara], self._indice[mascara].tolist()))
+
+    def vizinhanca(self, barras, k):
+        """
+        Barras (índices do pandapower) a no máximo k saltos de qualquer uma
+        das barras dadas, percorrendo só ramos em serviço.
+        """
+        grafo = self._grafo()
+        n = grafo.shape[0]
+        fontes = self._pos_barra[np.asarray(barras, dtype=np.int64)]
+        # Nó virtual ligado a todas as fontes: uma única busca em largura
+        virtual = sp.csr_matrix(
+            (np.ones(len(fontes)), (np.zeros(len(fontes), dtype=np.int64), fontes)), shape=(1, n))
+        aumentado = sp.bmat([[grafo, virtual.T], [virtual, None]], format='csr')
+        ordem, predecessores = breadth_first_order(aumentado, n, directed=False)
+        distancia = np.full(n + 1, -1, dtype=np.int64)
+        distancia[n] = -1
+        for v in ordem[1:]:
+            distancia[v] = distancia[predecessores[v]] + 1
+        alcancadas = (distancia[:n] >= 0) & (distancia[:n] <= k)
+        return self.barras[alcancadas]
+
+    def verificar(self, net=None, verbose=True):
+        """Resumo do estado topológico; sincroniza antes se 'net' for dado."""
+        if net is not None:
+            self.sincronizar(net)
+        n_comp, _ = self.componentes()
+        orfas = self.barras_sem_referencia()
+        if verbose:
+            print(f"   -> Topologia: {n_comp} ilha(s), {len(orfas)} barra(s) sem referência (slack).")
+            if len(orfas):
+                print(f"      -> AVISO: Barras sem referência: {orfas[:10].tolist()}"
+                      f"{' ...' if len(orfas) > 10 else ''}")
+        return {'num_ilhas': int(n_comp), 'barras_sem_referencia': orfas}
+
+    # ------------------------------------------------------------------
+    # Exportação opcional
+    # ------------------------------------------------------------------
+    def para_networkx(self):
+        """Exporta o grafo em serviço para networkx (apenas para inspeção/plotagem)."""
+        import networkx as nx
+
+        grafo = nx.MultiGraph()
+        grafo.add_nodes_from(self.barras.tolist())
+        ativas = np.flatnonzero(self._em_servico)
+        grafo.add_edges_from(
+            (int(self.barras[self._de[k]]), int(self.barras[self._para[k]]),
+             {'elemento': self._tipo[k], 'indice': int(self._indice[k])})
+            for k in ativas)
+        return grafo